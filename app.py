@@ -8,13 +8,18 @@ Aplicação web para geração automática de contestações jurídicas
 import streamlit as st
 from pathlib import Path
 from datetime import datetime
+from typing import Dict, Optional
 import json
 
 from config.settings import Config
 from modules.document_processor import ProcessadorPeticao
 from modules.rag_retriever import RAGRetriever
+from modules.embedding_engines import motores_residentes
 from modules.llm_generator import ContextBuilder, LLMGenerator
 from modules.validator import ValidadorContestacao, FormatadorDOCX
+from modules.trechos import trecho
+from modules.duplicatas import IndiceDuplicatas, substituir_campos, paragrafos_divergentes
+from modules.ingestao_online import IndexadorOnline
 
 # Configuração da página
 st.set_page_config(
@@ -66,29 +71,130 @@ st.markdown("""
 """, unsafe_allow_html=True)
 
 
+@st.cache_resource(show_spinner="🔄 Carregando sistema RAG...")
+def obter_retriever() -> RAGRetriever:
+    """Retriever compartilhado por todas as sessões (modelo e vector store carregados uma vez)"""
+    return RAGRetriever()
+
+
+@st.cache_resource
+def obter_generator() -> LLMGenerator:
+    """Cliente Anthropic compartilhado por todas as sessões"""
+    return LLMGenerator()
+
+
+@st.cache_resource
+def obter_indice_duplicatas() -> Optional[IndiceDuplicatas]:
+    """Índice de petições já respondidas (None se desabilitado)"""
+    return IndiceDuplicatas() if Config.DUPLICATAS_ENABLED else None
+
+
+@st.cache_resource
+def obter_indexador() -> Optional[IndexadorOnline]:
+    """Thread que indexa as contestações aprovadas (None se desabilitada)"""
+    return IndexadorOnline(obter_retriever()) if Config.INGESTAO_ONLINE_ENABLED else None
+
+
+@st.cache_resource
+def obter_builder() -> ContextBuilder:
+    """Construtor de contexto (sem estado) compartilhado"""
+    return ContextBuilder()
+
+
+@st.cache_resource
+def obter_validador() -> ValidadorContestacao:
+    """Validador (sem estado) compartilhado"""
+    return ValidadorContestacao()
+
+
+@st.cache_resource
+def obter_formatador() -> FormatadorDOCX:
+    """Formatador DOCX (sem estado) compartilhado"""
+    return FormatadorDOCX()
+
+
 def inicializar_sessao():
-    """Inicializa variáveis de sessão"""
+    """Inicializa variáveis de sessão (apenas dados do usuário)"""
+    # Processador guarda o texto da petição enviada: um por sessão
     if 'processador' not in st.session_state:
         st.session_state.processador = ProcessadorPeticao()
     
-    if 'retriever' not in st.session_state:
-        with st.spinner("🔄 Carregando sistema RAG..."):
-            st.session_state.retriever = RAGRetriever()
-    
-    if 'generator' not in st.session_state:
-        st.session_state.generator = LLMGenerator()
-    
-    if 'builder' not in st.session_state:
-        st.session_state.builder = ContextBuilder()
+    if 'resultado' not in st.session_state:
+        st.session_state.resultado = None
     
-    if 'validador' not in st.session_state:
-        st.session_state.validador = ValidadorContestacao()
+    # Recursos pesados são singletons do processo (st.cache_resource)
+    obter_retriever()
+    # Indexador online: retoma a fila de aprovadas deixada por um reinício
+    obter_indexador()
+
+
+def mostrar_chunk(chunk, tamanho: int, chave: str):
+    """Trecho do chunk; o texto completo só é carregado quando o usuário abre"""
+    st.code(trecho(chunk, tamanho) + "...", language=None)
+    if st.checkbox("Ver texto completo", key=chave):
+        chunk = obter_retriever().carregar_conteudo([chunk])[0]
+        st.code(chunk['conteudo'], language=None)
+
+
+def verificar_duplicata(arquivo_path: Path) -> Optional[Dict]:
+    """Petição anterior quase idêntica à enviada (registro do índice + dados da nova)"""
+    indice = obter_indice_duplicatas()
+    if indice is None:
+        return None
+    try:
+        dados_peticao = ProcessadorPeticao().processar_arquivo(arquivo_path)
+    except Exception:
+        # Erros de leitura aparecem na geração
+        return None
+    registro = indice.buscar(indice.assinatura(dados_peticao['texto_completo']))
+    if registro is None:
+        return None
+    return {
+        'registro': registro,
+        'dados_peticao': dados_peticao,
+        'divergentes': paragrafos_divergentes(dados_peticao['texto_completo'], registro['paragrafos'])
+    }
+
+
+def reaproveitar_contestacao(duplicata: Dict) -> Dict:
+    """Resultado da sessão a partir da contestação anterior, com os campos da petição nova"""
+    registro = duplicata['registro']
+    dados_peticao = duplicata['dados_peticao']
+    contestacao, substituicoes = substituir_campos(
+        registro['contestacao'], registro['dados_peticao'], dados_peticao
+    )
+    dados_peticao['tipo_caso'] = registro['dados_peticao'].get('tipo_caso')
+    dados_peticao['confianca'] = registro['dados_peticao'].get('confianca', 0)
     
-    if 'formatador' not in st.session_state:
-        st.session_state.formatador = FormatadorDOCX()
+    # Contexto guardado sem o texto dos chunks: recarregado por id
+    retriever = obter_retriever()
+    contexto = {
+        chave: retriever.carregar_conteudo(valor) if isinstance(valor, list) else valor
+        for chave, valor in registro['contexto'].items()
+    }
+    resultado_rag = {
+        'classificacao': {'tipo_caso': dados_peticao['tipo_caso'], 'confianca': dados_peticao['confianca']},
+        'nivel_1': contexto.get('nivel_1', []),
+        'nivel_2': contexto.get('nivel_2', []),
+        'nivel_3': contexto.get('nivel_3', []),
+    }
+    resultado_rag['total_chunks'] = sum(len(resultado_rag[nivel]) for nivel in ('nivel_1', 'nivel_2', 'nivel_3'))
     
-    if 'resultado' not in st.session_state:
-        st.session_state.resultado = None
+    return {
+        'contestacao': contestacao,
+        'metadados': {**registro['metadados'], 'input_tokens': 0, 'output_tokens': 0, 'reaproveitada_de': registro['id']},
+        'validacao': obter_validador().validar(contestacao),
+        'dados_peticao': dados_peticao,
+        'contexto_rag': contexto,
+        'resultado_rag_completo': resultado_rag,
+        'custo': 0.0,
+        'reaproveitamento': {
+            'similaridade': registro['similaridade'],
+            'arquivo': registro['arquivo'],
+            'substituicoes': substituicoes,
+            'divergentes': duplicata['divergentes']
+        }
+    }
 
 
 def validar_configuracao():
@@ -141,6 +247,29 @@ def interface_principal():
             
             st.success(f"✅ Arquivo carregado: {arquivo.name}")
             
+            # Petição quase idêntica a uma já respondida: oferece reaproveitar a contestação
+            chave_arquivo = (arquivo.name, arquivo.size)
+            if st.session_state.get('duplicata_arquivo') != chave_arquivo:
+                st.session_state.duplicata_arquivo = chave_arquivo
+                st.session_state.duplicata = verificar_duplicata(temp_path)
+            
+            duplicata = st.session_state.duplicata
+            if duplicata:
+                registro = duplicata['registro']
+                criado = datetime.fromtimestamp(registro['criado']).strftime('%d/%m/%Y %H:%M')
+                st.info(
+                    f"📎 **Petição quase idêntica já respondida** ({registro['similaridade']:.0%} de similaridade): "
+                    f"{registro['arquivo'] or 'sem nome'}, em {criado}. A contestação anterior pode ser "
+                    f"reaproveitada com as partes, o processo e o valor da causa trocados, sem nova geração."
+                )
+                if duplicata['divergentes']:
+                    with st.expander(f"📝 Trechos desta petição ausentes na anterior ({len(duplicata['divergentes'])})"):
+                        for paragrafo in duplicata['divergentes']:
+                            st.write(f"• {paragrafo[:400]}")
+                if st.button("⚡ REAPROVEITAR CONTESTAÇÃO ANTERIOR", use_container_width=True):
+                    st.session_state.resultado = reaproveitar_contestacao(duplicata)
+                    st.rerun()
+            
             # Configurações de geração
             st.header("⚙️ Configurações de Geração")
             
@@ -196,18 +325,27 @@ def interface_principal():
                         # 2. Retrieval RAG
                         st.info("🔍 Executando retrieval RAG...")
                         texto_query = st.session_state.processador.get_texto_para_embedding()
-                        resultado_rag = st.session_state.retriever.retrieval_hierarquico(texto_query)
+                        janelas = (
+                            st.session_state.processador.get_janelas_para_embedding()
+                            if Config.RETRIEVAL_MODO == 'multijanela' else None
+                        )
+                        resultado_rag = obter_retriever().retrieval_hierarquico(
+                            texto_query,
+                            janelas=janelas,
+                            pedidos=dados_peticao.get('pedidos'),
+                            fatos=dados_peticao.get('elementos_facticos')
+                        )
                         
                         # 3. Construir contexto
                         st.info("📚 Construindo contexto...")
-                        contexto = st.session_state.builder.construir_contexto(
+                        contexto = obter_builder().construir_contexto(
                             dados_peticao,
                             resultado_rag
                         )
                         
                         # 4. Gerar contestação
                         st.info("🤖 Gerando contestação com Claude...")
-                        resultado = st.session_state.generator.gerar_contestacao(
+                        resultado = obter_generator().gerar_contestacao(
                             dados_peticao,
                             contexto,
                             temperatura=temperatura,
@@ -217,7 +355,7 @@ def interface_principal():
                         
                         if resultado['sucesso']:
                             # 5. Validar
-                            validacao = st.session_state.validador.validar(resultado['contestacao'])
+                            validacao = obter_validador().validar(resultado['contestacao'])
                             
                             # 6. Salvar resultado na sessão
                             st.session_state.resultado = {
@@ -230,6 +368,18 @@ def interface_principal():
                                 'custo': resultado['custo_estimado']
                             }
                             
+                            # 7. Indexar a petição para reaproveitamento futuro
+                            indice = obter_indice_duplicatas()
+                            if indice is not None:
+                                indice.adicionar(
+                                    indice.assinatura(dados_peticao['texto_completo']),
+                                    dados_peticao,
+                                    resultado['contestacao'],
+                                    contexto,
+                                    resultado['metadados'],
+                                    arquivo=arquivo.name
+                                )
+                            
                             st.success("✅ Contestação gerada com sucesso!")
                             st.rerun()
                         
@@ -276,6 +426,18 @@ def interface_principal():
                         f"${res['custo']:.4f}"
                     )
                 
+                # Contestação reaproveitada: o que foi trocado e o que revisar
+                if res.get('reaproveitamento'):
+                    reap = res['reaproveitamento']
+                    st.warning(
+                        f"⚡ Contestação reaproveitada de {reap['arquivo'] or 'petição anterior'} "
+                        f"({reap['similaridade']:.0%} de similaridade). Revise os trechos novos da petição."
+                    )
+                    for sub in reap['substituicoes']:
+                        st.write(f"• **{sub['campo']}:** {sub['de']} → {sub['para']} ({sub['ocorrencias']} ocorrências)")
+                    if not reap['substituicoes']:
+                        st.write("• Nenhum campo da petição difere da anterior")
+                
                 # Métricas de qualidade
                 if mostrar_metricas:
                     st.subheader("📊 Métricas de Qualidade")
@@ -305,7 +467,7 @@ def interface_principal():
                 
                 # Contestação
                 st.subheader("📜 Contestação Gerada")
-                st.text_area(
+                texto_final = st.text_area(
                     "Texto da contestação",
                     value=res['contestacao'],
                     height=500,
@@ -313,7 +475,7 @@ def interface_principal():
                 )
                 
                 # Botões de ação
-                col1, col2, col3 = st.columns(3)
+                col1, col2, col3, col4 = st.columns(4)
                 
                 with col1:
                     if st.button("📥 Download DOCX", use_container_width=True):
@@ -321,7 +483,7 @@ def interface_principal():
                         output_path = Config.OUTPUT_DIR / f"contestacao_{datetime.now().strftime('%Y%m%d_%H%M%S')}.docx"
                         Config.OUTPUT_DIR.mkdir(exist_ok=True)
                         
-                        st.session_state.formatador.criar_docx(
+                        obter_formatador().criar_docx(
                             res['contestacao'],
                             res['metadados'],
                             output_path
@@ -346,6 +508,31 @@ def interface_principal():
                     if st.button("🔄 Nova Geração", use_container_width=True):
                         st.session_state.resultado = None
                         st.rerun()
+                
+                with col4:
+                    # Texto final (com as edições do advogado) entra na collection em segundo plano
+                    indexador = obter_indexador()
+                    if indexador is not None and st.button(
+                        "✅ Aprovar e Indexar",
+                        use_container_width=True,
+                        disabled=res.get('aprovacao') is not None
+                    ):
+                        try:
+                            res['aprovacao'] = indexador.aprovar(
+                                texto_final,
+                                res['resultado_rag_completo']['classificacao'].get('tipo_caso'),
+                                metadados={
+                                    'numero_processo': res['dados_peticao'].get('numero_processo'),
+                                    'editada': texto_final != res['contestacao'],
+                                    'score_qualidade': res['validacao']['metricas']['score_qualidade']
+                                }
+                            )
+                            st.success(f"✅ Contestação aprovada e na fila de indexação (item {res['aprovacao']})")
+                        except ValueError as e:
+                            st.error(f"❌ {e}")
+                    elif res.get('aprovacao') is not None and indexador is not None:
+                        item = indexador.fila.item(res['aprovacao']) or {}
+                        st.caption(f"Aprovada · indexação: {item.get('status', 'desconhecida')}")
     
     # ==================================================================
     # TAB 2: ANÁLISE DA PETIÇÃO
@@ -405,20 +592,24 @@ def interface_principal():
             with st.expander(f"📚 Nível 1 - Contexto Global ({len(rag['nivel_1'])} chunks)"):
                 for i, chunk in enumerate(rag['nivel_1'][:5], 1):
                     st.write(f"**Chunk {i}** (Sim: {chunk['similaridade']:.2%})")
-                    st.code(chunk['conteudo'][:300] + "...", language=None)
+                    mostrar_chunk(chunk, 300, f"completo_n1_{i}")
             
             # Nível 2
             with st.expander(f"📄 Nível 2 - Seções Processuais ({len(rag['nivel_2'])} chunks)"):
                 for i, chunk in enumerate(rag['nivel_2'][:5], 1):
                     st.write(f"**Chunk {i}** (Sim: {chunk['similaridade']:.2%})")
-                    st.write(f"Seção: {chunk['metadata'].get('secao', 'N/A')}")
-                    st.code(chunk['conteudo'][:250] + "...", language=None)
+                    st.write(f"Seção: {chunk['metadata'].get('secao') or chunk['metadata'].get('tipo_secao', 'N/A')}")
+                    if chunk.get('expansao'):
+                        st.caption(f"Expansão hierárquica: seção {chunk['expansao']['relacao']} de um hit")
+                    mostrar_chunk(chunk, 250, f"completo_n2_{i}")
             
             # Nível 3
             with st.expander(f"⚖️ Nível 3 - Chunks Atômicos ({len(rag['nivel_3'])} chunks)"):
                 for i, chunk in enumerate(rag['nivel_3'][:5], 1):
                     st.write(f"**Chunk {i}** (Sim: {chunk['similaridade']:.2%})")
-                    st.code(chunk['conteudo'][:200] + "...", language=None)
+                    if chunk.get('citacoes'):
+                        st.write(f"Citações da petição: {', '.join(chunk['citacoes'])}")
+                    mostrar_chunk(chunk, 200, f"completo_n3_{i}")
         
         else:
             st.info("👆 Gere uma contestação primeiro para ver o contexto RAG")
@@ -429,7 +620,7 @@ def interface_principal():
     with tab4:
         st.header("📊 Estatísticas do Sistema RAG")
         
-        stats = st.session_state.retriever.get_estatisticas()
+        stats = obter_retriever().get_estatisticas()
         
         st.metric("Total de Chunks no Vector Store", f"{stats['total_chunks']:,}")
         
@@ -447,16 +638,143 @@ def interface_principal():
         # Por tipo
         st.subheader("📋 Distribuição por Tipo de Caso")
         for tipo, count in stats['por_tipo'].items():
-            info_tipo = Config.get_tipo_caso_info(tipo)
-            st.write(f"**{info_tipo['nome']}:** {count} chunks")
+            nome = Config.get_tipo_caso_info(tipo)['nome'] if tipo in Config.TIPOS_CASO else tipo
+            st.write(f"**{nome}:** {count} chunks")
+        
+        # Por tipo de documento e seção
+        col1, col2 = st.columns(2)
+        
+        with col1:
+            st.subheader("📑 Por Tipo de Documento")
+            for tipo_doc, count in sorted(stats['por_tipo_doc'].items()):
+                st.write(f"**{tipo_doc}:** {count} chunks")
+        with col2:
+            st.subheader("🗂️ Por Seção")
+            for secao, count in sorted(stats['por_secao'].items()):
+                st.write(f"**{secao}:** {count} chunks")
+        
+        # Cache de embeddings
+        cache = obter_retriever().cache_embeddings
+        if cache is not None:
+            st.subheader("⚡ Cache de Embeddings")
+            cache_stats = cache.estatisticas()
+            col1, col2, col3, col4 = st.columns(4)
+            
+            with col1:
+                st.metric("Hits (memória)", cache_stats['hits_memoria'])
+            with col2:
+                st.metric("Hits (disco)", cache_stats['hits_disco'])
+            with col3:
+                st.metric("Misses", cache_stats['misses'])
+            with col4:
+                st.metric("Taxa de Acerto", f"{cache_stats['taxa_acerto']:.0%}")
+        
+        # Cache semântico de resultados
+        cache = obter_retriever().cache_resultados
+        if cache is not None:
+            st.subheader("🧠 Cache Semântico de Resultados")
+            cache_stats = cache.estatisticas()
+            col1, col2, col3, col4 = st.columns(4)
+            
+            with col1:
+                st.metric("Hits", cache_stats['hits'])
+            with col2:
+                st.metric("Misses", cache_stats['misses'])
+            with col3:
+                st.metric("Taxa de Acerto", f"{cache_stats['taxa_acerto']:.0%}")
+            with col4:
+                st.metric("Cosseno Médio (hits)", f"{cache_stats['similaridade_media_hits']:.3f}")
+            st.caption(
+                f"{cache_stats['entradas']} resultados guardados · {cache_stats['expiradas']} expirados · "
+                f"{cache_stats['invalidacoes']} invalidações por mudança na collection"
+            )
+        
+        # Petições quase duplicadas
+        indice = obter_indice_duplicatas()
+        if indice is not None:
+            st.subheader("🧬 Petições Quase Duplicadas")
+            dup_stats = indice.estatisticas()
+            col1, col2, col3, col4 = st.columns(4)
+            
+            with col1:
+                st.metric("Petições Indexadas", f"{dup_stats['peticoes']:,}")
+            with col2:
+                st.metric("Consultas", dup_stats['consultas'])
+            with col3:
+                st.metric("Duplicatas Encontradas", f"{dup_stats['taxa_duplicatas']:.0%}")
+            with col4:
+                st.metric("Busca (média)", f"{dup_stats['tempo_medio_ms']:.2f} ms")
+        
+        # Micro-lotes de embeddings
+        servico = obter_retriever().servico_embeddings
+        if servico is not None:
+            st.subheader("📦 Micro-lotes de Embeddings")
+            servico_stats = servico.estatisticas()
+            col1, col2, col3, col4 = st.columns(4)
+            
+            with col1:
+                st.metric("Fila", servico_stats['profundidade_fila'])
+            with col2:
+                st.metric("Lote Médio", f"{servico_stats['lote_medio']:.1f}")
+            with col3:
+                st.metric("Latência Adicionada (média)", f"{servico_stats['latencia_adicionada_media_ms']:.1f} ms")
+            with col4:
+                st.metric("Latência Adicionada (p95)", f"{servico_stats['latencia_adicionada_p95_ms']:.1f} ms")
+            
+            if servico_stats['histograma_lotes']:
+                st.bar_chart({
+                    'lotes': {
+                        str(tamanho): quantidade
+                        for tamanho, quantidade in servico_stats['histograma_lotes'].items()
+                    }
+                })
+        
+        # Contestações aprovadas indexadas em segundo plano
+        indexador = obter_indexador()
+        if indexador is not None:
+            st.subheader("📥 Ingestão Online de Aprovadas")
+            ingestao_stats = indexador.estatisticas()
+            col1, col2, col3, col4 = st.columns(4)
+            
+            with col1:
+                st.metric("Na Fila", ingestao_stats['fila']['pendente'] + ingestao_stats['fila']['processando'])
+            with col2:
+                st.metric("Indexadas", ingestao_stats['fila']['concluido'])
+            with col3:
+                st.metric("Chunks Acrescentados", ingestao_stats['chunks'])
+            with col4:
+                st.metric("Tempo por Documento", f"{ingestao_stats['tempo_medio_s']:.1f} s")
+            for erro in ingestao_stats['erros']:
+                st.warning(f"⚠️ Item {erro['id']} ({Path(erro['arquivo']).name}): {erro['erro']}")
+        
+        # Recursos compartilhados pelo processo
+        st.subheader("🧠 Recursos Residentes")
+        residentes = motores_residentes()
+        col1, col2, col3 = st.columns(3)
+        
+        with col1:
+            st.metric("Modelos de Embedding Residentes", residentes['residentes'])
+        with col2:
+            st.metric("Carregamentos de Modelo", residentes['carregamentos'])
+        with col3:
+            st.metric("Buscas Vetoriais (processo)", obter_retriever().total_queries)
+        
+        # Candidatos buscados x chunks usados por nível (top_k fixo ou adaptativo)
+        contadores = obter_retriever().estatisticas_busca()
+        if contadores:
+            st.subheader("🎯 Aproveitamento das Buscas por Nível")
+            st.caption(
+                f"Busca adaptativa: {'ativada' if Config.RETRIEVAL_ADAPTATIVO else 'desativada'}"
+            )
+            st.json({f"Nível {nivel}": valores for nivel, valores in contadores.items()})
         
         # Informações do modelo
         st.subheader("🤖 Configuração")
         st.json({
             "Embedding Model": Config.EMBEDDING_MODEL,
             "Claude Model": Config.CLAUDE_MODEL,
-            "Collection": Config.COLLECTION_NAME,
-            "Vector Store": str(Config.VECTOR_STORE_DIR)
+            "Collection": obter_retriever().collection_name,
+            "Vector Store": str(obter_retriever().vector_store_dir)
         })
 
 
@@ -0,0 +1,98 @@
+"""
+═══════════════════════════════════════════════════════════════════════════
+BENCHMARK - BUSCA ADAPTATIVA x TOP-K FIXO
+═══════════════════════════════════════════════════════════════════════════
+Queries a partir dos embeddings dos próprios chunks (com ruído), buscadas
+nos 3 níveis com os filtros do retriever. Compara o top_k fixo (documentos
+de todos os candidatos, corte em Python) com a busca adaptativa (ids e
+distâncias, documentos só dos sobreviventes): latência, candidatos e
+documentos carregados por busca, ampliações de k e se os chunks
+retornados são os mesmos.
+
+Uso:
+    python -m benchmarks.benchmark_adaptativo --n 50 --ruido 0.3
+"""
+
+import argparse
+import contextlib
+import io
+import time
+from typing import Dict, List
+
+import numpy as np
+
+from config.settings import Config
+from modules.rag_retriever import RAGRetriever
+
+
+def gerar_queries(retriever: RAGRetriever, n: int, ruido: float) -> List[List[float]]:
+    """Embeddings de chunks aleatórios com ruído gaussiano (renormalizados)"""
+    dados = retriever.collection.get(include=['embeddings'])
+    matriz = np.asarray(dados['embeddings'], dtype=np.float32)
+    rng = np.random.default_rng(42)
+    queries = []
+    for posicao in rng.choice(len(matriz), size=n):
+        consulta = matriz[posicao] / np.linalg.norm(matriz[posicao])
+        consulta = consulta + rng.normal(0, ruido / np.sqrt(len(consulta)), len(consulta))
+        queries.append((consulta / np.linalg.norm(consulta)).tolist())
+    return queries
+
+
+def executar(retriever: RAGRetriever, queries: List[List[float]], adaptativo: bool) -> Dict:
+    """Latência por nível e resultados de todas as queries num modo"""
+    Config.RETRIEVAL_ADAPTATIVO = adaptativo
+    retriever._k_adaptativo.clear()
+    retriever._media_sobreviventes.clear()
+    retriever._contadores_nivel.clear()
+    
+    buscas = {
+        1: lambda q: retriever.buscar_nivel_1(q),
+        2: lambda q: retriever.buscar_nivel_2(q, tipo_doc='contestacao'),
+        3: lambda q: retriever.buscar_nivel_3(q)
+    }
+    tempos = {nivel: [] for nivel in buscas}
+    resultados = {nivel: [] for nivel in buscas}
+    for query in queries:
+        for nivel, busca in buscas.items():
+            inicio = time.perf_counter()
+            chunks = busca(query)
+            tempos[nivel].append(time.perf_counter() - inicio)
+            resultados[nivel].append([chunk['id'] for chunk in chunks])
+    
+    return {
+        'tempos': {nivel: 1000 * np.mean(valores) for nivel, valores in tempos.items()},
+        'resultados': resultados,
+        'contadores': retriever.estatisticas_busca()
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--n', type=int, default=50, help='Queries')
+    parser.add_argument('--ruido', type=float, default=0.3, help='Norma do ruído somado ao embedding')
+    args = parser.parse_args()
+    
+    with contextlib.redirect_stdout(io.StringIO()):
+        retriever = RAGRetriever()
+    queries = gerar_queries(retriever, args.n, args.ruido)
+    
+    # Aquecimento (índices e caches do backend)
+    executar(retriever, queries[:5], False)
+    fixo = executar(retriever, queries, False)
+    adaptativo = executar(retriever, queries, True)
+    
+    print(f"{'Nível':<6} {'top_k':>6} {'Fixo (ms)':>10} {'Adapt. (ms)':>12} {'Docs fixo':>10} "
+          f"{'Cand. adapt.':>13} {'Docs adapt.':>12} {'Ampliações':>11} {'k final':>8} {'Iguais':>7}")
+    for nivel in (1, 2, 3):
+        cf, ca = fixo['contadores'][nivel], adaptativo['contadores'][nivel]
+        iguais = np.mean([
+            a == b for a, b in zip(fixo['resultados'][nivel], adaptativo['resultados'][nivel])
+        ])
+        print(f"{nivel:<6} {Config.RETRIEVAL_CONFIG[f'nivel_{nivel}']['top_k']:>6} "
+              f"{fixo['tempos'][nivel]:>10.2f} {adaptativo['tempos'][nivel]:>12.2f} "
+              f"{cf['documentos'] / cf['buscas']:>10.1f} {ca['candidatos'] / ca['buscas']:>13.1f} "
+              f"{ca['documentos'] / ca['buscas']:>12.1f} {ca['ampliacoes']:>11} {ca['k']:>8} {iguais:>7.0%}")
+
+
+if __name__ == "__main__":
+    main()
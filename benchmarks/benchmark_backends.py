@@ -0,0 +1,93 @@
+"""
+═══════════════════════════════════════════════════════════════════════════
+BENCHMARK - BACKENDS DE BUSCA VETORIAL (CHROMA x NUMPY)
+═══════════════════════════════════════════════════════════════════════════
+Compara tempo de inicialização, latência por busca de nível e
+concordância dos chunks retornados entre os backends
+
+Uso:
+    python -m benchmarks.benchmark_backends --n 30
+"""
+
+import argparse
+import contextlib
+import io
+import time
+from typing import Dict, List
+
+from config.settings import Config
+from modules.rag_retriever import RAGRetriever
+
+BACKENDS = ['chroma', 'numpy']
+
+
+def criar_retriever(backend: str) -> tuple:
+    """Cria retriever com o backend indicado, medindo a inicialização do store"""
+    Config.VECTOR_BACKEND = backend
+    inicio = time.perf_counter()
+    with contextlib.redirect_stdout(io.StringIO()):
+        retriever = RAGRetriever()
+    return retriever, time.perf_counter() - inicio
+
+
+def buscar_niveis(retriever: RAGRetriever, embedding: List[float], tipo_caso: str) -> Dict:
+    """Executa as três buscas de nível de um retrieval hierárquico"""
+    return {
+        'nivel_1': retriever.buscar_nivel_1(embedding, tipo_caso=tipo_caso),
+        'nivel_2': retriever.buscar_nivel_2(embedding, tipo_caso=tipo_caso, tipo_doc='contestacao'),
+        'nivel_3': retriever.buscar_nivel_3(embedding, tipo_caso=tipo_caso)
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--n', type=int, default=30, help='Número de queries')
+    parser.add_argument('--repeticoes', type=int, default=5, help='Repetições por query')
+    args = parser.parse_args()
+    
+    backend_original = Config.VECTOR_BACKEND
+    retrievers = {}
+    
+    print(f"{'Backend':<10} {'Inicialização (s)':>18}")
+    for backend in BACKENDS:
+        retriever, tempo = criar_retriever(backend)
+        retrievers[backend] = retriever
+        print(f"{backend:<10} {tempo:>18.3f}")
+    Config.VECTOR_BACKEND = backend_original
+    
+    # Queries: trechos de seções do próprio store, com e sem filtro de tipo
+    base = retrievers['chroma']
+    amostra = base.collection.get(where={'nivel': 2}, limit=args.n, include=['documents', 'metadatas'])
+    embeddings = [base.gerar_embedding(doc[:2000]) for doc in amostra['documents']]
+    tipos = [meta.get('tipo_lit') if i % 2 else None for i, meta in enumerate(amostra['metadatas'])]
+    
+    print(f"\n📊 {len(embeddings)} queries x {args.repeticoes} repetições (3 buscas de nível cada)\n")
+    print(f"{'Backend':<10} {'Média/busca (ms)':>18} {'p95 (ms)':>10}")
+    
+    resultados = {}
+    for backend, retriever in retrievers.items():
+        tempos = []
+        for _ in range(args.repeticoes):
+            resultados[backend] = []
+            for embedding, tipo in zip(embeddings, tipos):
+                inicio = time.perf_counter()
+                resultados[backend].append(buscar_niveis(retriever, embedding, tipo))
+                tempos.append((time.perf_counter() - inicio) / 3)
+        tempos.sort()
+        media = 1000 * sum(tempos) / len(tempos)
+        p95 = 1000 * tempos[int(0.95 * (len(tempos) - 1))]
+        print(f"{backend:<10} {media:>18.3f} {p95:>10.3f}")
+    
+    # Concordância: mesmos chunks (ordem entre vetores empatados pode variar)
+    total = divergentes = 0
+    for a, b in zip(resultados['chroma'], resultados['numpy']):
+        for nivel in ('nivel_1', 'nivel_2', 'nivel_3'):
+            total += 1
+            conteudos_a = sorted(chunk['conteudo'] for chunk in a[nivel])
+            conteudos_b = sorted(chunk['conteudo'] for chunk in b[nivel])
+            divergentes += conteudos_a != conteudos_b
+    print(f"\n🔎 Buscas com chunks divergentes: {divergentes}/{total}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,111 @@
+"""
+═══════════════════════════════════════════════════════════════════════════
+BENCHMARK - CACHE SEMÂNTICO DE RESULTADOS (PETIÇÕES QUASE IDÊNTICAS)
+═══════════════════════════════════════════════════════════════════════════
+Simula litigância de massa: cada petição inicial do corpus (chunks de
+nível 2 ordenados por posição) é reenviada em variantes que só trocam
+números (valores, datas, CPF, protocolos). Para cada limiar de cosseno,
+mede a taxa de acerto do cache, a latência média com e sem cache e se os
+chunks servidos pelo cache são os mesmos do retrieval sem cache.
+
+Uso:
+    python -m benchmarks.benchmark_cache_resultados --variantes 5 --limiar 0.95 0.98 0.99
+"""
+
+import argparse
+import contextlib
+import io
+import random
+import re
+import time
+from typing import Dict, List
+
+from config.settings import Config
+from modules.cache_resultados import CacheResultados
+from modules.rag_retriever import RAGRetriever
+
+LIMITE_QUERY = 2000  # corte de get_texto_para_embedding
+NIVEIS = ('nivel_1', 'nivel_2', 'nivel_3')
+
+
+def montar_peticoes(retriever: RAGRetriever, variantes: int, semente: int) -> List[str]:
+    """Petições iniciais do corpus e variantes com os números trocados, intercaladas"""
+    dados = retriever.collection.get(
+        where={'$and': [{'nivel': 2}, {'tipo_doc': 'inicial'}]},
+        include=['documents', 'metadatas']
+    )
+    por_documento = {}
+    for documento, meta in zip(dados['documents'], dados['metadatas']):
+        por_documento.setdefault(meta.get('document_id'), []).append((meta.get('posicao', 0), documento))
+    originais = [
+        "\n\n".join(documento for _, documento in sorted(partes, key=lambda parte: parte[0]))[:LIMITE_QUERY]
+        for partes in por_documento.values()
+    ]
+    
+    aleatorio = random.Random(semente)
+    trocar = lambda texto: re.sub(r'\d', lambda _: str(aleatorio.randint(0, 9)), texto)
+    # Rodadas: todas as petições, depois cada rodada de variantes
+    return originais + [trocar(texto) for _ in range(variantes) for texto in originais]
+
+
+def ids(resultado: Dict) -> List[List[str]]:
+    return [[chunk['id'] for chunk in resultado[nivel]] for nivel in NIVEIS]
+
+
+def medir(retriever: RAGRetriever, peticoes: List[str], referencia: List[List[List[str]]]) -> Dict:
+    """Latência média, buscas vetoriais e paridade com a referência sem cache"""
+    tempos, queries, iguais = [], 0, 0
+    for peticao, esperado in zip(peticoes, referencia):
+        inicio = time.perf_counter()
+        with contextlib.redirect_stdout(io.StringIO()):
+            resultado = retriever.retrieval_hierarquico(peticao, auto_classificar=False)
+        tempos.append(time.perf_counter() - inicio)
+        queries += resultado['queries']
+        iguais += ids(resultado) == esperado
+    return {
+        'media_ms': 1000 * sum(tempos) / len(tempos),
+        'queries': queries / len(peticoes),
+        'paridade': iguais / len(peticoes)
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--variantes', type=int, default=5, help='Variantes de cada petição')
+    parser.add_argument('--limiar', type=float, nargs='+', default=[0.95, 0.98, 0.99], help='Cossenos mínimos')
+    parser.add_argument('--semente', type=int, default=42, help='Semente das variantes')
+    args = parser.parse_args()
+    
+    with contextlib.redirect_stdout(io.StringIO()):
+        retriever = RAGRetriever()
+    Config.CITACOES_ENABLED = False
+    
+    peticoes = montar_peticoes(retriever, args.variantes, args.semente)
+    
+    # Embeddings fora da medição: compara só retrieval x consulta ao cache
+    with contextlib.redirect_stdout(io.StringIO()):
+        embeddings = dict(zip(peticoes, retriever.gerar_embeddings(peticoes)))
+    retriever.gerar_embedding = embeddings.__getitem__
+    
+    retriever.cache_resultados = None
+    sem_cache = medir(retriever, peticoes, [None] * len(peticoes))
+    with contextlib.redirect_stdout(io.StringIO()):
+        referencia = [ids(retriever.retrieval_hierarquico(p, auto_classificar=False)) for p in peticoes]
+    
+    print(f"📄 {len(peticoes)} petições ({args.variantes} variantes de cada original)\n")
+    print(f"{'Configuração':<18} {'Taxa acerto':>12} {'Cosseno hits':>13} {'Média (ms)':>11} "
+          f"{'Buscas/petição':>15} {'Mesmos chunks':>14}")
+    print(f"{'sem cache':<18} {'-':>12} {'-':>13} {sem_cache['media_ms']:>11.2f} "
+          f"{sem_cache['queries']:>15.1f} {'100%':>14}")
+    
+    for limiar in args.limiar:
+        retriever.cache_resultados = CacheResultados(retriever.collection, retriever.vector_store_dir, limiar=limiar)
+        metricas = medir(retriever, peticoes, referencia)
+        estatisticas = retriever.cache_resultados.estatisticas()
+        print(f"{f'cache {limiar:.2f}':<18} {estatisticas['taxa_acerto']:>12.0%} "
+              f"{estatisticas['similaridade_media_hits']:>13.4f} {metricas['media_ms']:>11.2f} "
+              f"{metricas['queries']:>15.1f} {metricas['paridade']:>14.0%}")
+
+
+if __name__ == "__main__":
+    main()
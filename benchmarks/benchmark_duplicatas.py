@@ -0,0 +1,149 @@
+"""
+═══════════════════════════════════════════════════════════════════════════
+BENCHMARK - ÍNDICE DE PETIÇÕES QUASE DUPLICADAS (MINHASH + LSH)
+═══════════════════════════════════════════════════════════════════════════
+Monta um índice temporário com N petições sintéticas (parágrafos do corpus
+sorteados, com partes e números próprios), recarrega do disco e consulta:
+cópias de petições indexadas com outro autor e outros números (o caso do
+modelo preenchido), as mesmas cópias com um parágrafo trocado, e petições
+novas, que não devem ser encontradas.
+Mede tempo de carga, da assinatura e da busca (LSH x varredura de todas
+as assinaturas), recall e falsos positivos.
+
+Uso:
+    python -m benchmarks.benchmark_duplicatas --total 100000 --consultas 200
+"""
+
+import argparse
+import re
+import shutil
+import tempfile
+import time
+from pathlib import Path
+from typing import List
+
+import chromadb
+import numpy as np
+from chromadb.config import Settings
+
+from config.settings import Config
+from modules.duplicatas import IndiceDuplicatas
+
+NOMES = ['Ana', 'Bruno', 'Carla', 'Daniel', 'Elisa', 'Fábio', 'Gabriela', 'Hugo', 'Isabel', 'João']
+SOBRENOMES = ['Almeida', 'Barbosa', 'Cardoso', 'Duarte', 'Esteves', 'Ferreira', 'Gomes', 'Lima', 'Moura', 'Silva']
+
+
+def carregar_paragrafos() -> List[str]:
+    """Parágrafos (8+ palavras) dos documentos do corpus"""
+    collection = chromadb.PersistentClient(
+        path=str(Config.VECTOR_STORE_DIR),
+        settings=Settings(anonymized_telemetry=False)
+    ).get_collection(name=Config.COLLECTION_NAME)
+    documentos = collection.get(include=['documents'])['documents']
+    return sorted({
+        paragrafo.strip()
+        for documento in documentos
+        for paragrafo in re.split(r'\n\s*\n', documento or "")
+        if len(paragrafo.split()) >= 8
+    })
+
+
+def montar_peticao(paragrafos: List[str], escolhidos: np.ndarray, rng: np.random.Generator) -> str:
+    """Qualificação com autor e números sorteados + parágrafos escolhidos"""
+    autor = f"{rng.choice(NOMES)} {rng.choice(SOBRENOMES)} {rng.choice(SOBRENOMES)}"
+    cabecalho = (
+        f"{autor}, brasileiro(a), portador(a) do CPF {rng.integers(10**10, 10**11)}, "
+        f"beneficiário(a) do contrato nº {rng.integers(10**6, 10**7)}, vem propor a presente ação"
+    )
+    return "\n\n".join([cabecalho] + [paragrafos[i] for i in escolhidos])
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--total', type=int, default=100000, help='Petições indexadas')
+    parser.add_argument('--consultas', type=int, default=200, help='Consultas de cada tipo')
+    parser.add_argument('--paragrafos', type=int, default=20, help='Parágrafos por petição sintética')
+    parser.add_argument('--lote', type=int, default=10000, help='Petições por transação na montagem')
+    args = parser.parse_args()
+    
+    paragrafos = carregar_paragrafos()
+    rng = np.random.default_rng(0)
+    escolhas = np.stack([
+        rng.choice(len(paragrafos), args.paragrafos, replace=False) for _ in range(args.total)
+    ])
+    print(f"📄 {len(paragrafos)} parágrafos do corpus, {args.paragrafos} por petição\n")
+    
+    temporario = Path(tempfile.mkdtemp(prefix='duplicatas_'))
+    try:
+        # Montagem (assinaturas + SQLite), em transações de --lote petições
+        indice = IndiceDuplicatas(temporario)
+        inicio = time.perf_counter()
+        for lote in range(0, args.total, args.lote):
+            indice.adicionar_lote([
+                {
+                    'assinatura': indice.assinatura(montar_peticao(paragrafos, escolhas[i], rng)),
+                    'dados_peticao': {'autor': f"Autor {i}"},
+                    'contestacao': f"Contestação {i}",
+                    'contexto': {},
+                    'metadados': {}
+                }
+                for i in range(lote, min(lote + args.lote, args.total))
+            ])
+        montagem = time.perf_counter() - inicio
+        
+        inicio = time.perf_counter()
+        indice = IndiceDuplicatas(temporario)
+        carga = time.perf_counter() - inicio
+        
+        # Cópias de petições indexadas (ids do SQLite começam em 1) e petições novas
+        consultas = []
+        for alvo in rng.choice(args.total, args.consultas, replace=False):
+            consultas.append(('modelo', montar_peticao(paragrafos, escolhas[alvo], rng), int(alvo) + 1))
+            escolhidos = escolhas[alvo].copy()
+            escolhidos[rng.integers(len(escolhidos))] = rng.integers(len(paragrafos))
+            consultas.append(('editada', montar_peticao(paragrafos, escolhidos, rng), int(alvo) + 1))
+        for _ in range(args.consultas):
+            escolhidos = rng.choice(len(paragrafos), args.paragrafos, replace=False)
+            consultas.append(('nova', montar_peticao(paragrafos, escolhidos, rng), None))
+        
+        tempos_assinatura, tempos_lsh, tempos_varredura, candidatos = [], [], [], []
+        encontradas = {'modelo': 0, 'editada': 0, 'nova': 0}
+        _, assinaturas, _, _ = indice._estado
+        for tipo, texto, esperado in consultas:
+            inicio = time.perf_counter()
+            assinatura = indice.assinatura(texto)
+            tempos_assinatura.append(time.perf_counter() - inicio)
+            
+            inicio = time.perf_counter()
+            registro = indice.buscar(assinatura)
+            tempos_lsh.append(time.perf_counter() - inicio)
+            candidatos.append(len(indice.candidatos(assinatura)))
+            
+            inicio = time.perf_counter()
+            similaridades = (assinaturas == assinatura).mean(axis=1)
+            int(np.argmax(similaridades))
+            tempos_varredura.append(time.perf_counter() - inicio)
+            
+            encontradas[tipo] += registro is not None and registro['id'] == (esperado or registro['id'])
+        
+        ms = lambda tempos: f"{1000 * np.mean(tempos):.3f} ms (p95 {1000 * np.percentile(tempos, 95):.3f})"
+        tamanho = sum(arquivo.stat().st_size for arquivo in temporario.iterdir()) / 2**20
+        linhas = [
+            ("Petições indexadas", f"{len(indice):,} ({tamanho:.0f} MB em disco)"),
+            ("Montagem", f"{montagem:.1f} s"),
+            ("Carga do disco", f"{carga:.2f} s"),
+            ("Assinatura MinHash", ms(tempos_assinatura)),
+            ("Busca LSH + registro", f"{ms(tempos_lsh)}, {np.mean(candidatos):.1f} candidatos em média"),
+            ("Varredura completa", ms(tempos_varredura)),
+            ("Recall (modelo)", f"{encontradas['modelo'] / args.consultas:.1%} (limiar {Config.DUPLICATAS_LIMIAR})"),
+            ("Recall (+1 parágrafo)", f"{encontradas['editada'] / args.consultas:.1%}"),
+            ("Falsos positivos", f"{encontradas['nova'] / args.consultas:.1%}"),
+        ]
+        for rotulo, valor in linhas:
+            print(f"{rotulo + ':':<23} {valor}")
+    finally:
+        shutil.rmtree(temporario, ignore_errors=True)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,112 @@
+"""
+═══════════════════════════════════════════════════════════════════════════
+BENCHMARK - MOTORES DE EMBEDDING (TORCH x ONNX INT8)
+═══════════════════════════════════════════════════════════════════════════
+Mede, para cada motor, tempo de carga, memória residente e latência por
+query (CPU), e verifica a paridade dos vetores ONNX contra o torch.
+
+Cada motor roda em um processo separado para que a memória medida seja
+apenas a dele.
+
+Uso:
+    python -m benchmarks.benchmark_embeddings --n 50
+"""
+
+import argparse
+import multiprocessing
+import time
+from typing import Dict, List
+
+from config.settings import Config
+from modules.embedding_engines import comparar_vetores, criar_motor_embedding
+
+TEXTOS_EXEMPLO = [
+    "Negativa de cobertura de home care pela operadora, com pedido de tutela de urgência.",
+    "Cancelamento unilateral do plano de saúde sem notificação prévia de 60 dias, art. 13 da Lei 9.656/98.",
+    "Demora na autorização de procedimento cirúrgico solicitado em caráter de urgência.",
+    "Pedido de reembolso integral de despesas médicas realizadas fora da rede credenciada.",
+    "Terapias multidisciplinares para paciente com TEA com profissionais de livre escolha.",
+    "Condenação da ré ao pagamento de indenização por danos morais no valor de R$ 20.000,00.",
+    "Súmula 302 do STJ: é abusiva a cláusula contratual que limita no tempo a internação hospitalar.",
+    "Ausência de cobertura contratual e observância do rol de procedimentos da ANS (RN 465/2021).",
+]
+
+
+def memoria_residente_mb() -> float:
+    """Memória residente do processo atual em MB (pico, se psutil indisponível)"""
+    try:
+        import psutil
+        return psutil.Process().memory_info().rss / 2**20
+    except ImportError:
+        import resource
+        import sys
+        pico = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        # ru_maxrss: KB no Linux, bytes no macOS
+        return pico / 2**20 if sys.platform == 'darwin' else pico / 1024
+
+
+def medir_motor(engine: str, textos: List[str], fila: multiprocessing.Queue):
+    """Executado em processo filho: carrega o motor e mede latência/memória"""
+    memoria_inicial = memoria_residente_mb()
+    
+    inicio = time.perf_counter()
+    motor = criar_motor_embedding(engine)
+    tempo_carga = time.perf_counter() - inicio
+    
+    # Aquecimento
+    motor.encode(textos[0])
+    
+    latencias = []
+    for texto in textos:
+        inicio = time.perf_counter()
+        motor.encode(texto)
+        latencias.append(time.perf_counter() - inicio)
+    
+    latencias.sort()
+    fila.put({
+        'engine': engine,
+        'tempo_carga_s': tempo_carga,
+        'memoria_mb': memoria_residente_mb() - memoria_inicial,
+        'latencia_media_ms': 1000 * sum(latencias) / len(latencias),
+        'latencia_p95_ms': 1000 * latencias[int(0.95 * (len(latencias) - 1))],
+        'vetores': motor.encode(TEXTOS_EXEMPLO, batch_size=8)
+    })
+
+
+def executar(engine: str, textos: List[str]) -> Dict:
+    """Roda a medição de um motor em um processo isolado"""
+    contexto = multiprocessing.get_context('spawn')
+    fila = contexto.Queue()
+    processo = contexto.Process(target=medir_motor, args=(engine, textos, fila))
+    processo.start()
+    resultado = fila.get()
+    processo.join()
+    return resultado
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--n', type=int, default=50, help='Número de queries medidas por motor')
+    args = parser.parse_args()
+    
+    textos = [TEXTOS_EXEMPLO[i % len(TEXTOS_EXEMPLO)] + f" (query {i})" for i in range(args.n)]
+    
+    print(f"📊 {args.n} queries unitárias | threads ONNX: {Config.ONNX_INTRA_OP_THREADS}\n")
+    print(f"{'Motor':<8} {'Carga (s)':>10} {'Memória (MB)':>14} {'Média (ms)':>12} {'p95 (ms)':>10}")
+    
+    resultados = {}
+    for engine in ('torch', 'onnx'):
+        r = executar(engine, textos)
+        resultados[engine] = r
+        print(f"{engine:<8} {r['tempo_carga_s']:>10.2f} {r['memoria_mb']:>14.0f} "
+              f"{r['latencia_media_ms']:>12.1f} {r['latencia_p95_ms']:>10.1f}")
+    
+    paridade = comparar_vetores(resultados['torch']['vetores'], resultados['onnx']['vetores'])
+    print(f"\n🔎 Paridade ONNX x torch: cosseno mín {paridade['cosseno_min']:.4f} | "
+          f"médio {paridade['cosseno_medio']:.4f} | "
+          f"{'✅ aprovado' if paridade['aprovado'] else '❌ reprovado'} "
+          f"(mínimo {Config.ONNX_PARIDADE_MIN_COSSENO})")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,100 @@
+"""
+═══════════════════════════════════════════════════════════════════════════
+BENCHMARK - RETRIEVAL HÍBRIDO (BM25 + VETORIAL) x SÓ VETORIAL
+═══════════════════════════════════════════════════════════════════════════
+Queries com citações exatas extraídas do próprio corpus (leis e súmulas).
+Relevantes = chunks do nível cujo texto contém a citação. Mede recall@k
+nos níveis 2 e 3 e a latência por busca de nível.
+
+Uso:
+    python -m benchmarks.benchmark_hibrido --k 5
+"""
+
+import argparse
+import contextlib
+import io
+import re
+import time
+from typing import Dict, List
+
+from modules.lexical_index import tokenizar
+from modules.rag_retriever import RAGRetriever
+
+# Citações de lei e súmula (número normalizado pelo tokenizador do BM25)
+PADRAO_CITACAO = re.compile(r"\b(Lei|S[úu]mula)\s+(?:n[º°o.]?\s*)?(\d[\d.]*(?:/\d+)?)", re.IGNORECASE)
+
+NIVEIS = {
+    2: {'tipo_doc': 'contestacao'},
+    3: {}
+}
+
+
+def extrair_citacoes(retriever: RAGRetriever, nivel: int, filtros: Dict, minimo: int) -> Dict[str, set]:
+    """Mapeia 'Lei 9656' / 'Súmula 302' -> ids dos chunks do nível que a citam"""
+    where = retriever._montar_filtro(nivel, **filtros)
+    dados = retriever.collection.get(where=where, include=['documents'])
+    
+    citacoes = {}
+    for chunk_id, documento in zip(dados['ids'], dados['documents']):
+        for tipo, numero in PADRAO_CITACAO.findall(documento or ""):
+            # Mesmo número que o tokenizador gera sozinho (9.656/98 -> 9656)
+            chave = f"{tipo.capitalize().replace('Sumula', 'Súmula')} {tokenizar(numero)[-1]}"
+            citacoes.setdefault(chave, set()).add(chunk_id)
+    
+    return {chave: ids for chave, ids in citacoes.items() if len(ids) >= minimo}
+
+
+def recall(recuperados: List[str], relevantes: set, k: int) -> float:
+    """Recall@k limitado a k relevantes (uma query com 20 relevantes e k=5 pode chegar a 1.0)"""
+    return len(set(recuperados[:k]) & relevantes) / min(len(relevantes), k)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--k', type=int, default=5, help='top_k avaliado')
+    parser.add_argument('--minimo', type=int, default=2, help='Mínimo de chunks citando para virar query')
+    parser.add_argument('--repeticoes', type=int, default=5, help='Repetições para a latência')
+    args = parser.parse_args()
+    
+    with contextlib.redirect_stdout(io.StringIO()):
+        retriever = RAGRetriever()
+        retriever.indice_lexical.sincronizar()
+    
+    print(f"📊 recall@{args.k} em queries com citações exatas\n")
+    print(f"{'Nível':<7} {'Queries':>8} {'Vetorial':>10} {'Híbrido':>10} "
+          f"{'Vetorial (ms)':>14} {'Híbrido (ms)':>13}")
+    
+    for nivel, filtros in NIVEIS.items():
+        citacoes = extrair_citacoes(retriever, nivel, filtros, args.minimo)
+        if not citacoes:
+            print(f"{nivel:<7} {0:>8} {'-':>10} {'-':>10}")
+            continue
+        
+        consultas = [(f"{citacao} plano de saúde", relevantes) for citacao, relevantes in citacoes.items()]
+        embeddings = [retriever.gerar_embedding(texto) for texto, _ in consultas]
+        buscar_vetorial = getattr(retriever, f'buscar_nivel_{nivel}')
+        
+        recalls = {'vetorial': [], 'hibrido': []}
+        tempos = {'vetorial': [], 'hibrido': []}
+        for repeticao in range(args.repeticoes):
+            for (texto, relevantes), embedding in zip(consultas, embeddings):
+                inicio = time.perf_counter()
+                vetorial = buscar_vetorial(embedding, top_k=args.k, **filtros)
+                tempos['vetorial'].append(time.perf_counter() - inicio)
+                
+                inicio = time.perf_counter()
+                hibrido = retriever.buscar_nivel_hibrido(nivel, texto, embedding, top_k=args.k, **filtros)
+                tempos['hibrido'].append(time.perf_counter() - inicio)
+                
+                if repeticao == 0:
+                    recalls['vetorial'].append(recall([c['id'] for c in vetorial], relevantes, args.k))
+                    recalls['hibrido'].append(recall([c['id'] for c in hibrido], relevantes, args.k))
+        
+        media = {modo: sum(valores) / len(valores) for modo, valores in recalls.items()}
+        ms = {modo: 1000 * sum(valores) / len(valores) for modo, valores in tempos.items()}
+        print(f"{nivel:<7} {len(consultas):>8} {media['vetorial']:>10.3f} {media['hibrido']:>10.3f} "
+              f"{ms['vetorial']:>14.2f} {ms['hibrido']:>13.2f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,149 @@
+"""
+═══════════════════════════════════════════════════════════════════════════
+BENCHMARK - INGESTÃO ONLINE x LATÊNCIA DO RETRIEVAL
+═══════════════════════════════════════════════════════════════════════════
+Copia a versão ativa do vector store para um diretório temporário (índices
+auxiliares, manifesto e fila também temporários) e mede a latência do
+retrieval hierárquico com petições do corpus: primeiro sem indexação, depois
+enquanto o IndexadorOnline acrescenta N contestações aprovadas (contestações
+do corpus com os números trocados). Informa p50/p95 nas duas fases, a vazão
+da indexação e se os chunks aprovados são encontrados ao final.
+
+Uso:
+    python -m benchmarks.benchmark_ingestao_online --documentos 20 --pausa 0.2
+"""
+
+import argparse
+import contextlib
+import io
+import random
+import re
+import shutil
+import tempfile
+import time
+from pathlib import Path
+from typing import List
+
+import numpy as np
+
+from config.settings import Config
+from modules.ingestao_online import FilaIngestao, IndexadorOnline
+from modules.rag_retriever import RAGRetriever
+from modules.versoes_collection import versao_ativa
+
+LIMITE_QUERY = 2000  # corte de get_texto_para_embedding
+
+
+def textos_do_corpus(retriever: RAGRetriever, tipo_doc: str) -> List[str]:
+    """Documentos do corpus remontados a partir das seções de nível 2 (ordem de posição)"""
+    dados = retriever.collection.get(
+        where={'$and': [{'nivel': 2}, {'tipo_doc': tipo_doc}]},
+        include=['documents', 'metadatas']
+    )
+    por_documento = {}
+    for documento, meta in zip(dados['documents'], dados['metadatas']):
+        por_documento.setdefault(meta.get('document_id'), []).append((meta.get('posicao', 0), documento))
+    return [
+        "\n\n".join(documento for _, documento in sorted(partes, key=lambda parte: parte[0]))
+        for partes in por_documento.values()
+    ]
+
+
+def medir(retriever: RAGRetriever, peticoes: List[str], continuar) -> List[float]:
+    """Latências (s) do retrieval, percorrendo as petições em ciclo enquanto continuar() for True"""
+    tempos = []
+    while continuar(len(tempos)):
+        inicio = time.perf_counter()
+        with contextlib.redirect_stdout(io.StringIO()):
+            retriever.retrieval_hierarquico(peticoes[len(tempos) % len(peticoes)], auto_classificar=False)
+        tempos.append(time.perf_counter() - inicio)
+    return tempos
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--documentos', type=int, default=20, help='Contestações aprovadas durante a medição')
+    parser.add_argument('--consultas', type=int, default=30, help='Retrievals da fase sem indexação')
+    parser.add_argument('--pausa', type=float, default=Config.INGESTAO_ONLINE_PAUSA, help='Pausa entre lotes (s)')
+    parser.add_argument('--lote', type=int, default=Config.INGESTAO_ONLINE_LOTE, help='Chunks por lote')
+    parser.add_argument('--semente', type=int, default=42, help='Semente dos números trocados')
+    args = parser.parse_args()
+    
+    collection_name, origem = versao_ativa()
+    temporario = Path(tempfile.mkdtemp(prefix='ingestao_online_'))
+    try:
+        # Store e todos os artefatos derivados em diretório temporário
+        shutil.copytree(origem, temporario / "vector_store")
+        Config.COLLECTION_NAME = collection_name
+        for nome in ('BM25_DIR', 'CITACOES_DIR', 'TRECHOS_DIR', 'HIERARQUIA_DIR', 'CLASSIFICADOR_DIR',
+                     'PARTICOES_DIR', 'NUMPY_STORE_DIR', 'INGESTAO_MANIFESTO_DIR'):
+            setattr(Config, nome, temporario / nome.lower())
+        # Sem caches: cada retrieval codifica a petição e consulta o store
+        Config.EMBEDDING_CACHE_ENABLED = False
+        Config.RESULTADOS_CACHE_ENABLED = False
+        
+        with contextlib.redirect_stdout(io.StringIO()):
+            retriever = RAGRetriever(vector_store_dir=temporario / "vector_store")
+        total_inicial = retriever.collection.count()
+        
+        aleatorio = random.Random(args.semente)
+        trocar = lambda texto: re.sub(r'\d', lambda _: str(aleatorio.randint(0, 9)), texto)
+        peticoes = [texto[:LIMITE_QUERY] for texto in textos_do_corpus(retriever, 'inicial')]
+        contestacoes = textos_do_corpus(retriever, 'contestacao')
+        aprovadas = [trocar(contestacoes[i % len(contestacoes)]) for i in range(args.documentos)]
+        
+        # Aquecimento (índices auxiliares carregados) e fase sem indexação
+        medir(retriever, peticoes, lambda feitos: feitos < 3)
+        sem_indexacao = medir(retriever, peticoes, lambda feitos: feitos < args.consultas)
+        
+        # Fase com indexação: retrievals contínuos até a fila esvaziar
+        with contextlib.redirect_stdout(io.StringIO()):
+            indexador = IndexadorOnline(
+                retriever,
+                FilaIngestao(temporario / "fila", temporario / "aprovadas"),
+                lote=args.lote,
+                pausa=args.pausa,
+                intervalo=0.1
+            )
+            inicio = time.perf_counter()
+            for texto in aprovadas:
+                indexador.aprovar(texto)
+            com_indexacao = medir(retriever, peticoes, lambda feitos: not indexador.aguardar(0))
+            duracao = time.perf_counter() - inicio
+            indexador.encerrar()
+            stats = indexador.estatisticas()
+            
+            # Chunks aprovados encontrados por busca com o próprio texto
+            novos = retriever.collection.get(
+                where={'arquivo': {'$in': [str(p.resolve()) for p in (temporario / "aprovadas").iterdir()]}},
+                include=['documents'],
+                limit=20
+            )
+            achados = 0
+            for chunk_id, documento in zip(novos['ids'], novos['documents']):
+                resultado = retriever.collection.query(
+                    query_embeddings=[retriever.gerar_embedding(documento)], n_results=1, include=[]
+                )
+                achados += resultado['ids'][0] == [chunk_id]
+        
+        ms = lambda tempos: (
+            f"p50 {1000 * np.percentile(tempos, 50):.1f} ms, p95 {1000 * np.percentile(tempos, 95):.1f} ms "
+            f"({len(tempos)} retrievals)"
+        )
+        linhas = [
+            ("Sem indexação", ms(sem_indexacao)),
+            ("Com indexação", ms(com_indexacao) if com_indexacao else "fila esvaziou antes da 1ª busca"),
+            ("Documentos indexados", f"{stats['documentos']} de {args.documentos} ({stats['falhas']} falhas)"),
+            ("Chunks acrescentados", f"{stats['chunks']} ({total_inicial} -> {retriever.collection.count()})"),
+            ("Vazão da indexação", f"{stats['documentos'] / duracao:.2f} docs/s "
+                                   f"({stats['tempo_medio_s']:.2f} s por documento, lote {args.lote}, pausa {args.pausa}s)"),
+            ("Chunks novos achados", f"{achados} de {len(novos['ids'])} (busca pelo próprio texto)"),
+        ]
+        for rotulo, valor in linhas:
+            print(f"{rotulo + ':':<23} {valor}")
+    finally:
+        shutil.rmtree(temporario, ignore_errors=True)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,100 @@
+"""
+═══════════════════════════════════════════════════════════════════════════
+BENCHMARK - MICRO-LOTES DE EMBEDDINGS SOB CONCORRÊNCIA
+═══════════════════════════════════════════════════════════════════════════
+Simula usuários simultâneos pedindo embeddings de petições e compara
+encode unitário concorrente (cada thread chama o motor) com o serviço
+de micro-lotes (um encode em lote por janela)
+
+Uso:
+    python -m benchmarks.benchmark_microlotes --usuarios 8 --pedidos 10
+"""
+
+import argparse
+import threading
+import time
+from typing import Callable, Dict, List
+
+from config.settings import Config
+from modules.embedding_engines import criar_motor_embedding
+from modules.embedding_service import ServicoEmbeddings
+
+
+def gerar_textos(usuarios: int, pedidos: int) -> List[List[str]]:
+    """Textos distintos por usuário (sem cache), com tamanho de petição"""
+    base = (
+        "Trata-se de ação de obrigação de fazer com pedido de tutela de urgência "
+        "em face da operadora de plano de saúde, que negou cobertura ao tratamento "
+        "prescrito pelo médico assistente. "
+    )
+    return [
+        [f"Petição {usuario}-{pedido}. " + base * 8 for pedido in range(pedidos)]
+        for usuario in range(usuarios)
+    ]
+
+
+def executar(encode: Callable, textos_por_usuario: List[List[str]]) -> Dict:
+    """Dispara uma thread por usuário, cada uma com seus pedidos em sequência"""
+    latencias = []
+    lock = threading.Lock()
+    
+    def usuario(textos: List[str]):
+        for texto in textos:
+            inicio = time.perf_counter()
+            encode(texto)
+            with lock:
+                latencias.append(time.perf_counter() - inicio)
+    
+    threads = [threading.Thread(target=usuario, args=(textos,)) for textos in textos_por_usuario]
+    inicio = time.perf_counter()
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    total = time.perf_counter() - inicio
+    
+    latencias.sort()
+    return {
+        'textos_por_s': len(latencias) / total,
+        'media_ms': 1000 * sum(latencias) / len(latencias),
+        'p95_ms': 1000 * latencias[int(0.95 * (len(latencias) - 1))]
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--usuarios', type=int, default=8, help='Usuários simultâneos (threads)')
+    parser.add_argument('--pedidos', type=int, default=10, help='Pedidos por usuário')
+    parser.add_argument('--janela-ms', type=float, default=Config.EMBEDDING_MICROLOTE_JANELA_MS)
+    parser.add_argument('--max-lote', type=int, default=Config.EMBEDDING_MICROLOTE_MAX)
+    args = parser.parse_args()
+    
+    print(f"📥 Carregando motor de embeddings ({Config.EMBEDDING_ENGINE})...")
+    motor = criar_motor_embedding()
+    textos = gerar_textos(args.usuarios, args.pedidos)
+    
+    # Aquecimento (primeira inferência aloca buffers)
+    motor.encode(textos[0][:2])
+    
+    print(f"\n📊 {args.usuarios} usuários x {args.pedidos} pedidos "
+          f"(janela {args.janela_ms:g} ms, lote máx. {args.max_lote})\n")
+    print(f"{'Modo':<12} {'Textos/s':>10} {'Média (ms)':>12} {'p95 (ms)':>10}")
+    
+    direto = executar(motor.encode, textos)
+    print(f"{'direto':<12} {direto['textos_por_s']:>10.1f} {direto['media_ms']:>12.1f} {direto['p95_ms']:>10.1f}")
+    
+    servico = ServicoEmbeddings(motor, janela_ms=args.janela_ms, max_lote=args.max_lote)
+    microlotes = executar(servico.encode, textos)
+    servico.encerrar()
+    print(f"{'microlotes':<12} {microlotes['textos_por_s']:>10.1f} "
+          f"{microlotes['media_ms']:>12.1f} {microlotes['p95_ms']:>10.1f}")
+    
+    stats = servico.estatisticas()
+    print(f"\n📦 Lotes: {stats['lotes']} (médio {stats['lote_medio']:.1f}) | "
+          f"histograma: {stats['histograma_lotes']}")
+    print(f"⏱️  Latência adicionada pela fila: média {stats['latencia_adicionada_media_ms']:.1f} ms, "
+          f"p95 {stats['latencia_adicionada_p95_ms']:.1f} ms")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,126 @@
+"""
+═══════════════════════════════════════════════════════════════════════════
+BENCHMARK - CONSULTA MULTIJANELA x TEXTO TRUNCADO
+═══════════════════════════════════════════════════════════════════════════
+Petições iniciais reconstruídas a partir dos chunks de nível 2 do próprio
+corpus (ordenados por posição). Compara a query atual (texto cortado em
+2000 caracteres) com o modo multijanela para vários limites de janelas:
+latência (embedding + buscas), cobertura do documento e precisão de tipo
+de caso nos hits de nível 2 (contestações do mesmo tipo da petição, sem
+filtro de tipo).
+
+Uso:
+    python -m benchmarks.benchmark_multijanela --janelas 2 4 8 16
+"""
+
+import argparse
+import contextlib
+import io
+import time
+from typing import Dict, List
+
+from config.settings import Config
+from modules.janelas import segmentar_janelas, selecionar_janelas
+from modules.rag_retriever import RAGRetriever
+
+LIMITE_TRUNCADO = 2000  # corte de get_texto_para_embedding
+
+
+def reconstruir_peticoes(retriever: RAGRetriever) -> List[Dict]:
+    """Texto completo e tipo de caso de cada petição inicial do corpus"""
+    dados = retriever.collection.get(
+        where={'$and': [{'nivel': 2}, {'tipo_doc': 'inicial'}]},
+        include=['documents', 'metadatas']
+    )
+    por_documento = {}
+    for documento, meta in zip(dados['documents'], dados['metadatas']):
+        por_documento.setdefault(meta.get('document_id'), []).append((meta.get('posicao', 0), documento, meta))
+    
+    peticoes = []
+    for document_id, partes in por_documento.items():
+        partes.sort(key=lambda parte: parte[0])
+        tipos = {meta.get('tipo_lit') for _, _, meta in partes} - {'GERAL', None}
+        if len(tipos) != 1:
+            continue
+        peticoes.append({
+            'id': document_id,
+            'texto': "\n\n".join(documento for _, documento, _ in partes),
+            'tipo': tipos.pop()
+        })
+    return peticoes
+
+
+def medir(retriever: RAGRetriever, peticoes: List[Dict], janelas_max: int, agregacao: str,
+          repeticoes: int) -> Dict:
+    """Latência, cobertura e precisão de tipo de uma configuração (janelas_max=0: truncado)"""
+    Config.MULTIJANELA_AGREGACAO = agregacao
+    Config.MULTIJANELA_MAX_JANELAS = max(janelas_max, 1)
+    
+    tempos, coberturas, precisoes = [], [], []
+    for peticao in peticoes:
+        texto = peticao['texto']
+        resumo = texto[:LIMITE_TRUNCADO]
+        if janelas_max:
+            passagens = segmentar_janelas(texto, Config.MULTIJANELA_TAMANHO, Config.MULTIJANELA_SOBREPOSICAO)
+            janelas = [resumo] + selecionar_janelas(passagens, janelas_max - 1) if janelas_max > 1 else [resumo]
+            coberto = len(resumo) + sum(len(j) for j in janelas[1:])
+        else:
+            janelas = None
+            coberto = len(resumo)
+        coberturas.append(min(1.0, coberto / len(texto)))
+        
+        for _ in range(repeticoes):
+            inicio = time.perf_counter()
+            with contextlib.redirect_stdout(io.StringIO()):
+                resultado = retriever.retrieval_hierarquico(
+                    resumo,
+                    auto_classificar=False,
+                    modo='multijanela' if janelas_max else 'sequencial',
+                    janelas=janelas
+                )
+            tempos.append(time.perf_counter() - inicio)
+        
+        hits = resultado['nivel_2']
+        if hits:
+            precisoes.append(sum(c['metadata'].get('tipo_lit') == peticao['tipo'] for c in hits) / len(hits))
+    
+    tempos.sort()
+    return {
+        'media_ms': 1000 * sum(tempos) / len(tempos),
+        'p95_ms': 1000 * tempos[int(0.95 * (len(tempos) - 1))],
+        'cobertura': sum(coberturas) / len(coberturas),
+        'precisao': sum(precisoes) / len(precisoes) if precisoes else 0.0
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--janelas', type=int, nargs='+', default=[2, 4, 8, 16], help='Limites de janelas')
+    parser.add_argument('--repeticoes', type=int, default=3, help='Retrievals por petição')
+    args = parser.parse_args()
+    
+    with contextlib.redirect_stdout(io.StringIO()):
+        retriever = RAGRetriever()
+    # Sem cache: mede o encode de todas as janelas em toda repetição
+    retriever.cache_embeddings = None
+    retriever.cache_resultados = None
+    Config.CITACOES_ENABLED = False
+    
+    peticoes = reconstruir_peticoes(retriever)
+    tamanho_medio = sum(len(p['texto']) for p in peticoes) / max(len(peticoes), 1)
+    print(f"📄 {len(peticoes)} petições (média {tamanho_medio:.0f} caracteres), "
+          f"janelas de {Config.MULTIJANELA_TAMANHO} caracteres\n")
+    print(f"{'Modo':<22} {'Média (ms)':>11} {'p95 (ms)':>9} {'Cobertura':>10} {'Precisão tipo (N2)':>19}")
+    
+    configuracoes = [('truncado (2000)', 0, 'max')] + [
+        (f"multijanela {n} ({agregacao})", n, agregacao)
+        for n in args.janelas for agregacao in ('max', 'soma')
+    ]
+    for rotulo, janelas_max, agregacao in configuracoes:
+        metricas = medir(retriever, peticoes, janelas_max, agregacao, args.repeticoes)
+        print(f"{rotulo:<22} {metricas['media_ms']:>11.1f} {metricas['p95_ms']:>9.1f} "
+              f"{metricas['cobertura']:>10.0%} {metricas['precisao']:>19.2f}")
+
+
+if __name__ == "__main__":
+    main()
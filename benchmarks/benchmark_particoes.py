@@ -0,0 +1,165 @@
+"""
+═══════════════════════════════════════════════════════════════════════════
+BENCHMARK - PARTIÇÕES (NIVEL, TIPO_LIT, TIPO_DOC) x COLLECTION GLOBAL FILTRADA
+═══════════════════════════════════════════════════════════════════════════
+Buscas com os filtros do retriever (nível, tipo de caso e contestação no
+nível 2) na collection global com where e nas partições roteadas. Mede
+latência, recall@k contra a busca exata (NumPy) e quantos resultados cada
+busca retorna (buscas filtradas no HNSW podem voltar com menos de top_k).
+
+--fator N replica o corpus N vezes (vetores com ruído) num store
+temporário, simulando anos de contestações.
+
+Uso:
+    python -m benchmarks.benchmark_particoes --n 30 --fator 20
+"""
+
+import argparse
+import contextlib
+import io
+import shutil
+import tempfile
+import time
+from pathlib import Path
+from typing import Dict, List, Optional
+
+import chromadb
+import numpy as np
+from chromadb.config import Settings
+
+from config.settings import Config
+from modules.particoes import VectorStoreParticionado
+
+
+def montar_filtro(nivel: int, tipo_caso: Optional[str], tipo_doc: Optional[str]) -> Dict:
+    """Mesmo formato de RAGRetriever._montar_filtro"""
+    filtros = [{'nivel': nivel}]
+    if tipo_caso:
+        filtros.append({'tipo_lit': tipo_caso})
+    if tipo_doc:
+        filtros.append({'tipo_doc': tipo_doc})
+    return {'$and': filtros} if len(filtros) > 1 else filtros[0]
+
+
+def replicar(dados: Dict, fator: int, diretorio: Path, ruido: float = 0.02):
+    """Cria um store temporário com o corpus replicado (ids e vetores distintos)"""
+    client = chromadb.PersistentClient(path=str(diretorio), settings=Settings(anonymized_telemetry=False))
+    collection = client.create_collection(
+        name=Config.COLLECTION_NAME,
+        metadata={'hnsw:space': Config.DISTANCE_METRIC}
+    )
+    rng = np.random.default_rng(0)
+    base = np.asarray(dados['embeddings'], dtype=np.float32)
+    for copia in range(fator):
+        vetores = base + rng.normal(0, ruido, base.shape).astype(np.float32)
+        vetores /= np.linalg.norm(vetores, axis=1, keepdims=True)
+        for inicio in range(0, len(base), 5000):
+            fim = inicio + 5000
+            collection.add(
+                ids=[f"{chunk_id}#{copia}" for chunk_id in dados['ids'][inicio:fim]],
+                embeddings=vetores[inicio:fim].tolist(),
+                documents=dados['documents'][inicio:fim],
+                metadatas=dados['metadatas'][inicio:fim]
+            )
+    return collection
+
+
+def exatos(matriz: np.ndarray, metadatas: List[Dict], ids: List[str], consulta: np.ndarray,
+           filtros: Dict, top_k: int) -> set:
+    """Top-k exato sob o filtro (ground truth)"""
+    mascara = np.array([all(meta.get(c) == v for c, v in filtros.items()) for meta in metadatas])
+    posicoes = np.flatnonzero(mascara)
+    similaridades = matriz[posicoes] @ consulta
+    topo = posicoes[np.argsort(-similaridades, kind='stable')[:top_k]]
+    return {ids[p] for p in topo}
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--n', type=int, default=30, help='Queries por filtro')
+    parser.add_argument('--fator', type=int, default=1, help='Réplicas do corpus (1 = store original)')
+    args = parser.parse_args()
+    
+    origem = chromadb.PersistentClient(
+        path=str(Config.VECTOR_STORE_DIR),
+        settings=Settings(anonymized_telemetry=False)
+    ).get_collection(name=Config.COLLECTION_NAME)
+    dados = origem.get(include=['embeddings', 'documents', 'metadatas'])
+    
+    temporario = Path(tempfile.mkdtemp(prefix='particoes_'))
+    try:
+        if args.fator > 1:
+            print(f"📦 Replicando corpus {args.fator}x em store temporário...")
+            collection = replicar(dados, args.fator, temporario / "vector_store")
+            vector_store_dir = temporario / "vector_store"
+            dados = collection.get(include=['embeddings', 'metadatas'])
+        else:
+            collection = origem
+            vector_store_dir = Config.VECTOR_STORE_DIR
+        
+        inicio = time.perf_counter()
+        with contextlib.redirect_stdout(io.StringIO()):
+            particoes = VectorStoreParticionado(collection, vector_store_dir, diretorio=temporario / "particoes")
+            particoes.sincronizar()
+        construcao = time.perf_counter() - inicio
+        
+        matriz = np.asarray(dados['embeddings'], dtype=np.float32)
+        matriz /= np.linalg.norm(matriz, axis=1, keepdims=True)
+        metadatas = dados['metadatas']
+        stats = particoes.estatisticas()
+        print(f"📊 {len(matriz)} chunks, {len(stats['particoes'])} partições "
+              f"(maior: {max(p['total'] for p in stats['particoes'])}), construídas em {construcao:.1f}s\n")
+        
+        rng = np.random.default_rng(42)
+        print(f"{'Nível':<6} {'Tipo':<9} {'Global (ms)':>12} {'Partições (ms)':>15} "
+              f"{'Recall global':>14} {'Recall part.':>13} {'Retornados (g/p/esperado)':>26}")
+        
+        for nivel, tipo_doc in [(1, None), (2, 'contestacao'), (3, None)]:
+            top_k = Config.RETRIEVAL_CONFIG[f'nivel_{nivel}']['top_k']
+            tipos = sorted({meta.get('tipo_lit') for meta in metadatas if meta.get('nivel') == nivel})
+            
+            for rotulo, tipos_caso in [('com tipo', tipos), ('sem tipo', [None])]:
+                tempos = {'global': [], 'particoes': []}
+                recalls = {'global': [], 'particoes': []}
+                retornados = {'global': [], 'particoes': [], 'esperado': []}
+                
+                for tipo_caso in tipos_caso:
+                    where = montar_filtro(nivel, tipo_caso, tipo_doc)
+                    filtros = {'nivel': nivel, 'tipo_lit': tipo_caso, 'tipo_doc': tipo_doc}
+                    filtros = {campo: valor for campo, valor in filtros.items() if valor is not None}
+                    
+                    for posicao in rng.choice(len(matriz), size=args.n):
+                        consulta = matriz[posicao] + rng.normal(0, 0.05, matriz.shape[1]).astype(np.float32)
+                        consulta /= np.linalg.norm(consulta)
+                        esperado = exatos(matriz, metadatas, dados['ids'], consulta, filtros, top_k)
+                        retornados['esperado'].append(len(esperado))
+                        
+                        for modo, indice in (('global', collection), ('particoes', particoes)):
+                            inicio = time.perf_counter()
+                            resultado = indice.query(
+                                query_embeddings=[consulta.tolist()],
+                                n_results=top_k,
+                                where=where,
+                                include=['documents', 'metadatas', 'distances']
+                            )
+                            tempos[modo].append(time.perf_counter() - inicio)
+                            ids = resultado['ids'][0]
+                            retornados[modo].append(len(ids))
+                            recalls[modo].append(len(set(ids) & esperado) / max(len(esperado), 1))
+                
+                media = {modo: 1000 * np.mean(valores) for modo, valores in tempos.items()}
+                recall = {modo: np.mean(valores) for modo, valores in recalls.items()}
+                qtd = {modo: np.mean(valores) for modo, valores in retornados.items()}
+                print(f"{nivel:<6} {rotulo:<9} {media['global']:>12.2f} {media['particoes']:>15.2f} "
+                      f"{recall['global']:>14.3f} {recall['particoes']:>13.3f} "
+                      f"{qtd['global']:>10.1f}/{qtd['particoes']:.1f}/{qtd['esperado']:.1f}")
+        
+        stats = particoes.estatisticas()
+        print(f"\n🧭 Buscas roteadas: {stats['buscas_roteadas']} "
+              f"({stats['particoes_por_busca']:.1f} partições por busca), globais: {stats['buscas_globais']}")
+    finally:
+        shutil.rmtree(temporario, ignore_errors=True)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,102 @@
+"""
+═══════════════════════════════════════════════════════════════════════════
+BENCHMARK - RETRIEVAL POR PEDIDO: LAÇO x LOTE
+═══════════════════════════════════════════════════════════════════════════
+Pedidos e fatos sintéticos tirados dos chunks de nível 2 das petições
+iniciais do corpus. Compara o contexto por item num laço (um encode e
+duas buscas por pedido/fato) com retrieval_por_pedido (um encode em lote
+e uma busca multi-query por nível): latência, buscas vetoriais e se os
+chunks retornados são os mesmos.
+
+Uso:
+    python -m benchmarks.benchmark_pedidos --itens 5 10 20 --repeticoes 5
+"""
+
+import argparse
+import contextlib
+import io
+import time
+from typing import Dict, List
+
+from config.settings import Config
+from modules.rag_retriever import RAGRetriever
+
+
+def montar_itens(retriever: RAGRetriever, quantidade: int) -> List[str]:
+    """Parágrafos das petições iniciais do corpus, usados como pedidos/fatos"""
+    dados = retriever.collection.get(
+        where={'$and': [{'nivel': 2}, {'tipo_doc': 'inicial'}]},
+        include=['documents']
+    )
+    paragrafos = [
+        paragrafo.strip()
+        for documento in dados['documents']
+        for paragrafo in documento.split('\n\n')
+        if len(paragrafo.strip()) > 80
+    ]
+    return [paragrafos[i % len(paragrafos)][:400] for i in range(quantidade)]
+
+
+def por_laco(retriever: RAGRetriever, itens: List[str]) -> List[Dict]:
+    """Um encode e uma busca por nível para cada item"""
+    resultado = []
+    for texto in itens:
+        embedding = retriever.gerar_embedding(texto)
+        resultado.append({
+            'nivel_2': retriever.buscar_nivel_2(
+                embedding, tipo_doc='contestacao', top_k=Config.PEDIDOS_TOP_K_NIVEL_2
+            ),
+            'nivel_3': retriever.buscar_nivel_3(embedding, top_k=Config.PEDIDOS_TOP_K_NIVEL_3)
+        })
+    return resultado
+
+
+def medir(funcao, repeticoes: int, retriever: RAGRetriever) -> Dict:
+    """Latência média e buscas vetoriais por execução"""
+    tempos = []
+    for _ in range(repeticoes):
+        queries_inicio = retriever._queries_thread()
+        inicio = time.perf_counter()
+        with contextlib.redirect_stdout(io.StringIO()):
+            itens = funcao()
+        tempos.append(time.perf_counter() - inicio)
+        queries = retriever._queries_thread() - queries_inicio
+    return {'media_ms': 1000 * sum(tempos) / len(tempos), 'queries': queries, 'itens': itens}
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--itens', type=int, nargs='+', default=[5, 10, 20], help='Pedidos + fatos por petição')
+    parser.add_argument('--repeticoes', type=int, default=5, help='Execuções por configuração')
+    args = parser.parse_args()
+    
+    with contextlib.redirect_stdout(io.StringIO()):
+        retriever = RAGRetriever()
+    # Sem cache: mede o encode de todos os itens em toda repetição
+    retriever.cache_embeddings = None
+    Config.CITACOES_ENABLED = False
+    Config.PEDIDOS_MAX_ITENS = max(args.itens)
+    
+    print(f"{'Itens':>6} {'Laço (ms)':>10} {'Lote (ms)':>10} {'Buscas laço':>12} "
+          f"{'Buscas lote':>12} {'Mesmos chunks':>14}")
+    
+    for quantidade in args.itens:
+        itens = montar_itens(retriever, quantidade)
+        laco = medir(lambda: por_laco(retriever, itens), args.repeticoes, retriever)
+        lote = medir(
+            lambda: retriever.retrieval_por_pedido(itens)['pedidos'],
+            args.repeticoes,
+            retriever
+        )
+        
+        iguais = [
+            [c['id'] for c in a[nivel]] == [c['id'] for c in b[nivel]]
+            for a, b in zip(laco['itens'], lote['itens'])
+            for nivel in ('nivel_2', 'nivel_3')
+        ]
+        print(f"{quantidade:>6} {laco['media_ms']:>10.1f} {lote['media_ms']:>10.1f} "
+              f"{laco['queries']:>12} {lote['queries']:>12} {sum(iguais) / len(iguais):>14.0%}")
+
+
+if __name__ == "__main__":
+    main()
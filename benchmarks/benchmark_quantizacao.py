@@ -0,0 +1,148 @@
+"""
+═══════════════════════════════════════════════════════════════════════════
+BENCHMARK - ARMAZENAMENTO COMPACTO (FLOAT16 / INT8) x FLOAT32
+═══════════════════════════════════════════════════════════════════════════
+Exporta a versão ativa da collection para o backend numpy e compara a
+varredura float32 com as cópias float16 e int8 (escala por vetor), com e
+sem reescore exato dos candidatos. Mede a memória da matriz varrida a cada
+busca, o disco, a latência por busca de nível e o recall@k e a ordem dos
+resultados contra a busca exata float32.
+
+--fator N replica o corpus N vezes (vetores com ruído), simulando anos de
+contestações; as réplicas próximas entre si são o caso difícil para a
+quantização.
+
+Uso:
+    python -m benchmarks.benchmark_quantizacao --n 50 --fator 100
+"""
+
+import argparse
+import shutil
+import tempfile
+import time
+from pathlib import Path
+from typing import Dict, List
+
+import numpy as np
+
+from config.settings import Config
+from modules.vector_backend import ARQUIVO_ESCALAS, ARQUIVO_QUANTIZADOS, ARQUIVO_VETORES, NumpyVectorStore
+from modules.versoes_collection import abrir_collection, versao_ativa
+
+
+class FonteReplicada:
+    """Corpus replicado em memória, no formato de collection.get (para NumpyVectorStore.exportar)"""
+    
+    def __init__(self, dados: Dict, fator: int, ruido: float = 0.02):
+        rng = np.random.default_rng(0)
+        base = np.asarray(dados['embeddings'], dtype=np.float32)
+        copias = []
+        for _ in range(fator):
+            vetores = base + rng.normal(0, ruido, base.shape).astype(np.float32) if fator > 1 else base
+            copias.append(vetores / np.linalg.norm(vetores, axis=1, keepdims=True))
+        self.embeddings = np.vstack(copias)
+        self.ids = [f"{chunk_id}#{copia}" for copia in range(fator) for chunk_id in dados['ids']]
+        self.documents = list(dados['documents']) * fator
+        self.metadatas = list(dados['metadatas']) * fator
+    
+    def get(self, include=None) -> Dict:
+        return {
+            'ids': self.ids,
+            'embeddings': self.embeddings,
+            'documents': self.documents,
+            'metadatas': self.metadatas
+        }
+
+
+def tamanho_disco(diretorio: Path, quantizacao: str) -> int:
+    """Bytes dos arquivos de vetores usados por um modo (float32 sempre, para o reescore)"""
+    arquivos = [ARQUIVO_VETORES]
+    if quantizacao != 'float32':
+        arquivos.append(ARQUIVO_QUANTIZADOS.format(modo=quantizacao))
+    if quantizacao == 'int8':
+        arquivos.append(ARQUIVO_ESCALAS)
+    return sum((diretorio / arquivo).stat().st_size for arquivo in arquivos)
+
+
+def buscar(store: NumpyVectorStore, consultas: List[np.ndarray], filtros: List[Dict], k: int) -> tuple:
+    """Ids e distâncias de cada busca e o tempo de cada uma (s)"""
+    ids, distancias, tempos = [], [], []
+    for consulta, where in zip(consultas, filtros):
+        inicio = time.perf_counter()
+        resultado = store.query(query_embeddings=[consulta], n_results=k, where=where, include=['distances'])
+        tempos.append(time.perf_counter() - inicio)
+        ids.append(resultado['ids'][0])
+        distancias.append(resultado['distances'][0])
+    return ids, distancias, tempos
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--n', type=int, default=50, help='Número de queries')
+    parser.add_argument('--k', type=int, default=10, help='Resultados por busca')
+    parser.add_argument('--fator', type=int, default=100, help='Réplicas do corpus (1 = store original)')
+    parser.add_argument('--reescore', type=int, default=Config.NUMPY_REESCORE_FATOR,
+                        help='Candidatos reordenados em float32, em múltiplos de k')
+    parser.add_argument('--repeticoes', type=int, default=3, help='Repetições por query')
+    args = parser.parse_args()
+    
+    collection_name, vector_store_dir = versao_ativa()
+    dados = abrir_collection(collection_name, vector_store_dir).get(include=['embeddings', 'documents', 'metadatas'])
+    fonte = FonteReplicada(dados, args.fator)
+    
+    temporario = Path(tempfile.mkdtemp(prefix='quantizacao_'))
+    try:
+        NumpyVectorStore.exportar(fonte, temporario)
+        
+        # Queries: chunks do corpus com ruído, filtradas pelo nível como no retriever
+        rng = np.random.default_rng(42)
+        consultas, filtros = [], []
+        for posicao in rng.choice(len(fonte.ids), size=args.n):
+            consulta = fonte.embeddings[posicao] + rng.normal(0, 0.05, fonte.embeddings.shape[1]).astype(np.float32)
+            consultas.append((consulta / np.linalg.norm(consulta)).tolist())
+            filtros.append({'nivel': fonte.metadatas[posicao].get('nivel')} if posicao % 2 else None)
+        
+        print(f"📊 {len(fonte.ids)} chunks x {fonte.embeddings.shape[1]} dimensões, "
+              f"{args.n} queries (metade filtrada por nível), k = {args.k}\n")
+        print(f"{'Modo':<9} {'Reescore':>9} {'Varredura (MB)':>15} {'Disco (MB)':>11} {'Média (ms)':>11} "
+              f"{'p95 (ms)':>9} {'Recall@k':>9} {'Ordem igual':>12} {'Erro dist.':>11}")
+        
+        exatos = None
+        modos = [('float32', 1)] + [
+            (quantizacao, fator)
+            for quantizacao in ('float16', 'int8')
+            for fator in sorted({1, args.reescore})
+        ]
+        for quantizacao, fator in modos:
+            store = NumpyVectorStore(temporario, quantizacao=quantizacao, reescore_fator=fator)
+            tempos = []
+            for _ in range(args.repeticoes):
+                ids, distancias, tempos_rodada = buscar(store, consultas, filtros, args.k)
+                tempos.extend(tempos_rodada)
+            if exatos is None:
+                exatos = (ids, distancias)
+            
+            recall = np.mean([len(set(a) & set(b)) / max(len(a), 1) for a, b in zip(exatos[0], ids)])
+            ordem = np.mean([a == b for a, b in zip(exatos[0], ids)])
+            # Distâncias retornadas para os mesmos chunks (reescore exato = 0)
+            erro = max(
+                (
+                    abs(dist_exata - dist)
+                    for ids_exatos, dists_exatas, ids_modo, dists in zip(*exatos, ids, distancias)
+                    for chunk_id, dist in zip(ids_modo, dists)
+                    for chunk_exato, dist_exata in zip(ids_exatos, dists_exatas)
+                    if chunk_id == chunk_exato
+                ),
+                default=0.0
+            )
+            tempos.sort()
+            print(f"{quantizacao:<9} {f'{fator}x k' if quantizacao != 'float32' else '-':>9} "
+                  f"{store.memoria_varredura() / 2**20:>15.1f} {tamanho_disco(temporario, quantizacao) / 2**20:>11.1f} "
+                  f"{1000 * np.mean(tempos):>11.3f} {1000 * tempos[int(0.95 * (len(tempos) - 1))]:>9.3f} "
+                  f"{recall:>9.3f} {ordem:>11.0%} {erro:>11.2e}")
+    finally:
+        shutil.rmtree(temporario, ignore_errors=True)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,153 @@
+"""
+═══════════════════════════════════════════════════════════════════════════
+BENCHMARK - RETRIEVAL HIERÁRQUICO (SEQUENCIAL x FUNDIDO x PARALELO x LOTE)
+═══════════════════════════════════════════════════════════════════════════
+Compara número de buscas vetoriais e tempo por petição entre os modos
+e o retrieval em lote (retrieval_hierarquico_lote, todas as petições de uma vez).
+--latencia-ms simula um vector store remoto (atraso fixo por busca).
+
+Uso:
+    python -m benchmarks.benchmark_retrieval --n 30
+    python -m benchmarks.benchmark_retrieval --n 30 --latencia-ms 20
+"""
+
+import argparse
+import contextlib
+import io
+import time
+from typing import Dict, List
+
+from modules.rag_retriever import RAGRetriever
+
+MODOS = ['sequencial', 'fundido', 'paralelo']
+
+
+def carregar_queries(retriever: RAGRetriever, n: int) -> List[str]:
+    """Usa trechos de seções nível 2 do próprio vector store como queries"""
+    results = retriever.collection.get(where={'nivel': 2}, limit=n, include=['documents'])
+    return [doc[:2000] for doc in results['documents']]
+
+
+def assinatura(resultado: Dict) -> tuple:
+    """Resumo comparável de um resultado (conteúdo e similaridade por nível)"""
+    return tuple(
+        tuple((chunk['conteudo'], round(chunk['similaridade'], 6)) for chunk in resultado[nivel])
+        for nivel in ('nivel_1', 'nivel_2', 'nivel_3')
+    )
+
+
+def conteudos(resultado: Dict) -> tuple:
+    """Chunks de cada nível, sem ordem (buscas em lote podem desempatar diferente)"""
+    return tuple(
+        tuple(sorted(chunk['conteudo'] for chunk in resultado[nivel]))
+        for nivel in ('nivel_1', 'nivel_2', 'nivel_3')
+    )
+
+
+def simular_latencia(retriever: RAGRetriever, atraso: float):
+    """Acrescenta um atraso fixo a cada busca vetorial (vector store remoto)"""
+    query_original = retriever.collection.query
+    
+    def query_com_atraso(*args, **kwargs):
+        time.sleep(atraso)
+        return query_original(*args, **kwargs)
+    
+    retriever.collection.query = query_com_atraso
+
+
+def executar(retriever: RAGRetriever, queries: List[str], modo: str, repeticoes: int) -> Dict:
+    """Executa o retrieval de todas as queries em um modo"""
+    tempos = []
+    total_queries = 0
+    resultados = []
+    
+    for _ in range(repeticoes):
+        resultados = []
+        for query in queries:
+            inicio = time.perf_counter()
+            with contextlib.redirect_stdout(io.StringIO()):
+                resultado = retriever.retrieval_hierarquico(query, modo=modo)
+            tempos.append(time.perf_counter() - inicio)
+            total_queries += resultado['queries']
+            resultados.append(resultado)
+    
+    tempos.sort()
+    return {
+        'queries_por_peticao': total_queries / len(tempos),
+        'media_ms': 1000 * sum(tempos) / len(tempos),
+        'p95_ms': 1000 * tempos[int(0.95 * (len(tempos) - 1))],
+        'resultados': resultados
+    }
+
+
+def executar_lote(retriever: RAGRetriever, queries: List[str], repeticoes: int) -> Dict:
+    """Executa o retrieval de todas as queries com uma chamada em lote"""
+    tempos = []
+    buscas = 0
+    resultados = []
+    
+    for _ in range(repeticoes):
+        buscas_inicio = retriever.total_queries
+        inicio = time.perf_counter()
+        with contextlib.redirect_stdout(io.StringIO()):
+            resultados = retriever.retrieval_hierarquico_lote(queries)
+        tempos.append(time.perf_counter() - inicio)
+        buscas += retriever.total_queries - buscas_inicio
+    
+    return {
+        'queries_por_peticao': buscas / (repeticoes * len(queries)),
+        'media_ms': 1000 * sum(tempos) / (repeticoes * len(queries)),
+        'resultados': resultados
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--n', type=int, default=30, help='Número de petições (queries)')
+    parser.add_argument('--repeticoes', type=int, default=3, help='Repetições por modo')
+    parser.add_argument('--latencia-ms', type=float, default=0.0, help='Atraso simulado por busca vetorial')
+    args = parser.parse_args()
+    
+    retriever = RAGRetriever()
+    # Sem cache de resultados: as repetições precisam refazer as buscas
+    retriever.cache_resultados = None
+    queries = carregar_queries(retriever, args.n)
+    
+    # Pré-calcular embeddings: o benchmark mede apenas o retrieval
+    embeddings = {query: retriever.gerar_embedding(query) for query in queries}
+    retriever.gerar_embedding = embeddings.__getitem__
+    retriever.gerar_embeddings = lambda textos: [embeddings[texto] for texto in textos]
+    
+    if args.latencia_ms:
+        simular_latencia(retriever, args.latencia_ms / 1000)
+    
+    print(f"📊 {len(queries)} petições x {args.repeticoes} repetições\n")
+    print(f"{'Modo':<12} {'Buscas/petição':>15} {'Média (ms)':>12} {'p95 (ms)':>10}")
+    
+    metricas = {}
+    for modo in MODOS:
+        metricas[modo] = executar(retriever, queries, modo, args.repeticoes)
+        m = metricas[modo]
+        print(f"{modo:<12} {m['queries_por_peticao']:>15.2f} {m['media_ms']:>12.2f} {m['p95_ms']:>10.2f}")
+    
+    lote = executar_lote(retriever, queries, args.repeticoes)
+    print(f"{'lote':<12} {lote['queries_por_peticao']:>15.2f} {lote['media_ms']:>12.2f} {'-':>10}")
+    
+    # Conferir se os modos retornam os mesmos chunks do sequencial
+    print()
+    for modo in MODOS[1:]:
+        divergentes = sum(
+            assinatura(a) != assinatura(b)
+            for a, b in zip(metricas['sequencial']['resultados'], metricas[modo]['resultados'])
+        )
+        print(f"🔎 {modo}: petições com resultado divergente do sequencial: {divergentes}/{len(queries)}")
+    
+    divergentes = sum(
+        conteudos(a) != conteudos(b)
+        for a, b in zip(metricas['sequencial']['resultados'], lote['resultados'])
+    )
+    print(f"🔎 lote: petições com chunks divergentes do sequencial: {divergentes}/{len(queries)}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,123 @@
+"""
+═══════════════════════════════════════════════════════════════════════════
+BENCHMARK - RETRIEVAL COM TRECHOS x TEXTO COMPLETO
+═══════════════════════════════════════════════════════════════════════════
+Buscas dos 3 níveis (filtros do retriever) trazendo o documento inteiro de
+cada chunk ou só metadados e distâncias, com os trechos pré-calculados
+anexados em memória. Mede latência por retrieval e caracteres de texto
+carregados por retrieval, e confere se os trechos exibidos no prompt são
+os mesmos nos dois modos.
+
+--fator N repete o texto de cada chunk N vezes num store temporário
+(mesmos ids e vetores), simulando chunks mais longos.
+
+Uso:
+    python -m benchmarks.benchmark_trechos --n 30 --fator 1 5 20
+"""
+
+import argparse
+import contextlib
+import io
+import shutil
+import tempfile
+import time
+from pathlib import Path
+from typing import Dict, List
+
+import chromadb
+import numpy as np
+from chromadb.config import Settings
+
+from config.settings import Config
+from modules.rag_retriever import RAGRetriever
+from modules.trechos import trecho
+
+
+def criar_store(dados: Dict, fator: int, diretorio: Path):
+    """Store temporário com o texto de cada chunk repetido `fator` vezes"""
+    client = chromadb.PersistentClient(path=str(diretorio), settings=Settings(anonymized_telemetry=False))
+    collection = client.create_collection(
+        name=Config.COLLECTION_NAME,
+        metadata={'hnsw:space': Config.DISTANCE_METRIC}
+    )
+    for inicio in range(0, len(dados['ids']), 5000):
+        fim = inicio + 5000
+        collection.add(
+            ids=dados['ids'][inicio:fim],
+            embeddings=dados['embeddings'][inicio:fim],
+            documents=["\n\n".join([documento] * fator) for documento in dados['documents'][inicio:fim]],
+            metadatas=dados['metadatas'][inicio:fim]
+        )
+
+
+def medir(retriever: RAGRetriever, queries: List[List[float]], com_trechos: bool) -> Dict:
+    """Latência e caracteres carregados por retrieval (buscas dos 3 níveis)"""
+    Config.RETRIEVAL_TRECHOS = com_trechos
+    tempos, caracteres, exibidos = [], [], []
+    for query in queries:
+        inicio = time.perf_counter()
+        chunks = (
+            retriever.buscar_nivel_1(query)
+            + retriever.buscar_nivel_2(query, tipo_doc='contestacao')
+            + retriever.buscar_nivel_3(query)
+        )
+        tempos.append(time.perf_counter() - inicio)
+        caracteres.append(sum(
+            len(chunk['conteudo']) if chunk.get('conteudo') is not None
+            else len(chunk['trechos'][max(chunk['trechos'])])
+            for chunk in chunks
+        ))
+        exibidos.append([trecho(chunk, 300) for chunk in chunks])
+    return {
+        'media_ms': 1000 * np.mean(tempos),
+        'caracteres': np.mean(caracteres),
+        'exibidos': exibidos
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--n', type=int, default=30, help='Queries')
+    parser.add_argument('--fator', type=int, nargs='+', default=[1, 5, 20], help='Repetições do texto de cada chunk')
+    args = parser.parse_args()
+    
+    origem = chromadb.PersistentClient(
+        path=str(Config.VECTOR_STORE_DIR),
+        settings=Settings(anonymized_telemetry=False)
+    ).get_collection(name=Config.COLLECTION_NAME)
+    dados = origem.get(include=['embeddings', 'documents', 'metadatas'])
+    
+    rng = np.random.default_rng(42)
+    matriz = np.asarray(dados['embeddings'], dtype=np.float32)
+    queries = []
+    for posicao in rng.choice(len(matriz), size=args.n):
+        consulta = matriz[posicao] + rng.normal(0, 0.01, matriz.shape[1]).astype(np.float32)
+        queries.append((consulta / np.linalg.norm(consulta)).tolist())
+    
+    temporario = Path(tempfile.mkdtemp(prefix='trechos_'))
+    Config.TRECHOS_DIR = temporario / "trechos"
+    try:
+        print(f"{'Fator':>6} {'Texto médio':>12} {'Completo (ms)':>14} {'Trechos (ms)':>13} "
+              f"{'Caract. completo':>17} {'Caract. trechos':>16} {'Prompt igual':>13}")
+        for fator in args.fator:
+            vector_store_dir = temporario / f"vector_store_{fator}"
+            criar_store(dados, fator, vector_store_dir)
+            with contextlib.redirect_stdout(io.StringIO()):
+                retriever = RAGRetriever(vector_store_dir=vector_store_dir)
+                # Índice de trechos construído fora da medição
+                retriever.indice_trechos.sincronizar()
+            
+            medir(retriever, queries[:5], False)
+            completo = medir(retriever, queries, False)
+            com_trechos = medir(retriever, queries, True)
+            
+            texto_medio = np.mean([len(documento) for documento in dados['documents']]) * fator
+            iguais = completo['exibidos'] == com_trechos['exibidos']
+            print(f"{fator:>6} {texto_medio:>12.0f} {completo['media_ms']:>14.2f} {com_trechos['media_ms']:>13.2f} "
+                  f"{completo['caracteres']:>17.0f} {com_trechos['caracteres']:>16.0f} {'sim' if iguais else 'não':>13}")
+    finally:
+        shutil.rmtree(temporario, ignore_errors=True)
+
+
+if __name__ == "__main__":
+    main()
@@ -99,7 +99,7 @@ USER_PROMPT_TEMPLATE = """# PETIÇÃO INICIAL RECEBIDA
 
 ═══════════════════════════════════════════════════════════════════════════
 
-# TAREFA
+{secao_por_pedido}# TAREFA
 
 Com base na petição inicial apresentada e em todo o contexto jurídico fornecido acima, redija uma CONTESTAÇÃO completa e fundamentada, seguindo rigorosamente a estrutura abaixo:
 
@@ -140,7 +140,7 @@ Apresente a versão dos fatos sob a ótica da defesa, incluindo:
 
 ##### 3.2.3. Refutação dos Argumentos do Autor
 - Refute especificamente cada argumento levantado na inicial
-- Apresente contraprovas ou esclarecimentos
+{instrucao_por_pedido}- Apresente contraprovas ou esclarecimentos
 - Demonstre eventual má compreensão dos fatos ou do direito pelo autor
 
 ##### 3.2.4. Jurisprudência Favorável
@@ -182,125 +182,14 @@ Formule pedidos claros e específicos:
 
 Inicie a redação da contestação abaixo:"""
 
-def formatar_contestacoes_similares(chunks_nivel_1, chunks_nivel_2):
-    """Formata chunks recuperados para inclusão no prompt"""
-    
-    resultado = []
-    
-    # Nível 1 - Contexto global
-    if chunks_nivel_1:
-        resultado.append("### Documentos Similares (Contexto Global)\n")
-        for i, chunk in enumerate(chunks_nivel_1[:5], 1):  # Top 5
-            resultado.append(f"**Documento {i}** (Similaridade: {chunk['similaridade']:.2%})")
-            resultado.append(f"Tipo: {chunk['metadata'].get('tipo_lit', 'N/A')}")
-            resultado.append(f"```\n{chunk['conteudo'][:500]}...\n```\n")
-    
-    # Nível 2 - Seções específicas
-    if chunks_nivel_2:
-        resultado.append("\n### Seções Processuais Relevantes\n")
-        for i, chunk in enumerate(chunks_nivel_2[:8], 1):  # Top 8
-            resultado.append(f"**Trecho {i}** (Similaridade: {chunk['similaridade']:.2%})")
-            resultado.append(f"Seção: {chunk['metadata'].get('secao', 'N/A')}")
-            resultado.append(f"```\n{chunk['conteudo'][:400]}...\n```\n")
-    
-    return "\n".join(resultado) if resultado else "Nenhum documento similar encontrado."
-
-def formatar_fundamentacao_juridica(chunks_nivel_3):
-    """Formata chunks de fundamentação jurídica"""
-    
-    if not chunks_nivel_3:
-        return "Nenhuma fundamentação jurídica específica recuperada."
-    
-    resultado = []
-    
-    # Agrupar por tipo
-    artigos = []
-    precedentes = []
-    outros = []
-    
-    for chunk in chunks_nivel_3:
-        conteudo = chunk['conteudo']
-        
-        if 'art.' in conteudo.lower() or 'artigo' in conteudo.lower():
-            artigos.append(chunk)
-        elif 'jurisprudência' in conteudo.lower() or 'acórdão' in conteudo.lower():
-            precedentes.append(chunk)
-        else:
-            outros.append(chunk)
-    
-    # Formatação
-    if artigos:
-        resultado.append("### Dispositivos Legais Aplicáveis\n")
-        for chunk in artigos[:5]:
-            resultado.append(f"```\n{chunk['conteudo'][:300]}...\n```\n")
-    
-    if precedentes:
-        resultado.append("\n### Precedentes Jurisprudenciais\n")
-        for chunk in precedentes[:4]:
-            resultado.append(f"```\n{chunk['conteudo'][:300]}...\n```\n")
-    
-    if outros:
-        resultado.append("\n### Argumentação Jurídica\n")
-        for chunk in outros[:3]:
-            resultado.append(f"```\n{chunk['conteudo'][:300]}...\n```\n")
-    
-    return "\n".join(resultado)
-
-def formatar_argumentos_tipo_caso(tipo_caso, chunks_especificos):
-    """Formata argumentos específicos do tipo de caso"""
-    
-    from config.settings import Config
-    
-    info_tipo = Config.get_tipo_caso_info(tipo_caso)
-    
-    resultado = [
-        f"### Tipo de Caso: {info_tipo['nome']}",
-        f"{info_tipo['descricao']}\n",
-        "**Argumentos de Defesa Típicos:**\n"
-    ]
-    
-    if chunks_especificos:
-        for i, chunk in enumerate(chunks_especificos[:5], 1):
-            resultado.append(f"{i}. {chunk['conteudo'][:250]}...")
-    else:
-        resultado.append("Use os argumentos gerais presentes nas contestações similares recuperadas.")
-    
-    return "\n".join(resultado)
-
-def construir_prompt_usuario(dados_peticao, contexto_rag):
-    """Constrói o prompt do usuário com todos os dados"""
-    
-    # Formatar elementos factuais
-    elementos = "\n".join([f"- {elem}" for elem in dados_peticao.get('elementos_facticos', [])])
-    
-    # Formatar pedidos
-    pedidos = "\n".join([f"- {ped}" for ped in dados_peticao.get('pedidos', [])])
-    
-    # Valor da causa
-    valor = dados_peticao.get('valor_causa')
-    valor_info = f"\n## Valor da Causa\n{valor}\n" if valor else ""
-    
-    # Construir prompt
-    prompt = USER_PROMPT_TEMPLATE.format(
-        peticao_inicial_completa=dados_peticao.get('texto_completo', ''),
-        tipo_caso=dados_peticao.get('tipo_caso', 'Não identificado'),
-        confianca_classificacao=dados_peticao.get('confianca', 0) * 100,
-        autor=dados_peticao.get('autor', 'Não identificado'),
-        reu=dados_peticao.get('reu', 'UNIMED FERJ'),
-        elementos_facticos=elementos if elementos else '- Não identificados',
-        pedidos_autor=pedidos if pedidos else '- Não identificados',
-        valor_causa_info=valor_info,
-        contestacoes_similares=formatar_contestacoes_similares(
-            contexto_rag.get('nivel_1', []),
-            contexto_rag.get('nivel_2', [])
-        ),
-        fundamentacao_juridica=formatar_fundamentacao_juridica(
-            contexto_rag.get('nivel_3', [])
-        ),
-        argumentos_tipo_caso=formatar_argumentos_tipo_caso(
-            dados_peticao.get('tipo_caso', ''),
-            contexto_rag.get('especificos', [])
-        )
-    )
-    
-    return prompt
+# Seção e instrução do contexto por pedido (só com retrieval_por_pedido,
+# Config.PEDIDOS_RETRIEVAL_ENABLED); sem ele, o prompt fica como antes
+SECAO_POR_PEDIDO = """## 🧩 Contexto Direcionado a Cada Pedido e Fato
+
+{contexto_por_pedido}
+
+═══════════════════════════════════════════════════════════════════════════
+
+"""
+
+INSTRUCAO_POR_PEDIDO = "- Para cada pedido, utilize os trechos e precedentes a ele associados no contexto direcionado\n"
@@ -78,6 +78,39 @@ class Config:
     EMBEDDING_MODEL = "intfloat/multilingual-e5-large"
     EMBEDDING_DIM = 1024
     
+    # Motor de inferência de embeddings
+    #   'torch': SentenceTransformer (PyTorch)
+    #   'onnx': modelo exportado e quantizado (int8 dinâmico) no ONNX Runtime
+    EMBEDDING_ENGINE = 'torch'
+    ONNX_MODEL_DIR = OUTPUT_RAG_DIR / "onnx_model"
+    ONNX_INTRA_OP_THREADS = max(1, (os.cpu_count() or 2) // 2)
+    ONNX_PARIDADE_MIN_COSSENO = 0.98  # Cosseno mínimo ONNX x torch (mesmo texto)
+    
+    # Cache de embeddings de query (LRU em memória + SQLite em disco)
+    EMBEDDING_CACHE_ENABLED = True
+    EMBEDDING_CACHE_DIR = OUTPUT_RAG_DIR / "embedding_cache"
+    EMBEDDING_CACHE_MAX_MEMORIA = 256  # entradas
+    EMBEDDING_CACHE_MAX_DISCO = 20000  # entradas (~4 KB cada)
+    
+    # Cache semântico de resultados do retrieval: petição cujo embedding tem
+    # cosseno >= LIMIAR com o de uma recente (mesmos parâmetros) reutiliza os
+    # chunks guardados. Entradas expiram em TTL segundos; o cache é esvaziado
+    # quando a collection muda. Desligado por padrão: um hit devolve os chunks
+    # da petição anterior, não os da busca exata da nova
+    RESULTADOS_CACHE_ENABLED = False
+    RESULTADOS_CACHE_LIMIAR = 0.98
+    RESULTADOS_CACHE_MAX_ENTRADAS = 128
+    RESULTADOS_CACHE_TTL = 3600  # segundos
+    
+    # Micro-lotes: pedidos de embedding concorrentes (vários usuários) são
+    # agrupados por até JANELA_MS (ou MAX textos) em um único encode.
+    # JANELA_MS = 0 agrupa só o que acumulou durante o encode anterior.
+    # Desligado por padrão: com um usuário, cada embedding espera a janela
+    # sem nada para agrupar
+    EMBEDDING_MICROLOTE_ENABLED = False
+    EMBEDDING_MICROLOTE_JANELA_MS = 5
+    EMBEDDING_MICROLOTE_MAX = 16
+    
     # ═══════════════════════════════════════════════════════════════════════
     # VECTOR STORE
     # ═══════════════════════════════════════════════════════════════════════
@@ -85,6 +118,40 @@ class Config:
     COLLECTION_NAME = "contestacoes_juridicas_v1"
     DISTANCE_METRIC = "cosine"
     
+    # Backend de busca vetorial
+    #   'chroma': busca HNSW via ChromaDB
+    #   'numpy': busca exata em memória sobre um export da collection
+    #            (refeito ao iniciar o retriever ou trocar de versão, se a
+    #            collection mudou; chunks gravados com o app em execução,
+    #            pela ingestão online ou por modules.ingestao na mesma
+    #            versão, só aparecem depois de reiniciar)
+    VECTOR_BACKEND = 'chroma'
+    NUMPY_STORE_DIR = OUTPUT_RAG_DIR / "numpy_store"
+    
+    # Armazenamento compacto do backend numpy
+    #   'float32': varredura sobre os vetores originais
+    #   'float16' / 'int8' (escala por vetor): varredura sobre uma cópia 2x / 4x
+    #   menor; os NUMPY_REESCORE_FATOR x k melhores candidatos são reordenados
+    #   com os vetores float32 (lidos do disco só para eles)
+    NUMPY_QUANTIZACAO = 'float32'
+    NUMPY_REESCORE_FATOR = 4
+    
+    # Partições físicas por (nivel, tipo_lit, tipo_doc): as buscas filtradas
+    # vão direto ao sub-índice do filtro (tipo_caso None funde as partições
+    # do nível). Reconstruídas quando a collection muda
+    VECTOR_PARTICOES = False
+    PARTICOES_DIR = OUTPUT_RAG_DIR / "particoes"
+    
+    # Versões da collection (blue/green): cada build vai para uma collection
+    # nova (<base>_vN, em VERSOES_DIR/<nome>), validada e ativada pela troca
+    # atômica do ponteiro. Sem ponteiro vale COLLECTION_NAME em VECTOR_STORE_DIR.
+    # Retrievers em execução conferem o ponteiro a cada VERSOES_INTERVALO s
+    VERSOES_DIR = OUTPUT_RAG_DIR / "versoes"
+    VERSOES_PONTEIRO = OUTPUT_RAG_DIR / "colecao_ativa.json"
+    VERSOES_INTERVALO = 5.0  # segundos
+    VERSOES_MIN_FRACAO = 0.9  # chunks mínimos da nova versão, em fração da ativa
+    VERSOES_MANTER = 2  # versões inativas mantidas em disco pela limpeza
+    
     # ═══════════════════════════════════════════════════════════════════════
     # RAG - PARÂMETROS DE RETRIEVAL
     # ═══════════════════════════════════════════════════════════════════════
@@ -111,6 +178,125 @@ class Config:
     # Limite de tokens para contexto
     MAX_CONTEXT_TOKENS = 12000
     
+    # Modo de execução do retrieval hierárquico
+    #   'sequencial': uma busca por nível (+ uma busca para classificação)
+    #   'fundido': uma única busca sobre-amostrada, separada por nível em memória
+    #   'paralelo': uma busca por nível, as três executadas concorrentemente
+    #   'hibrido': por nível, rankings vetorial e BM25 fundidos por RRF
+    #   'multijanela': petição inteira em janelas, uma busca multi-query por nível
+    RETRIEVAL_MODO = 'sequencial'
+    
+    # Modo fundido: n_results = fator x soma dos top_k dos 3 níveis
+    RETRIEVAL_FUNDIDO_FATOR = 4
+    
+    # Modo paralelo: threads do pool (compartilhado entre sessões) e tempo
+    # máximo de espera pelos níveis; nível que expira retorna sem chunks
+    RETRIEVAL_PARALELO_WORKERS = 6
+    RETRIEVAL_PARALELO_TIMEOUT = 10.0  # segundos
+    
+    # Modo híbrido: índice BM25 local (persistido, atualizado incrementalmente)
+    # e Reciprocal Rank Fusion; cada ranking traz fator x top_k candidatos
+    BM25_DIR = OUTPUT_RAG_DIR / "bm25"
+    BM25_K1 = 1.5
+    BM25_B = 0.75
+    RRF_K = 60
+    HIBRIDO_FATOR_CANDIDATOS = 3
+    
+    # Índice de citações (lei/artigo/§, súmulas, recursos, processos -> chunks).
+    # Ligado, em todos os modos, chunks de nível 3 que citam os diplomas e
+    # precedentes da petição entram à frente do nível 3 (até CITACOES_MAX_CHUNKS)
+    # e a fundamentação do prompt é agrupada pela categoria do índice.
+    # Desligado por padrão: muda a ordem do nível 3 e o agrupamento do prompt
+    CITACOES_ENABLED = False
+    CITACOES_DIR = OUTPUT_RAG_DIR / "citacoes"
+    CITACOES_MAX_CHUNKS = 5
+    
+    # Modo multijanela: a petição é dividida em janelas de passagem (um
+    # encode em lote) e os hits das janelas são agregados por chunk
+    #   'max': maior similaridade entre as janelas; 'soma': soma das similaridades
+    MULTIJANELA_MAX_JANELAS = 8  # inclui o resumo estruturado (janela 0)
+    MULTIJANELA_TAMANHO = 1500  # caracteres por janela
+    MULTIJANELA_SOBREPOSICAO = 200
+    MULTIJANELA_AGREGACAO = 'max'
+    
+    # Expansão hierárquica: dos melhores hits dos níveis 2 e 3, traz por
+    # lookup de id (índice pai/filhos, sem busca vetorial) o documento pai
+    # e os irmãos vizinhos (seções adjacentes do mesmo documento).
+    # Desligado por padrão: acrescenta chunks ao contexto do prompt
+    HIERARQUIA_EXPANSAO = False
+    HIERARQUIA_DIR = OUTPUT_RAG_DIR / "hierarquia"
+    HIERARQUIA_SEMENTES = 3  # melhores hits expandidos por nível
+    HIERARQUIA_VIZINHOS = 1  # irmãos de cada lado
+    
+    # Retrieval com trechos: as buscas trazem só ids, metadados e distâncias,
+    # e cada chunk recebe os trechos pré-calculados (cortados em fim de frase)
+    # nos tamanhos usados pelo prompt e pela interface. O texto completo é
+    # carregado sob demanda (RAGRetriever.carregar_conteudo)
+    RETRIEVAL_TRECHOS = False
+    TRECHOS_DIR = OUTPUT_RAG_DIR / "trechos"
+    TRECHOS_TAMANHOS = (200, 250, 300, 400, 500)
+    
+    # Busca adaptativa (buscar_nivel_*): busca ids e distâncias, corta em
+    # min_similarity e carrega documentos só dos sobreviventes. O k de cada
+    # nível acompanha quantos chunks passaram nas últimas buscas (até top_k)
+    RETRIEVAL_ADAPTATIVO = False
+    ADAPTATIVO_K_MIN = 4
+    ADAPTATIVO_FATOR_AMPLIACAO = 2  # multiplica k quando todos os candidatos passam
+    ADAPTATIVO_MARGEM = 0.25  # folga sobre a média de sobreviventes
+    ADAPTATIVO_SUAVIZACAO = 0.3  # peso da última busca na média móvel
+    
+    # Retrieval por pedido (retrieval_por_pedido): pedidos e fatos da petição
+    # consultados em lote nos níveis 2 e 3 para a refutação item a item.
+    # Desligado por padrão: +2 buscas vetoriais por petição e uma seção a
+    # mais no prompt (sem ele, o prompt não muda)
+    PEDIDOS_RETRIEVAL_ENABLED = False
+    PEDIDOS_TOP_K_NIVEL_2 = 3
+    PEDIDOS_TOP_K_NIVEL_3 = 2
+    PEDIDOS_MAX_ITENS = 15
+    PEDIDOS_MAX_FATOS = 10
+    
+    # Retrieval em lote (retrieval_hierarquico_lote): textos por encode e
+    # máximo de query_embeddings por chamada a collection.query
+    RETRIEVAL_LOTE_ENCODE = 32
+    RETRIEVAL_LOTE_QUERIES = 64
+    
+    # ═══════════════════════════════════════════════════════════════════════
+    # INGESTÃO EM LOTE (python -m modules.ingestao)
+    # ═══════════════════════════════════════════════════════════════════════
+    
+    # Extração/divisão em INGESTAO_WORKERS processos; encode em lotes de
+    # LOTE_ENCODE textos e upsert a cada LOTE_UPSERT chunks
+    INGESTAO_WORKERS = max(1, (os.cpu_count() or 2) - 1)
+    INGESTAO_LOTE_ENCODE = 64
+    INGESTAO_LOTE_UPSERT = 1024
+    
+    # Tamanhos dos chunks (caracteres): resumo de nível 1, partes das seções
+    # de nível 2 (~512 tokens do e5) e trechos atômicos de nível 3
+    INGESTAO_TAMANHO_RESUMO = 2000
+    INGESTAO_TAMANHO_SECAO = 2000
+    INGESTAO_TAMANHO_ATOMICO = 600
+    
+    # Manifesto da ingestão incremental: hash de cada arquivo -> chunks gravados
+    # e hash do texto de cada chunk -> vetor. Novas execuções pulam arquivos
+    # inalterados, só gravam chunks novos/alterados, reaproveitam vetores de
+    # textos já codificados e apagam chunks órfãos e de arquivos removidos
+    INGESTAO_MANIFESTO_ENABLED = True
+    INGESTAO_MANIFESTO_DIR = OUTPUT_RAG_DIR / "ingestao"
+    
+    # Ingestão online: contestações aprovadas no app são gravadas em
+    # APROVADAS_DIR e entram numa fila SQLite (sobrevive a reinícios); uma
+    # thread as divide, codifica e acrescenta à collection ativa em transações
+    # de LOTE chunks, com PAUSA segundos entre lotes para não disputar CPU com
+    # as buscas. TENTATIVAS por item antes de marcá-lo como erro.
+    # Desligado por padrão: cada aprovação grava no vector store em uso
+    INGESTAO_ONLINE_ENABLED = False
+    INGESTAO_ONLINE_DIR = OUTPUT_RAG_DIR / "ingestao_online"
+    INGESTAO_ONLINE_APROVADAS_DIR = OUTPUT_RAG_DIR / "aprovadas"
+    INGESTAO_ONLINE_LOTE = 8
+    INGESTAO_ONLINE_PAUSA = 0.2
+    INGESTAO_ONLINE_INTERVALO = 2.0  # segundos entre consultas à fila vazia
+    INGESTAO_ONLINE_TENTATIVAS = 3
+    
     # ═══════════════════════════════════════════════════════════════════════
     # CLAUDE API
     # ═══════════════════════════════════════════════════════════════════════
@@ -132,6 +318,21 @@ class Config:
     # API Key (será lida de variável de ambiente)
     ANTHROPIC_API_KEY = os.getenv("ANTHROPIC_API_KEY", "")
     
+    # ═══════════════════════════════════════════════════════════════════════
+    # PETIÇÕES QUASE DUPLICADAS (REAPROVEITAMENTO DE CONTESTAÇÕES)
+    # ═══════════════════════════════════════════════════════════════════════
+    
+    # Índice MinHash/LSH das petições já respondidas. Petição nova com
+    # Jaccard estimado >= LIMIAR com uma anterior pode reaproveitar aquela
+    # contestação (substituição de partes, processo e valor) em vez de uma
+    # geração completa
+    DUPLICATAS_ENABLED = True
+    DUPLICATAS_DIR = OUTPUT_RAG_DIR / "duplicatas"
+    DUPLICATAS_LIMIAR = 0.8
+    DUPLICATAS_SHINGLE = 5  # palavras por shingle
+    DUPLICATAS_PERMUTACOES = 128  # tamanho da assinatura
+    DUPLICATAS_BANDAS = 32  # LSH: 32 bandas de 4 linhas (candidato a partir de ~0.4)
+    
     # ═══════════════════════════════════════════════════════════════════════
     # CLASSIFICAÇÃO DE TIPOS DE CASO
     # ═══════════════════════════════════════════════════════════════════════
@@ -167,6 +368,16 @@ class Config:
     # Limite mínimo de confiança para classificação
     MIN_CONFIDENCE_CLASSIFICATION = 0.70
     
+    # Método de classificação do tipo de caso
+    #   'vizinhos': busca top-10 no nível 1 e votação por tipo_lit
+    #   'centroides': produto com protótipos pré-computados por tipo (sem busca
+    #                 vetorial); exige níveis 1 e 3 rotulados com tipo_lit, pois
+    #                 um tipo confiante filtra as buscas desses níveis
+    CLASSIFICADOR_METODO = 'vizinhos'
+    CLASSIFICADOR_DIR = OUTPUT_RAG_DIR / "classificador"
+    CLASSIFICADOR_PROTOTIPOS = 1  # Protótipos (centroides) por tipo de caso
+    CLASSIFICADOR_TEMPERATURA = None  # Softmax; None = calibrada nos chunks rotulados
+    
     # ═══════════════════════════════════════════════════════════════════════
     # VALIDAÇÃO E QUALIDADE
     # ═══════════════════════════════════════════════════════════════════════
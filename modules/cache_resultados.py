@@ -0,0 +1,159 @@
+"""
+═══════════════════════════════════════════════════════════════════════════
+CACHE SEMÂNTICO DE RESULTADOS DO RETRIEVAL
+═══════════════════════════════════════════════════════════════════════════
+Litigância de massa gera muitas petições quase idênticas (mesmo escritório,
+mesma operadora). Este cache guarda os resultados recentes do retrieval
+indexados pelo embedding da query: uma nova petição cujo embedding tem
+cosseno >= limiar com o de uma entrada (mesmos parâmetros de retrieval)
+recebe os chunks guardados, sem acessar o vector store.
+
+Entradas expiram por TTL e as menos usadas saem primeiro (LRU). O cache
+inteiro é invalidado quando a collection muda (assinatura dos arquivos
+ou total de chunks).
+"""
+
+import pickle
+import threading
+import time
+from collections import OrderedDict
+from itertools import count
+from pathlib import Path
+from typing import Dict, List, Optional, Tuple
+
+import numpy as np
+
+from config.settings import Config
+from modules.vector_backend import assinatura_vector_store
+
+
+class CacheResultados:
+    """Cache em memória: embedding da query -> resultado do retrieval (casamento por cosseno)"""
+    
+    def __init__(
+        self,
+        collection,
+        vector_store_dir: Optional[Path] = None,
+        limiar: Optional[float] = None,
+        max_entradas: Optional[int] = None,
+        ttl: Optional[float] = None
+    ):
+        """
+        Args:
+            collection: Collection (ChromaDB ou NumpyVectorStore) cujos resultados são guardados
+            vector_store_dir: Diretório do vector store (usa Config se None)
+            limiar: Cosseno mínimo para reutilizar um resultado (usa Config se None)
+            max_entradas: Máximo de resultados guardados (usa Config se None)
+            ttl: Validade de uma entrada em segundos (usa Config se None)
+        """
+        self.collection = collection
+        self.vector_store_dir = Path(vector_store_dir or Config.VECTOR_STORE_DIR)
+        self.limiar = limiar if limiar is not None else Config.RESULTADOS_CACHE_LIMIAR
+        self.max_entradas = max_entradas or Config.RESULTADOS_CACHE_MAX_ENTRADAS
+        self.ttl = ttl if ttl is not None else Config.RESULTADOS_CACHE_TTL
+        
+        self._entradas = OrderedDict()  # seq -> {'vetor', 'parametros', 'resultado', 'criado'}
+        self._sequencia = count()
+        self._versao = None
+        self._lock = threading.Lock()
+        
+        # Contadores
+        self.hits = 0
+        self.misses = 0
+        self.expiradas = 0
+        self.invalidacoes = 0
+        self._soma_similaridade = 0.0
+    
+    @staticmethod
+    def _normalizar(embedding: List[float]) -> np.ndarray:
+        vetor = np.asarray(embedding, dtype=np.float32)
+        return vetor / max(float(np.linalg.norm(vetor)), 1e-12)
+    
+    def _verificar_versao(self):
+        """Esvazia o cache se a collection mudou desde a última consulta (chamar com o lock)"""
+        versao = (
+            assinatura_vector_store(self.vector_store_dir, self.collection.name),
+            self.collection.count()
+        )
+        if versao != self._versao:
+            if self._entradas:
+                self.invalidacoes += 1
+                self._entradas.clear()
+            self._versao = versao
+    
+    def _expirar(self, agora: float):
+        """Remove entradas mais velhas que o TTL (chamar com o lock)"""
+        vencidas = [seq for seq, entrada in self._entradas.items() if agora - entrada['criado'] > self.ttl]
+        for seq in vencidas:
+            del self._entradas[seq]
+        self.expiradas += len(vencidas)
+    
+    def obter(self, query_embedding: List[float], parametros: Tuple) -> Optional[Tuple[Dict, float]]:
+        """
+        Resultado guardado de uma query semanticamente equivalente
+        
+        Args:
+            query_embedding: Embedding da query
+            parametros: Parâmetros do retrieval que também precisam coincidir (modo, tipo de caso...)
+            
+        Returns:
+            (cópia do resultado, cosseno com a query guardada) ou None
+        """
+        vetor = self._normalizar(query_embedding)
+        
+        with self._lock:
+            self._verificar_versao()
+            self._expirar(time.time())
+            
+            candidatas = [
+                (seq, entrada) for seq, entrada in self._entradas.items()
+                if entrada['parametros'] == parametros
+            ]
+            if candidatas:
+                similaridades = np.stack([entrada['vetor'] for _, entrada in candidatas]) @ vetor
+                melhor = int(np.argmax(similaridades))
+                similaridade = float(similaridades[melhor])
+                if similaridade >= self.limiar:
+                    seq, entrada = candidatas[melhor]
+                    self._entradas.move_to_end(seq)
+                    self.hits += 1
+                    self._soma_similaridade += similaridade
+                    # Cópia nova a cada hit: o resultado é compartilhado entre sessões do app
+                    return pickle.loads(entrada['resultado']), similaridade
+            
+            self.misses += 1
+            return None
+    
+    def armazenar(self, query_embedding: List[float], parametros: Tuple, resultado: Dict):
+        """Guarda o resultado de um retrieval, descartando o menos usado se cheio"""
+        entrada = {
+            'vetor': self._normalizar(query_embedding),
+            'parametros': parametros,
+            # Serializado: mais rápido que deepcopy e mais compacto em memória
+            'resultado': pickle.dumps(resultado, protocol=pickle.HIGHEST_PROTOCOL),
+            'criado': time.time()
+        }
+        with self._lock:
+            self._verificar_versao()
+            self._entradas[next(self._sequencia)] = entrada
+            while len(self._entradas) > self.max_entradas:
+                self._entradas.popitem(last=False)
+    
+    def estatisticas(self) -> Dict:
+        """Contadores de hit/miss, expirações, invalidações e ocupação"""
+        with self._lock:
+            consultas = self.hits + self.misses
+            return {
+                'hits': self.hits,
+                'misses': self.misses,
+                'taxa_acerto': self.hits / consultas if consultas else 0.0,
+                'similaridade_media_hits': self._soma_similaridade / self.hits if self.hits else 0.0,
+                'expiradas': self.expiradas,
+                'invalidacoes': self.invalidacoes,
+                'entradas': len(self._entradas)
+            }
+    
+    def limpar(self):
+        """Esvazia o cache"""
+        with self._lock:
+            self._entradas.clear()
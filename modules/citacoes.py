@@ -0,0 +1,491 @@
+"""
+═══════════════════════════════════════════════════════════════════════════
+CITAÇÕES JURÍDICAS - EXTRATOR E ÍNDICE INVERTIDO
+═══════════════════════════════════════════════════════════════════════════
+Extrai as citações de cada chunk em chaves normalizadas e mantém um
+índice invertido chave -> ids, para recuperar por lookup exato todos os
+chunks que citam as leis, artigos e precedentes mencionados na petição.
+
+Formato das chaves (do geral para o específico, separadas por ':'):
+    lei:9656                    Lei 9.656/98 (ano descartado)
+    lei:9656:art:13             art. 13 da Lei 9.656/98
+    lei:9656:art:13:par:1       art. 13, § 1º, da Lei 9.656/98
+    lei:8078:art:6              art. 6º do CDC (códigos viram o número da lei)
+    rn:465                      Resolução Normativa ANS nº 465
+    cf:art:5                    art. 5º da Constituição Federal
+    sumula:608                  Súmula 608 (tribunal não informado)
+    sumula:608:stj              Súmula 608 do STJ
+    sumula_vinculante:13        Súmula Vinculante 13
+    resp:1795421                REsp / AREsp / RE / ARE (sem pontos e UF)
+    tema:1082                   Tema repetitivo / de repercussão geral
+    processo:08046037520238190001   número CNJ
+
+Cada chunk também recebe uma categoria ('dispositivo', 'precedente' ou
+'argumento'), calculada uma vez na indexação, usada na montagem do prompt.
+"""
+
+import hashlib
+import json
+import re
+import threading
+import unicodedata
+from pathlib import Path
+from typing import Dict, List, Optional
+
+from config.settings import Config
+from modules.vector_backend import assinatura_vector_store, em_gravacao
+
+ARQUIVO_INDICE = "indice.json"
+ARQUIVO_MANIFESTO = "manifesto.json"
+
+# Alterar quando a extração mudar (força re-extrair todo o índice)
+VERSAO_EXTRATOR = 4
+
+CATEGORIAS = ('dispositivo', 'precedente', 'argumento')
+
+# Códigos citados por sigla ou nome -> diploma normalizado
+_CODIGOS = {
+    'cdc': 'lei:8078',
+    'codigo de defesa do consumidor': 'lei:8078',
+    'cpc': 'lei:13105',
+    'codigo de processo civil': 'lei:13105',
+    'cc': 'lei:10406',
+    'codigo civil': 'lei:10406',
+    'cf': 'cf',
+    'crfb': 'cf',
+    'constituicao federal': 'cf',
+    'constituicao da republica': 'cf',
+    'eca': 'lei:8069',
+    'estatuto da crianca e do adolescente': 'lei:8069',
+    'estatuto do idoso': 'lei:10741'
+}
+# Siglas que também aparecem soltas na prosa ("conforme o cc e o re"): só
+# valem qualificadas, com o ano ("CC/2002") ou como diploma de um artigo
+# ("art. 186 do CC", "CC, art. 186")
+_SIGLAS_AMBIGUAS = {'cc'}
+
+_NUMERO = r"\d{1,3}(?:\.\d{3})+|\d+"
+_MARCA_NUMERO = r"(?:n\s*[o.]*\s*|numero\s+)?"  # "nº", "n.", "n.º", "n" (º perdido na extração)
+
+_PADRAO_DIPLOMA = re.compile(
+    r"\b(?:"
+    rf"(?P<lei>lei)(?:\s+complementar)?(?:\s+federal)?\s+{_MARCA_NUMERO}(?P<num_lei>{_NUMERO})(?:\s*/\s*\d{{2,4}})?"
+    rf"|(?:rn|resolu\w*\s+normativa)(?:\s+(?:da\s+)?ans)?\s+{_MARCA_NUMERO}(?P<num_rn>{_NUMERO})"
+    r"|(?P<codigo>" + "|".join(sorted(map(re.escape, _CODIGOS), key=len, reverse=True)) + r")"
+    r"(?:\s*/\s*(?P<ano_codigo>\d{2,4}))?"
+    r")\b"
+)
+
+# Número de artigo com sufixo de letra opcional ("35-C", "10-A", "35º-G")
+_NUMERO_ARTIGO = rf"(?:{_NUMERO})(?:o?\s?-\s?[a-z]\b)?"
+_PADRAO_NUMERO_ARTIGO = re.compile(rf"(?P<num>{_NUMERO})(?:o?\s?-\s?(?P<letra>[a-z])\b)?")
+
+_PADRAO_ARTIGO = re.compile(
+    rf"\b(?:arts?\s*\.|artigos?)\s*(?P<numeros>{_NUMERO_ARTIGO}(?:\s*[o.]?\s*(?:,|e)\s*{_NUMERO_ARTIGO})*)"
+)
+_PADRAO_PARAGRAFO = re.compile(r"(?:§+|paragrafo)\s*(?P<par>\d+|unico)")
+
+# "Súmula 302", "Súmulas 302 e 608", "Súmula Vinculante 11"; a cauda (onde
+# fica o tribunal) é lida por lookahead, sem consumir a citação seguinte
+_PADRAO_SUMULA = re.compile(
+    rf"\bsumula(?P<plural>s)?(?P<vinculante>\s+vinculantes?)?\s+{_MARCA_NUMERO}"
+    rf"(?P<numeros>\d+(?(plural)(?:\s*[o.]?\s*(?:,|e)\s*{_MARCA_NUMERO}\d+)*))"
+    r"(?=(?P<cauda>[^\n;]{0,25}))"
+)
+# Onde termina a cauda de uma súmula: outra citação começa ali
+_FIM_CAUDA_SUMULA = re.compile(r"\b(?:sumulas?|aresp|resp|are|re|rms|hc|tema)\b")
+_TRIBUNAIS = re.compile(r"\b(stj|stf|tst|tnu|tj[a-z]{2}|trf\d)\b")
+
+_PADRAO_RECURSO = re.compile(
+    rf"\b(?P<tipo>aresp|resp|are|re|rms|hc)\s+{_MARCA_NUMERO}(?P<num>{_NUMERO})"
+)
+_PADRAO_TEMA = re.compile(rf"\btema\s+(?:repetitivo\s+)?{_MARCA_NUMERO}(?P<num>{_NUMERO})")
+_PADRAO_CNJ = re.compile(r"\b(\d{7})-(\d{2})\.(\d{4})\.(\d)\.(\d{2})\.(\d{4})\b")
+
+# Marcadores de texto de precedente (sem número citável)
+_MARCADORES_PRECEDENTE = re.compile(r"\b(?:jurisprudencia|acordao|ementa|relator|julgado em)\b")
+
+# Distância máxima (caracteres) entre o artigo e o diploma citado depois dele
+_JANELA_DIPLOMA = 60
+
+
+def normalizar_texto(texto: str) -> str:
+    """Minúsculas, sem acentos e com espaços colapsados (base de todas as regex)"""
+    texto = unicodedata.normalize('NFKD', (texto or "").lower())
+    texto = ''.join(c for c in texto if not unicodedata.combining(c))
+    # º/° viram "o" na normalização; padroniza para a marca de número
+    texto = texto.replace('º', 'o').replace('°', 'o')
+    return re.sub(r"[ \t\r\f\v]+", " ", texto)
+
+
+def _numero(texto: str) -> str:
+    """1.795.421 -> 1795421"""
+    return texto.replace('.', '')
+
+
+def _diploma(match: re.Match) -> str:
+    """Chave normalizada de um match de _PADRAO_DIPLOMA"""
+    if match.group('lei'):
+        return f"lei:{_numero(match.group('num_lei'))}"
+    if match.group('num_rn'):
+        return f"rn:{_numero(match.group('num_rn'))}"
+    codigo = _CODIGOS[match.group('codigo')]
+    if codigo == 'lei:13105' and match.group('ano_codigo') in ('73', '1973'):
+        return 'lei:5869'  # CPC/73
+    return codigo
+
+
+def _sigla_solta(match: re.Match) -> bool:
+    """Sigla ambígua sem ano (sozinha, não identifica o diploma)"""
+    return match.group('codigo') in _SIGLAS_AMBIGUAS and not match.group('ano_codigo')
+
+
+def _diploma_do_artigo(texto: str, inicio: int, fim: int) -> tuple:
+    """
+    Diploma citado junto ao artigo: logo depois ("art. 6º, VIII, do CDC")
+    ou logo antes ("CDC, art. 6º")
+    
+    Returns:
+        (chave do diploma ou None, trecho entre o artigo e o diploma, onde fica o §)
+    """
+    cauda = texto[fim:fim + _JANELA_DIPLOMA]
+    # Não atravessa o fim da frase nem outro artigo
+    corte = re.search(r"[;\n]|\.\s+[a-z]{4,}|\b(?:arts?\s*\.|artigos?)\s*\d", cauda)
+    if corte:
+        cauda = cauda[:corte.start()]
+    match = _PADRAO_DIPLOMA.search(cauda)
+    # Sigla ambígua só como complemento direto do artigo ("art. 186, caput, do CC")
+    if match and not (_sigla_solta(match) and not re.search(r"\b(?:do|no)\s*$", cauda[:match.start()])):
+        return _diploma(match), cauda[:match.start()]
+    
+    anterior = texto[max(0, inicio - 25):inicio]
+    ultimo = None
+    for ultimo in _PADRAO_DIPLOMA.finditer(anterior):
+        pass
+    if ultimo and re.fullmatch(r"[\s,(]*", anterior[ultimo.end():]):
+        return _diploma(ultimo), cauda
+    return None, ""
+
+
+def _chaves_artigos(texto: str) -> tuple:
+    """Chaves de artigos ancorados num diploma e total de artigos citados"""
+    chaves = set()
+    total = 0
+    for match in _PADRAO_ARTIGO.finditer(texto):
+        numeros = [
+            _numero(numero.group('num')) + (f"-{numero.group('letra')}" if numero.group('letra') else "")
+            for numero in _PADRAO_NUMERO_ARTIGO.finditer(match.group('numeros'))
+        ]
+        total += len(numeros)
+        
+        base, trecho = _diploma_do_artigo(texto, match.start(), match.end())
+        if base is None:
+            continue  # "art. 4" sem lei identificável: não vira chave
+        
+        # Parágrafo só quando há um único artigo ("art. 10, § 4º, da Lei ...")
+        paragrafo = _PADRAO_PARAGRAFO.search(trecho) if len(numeros) == 1 else None
+        
+        for numero in numeros:
+            chave = f"{base}:art:{numero}"
+            chaves.add(chave)
+            if paragrafo:
+                chaves.add(f"{chave}:par:{paragrafo.group('par')}")
+    return chaves, total
+
+
+def extrair_citacoes(texto: str) -> Dict:
+    """
+    Extrai as citações jurídicas de um texto
+    
+    Args:
+        texto: Texto do chunk ou da petição
+        
+    Returns:
+        Dict com 'chaves' (lista ordenada de chaves normalizadas),
+        'dispositivos' (artigos citados, ancorados ou não) e
+        'precedentes' (súmulas, recursos, temas e processos citados)
+    """
+    texto = normalizar_texto(texto)
+    chaves = {_diploma(match) for match in _PADRAO_DIPLOMA.finditer(texto) if not _sigla_solta(match)}
+    
+    chaves_artigos, dispositivos = _chaves_artigos(texto)
+    # Diploma de cada artigo (inclui siglas ambíguas, qualificadas pelo artigo)
+    chaves |= chaves_artigos | {chave.split(':art:')[0] for chave in chaves_artigos}
+    
+    precedentes = set()
+    for match in _PADRAO_SUMULA.finditer(texto):
+        numeros = re.findall(r"\d+", match.group('numeros'))
+        if match.group('vinculante'):
+            precedentes.update(f"sumula_vinculante:{numero}" for numero in numeros)
+            continue
+        cauda = match.group('cauda')
+        corte = _FIM_CAUDA_SUMULA.search(cauda)
+        tribunal = _TRIBUNAIS.search(cauda[:corte.start()] if corte else cauda)
+        sufixo = f":{tribunal.group(1)}" if tribunal else ""
+        precedentes.update(f"sumula:{numero}{sufixo}" for numero in numeros)
+    for match in _PADRAO_RECURSO.finditer(texto):
+        precedentes.add(f"{match.group('tipo')}:{_numero(match.group('num'))}")
+    for match in _PADRAO_TEMA.finditer(texto):
+        precedentes.add(f"tema:{_numero(match.group('num'))}")
+    for match in _PADRAO_CNJ.finditer(texto):
+        precedentes.add("processo:" + "".join(match.groups()))
+    chaves |= precedentes
+    
+    return {
+        'chaves': sorted(chaves),
+        'dispositivos': dispositivos,
+        'precedentes': len(precedentes) + len(_MARCADORES_PRECEDENTE.findall(texto))
+    }
+
+
+def categorizar(citacoes: Dict, metadata: Optional[Dict] = None) -> str:
+    """
+    Categoria do chunk para o prompt: 'dispositivo', 'precedente' ou 'argumento'
+    
+    Args:
+        citacoes: Retorno de extrair_citacoes
+        metadata: Metadados do chunk (tipo_atomic == 'precedente' conta como precedente)
+    """
+    precedentes = citacoes['precedentes'] + ((metadata or {}).get('tipo_atomic') == 'precedente')
+    if precedentes and precedentes >= citacoes['dispositivos']:
+        return 'precedente'
+    if citacoes['dispositivos']:
+        return 'dispositivo'
+    return 'argumento'
+
+
+def expandir_chave(chave: str) -> List[str]:
+    """Chave e seus prefixos: lei:9656:art:13:par:1 -> [lei:9656, lei:9656:art:13, lei:9656:art:13:par:1]"""
+    partes = chave.split(':')
+    # Primeiro nível tem 2 partes (lei:9656) exceto 'cf'; depois, pares (art:13, par:1, stj)
+    inicio = 1 if partes[0] == 'cf' else 2
+    prefixos = [':'.join(partes[:fim]) for fim in range(inicio, len(partes), 2)]
+    if not prefixos or prefixos[-1] != chave:
+        prefixos.append(chave)
+    return prefixos
+
+
+def _hash(texto: str) -> str:
+    """Hash do conteúdo do chunk (detecta documentos alterados com o mesmo id)"""
+    return hashlib.sha1(texto.encode('utf-8')).hexdigest()
+
+
+class IndiceCitacoes:
+    """Índice invertido persistido: chave de citação -> ids dos chunks"""
+    
+    def __init__(
+        self,
+        collection,
+        vector_store_dir: Optional[Path] = None,
+        diretorio: Optional[Path] = None
+    ):
+        """
+        Args:
+            collection: Collection (ChromaDB ou NumpyVectorStore) com os documentos
+            vector_store_dir: Diretório do vector store (usa Config se None)
+            diretorio: Diretório do índice (usa Config.CITACOES_DIR se None)
+        """
+        self.collection = collection
+        self.vector_store_dir = Path(vector_store_dir or Config.VECTOR_STORE_DIR)
+        self.diretorio = Path(diretorio or Config.CITACOES_DIR) / self.collection.name
+        
+        self._lock = threading.Lock()
+        self._documentos = {}  # id -> {'hash', 'chaves', 'categoria', 'nivel', 'tipo_lit'}
+        self._manifesto = {}
+        self._assinatura = None
+        self._invertido = {}   # chave (e seus prefixos) -> set de ids
+    
+    # ═══════════════════════════════════════════════════════════════════════
+    # Consulta
+    # ═══════════════════════════════════════════════════════════════════════
+    
+    def buscar(
+        self,
+        chaves: List[str],
+        nivel: Optional[int] = None,
+        tipo_caso: Optional[str] = None
+    ) -> List[Dict]:
+        """
+        Chunks que citam as chaves (ou citações mais específicas delas)
+        
+        Uma chave da petição casa com ela mesma e com seus prefixos
+        ("Súmula 608 do STJ" casa com chunks que citam só "Súmula 608");
+        casamentos mais específicos pesam mais.
+        
+        Args:
+            chaves: Chaves normalizadas (ex.: extraídas da petição)
+            nivel: Filtrar por nível (opcional)
+            tipo_caso: Filtrar por tipo_lit (opcional)
+            
+        Returns:
+            Lista de {'id', 'score', 'chaves'} ordenada por score
+        """
+        self.sincronizar()
+        invertido = self._invertido
+        documentos = self._documentos
+        
+        # Chaves do índice (e prefixos) que a consulta alcança -> profundidade
+        alvo = {}
+        for chave in set(chaves):
+            for profundidade, prefixo in enumerate(expandir_chave(chave), start=1):
+                alvo[prefixo] = profundidade
+        
+        casadas = {}
+        for prefixo in alvo:
+            for chunk_id in invertido.get(prefixo, ()):
+                casadas.setdefault(chunk_id, []).append(prefixo)
+        
+        hits = []
+        for chunk_id, prefixos in casadas.items():
+            documento = documentos.get(chunk_id)
+            if documento is None:
+                continue  # removido durante uma atualização concorrente
+            if nivel is not None and documento['nivel'] != nivel:
+                continue
+            if tipo_caso and documento['tipo_lit'] != tipo_caso:
+                continue
+            hits.append({
+                'id': chunk_id,
+                'score': sum(alvo[prefixo] for prefixo in prefixos),
+                'chaves': sorted(prefixos)
+            })
+        
+        hits.sort(key=lambda hit: (-hit['score'], hit['id']))
+        return hits
+    
+    def categorias(self, ids: List[str]) -> Dict[str, Optional[str]]:
+        """Categoria de cada chunk, calculada na indexação (None se não indexado)"""
+        self.sincronizar()
+        documentos = self._documentos
+        return {
+            chunk_id: documentos[chunk_id]['categoria'] if chunk_id in documentos else None
+            for chunk_id in ids
+        }
+    
+    # ═══════════════════════════════════════════════════════════════════════
+    # Atualização
+    # ═══════════════════════════════════════════════════════════════════════
+    
+    def carregado(self) -> bool:
+        """Índice já carregado (pelo primeiro lookup ou por sincronizar)"""
+        return self._assinatura is not None
+    
+    def sincronizar(self):
+        """Carrega o índice e o atualiza se a collection mudou"""
+        assinatura = assinatura_vector_store(self.vector_store_dir, self.collection.name)
+        total = self.collection.count()
+        if self._assinatura == (assinatura, total):
+            return
+        if self._assinatura is not None and (
+            self._lock.locked() or em_gravacao(self.vector_store_dir, self.collection.name)
+        ):
+            return  # Gravação ou atualização em andamento: as buscas seguem com o índice atual
+        
+        with self._lock:
+            if self._assinatura == (assinatura, total):
+                return
+            
+            if self._assinatura is None:
+                self._ler_disco()
+                if self._manifesto.get('assinatura') == assinatura and len(self._documentos) == total:
+                    self._inverter()
+                    self._assinatura = (assinatura, total)
+                    return
+            
+            self._sincronizar_collection()
+            self._assinatura = (assinatura, total)
+            self._salvar(assinatura)
+    
+    def _sincronizar_collection(self):
+        """Re-extrai só os chunks novos ou alterados e remove os excluídos"""
+        todos = self.collection.get(include=['documents', 'metadatas'])
+        
+        novos, alterados = 0, 0
+        presentes = set()
+        for chunk_id, documento, meta in zip(todos['ids'], todos['documents'], todos['metadatas']):
+            presentes.add(chunk_id)
+            documento = documento or ""
+            atual = self._documentos.get(chunk_id)
+            if atual is not None and atual['hash'] == _hash(documento):
+                continue
+            novos += atual is None
+            alterados += atual is not None
+            self._indexar(chunk_id, documento, meta)
+        
+        removidos = [chunk_id for chunk_id in self._documentos if chunk_id not in presentes]
+        for chunk_id in removidos:
+            del self._documentos[chunk_id]
+        
+        if novos or alterados or removidos:
+            print(f"⚖️  Índice de citações atualizado: {novos} novos, {alterados} alterados, {len(removidos)} removidos")
+        self._inverter()
+    
+    def atualizar(self, ids: List[str], documentos: List[str], metadatas: List[Dict]):
+        """Indexa (ou re-indexa) chunks explicitamente, sem reler a collection"""
+        with self._lock:
+            for chunk_id, documento, meta in zip(ids, documentos, metadatas):
+                self._indexar(chunk_id, documento or "", meta)
+            self._inverter()
+    
+    def remover(self, ids: List[str]):
+        """Remove chunks do índice"""
+        with self._lock:
+            for chunk_id in ids:
+                self._documentos.pop(chunk_id, None)
+            self._inverter()
+    
+    def _indexar(self, chunk_id: str, documento: str, meta: Dict):
+        """Extrai citações e categoria de um chunk"""
+        meta = meta or {}
+        citacoes = extrair_citacoes(documento)
+        self._documentos[chunk_id] = {
+            'hash': _hash(documento),
+            'chaves': citacoes['chaves'],
+            'categoria': categorizar(citacoes, meta),
+            'nivel': meta.get('nivel'),
+            'tipo_lit': meta.get('tipo_lit')
+        }
+    
+    def _inverter(self):
+        """Monta o índice invertido (cada chave registrada também nos seus prefixos)"""
+        invertido = {}
+        for chunk_id, documento in self._documentos.items():
+            for chave in documento['chaves']:
+                for prefixo in expandir_chave(chave):
+                    invertido.setdefault(prefixo, set()).add(chunk_id)
+        # Troca da referência é atômica: buscas concorrentes veem o índice antigo ou o novo
+        self._invertido = invertido
+    
+    # ═══════════════════════════════════════════════════════════════════════
+    # Persistência
+    # ═══════════════════════════════════════════════════════════════════════
+    
+    def _ler_disco(self):
+        """Lê índice e manifesto persistidos (se existirem)"""
+        self._manifesto = {}
+        indice = self.diretorio / ARQUIVO_INDICE
+        manifesto = self.diretorio / ARQUIVO_MANIFESTO
+        if indice.exists() and manifesto.exists():
+            self._manifesto = json.loads(manifesto.read_text(encoding='utf-8'))
+            if self._manifesto.get('versao_extrator') == VERSAO_EXTRATOR:
+                self._documentos = json.loads(indice.read_text(encoding='utf-8'))
+            else:
+                self._manifesto = {}
+    
+    def _salvar(self, assinatura: str):
+        """Persiste índice e manifesto (manifesto por último)"""
+        self.diretorio.mkdir(parents=True, exist_ok=True)
+        (self.diretorio / ARQUIVO_INDICE).write_text(
+            json.dumps(self._documentos, ensure_ascii=False),
+            encoding='utf-8'
+        )
+        self._manifesto = {
+            'assinatura': assinatura,
+            'versao_extrator': VERSAO_EXTRATOR,
+            'total_chunks': len(self._documentos),
+            'chaves': len(self._invertido)
+        }
+        (self.diretorio / ARQUIVO_MANIFESTO).write_text(
+            json.dumps(self._manifesto, ensure_ascii=False, indent=2),
+            encoding='utf-8'
+        )
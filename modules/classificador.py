@@ -0,0 +1,299 @@
+"""
+═══════════════════════════════════════════════════════════════════════════
+CLASSIFICADOR DE TIPO DE CASO - CENTROIDES PRÉ-COMPUTADOS
+═══════════════════════════════════════════════════════════════════════════
+Classifica a petição por similaridade com protótipos (centroides
+normalizados) de cada tipo de Config.TIPOS_CASO, calculados a partir dos
+embeddings armazenados. A classificação é um único produto
+matriz-vetor, sem busca vetorial na collection.
+
+Os centroides ficam em disco ao lado do vector store e são recalculados
+quando a collection muda (assinatura dos arquivos ou total de chunks).
+"""
+
+import json
+import threading
+from pathlib import Path
+from typing import Dict, List, Optional
+
+import numpy as np
+
+from config.settings import Config
+from modules.vector_backend import assinatura_vector_store, em_gravacao
+
+ARQUIVO_CENTROIDES = "centroides.npz"
+ARQUIVO_MANIFESTO = "manifesto.json"
+
+# Temperaturas avaliadas na calibração (softmax sobre similaridades de cosseno)
+TEMPERATURAS_CALIBRACAO = np.logspace(-3, 0, 61)
+
+
+class ClassificadorCentroides:
+    """Classificação de tipo de caso por protótipos normalizados"""
+    
+    def __init__(
+        self,
+        collection,
+        vector_store_dir: Optional[Path] = None,
+        diretorio: Optional[Path] = None,
+        prototipos: Optional[int] = None,
+        temperatura: Optional[float] = None
+    ):
+        """
+        Args:
+            collection: Collection (ChromaDB ou NumpyVectorStore) com os embeddings
+            vector_store_dir: Diretório do vector store (usa Config se None)
+            diretorio: Diretório dos centroides (usa Config.CLASSIFICADOR_DIR se None)
+            prototipos: Protótipos por tipo (usa Config.CLASSIFICADOR_PROTOTIPOS se None)
+            temperatura: Temperatura do softmax (usa Config; calibrada se None em ambos)
+        """
+        self.collection = collection
+        self.vector_store_dir = Path(vector_store_dir or Config.VECTOR_STORE_DIR)
+        self.diretorio = Path(diretorio or Config.CLASSIFICADOR_DIR) / self.collection.name
+        self.prototipos = prototipos or Config.CLASSIFICADOR_PROTOTIPOS
+        self.temperatura_fixa = temperatura if temperatura is not None else Config.CLASSIFICADOR_TEMPERATURA
+        
+        self._lock = threading.Lock()
+        self._estado = None
+    
+    # ═══════════════════════════════════════════════════════════════════════
+    # Classificação
+    # ═══════════════════════════════════════════════════════════════════════
+    
+    def classificar(self, query_embedding: List[float]) -> Dict:
+        """
+        Classifica o tipo de caso da query
+        
+        Args:
+            query_embedding: Embedding (normalizado) da petição inicial
+            
+        Returns:
+            Dict com tipo_caso, confiança (probabilidade do softmax) e distribuição
+        """
+        return self.classificar_lote([query_embedding])[0]
+    
+    def classificar_lote(self, query_embeddings: List[List[float]]) -> List[Dict]:
+        """Classifica várias queries com um único produto matricial"""
+        estado = self.carregar()
+        if not estado['tipos']:
+            return [{'tipo_caso': None, 'confianca': 0.0, 'distribuicao': {}} for _ in query_embeddings]
+        
+        queries = _normalizar(np.asarray(query_embeddings, dtype=np.float32).reshape(len(query_embeddings), -1))
+        
+        scores = self._scores_por_tipo(estado, queries @ estado['centroides'].T)
+        probabilidades = _softmax(scores, estado['temperatura'])
+        
+        classificacoes = []
+        for linha in probabilidades:
+            distribuicao = {tipo: float(prob) for tipo, prob in zip(estado['tipos'], linha)}
+            tipo_identificado = max(distribuicao, key=distribuicao.get)
+            classificacoes.append({
+                'tipo_caso': tipo_identificado,
+                'confianca': distribuicao[tipo_identificado],
+                'distribuicao': distribuicao
+            })
+        
+        return classificacoes
+    
+    @staticmethod
+    def _scores_por_tipo(estado: Dict, similaridades: np.ndarray) -> np.ndarray:
+        """Score de cada tipo: maior similaridade entre seus protótipos"""
+        scores = np.full((similaridades.shape[0], len(estado['tipos'])), -np.inf, dtype=np.float32)
+        for coluna, indice_tipo in enumerate(estado['indice_tipo']):
+            scores[:, indice_tipo] = np.maximum(scores[:, indice_tipo], similaridades[:, coluna])
+        return scores
+    
+    # ═══════════════════════════════════════════════════════════════════════
+    # Persistência
+    # ═══════════════════════════════════════════════════════════════════════
+    
+    def carregado(self) -> bool:
+        """Centroides já em memória (pela primeira classificação ou por carregar)"""
+        return self._estado is not None
+    
+    def carregar(self) -> Dict:
+        """Retorna os centroides, recalculando se a collection mudou"""
+        assinatura = assinatura_vector_store(self.vector_store_dir, self.collection.name)
+        total = self.collection.count()
+        
+        estado = self._estado
+        if estado is not None and self._atualizado(estado['manifesto'], assinatura, total):
+            return estado
+        if estado is not None and (
+            self._lock.locked() or em_gravacao(self.vector_store_dir, self.collection.name)
+        ):
+            return estado  # Gravação ou recálculo em andamento: usa os centroides atuais
+        
+        with self._lock:
+            if self._estado is not None and self._atualizado(self._estado['manifesto'], assinatura, total):
+                return self._estado
+            
+            estado = self._ler_disco()
+            if estado is None or not self._atualizado(estado['manifesto'], assinatura, total):
+                estado = self.construir(assinatura, total)
+            
+            self._estado = estado
+            return estado
+    
+    def _atualizado(self, manifesto: Dict, assinatura: str, total: int) -> bool:
+        """Verifica se os centroides correspondem à collection e à configuração atuais"""
+        return (
+            manifesto.get('assinatura') == assinatura
+            and manifesto.get('total_chunks') == total
+            and manifesto.get('prototipos') == self.prototipos
+            and manifesto.get('temperatura_fixa') == self.temperatura_fixa
+            and manifesto.get('tipos_config') == sorted(Config.TIPOS_CASO)
+        )
+    
+    def _ler_disco(self) -> Optional[Dict]:
+        """Lê centroides persistidos (None se ausentes)"""
+        manifesto_path = self.diretorio / ARQUIVO_MANIFESTO
+        centroides_path = self.diretorio / ARQUIVO_CENTROIDES
+        if not manifesto_path.exists() or not centroides_path.exists():
+            return None
+        
+        manifesto = json.loads(manifesto_path.read_text(encoding='utf-8'))
+        with np.load(centroides_path) as dados:
+            return {
+                'manifesto': manifesto,
+                'tipos': manifesto['tipos'],
+                'temperatura': manifesto['temperatura'],
+                'centroides': dados['centroides'],
+                'indice_tipo': dados['indice_tipo']
+            }
+    
+    def construir(self, assinatura: str = "", total: Optional[int] = None) -> Dict:
+        """
+        Calcula e persiste os centroides a partir dos embeddings armazenados
+        
+        Usa os chunks de nível 1 de cada tipo; tipos sem chunks de nível 1
+        usam todos os seus chunks (os níveis 2 e 3 também carregam tipo_lit).
+        """
+        print(f"🧭 Calculando centroides de classificação ({self.prototipos} protótipo(s) por tipo)...")
+        tipos_config = sorted(Config.TIPOS_CASO)
+        
+        dados = self.collection.get(
+            where={'tipo_lit': {'$in': tipos_config}},
+            include=['embeddings', 'metadatas']
+        )
+        vetores = np.asarray(dados['embeddings'], dtype=np.float32).reshape(len(dados['ids']), -1)
+        vetores = _normalizar(vetores) if len(vetores) else np.empty((0, Config.EMBEDDING_DIM), dtype=np.float32)
+        rotulos = np.array([meta.get('tipo_lit') for meta in dados['metadatas']])
+        niveis = np.array([meta.get('nivel') for meta in dados['metadatas']])
+        
+        tipos, centroides, indice_tipo, origem = [], [], [], {}
+        for tipo in tipos_config:
+            do_tipo = rotulos == tipo
+            if not do_tipo.any():
+                continue
+            
+            nivel_1 = do_tipo & (niveis == 1)
+            selecionados = nivel_1 if nivel_1.any() else do_tipo
+            origem[tipo] = 'nivel_1' if nivel_1.any() else 'todos_niveis'
+            
+            for prototipo in _kmeans_esferico(vetores[selecionados], self.prototipos):
+                centroides.append(prototipo)
+                indice_tipo.append(len(tipos))
+            tipos.append(tipo)
+        
+        centroides = (
+            np.vstack(centroides).astype(np.float32) if centroides
+            else np.empty((0, vetores.shape[1]), dtype=np.float32)
+        )
+        indice_tipo = np.array(indice_tipo, dtype=np.int64)
+        
+        estado = {'tipos': tipos, 'centroides': centroides, 'indice_tipo': indice_tipo}
+        
+        # Temperatura: fixa (Config) ou calibrada nos chunks rotulados
+        if self.temperatura_fixa is not None:
+            temperatura = float(self.temperatura_fixa)
+        else:
+            temperatura = self._calibrar_temperatura(estado, vetores, rotulos)
+        
+        estado['temperatura'] = temperatura
+        estado['manifesto'] = {
+            'assinatura': assinatura,
+            'total_chunks': total if total is not None else self.collection.count(),
+            'prototipos': self.prototipos,
+            'temperatura_fixa': self.temperatura_fixa,
+            'tipos_config': tipos_config,
+            'tipos': tipos,
+            'origem': origem,
+            'temperatura': temperatura
+        }
+        
+        self.diretorio.mkdir(parents=True, exist_ok=True)
+        np.savez(self.diretorio / ARQUIVO_CENTROIDES, centroides=centroides, indice_tipo=indice_tipo)
+        # Manifesto por último: só é gravado com os centroides completos
+        (self.diretorio / ARQUIVO_MANIFESTO).write_text(
+            json.dumps(estado['manifesto'], ensure_ascii=False, indent=2),
+            encoding='utf-8'
+        )
+        
+        print(f"✅ Centroides prontos: {len(tipos)} tipos, temperatura {temperatura:.4f}")
+        return estado
+    
+    def _calibrar_temperatura(self, estado: Dict, vetores: np.ndarray, rotulos: np.ndarray) -> float:
+        """Escolhe a temperatura que minimiza a log-verossimilhança negativa nos chunks rotulados"""
+        if len(estado['tipos']) < 2:
+            return 1.0
+        
+        posicao = {tipo: i for i, tipo in enumerate(estado['tipos'])}
+        conhecidos = np.array([rotulo in posicao for rotulo in rotulos])
+        alvo = np.array([posicao[rotulo] for rotulo in rotulos[conhecidos]])
+        scores = self._scores_por_tipo(estado, vetores[conhecidos] @ estado['centroides'].T)
+        
+        melhor, menor_perda = 1.0, np.inf
+        for temperatura in TEMPERATURAS_CALIBRACAO:
+            probabilidades = _softmax(scores, temperatura)
+            perda = -np.mean(np.log(np.clip(probabilidades[np.arange(len(alvo)), alvo], 1e-12, None)))
+            if perda < menor_perda:
+                melhor, menor_perda = float(temperatura), perda
+        
+        return melhor
+
+
+def _normalizar(vetores: np.ndarray) -> np.ndarray:
+    """Normaliza linhas (L2)"""
+    normas = np.linalg.norm(vetores, axis=1, keepdims=True)
+    return vetores / np.clip(normas, 1e-12, None)
+
+
+def _softmax(scores: np.ndarray, temperatura: float) -> np.ndarray:
+    """Softmax por linha com temperatura"""
+    logits = scores / max(temperatura, 1e-6)
+    logits = logits - logits.max(axis=1, keepdims=True)
+    exp = np.exp(logits)
+    return exp / exp.sum(axis=1, keepdims=True)
+
+
+def _kmeans_esferico(vetores: np.ndarray, k: int, iteracoes: int = 20) -> np.ndarray:
+    """
+    Agrupa vetores normalizados em até k protótipos (k-means por cosseno)
+    
+    Inicialização determinística (ponto mais distante), para que o mesmo
+    conjunto de vetores gere sempre os mesmos centroides.
+    """
+    k = max(1, min(k, len(vetores)))
+    media = _normalizar(vetores.mean(axis=0, keepdims=True))
+    if k == 1:
+        return media
+    
+    indices = [int(np.argmin(vetores @ media[0]))]
+    while len(indices) < k:
+        proximidade = (vetores @ vetores[indices].T).max(axis=1)
+        indices.append(int(np.argmin(proximidade)))
+    centroides = vetores[indices].copy()
+    
+    for _ in range(iteracoes):
+        atribuicao = np.argmax(vetores @ centroides.T, axis=1)
+        novos = np.vstack([
+            vetores[atribuicao == i].mean(axis=0) if (atribuicao == i).any() else centroides[i]
+            for i in range(k)
+        ])
+        novos = _normalizar(novos)
+        if np.allclose(novos, centroides, atol=1e-6):
+            break
+        centroides = novos
+    
+    return centroides
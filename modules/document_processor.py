@@ -11,6 +11,9 @@ from typing import Dict, List, Optional
 import PyPDF2
 import docx
 
+from config.settings import Config
+from modules.janelas import segmentar_janelas, selecionar_janelas
+
 class ProcessadorPeticao:
     """Processa petição inicial e extrai informações estruturadas"""
     
@@ -246,3 +249,32 @@ class ProcessadorPeticao:
             texto_embedding = texto_embedding[:2000]
         
         return texto_embedding
+    
+    def get_janelas_para_embedding(
+        self,
+        max_janelas: Optional[int] = None,
+        tamanho: Optional[int] = None,
+        sobreposicao: Optional[int] = None
+    ) -> List[str]:
+        """
+        Retorna janelas de passagem cobrindo a petição inteira (consulta multi-vetor)
+        
+        A janela 0 é o resumo estruturado de get_texto_para_embedding; as
+        demais são trechos do texto completo, igualmente espaçados quando
+        a petição tem mais janelas que o limite.
+        
+        Args:
+            max_janelas: Máximo de janelas, incluindo o resumo (usa Config se None)
+            tamanho: Caracteres por janela (usa Config se None)
+            sobreposicao: Caracteres repetidos entre janelas vizinhas (usa Config se None)
+        """
+        max_janelas = max_janelas or Config.MULTIJANELA_MAX_JANELAS
+        tamanho = tamanho or Config.MULTIJANELA_TAMANHO
+        sobreposicao = sobreposicao if sobreposicao is not None else Config.MULTIJANELA_SOBREPOSICAO
+        
+        resumo = self.get_texto_para_embedding()
+        passagens = segmentar_janelas(self.texto_completo, tamanho, sobreposicao)
+        
+        janelas = [resumo] if resumo else []
+        janelas.extend(selecionar_janelas(passagens, max_janelas - len(janelas)))
+        return janelas
@@ -0,0 +1,435 @@
+"""
+═══════════════════════════════════════════════════════════════════════════
+DETECÇÃO DE PETIÇÕES QUASE DUPLICADAS (MINHASH + LSH)
+═══════════════════════════════════════════════════════════════════════════
+Boa parte das petições recebidas são cópias de um modelo com nomes, datas
+e valores trocados. Cada petição processada entra num índice MinHash
+(shingles de palavras, dígitos normalizados) persistido em SQLite junto
+com a contestação gerada e o contexto usado. Uma petição nova cuja
+similaridade de Jaccard estimada com uma anterior passa do limiar pode
+reaproveitar aquela contestação, com substituição dos campos da petição
+(partes, número do processo, valor da causa), em vez de uma geração
+completa.
+
+Busca por LSH: a assinatura é dividida em bandas; por banda, um array
+ordenado de chaves (hash das linhas da banda) é consultado por busca
+binária. Só os candidatos que colidem em alguma banda têm a similaridade
+estimada.
+"""
+
+import hashlib
+import json
+import re
+import sqlite3
+import threading
+import time
+import unicodedata
+import zlib
+from pathlib import Path
+from typing import Dict, List, Optional, Tuple
+
+import numpy as np
+
+from config.settings import Config
+
+# Primo de Mersenne 2^31 - 1: (a * x + b) cabe em uint64 para x < 2^32
+PRIMO = (1 << 31) - 1
+# Base do hash polinomial que combina as palavras de um shingle
+BASE_SHINGLE = np.uint64(1099511628211)
+_DIGITOS_ZERO = str.maketrans('123456789', '000000000')
+
+# Campos da petição trocados na contestação reaproveitada
+CAMPOS_SUBSTITUIVEIS = ('autor', 'reu', 'numero_processo', 'valor_causa')
+NAO_IDENTIFICADO = "Não identificado"
+
+
+def normalizar_texto(texto: str) -> List[str]:
+    """Palavras do texto sem acentos, em minúsculas e com dígitos trocados por 0"""
+    texto = unicodedata.normalize('NFKD', texto or "").encode('ascii', 'ignore').decode('ascii')
+    return re.findall(r'[a-z0-9_]+', texto.lower().translate(_DIGITOS_ZERO))
+
+
+def shingles(texto: str, tamanho: int) -> np.ndarray:
+    """Hashes de 32 bits dos shingles de `tamanho` palavras consecutivas, sem repetição"""
+    palavras = normalizar_texto(texto)
+    if not palavras:
+        return np.zeros(0, dtype=np.uint64)
+    
+    # crc32 de cada palavra, combinado por hash polinomial (mod 2^64) em cada janela
+    vocabulario = {palavra: zlib.crc32(palavra.encode('ascii')) for palavra in set(palavras)}
+    codigos = np.fromiter(map(vocabulario.__getitem__, palavras), dtype=np.uint64, count=len(palavras))
+    total = max(1, len(codigos) - tamanho + 1)
+    hashes = np.zeros(total, dtype=np.uint64)
+    with np.errstate(over='ignore'):
+        for deslocamento in range(min(tamanho, len(codigos))):
+            hashes = hashes * BASE_SHINGLE + codigos[deslocamento:deslocamento + total]
+    return np.unique((hashes ^ (hashes >> np.uint64(32))) & np.uint64(0xFFFFFFFF))
+
+
+def _paragrafos(texto: str) -> List[Tuple[str, str]]:
+    """(parágrafo, hash curto do parágrafo normalizado) dos parágrafos não vazios"""
+    resultado = []
+    for paragrafo in re.split(r'\n\s*\n', texto or ""):
+        palavras = normalizar_texto(paragrafo)
+        if palavras:
+            resultado.append((paragrafo.strip(), hashlib.sha1(' '.join(palavras).encode('utf-8')).hexdigest()[:12]))
+    return resultado
+
+
+def hashes_paragrafos(texto: str) -> List[str]:
+    """Hash de cada parágrafo normalizado (guardado no lugar do texto da petição)"""
+    return [hash_paragrafo for _, hash_paragrafo in _paragrafos(texto)]
+
+
+def paragrafos_divergentes(texto: str, hashes_anteriores: List[str]) -> List[str]:
+    """Parágrafos do texto que não existem (normalizados) na petição anterior"""
+    anteriores = set(hashes_anteriores)
+    return [paragrafo for paragrafo, hash_paragrafo in _paragrafos(texto) if hash_paragrafo not in anteriores]
+
+
+def substituir_campos(
+    contestacao: str,
+    dados_anteriores: Dict,
+    dados_novos: Dict
+) -> Tuple[str, List[Dict]]:
+    """
+    Troca na contestação os campos da petição anterior pelos da nova
+    
+    Substitui o valor exato e a versão em maiúsculas (nomes de partes
+    costumam aparecer em caixa alta na qualificação).
+    
+    Returns:
+        (contestação ajustada, lista de {'campo', 'de', 'para', 'ocorrencias'})
+    """
+    substituicoes = []
+    for campo in CAMPOS_SUBSTITUIVEIS:
+        anterior = (dados_anteriores.get(campo) or "").strip()
+        novo = (dados_novos.get(campo) or "").strip()
+        if not anterior or not novo or anterior == novo or NAO_IDENTIFICADO in (anterior, novo):
+            continue
+        
+        pares = [(anterior, novo)]
+        if anterior.upper() != anterior:
+            pares.append((anterior.upper(), novo.upper()))
+        ocorrencias = 0
+        for de, para in pares:
+            ocorrencias += contestacao.count(de)
+            contestacao = contestacao.replace(de, para)
+        substituicoes.append({'campo': campo, 'de': anterior, 'para': novo, 'ocorrencias': ocorrencias})
+    return contestacao, substituicoes
+
+
+def compactar_contexto(contexto: Dict) -> Dict:
+    """Contexto sem o texto dos chunks (recarregado por id com RAGRetriever.carregar_conteudo)"""
+    def compactar(chunk: Dict) -> Dict:
+        return {chave: valor for chave, valor in chunk.items() if chave not in ('conteudo', 'trechos')}
+    
+    compacto = {}
+    for chave, valor in contexto.items():
+        if chave == 'por_pedido':
+            # Contexto por pedido é recuperado de novo (pedidos mudam entre petições)
+            continue
+        compacto[chave] = [compactar(chunk) for chunk in valor] if isinstance(valor, list) else valor
+    return compacto
+
+
+def _json_padrao(valor):
+    """Serialização JSON de tipos numpy presentes nos chunks"""
+    if isinstance(valor, np.generic):
+        return valor.item()
+    if isinstance(valor, np.ndarray):
+        return valor.tolist()
+    raise TypeError(f"Tipo não serializável: {type(valor).__name__}")
+
+
+class IndiceDuplicatas:
+    """Petições processadas: assinaturas MinHash com LSH em memória, registros em SQLite"""
+    
+    def __init__(
+        self,
+        diretorio: Optional[Path] = None,
+        permutacoes: Optional[int] = None,
+        bandas: Optional[int] = None,
+        tamanho_shingle: Optional[int] = None
+    ):
+        """
+        Args:
+            diretorio: Diretório do índice (usa Config.DUPLICATAS_DIR se None)
+            permutacoes: Tamanho da assinatura MinHash (usa Config se None)
+            bandas: Bandas do LSH; permutacoes precisa ser múltiplo (usa Config se None)
+            tamanho_shingle: Palavras por shingle (usa Config se None)
+        """
+        self.diretorio = Path(diretorio or Config.DUPLICATAS_DIR)
+        self.permutacoes = permutacoes or Config.DUPLICATAS_PERMUTACOES
+        self.bandas = bandas or Config.DUPLICATAS_BANDAS
+        self.tamanho_shingle = tamanho_shingle or Config.DUPLICATAS_SHINGLE
+        if self.permutacoes % self.bandas:
+            raise ValueError(f"permutacoes ({self.permutacoes}) deve ser múltiplo de bandas ({self.bandas})")
+        self.linhas = self.permutacoes // self.bandas
+        # Assinaturas só são comparáveis com as mesmas permutações e shingles
+        self.parametros = f"{self.permutacoes}x{self.tamanho_shingle}"
+        
+        # Permutações a*x + b mod PRIMO fixas: assinaturas persistidas continuam comparáveis
+        rng = np.random.default_rng(20240601)
+        self._a = rng.integers(1, PRIMO, self.permutacoes, dtype=np.uint64)
+        self._b = rng.integers(0, PRIMO, self.permutacoes, dtype=np.uint64)
+        # Multiplicadores ímpares que combinam as linhas de uma banda numa chave uint64
+        self._mistura = rng.integers(1, 2**63, self.linhas, dtype=np.uint64) | np.uint64(1)
+        
+        self._lock = threading.Lock()
+        # (ids [N], assinaturas [N, P], chaves ordenadas [B, N], posições [B, N])
+        self._estado = self._montar_estado(np.zeros(0, dtype=np.int64), np.zeros((0, self.permutacoes), dtype=np.uint32))
+        
+        # Contadores
+        self.consultas = 0
+        self.encontradas = 0
+        self._tempo_busca = 0.0
+        
+        self.diretorio.mkdir(parents=True, exist_ok=True)
+        self._conexao = sqlite3.connect(
+            str(self.diretorio / "peticoes.sqlite3"),
+            check_same_thread=False
+        )
+        # Assinatura antes dos textos: a carga do índice não lê as contestações
+        self._conexao.execute(
+            """
+            CREATE TABLE IF NOT EXISTS peticoes (
+                id INTEGER PRIMARY KEY AUTOINCREMENT,
+                parametros TEXT NOT NULL,
+                assinatura BLOB NOT NULL,
+                criado REAL NOT NULL,
+                arquivo TEXT,
+                paragrafos TEXT NOT NULL,
+                dados TEXT NOT NULL,
+                contestacao TEXT NOT NULL,
+                contexto TEXT NOT NULL,
+                metadados TEXT NOT NULL
+            )
+            """
+        )
+        self._conexao.commit()
+        self._carregar()
+    
+    def __len__(self) -> int:
+        return len(self._estado[0])
+    
+    # ═══════════════════════════════════════════════════════════════════════
+    # Assinaturas
+    # ═══════════════════════════════════════════════════════════════════════
+    
+    def assinatura(self, texto: str) -> np.ndarray:
+        """Assinatura MinHash (uint32 [permutacoes]) do texto"""
+        hashes = shingles(texto, self.tamanho_shingle)
+        if not len(hashes):
+            return np.full(self.permutacoes, PRIMO, dtype=np.uint32)
+        
+        assinatura = np.full(self.permutacoes, PRIMO, dtype=np.uint64)
+        # Blocos de shingles: limita a matriz intermediária em petições longas
+        for inicio in range(0, len(hashes), 4096):
+            bloco = hashes[inicio:inicio + 4096, None]
+            np.minimum(assinatura, ((bloco * self._a + self._b) % PRIMO).min(axis=0), out=assinatura)
+        return assinatura.astype(np.uint32)
+    
+    def _chaves_bandas(self, assinaturas: np.ndarray) -> np.ndarray:
+        """Chave uint64 de cada banda (uint64 [B, N])"""
+        bandas = assinaturas.astype(np.uint64).reshape(len(assinaturas), self.bandas, self.linhas)
+        # Produto com overflow (mod 2^64) intencional
+        with np.errstate(over='ignore'):
+            return (bandas * self._mistura).sum(axis=2, dtype=np.uint64).T
+    
+    def _montar_estado(self, ids: np.ndarray, assinaturas: np.ndarray) -> Tuple:
+        """Arrays ordenados por chave em cada banda (busca binária no LSH)"""
+        chaves = self._chaves_bandas(assinaturas)
+        ordem = np.argsort(chaves, axis=1, kind='stable')
+        return ids, assinaturas, np.take_along_axis(chaves, ordem, axis=1), ordem
+    
+    # ═══════════════════════════════════════════════════════════════════════
+    # Consulta
+    # ═══════════════════════════════════════════════════════════════════════
+    
+    def candidatos(self, assinatura: np.ndarray) -> np.ndarray:
+        """Posições das petições que colidem com a assinatura em ao menos uma banda"""
+        _, _, chaves, ordem = self._estado
+        if not chaves.shape[1]:
+            return np.zeros(0, dtype=np.int64)
+        
+        consulta = self._chaves_bandas(assinatura[None, :])[:, 0]
+        encontrados = []
+        for banda in range(self.bandas):
+            inicio = np.searchsorted(chaves[banda], consulta[banda], side='left')
+            fim = np.searchsorted(chaves[banda], consulta[banda], side='right')
+            if fim > inicio:
+                encontrados.append(ordem[banda, inicio:fim])
+        if not encontrados:
+            return np.zeros(0, dtype=np.int64)
+        return np.unique(np.concatenate(encontrados))
+    
+    def buscar(self, assinatura: np.ndarray, limiar: Optional[float] = None) -> Optional[Dict]:
+        """
+        Petição anterior mais parecida, se a similaridade estimada passar do limiar
+        
+        Args:
+            assinatura: Assinatura MinHash da petição nova
+            limiar: Jaccard estimado mínimo (usa Config.DUPLICATAS_LIMIAR se None)
+            
+        Returns:
+            Registro da petição anterior (dados, contestação, contexto...) com
+            'similaridade', ou None
+        """
+        limiar = limiar if limiar is not None else Config.DUPLICATAS_LIMIAR
+        inicio = time.perf_counter()
+        
+        ids, assinaturas, _, _ = self._estado
+        candidatos = self.candidatos(assinatura)
+        melhor = None
+        if len(candidatos):
+            similaridades = (assinaturas[candidatos] == assinatura).mean(axis=1)
+            indice = int(np.argmax(similaridades))
+            if similaridades[indice] >= limiar:
+                melhor = (int(ids[candidatos[indice]]), float(similaridades[indice]))
+        
+        registro = None
+        if melhor is not None:
+            registro = self.registro(melhor[0])
+            registro['similaridade'] = melhor[1]
+        
+        with self._lock:
+            self.consultas += 1
+            self.encontradas += registro is not None
+            self._tempo_busca += time.perf_counter() - inicio
+        return registro
+    
+    def registro(self, peticao_id: int) -> Dict:
+        """Petição guardada: dados, contestação, contexto compacto e metadados"""
+        with self._lock:
+            linha = self._conexao.execute(
+                """
+                SELECT id, criado, arquivo, paragrafos, dados, contestacao, contexto, metadados
+                FROM peticoes WHERE id = ?
+                """,
+                (peticao_id,)
+            ).fetchone()
+        if linha is None:
+            raise KeyError(f"Petição {peticao_id} não encontrada no índice de duplicatas")
+        return {
+            'id': linha[0],
+            'criado': linha[1],
+            'arquivo': linha[2],
+            'paragrafos': json.loads(linha[3]),
+            'dados_peticao': json.loads(linha[4]),
+            'contestacao': linha[5],
+            'contexto': json.loads(linha[6]),
+            'metadados': json.loads(linha[7])
+        }
+    
+    # ═══════════════════════════════════════════════════════════════════════
+    # Atualização
+    # ═══════════════════════════════════════════════════════════════════════
+    
+    def adicionar(
+        self,
+        assinatura: np.ndarray,
+        dados_peticao: Dict,
+        contestacao: str,
+        contexto: Dict,
+        metadados: Dict,
+        arquivo: Optional[str] = None
+    ) -> int:
+        """Guarda uma petição processada com a contestação gerada e o contexto usado"""
+        return self.adicionar_lote([{
+            'assinatura': assinatura,
+            'dados_peticao': dados_peticao,
+            'contestacao': contestacao,
+            'contexto': contexto,
+            'metadados': metadados,
+            'arquivo': arquivo
+        }])[0]
+    
+    def adicionar_lote(self, registros: List[Dict]) -> List[int]:
+        """
+        Guarda várias petições numa transação (importação de histórico)
+        
+        Args:
+            registros: Dicts com 'assinatura', 'dados_peticao', 'contestacao',
+                'contexto', 'metadados' e opcionalmente 'arquivo'
+        """
+        linhas = []
+        for registro in registros:
+            dados = dict(registro['dados_peticao'])
+            texto = dados.pop('texto_completo', "")
+            linhas.append((
+                self.parametros,
+                np.asarray(registro['assinatura'], dtype=np.uint32).tobytes(),
+                time.time(),
+                registro.get('arquivo'),
+                json.dumps(hashes_paragrafos(texto)),
+                json.dumps(dados, ensure_ascii=False, default=_json_padrao),
+                registro['contestacao'],
+                json.dumps(compactar_contexto(registro['contexto']), ensure_ascii=False, default=_json_padrao),
+                json.dumps(registro['metadados'], ensure_ascii=False, default=_json_padrao)
+            ))
+        
+        with self._lock:
+            cursor = self._conexao.cursor()
+            ids = []
+            for linha in linhas:
+                cursor.execute(
+                    """
+                    INSERT INTO peticoes
+                        (parametros, assinatura, criado, arquivo, paragrafos, dados, contestacao, contexto, metadados)
+                    VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)
+                    """,
+                    linha
+                )
+                ids.append(cursor.lastrowid)
+            self._conexao.commit()
+            
+            novas = np.stack([np.asarray(r['assinatura'], dtype=np.uint32) for r in registros])
+            self._inserir_estado(np.asarray(ids, dtype=np.int64), novas)
+        return ids
+    
+    def _inserir_estado(self, ids: np.ndarray, assinaturas: np.ndarray):
+        """Insere assinaturas no LSH mantendo as bandas ordenadas (chamar com o lock)"""
+        atuais, todas, chaves, ordem = self._estado
+        posicoes = np.arange(len(atuais), len(atuais) + len(ids))
+        novas_chaves = self._chaves_bandas(assinaturas)
+        
+        bandas_chaves, bandas_ordem = [], []
+        for banda in range(self.bandas):
+            ordem_nova = np.argsort(novas_chaves[banda], kind='stable')
+            chaves_banda = novas_chaves[banda][ordem_nova]
+            onde = np.searchsorted(chaves[banda], chaves_banda, side='right')
+            bandas_chaves.append(np.insert(chaves[banda], onde, chaves_banda))
+            bandas_ordem.append(np.insert(ordem[banda], onde, posicoes[ordem_nova]))
+        
+        # Troca da referência é atômica: buscas concorrentes veem o índice antigo ou o novo
+        self._estado = (
+            np.concatenate([atuais, ids]),
+            np.concatenate([todas, assinaturas]),
+            np.stack(bandas_chaves),
+            np.stack(bandas_ordem)
+        )
+    
+    def _carregar(self):
+        """Monta o LSH com as assinaturas persistidas (só as dos parâmetros atuais)"""
+        linhas = self._conexao.execute(
+            "SELECT id, assinatura FROM peticoes WHERE parametros = ? ORDER BY id",
+            (self.parametros,)
+        ).fetchall()
+        if not linhas:
+            return
+        ids = np.fromiter((linha[0] for linha in linhas), dtype=np.int64, count=len(linhas))
+        assinaturas = np.frombuffer(b''.join(linha[1] for linha in linhas), dtype=np.uint32)
+        self._estado = self._montar_estado(ids, assinaturas.reshape(len(linhas), self.permutacoes))
+        print(f"🧬 Índice de duplicatas: {len(linhas)} petições")
+    
+    def estatisticas(self) -> Dict:
+        """Petições indexadas, consultas, duplicatas encontradas e tempo médio de busca"""
+        with self._lock:
+            return {
+                'peticoes': len(self),
+                'consultas': self.consultas,
+                'encontradas': self.encontradas,
+                'taxa_duplicatas': self.encontradas / self.consultas if self.consultas else 0.0,
+                'tempo_medio_ms': 1000 * self._tempo_busca / self.consultas if self.consultas else 0.0
+            }
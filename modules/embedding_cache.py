@@ -0,0 +1,177 @@
+"""
+═══════════════════════════════════════════════════════════════════════════
+CACHE DE EMBEDDINGS - MEMÓRIA (LRU) + DISCO (SQLITE)
+═══════════════════════════════════════════════════════════════════════════
+Evita recalcular o embedding de textos já vistos (re-upload da mesma
+petição, nova geração alterando apenas temperatura/top-k etc.)
+"""
+
+import hashlib
+import re
+import sqlite3
+import threading
+import time
+import unicodedata
+from collections import OrderedDict
+from pathlib import Path
+from typing import Dict, List, Optional
+
+import numpy as np
+
+from config.settings import Config
+
+
+class CacheEmbeddings:
+    """Cache de embeddings em dois níveis: LRU em memória + SQLite em disco"""
+    
+    def __init__(
+        self,
+        diretorio: Optional[Path] = None,
+        modelo: Optional[str] = None,
+        max_memoria: Optional[int] = None,
+        max_disco: Optional[int] = None
+    ):
+        """
+        Inicializa o cache
+        
+        Args:
+            diretorio: Diretório do cache em disco (usa Config se None)
+            modelo: Modelo de embeddings, parte da chave (usa Config se None)
+            max_memoria: Máximo de entradas em memória (usa Config se None)
+            max_disco: Máximo de entradas em disco (usa Config se None)
+        """
+        self.diretorio = Path(diretorio or Config.EMBEDDING_CACHE_DIR)
+        # Motores diferentes (torch/onnx int8) geram vetores ligeiramente diferentes
+        self.modelo = modelo or f"{Config.EMBEDDING_MODEL}@{Config.EMBEDDING_ENGINE}"
+        self.max_memoria = max_memoria or Config.EMBEDDING_CACHE_MAX_MEMORIA
+        self.max_disco = max_disco or Config.EMBEDDING_CACHE_MAX_DISCO
+        
+        self._memoria = OrderedDict()
+        self._lock = threading.Lock()
+        
+        # Contadores
+        self.hits_memoria = 0
+        self.hits_disco = 0
+        self.misses = 0
+        
+        self.diretorio.mkdir(parents=True, exist_ok=True)
+        self._conexao = sqlite3.connect(
+            str(self.diretorio / "embeddings.sqlite3"),
+            check_same_thread=False
+        )
+        self._conexao.execute(
+            """
+            CREATE TABLE IF NOT EXISTS embeddings (
+                chave TEXT PRIMARY KEY,
+                vetor BLOB NOT NULL,
+                ultimo_acesso REAL NOT NULL
+            )
+            """
+        )
+        self._conexao.execute(
+            "CREATE INDEX IF NOT EXISTS idx_ultimo_acesso ON embeddings (ultimo_acesso)"
+        )
+        self._conexao.commit()
+    
+    @staticmethod
+    def normalizar(texto: str) -> str:
+        """Normaliza unicode e espaços (não altera caixa: afeta o embedding)"""
+        texto = unicodedata.normalize('NFC', texto)
+        return re.sub(r'\s+', ' ', texto).strip()
+    
+    def chave(self, texto: str) -> str:
+        """Chave do cache: hash do texto normalizado + modelo de embeddings"""
+        conteudo = f"{self.modelo}\x00{self.normalizar(texto)}"
+        return hashlib.sha256(conteudo.encode('utf-8')).hexdigest()
+    
+    def obter(self, texto: str) -> Optional[List[float]]:
+        """
+        Busca embedding no cache (memória, depois disco)
+        
+        Returns:
+            Embedding ou None se ausente
+        """
+        chave = self.chave(texto)
+        
+        with self._lock:
+            if chave in self._memoria:
+                self._memoria.move_to_end(chave)
+                self.hits_memoria += 1
+                return self._memoria[chave]
+            
+            linha = self._conexao.execute(
+                "SELECT vetor FROM embeddings WHERE chave = ?", (chave,)
+            ).fetchone()
+            
+            if linha is None:
+                self.misses += 1
+                return None
+            
+            self._conexao.execute(
+                "UPDATE embeddings SET ultimo_acesso = ? WHERE chave = ?",
+                (time.time(), chave)
+            )
+            self._conexao.commit()
+            
+            embedding = np.frombuffer(linha[0], dtype=np.float32).tolist()
+            self._guardar_memoria(chave, embedding)
+            self.hits_disco += 1
+            return embedding
+    
+    def armazenar(self, texto: str, embedding: List[float]):
+        """Armazena embedding nos dois níveis"""
+        chave = self.chave(texto)
+        vetor = np.asarray(embedding, dtype=np.float32).tobytes()
+        
+        with self._lock:
+            self._guardar_memoria(chave, list(embedding))
+            self._conexao.execute(
+                "INSERT OR REPLACE INTO embeddings (chave, vetor, ultimo_acesso) VALUES (?, ?, ?)",
+                (chave, vetor, time.time())
+            )
+            self._evictar_disco()
+            self._conexao.commit()
+    
+    def _guardar_memoria(self, chave: str, embedding: List[float]):
+        """Insere no LRU em memória, descartando o menos usado se cheio"""
+        self._memoria[chave] = embedding
+        self._memoria.move_to_end(chave)
+        while len(self._memoria) > self.max_memoria:
+            self._memoria.popitem(last=False)
+    
+    def _evictar_disco(self):
+        """Remove as entradas de acesso mais antigo quando excede max_disco"""
+        total = self._conexao.execute("SELECT COUNT(*) FROM embeddings").fetchone()[0]
+        excesso = total - self.max_disco
+        if excesso > 0:
+            # Remove 10% a mais para não evictar a cada inserção
+            remover = excesso + self.max_disco // 10
+            self._conexao.execute(
+                """
+                DELETE FROM embeddings WHERE chave IN (
+                    SELECT chave FROM embeddings ORDER BY ultimo_acesso ASC LIMIT ?
+                )
+                """,
+                (remover,)
+            )
+    
+    def estatisticas(self) -> Dict:
+        """Contadores de hit/miss e ocupação do cache"""
+        with self._lock:
+            total_disco = self._conexao.execute("SELECT COUNT(*) FROM embeddings").fetchone()[0]
+            consultas = self.hits_memoria + self.hits_disco + self.misses
+            return {
+                'hits_memoria': self.hits_memoria,
+                'hits_disco': self.hits_disco,
+                'misses': self.misses,
+                'taxa_acerto': (self.hits_memoria + self.hits_disco) / consultas if consultas else 0.0,
+                'entradas_memoria': len(self._memoria),
+                'entradas_disco': total_disco
+            }
+    
+    def limpar(self):
+        """Esvazia os dois níveis do cache"""
+        with self._lock:
+            self._memoria.clear()
+            self._conexao.execute("DELETE FROM embeddings")
+            self._conexao.commit()
@@ -0,0 +1,293 @@
+"""
+═══════════════════════════════════════════════════════════════════════════
+MOTORES DE EMBEDDING - PYTORCH E ONNX RUNTIME (INT8)
+═══════════════════════════════════════════════════════════════════════════
+Motores intercambiáveis para o modelo de embeddings, selecionados por
+Config.EMBEDDING_ENGINE. Ambos retornam vetores normalizados (L2).
+
+O motor ONNX usa o multilingual-e5-large exportado e quantizado
+dinamicamente para int8, com threads intra-op ajustáveis para CPU.
+O export é feito uma única vez (requer torch + transformers).
+"""
+
+import threading
+import weakref
+from pathlib import Path
+from typing import Dict, List, Optional, Union
+
+import numpy as np
+
+from config.settings import Config
+
+ARQUIVO_ONNX_FP32 = "modelo_fp32.onnx"
+ARQUIVO_ONNX_INT8 = "modelo_int8.onnx"
+ARQUIVO_TOKENIZER = "tokenizer.json"
+
+# Comprimento máximo de sequência do multilingual-e5-large
+MAX_SEQ_LENGTH = 512
+
+# Motores carregados no processo (referências fracas: instâncias coletadas saem sozinhas)
+_MOTORES_RESIDENTES = weakref.WeakSet()
+_LOCK_MOTORES = threading.Lock()
+
+
+def _registrar_motor(motor):
+    """Registra um motor recém-carregado na contagem de instâncias residentes"""
+    with _LOCK_MOTORES:
+        _MOTORES_RESIDENTES.add(motor)
+        type(motor).carregamentos += 1
+
+
+def motores_residentes() -> Dict:
+    """
+    Contagem de modelos de embedding carregados no processo
+    
+    Returns:
+        Dict com instâncias vivas (total e por motor) e carregamentos acumulados
+    """
+    with _LOCK_MOTORES:
+        motores = list(_MOTORES_RESIDENTES)
+        return {
+            'residentes': len(motores),
+            'por_motor': {
+                classe.nome: sum(isinstance(m, classe) for m in motores)
+                for classe in (MotorEmbeddingTorch, MotorEmbeddingONNX)
+            },
+            'carregamentos': MotorEmbeddingTorch.carregamentos + MotorEmbeddingONNX.carregamentos
+        }
+
+
+class MotorEmbeddingTorch:
+    """Embeddings via SentenceTransformer (PyTorch)"""
+    
+    nome = 'torch'
+    carregamentos = 0
+    
+    def __init__(self, modelo: Optional[str] = None):
+        """
+        Args:
+            modelo: Nome do modelo (usa Config.EMBEDDING_MODEL se None)
+        """
+        # Import tardio: o motor ONNX não deve carregar o PyTorch
+        from sentence_transformers import SentenceTransformer
+        
+        self.modelo = modelo or Config.EMBEDDING_MODEL
+        self.model = SentenceTransformer(self.modelo)
+        _registrar_motor(self)
+    
+    def encode(self, textos: Union[str, List[str]], batch_size: int = 32) -> np.ndarray:
+        """
+        Gera embeddings normalizados
+        
+        Returns:
+            Vetor (texto único) ou matriz (lista de textos) float32
+        """
+        return self.model.encode(
+            textos,
+            batch_size=batch_size,
+            convert_to_numpy=True,
+            normalize_embeddings=True  # Normalizar para cosine similarity
+        )
+
+
+class MotorEmbeddingONNX:
+    """Embeddings via ONNX Runtime com modelo quantizado (int8 dinâmico)"""
+    
+    nome = 'onnx'
+    carregamentos = 0
+    
+    def __init__(
+        self,
+        modelo: Optional[str] = None,
+        diretorio: Optional[Path] = None,
+        threads: Optional[int] = None
+    ):
+        """
+        Args:
+            modelo: Nome do modelo (usa Config.EMBEDDING_MODEL se None)
+            diretorio: Diretório do modelo exportado (usa Config.ONNX_MODEL_DIR se None)
+            threads: Threads intra-op (usa Config.ONNX_INTRA_OP_THREADS se None)
+        """
+        import onnxruntime as ort
+        from tokenizers import Tokenizer
+        
+        self.modelo = modelo or Config.EMBEDDING_MODEL
+        self.diretorio = Path(diretorio or Config.ONNX_MODEL_DIR)
+        
+        if not (self.diretorio / ARQUIVO_ONNX_INT8).exists():
+            exportar_modelo_onnx(self.modelo, self.diretorio)
+        
+        opcoes = ort.SessionOptions()
+        opcoes.intra_op_num_threads = threads or Config.ONNX_INTRA_OP_THREADS
+        opcoes.inter_op_num_threads = 1
+        opcoes.execution_mode = ort.ExecutionMode.ORT_SEQUENTIAL
+        opcoes.graph_optimization_level = ort.GraphOptimizationLevel.ORT_ENABLE_ALL
+        
+        self.sessao = ort.InferenceSession(
+            str(self.diretorio / ARQUIVO_ONNX_INT8),
+            sess_options=opcoes,
+            providers=['CPUExecutionProvider']
+        )
+        self.entradas = [entrada.name for entrada in self.sessao.get_inputs()]
+        
+        self.tokenizer = Tokenizer.from_file(str(self.diretorio / ARQUIVO_TOKENIZER))
+        self.tokenizer.enable_truncation(max_length=MAX_SEQ_LENGTH)
+        self.tokenizer.enable_padding(pad_id=self.tokenizer.token_to_id('<pad>'), pad_token='<pad>')
+        _registrar_motor(self)
+    
+    def encode(self, textos: Union[str, List[str]], batch_size: int = 32) -> np.ndarray:
+        """
+        Gera embeddings normalizados (mean pooling + L2, como o SentenceTransformer)
+        
+        Returns:
+            Vetor (texto único) ou matriz (lista de textos) float32
+        """
+        unico = isinstance(textos, str)
+        lista = [textos] if unico else list(textos)
+        
+        lotes = []
+        for inicio in range(0, len(lista), batch_size):
+            codificados = self.tokenizer.encode_batch(lista[inicio:inicio + batch_size])
+            input_ids = np.array([c.ids for c in codificados], dtype=np.int64)
+            mascara = np.array([c.attention_mask for c in codificados], dtype=np.int64)
+            
+            alimentacao = {'input_ids': input_ids, 'attention_mask': mascara}
+            if 'token_type_ids' in self.entradas:
+                alimentacao['token_type_ids'] = np.zeros_like(input_ids)
+            
+            estados = self.sessao.run(None, {k: v for k, v in alimentacao.items() if k in self.entradas})[0]
+            
+            # Mean pooling ponderado pela attention mask
+            peso = mascara[:, :, None].astype(np.float32)
+            media = (estados * peso).sum(axis=1) / np.clip(peso.sum(axis=1), 1e-9, None)
+            normas = np.linalg.norm(media, axis=1, keepdims=True)
+            lotes.append((media / np.clip(normas, 1e-12, None)).astype(np.float32))
+        
+        embeddings = np.vstack(lotes) if lotes else np.empty((0, Config.EMBEDDING_DIM), dtype=np.float32)
+        return embeddings[0] if unico else embeddings
+
+
+def exportar_modelo_onnx(modelo: str, diretorio: Path) -> Path:
+    """
+    Exporta o modelo HuggingFace para ONNX e quantiza para int8 (dinâmico)
+    
+    Args:
+        modelo: Nome do modelo HuggingFace
+        diretorio: Diretório de destino
+        
+    Returns:
+        Caminho do modelo quantizado
+    """
+    import torch
+    from onnxruntime.quantization import QuantType, quantize_dynamic
+    from transformers import AutoModel, AutoTokenizer
+    
+    diretorio = Path(diretorio)
+    diretorio.mkdir(parents=True, exist_ok=True)
+    
+    print(f"📦 Exportando {modelo} para ONNX em {diretorio} (executado uma única vez)...")
+    tokenizer = AutoTokenizer.from_pretrained(modelo)
+    tokenizer.save_pretrained(str(diretorio))
+    
+    model = AutoModel.from_pretrained(modelo)
+    model.eval()
+    
+    exemplo = tokenizer(["texto de exemplo para exportação"], return_tensors='pt')
+    caminho_fp32 = diretorio / ARQUIVO_ONNX_FP32
+    eixos = {0: 'batch', 1: 'sequencia'}
+    
+    with torch.no_grad():
+        torch.onnx.export(
+            model,
+            (exemplo['input_ids'], exemplo['attention_mask']),
+            str(caminho_fp32),
+            input_names=['input_ids', 'attention_mask'],
+            output_names=['last_hidden_state'],
+            dynamic_axes={
+                'input_ids': eixos,
+                'attention_mask': eixos,
+                'last_hidden_state': eixos
+            },
+            opset_version=14
+        )
+    
+    print("⚙️  Quantizando pesos para int8...")
+    caminho_int8 = diretorio / ARQUIVO_ONNX_INT8
+    quantize_dynamic(
+        str(caminho_fp32),
+        str(caminho_int8),
+        weight_type=QuantType.QInt8
+    )
+    print(f"✅ Modelo ONNX quantizado: {caminho_int8}")
+    
+    return caminho_int8
+
+
+def criar_motor_embedding(engine: Optional[str] = None):
+    """
+    Cria o motor de embeddings configurado
+    
+    Args:
+        engine: 'torch' ou 'onnx' (usa Config.EMBEDDING_ENGINE se None)
+    """
+    engine = engine or Config.EMBEDDING_ENGINE
+    
+    if engine == 'onnx':
+        return MotorEmbeddingONNX()
+    if engine == 'torch':
+        return MotorEmbeddingTorch()
+    
+    raise ValueError(f"Motor de embeddings desconhecido: {engine}")
+
+
+def comparar_vetores(
+    referencia: np.ndarray,
+    avaliado: np.ndarray,
+    min_cosseno: Optional[float] = None
+) -> Dict:
+    """
+    Compara vetores normalizados de dois motores para os mesmos textos
+    
+    Args:
+        referencia: Matriz do motor de referência (normalmente torch)
+        avaliado: Matriz do motor avaliado (normalmente onnx)
+        min_cosseno: Cosseno mínimo aceito (usa Config.ONNX_PARIDADE_MIN_COSSENO se None)
+        
+    Returns:
+        Dict com cosseno mínimo/médio, maior diferença absoluta e aprovação
+    """
+    min_cosseno = min_cosseno if min_cosseno is not None else Config.ONNX_PARIDADE_MIN_COSSENO
+    
+    referencia = np.asarray(referencia, dtype=np.float32)
+    avaliado = np.asarray(avaliado, dtype=np.float32)
+    cossenos = np.sum(referencia * avaliado, axis=1)
+    
+    return {
+        'cosseno_min': float(cossenos.min()),
+        'cosseno_medio': float(cossenos.mean()),
+        'diferenca_max': float(np.abs(referencia - avaliado).max()),
+        'normas_ok': bool(np.allclose(np.linalg.norm(avaliado, axis=1), 1.0, atol=1e-3)),
+        'aprovado': bool(cossenos.min() >= min_cosseno)
+    }
+
+
+def verificar_paridade(
+    motor_referencia,
+    motor,
+    textos: List[str],
+    min_cosseno: Optional[float] = None
+) -> Dict:
+    """
+    Verifica se dois motores geram os mesmos vetores (dentro da tolerância)
+    
+    Args:
+        motor_referencia: Motor de referência (normalmente torch)
+        motor: Motor avaliado (normalmente onnx)
+        textos: Textos de teste
+        min_cosseno: Cosseno mínimo aceito (usa Config se None)
+    """
+    return comparar_vetores(
+        motor_referencia.encode(textos),
+        motor.encode(textos),
+        min_cosseno
+    )
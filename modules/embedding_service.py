@@ -0,0 +1,154 @@
+"""
+═══════════════════════════════════════════════════════════════════════════
+SERVIÇO DE EMBEDDINGS - MICRO-LOTES PARA USUÁRIOS CONCORRENTES
+═══════════════════════════════════════════════════════════════════════════
+Fila na frente do motor de embeddings: pedidos que chegam dentro de uma
+janela curta (ou até o tamanho máximo de lote) são codificados em um
+único encode em lote, executado por uma thread dedicada. Cada chamador
+recebe seu vetor por um Future.
+
+Com um único usuário o custo é no máximo a janela; com vários usuários
+simultâneos, um encode em lote substitui encodes unitários concorrendo
+pelas threads do PyTorch/ONNX Runtime.
+"""
+
+import queue
+import threading
+import time
+from collections import deque
+from concurrent.futures import Future
+from typing import Dict, Optional
+
+import numpy as np
+
+from config.settings import Config
+
+# Latências mantidas para média/p95 (janela deslizante)
+MAX_AMOSTRAS_LATENCIA = 1000
+
+
+class ServicoEmbeddings:
+    """Agrupa pedidos de embedding concorrentes em micro-lotes"""
+    
+    def __init__(
+        self,
+        motor,
+        janela_ms: Optional[float] = None,
+        max_lote: Optional[int] = None
+    ):
+        """
+        Args:
+            motor: Motor de embeddings (encode de str ou lista de str)
+            janela_ms: Espera máxima por novos pedidos após o primeiro (usa Config se None)
+            max_lote: Tamanho máximo do lote (usa Config se None)
+        """
+        self.motor = motor
+        self.janela = (janela_ms if janela_ms is not None else Config.EMBEDDING_MICROLOTE_JANELA_MS) / 1000
+        self.max_lote = max_lote or Config.EMBEDDING_MICROLOTE_MAX
+        
+        self._fila = queue.Queue()
+        self._lock = threading.Lock()
+        self._ativo = True
+        
+        # Métricas
+        self.lotes = 0
+        self.textos = 0
+        self.histograma_lotes = {}
+        self._latencias_fila = deque(maxlen=MAX_AMOSTRAS_LATENCIA)
+        self._tempos_encode = deque(maxlen=MAX_AMOSTRAS_LATENCIA)
+        
+        self._worker = threading.Thread(
+            target=self._processar,
+            name='servico-embeddings',
+            daemon=True
+        )
+        self._worker.start()
+    
+    def submeter(self, texto: str) -> Future:
+        """Enfileira um texto e retorna o Future do seu embedding"""
+        if not self._ativo:
+            raise RuntimeError("Serviço de embeddings encerrado")
+        
+        futuro = Future()
+        self._fila.put((texto, futuro, time.perf_counter()))
+        return futuro
+    
+    def encode(self, texto: str) -> np.ndarray:
+        """Embedding de um texto (bloqueia até o lote que o contém ser codificado)"""
+        return self.submeter(texto).result()
+    
+    def _coletar_lote(self) -> list:
+        """Aguarda o primeiro pedido e junta os que chegarem dentro da janela"""
+        lote = [self._fila.get()]
+        limite = time.perf_counter() + self.janela
+        
+        while len(lote) < self.max_lote:
+            restante = limite - time.perf_counter()
+            try:
+                item = self._fila.get(timeout=restante) if restante > 0 else self._fila.get_nowait()
+            except queue.Empty:
+                break
+            lote.append(item)
+        
+        return lote
+    
+    def _processar(self):
+        """Loop da thread do serviço: coleta lotes e resolve os Futures"""
+        while True:
+            lote = self._coletar_lote()
+            # Sentinela de encerramento (None) pode vir junto com pedidos reais
+            pedidos = [item for item in lote if item is not None]
+            
+            if pedidos:
+                self._codificar(pedidos)
+            
+            if len(pedidos) < len(lote):
+                return
+    
+    def _codificar(self, pedidos: list):
+        """Executa um encode em lote e entrega cada vetor ao seu Future"""
+        inicio = time.perf_counter()
+        textos = [texto for texto, _, _ in pedidos]
+        
+        try:
+            embeddings = self.motor.encode(textos, batch_size=len(textos))
+        except Exception as e:
+            for _, futuro, _ in pedidos:
+                futuro.set_exception(e)
+            return
+        
+        fim = time.perf_counter()
+        for (_, futuro, enfileirado), embedding in zip(pedidos, embeddings):
+            futuro.set_result(embedding)
+        
+        with self._lock:
+            self.lotes += 1
+            self.textos += len(pedidos)
+            self.histograma_lotes[len(pedidos)] = self.histograma_lotes.get(len(pedidos), 0) + 1
+            self._latencias_fila.extend(inicio - enfileirado for _, _, enfileirado in pedidos)
+            self._tempos_encode.append(fim - inicio)
+    
+    def estatisticas(self) -> Dict:
+        """Profundidade da fila, histograma de tamanhos de lote e latência adicionada"""
+        with self._lock:
+            latencias = sorted(self._latencias_fila)
+            tempos_encode = list(self._tempos_encode)
+            return {
+                'profundidade_fila': self._fila.qsize(),
+                'lotes': self.lotes,
+                'textos': self.textos,
+                'lote_medio': self.textos / self.lotes if self.lotes else 0.0,
+                'histograma_lotes': dict(sorted(self.histograma_lotes.items())),
+                # Espera na fila antes do encode (custo do agrupamento)
+                'latencia_adicionada_media_ms': 1000 * sum(latencias) / len(latencias) if latencias else 0.0,
+                'latencia_adicionada_p95_ms': 1000 * latencias[int(0.95 * (len(latencias) - 1))] if latencias else 0.0,
+                'encode_medio_ms': 1000 * sum(tempos_encode) / len(tempos_encode) if tempos_encode else 0.0
+            }
+    
+    def encerrar(self, timeout: Optional[float] = None):
+        """Processa os pedidos pendentes e encerra a thread do serviço"""
+        if not self._ativo:
+            return
+        self._ativo = False
+        self._fila.put(None)
+        self._worker.join(timeout)
@@ -0,0 +1,216 @@
+"""
+═══════════════════════════════════════════════════════════════════════════
+ÍNDICE DE HIERARQUIA DOS CHUNKS (PAI / FILHOS ORDENADOS)
+═══════════════════════════════════════════════════════════════════════════
+Mapa id -> pai e pai -> filhos em ordem de leitura, montado dos metadados
+da collection e mantido em memória, para navegar de um hit para o seu
+documento e para as seções/chunks vizinhos por lookup de id, sem busca
+vetorial.
+
+O pai vem de metadata['parent_id'] (seções de nível 2 -> documento de
+nível 1). Chunks sem parent_id (os atômicos de nível 3) ficam sob o chunk
+de nível 1 do mesmo document_id. Irmãos são os filhos do mesmo pai no
+mesmo nível, ordenados por (posicao, tipo_secao): partes de uma seção
+dividida ('fatos_1', 'fatos_2') compartilham a posição.
+"""
+
+import json
+import threading
+from pathlib import Path
+from typing import Dict, List, Optional, Tuple
+
+from config.settings import Config
+from modules.vector_backend import assinatura_vector_store, em_gravacao
+
+ARQUIVO_INDICE = "indice.json"
+ARQUIVO_MANIFESTO = "manifesto.json"
+
+# Incrementar quando a regra de pai/ordem mudar (força reconstrução)
+VERSAO_HIERARQUIA = 1
+
+
+class IndiceHierarquia:
+    """Hierarquia persistida: id -> pai e pai -> filhos ordenados por nível"""
+    
+    def __init__(
+        self,
+        collection,
+        vector_store_dir: Optional[Path] = None,
+        diretorio: Optional[Path] = None
+    ):
+        """
+        Args:
+            collection: Collection (ChromaDB ou NumpyVectorStore)
+            vector_store_dir: Diretório do vector store (usa Config se None)
+            diretorio: Diretório do índice (usa Config.HIERARQUIA_DIR se None)
+        """
+        self.collection = collection
+        self.vector_store_dir = Path(vector_store_dir or Config.VECTOR_STORE_DIR)
+        self.diretorio = Path(diretorio or Config.HIERARQUIA_DIR) / self.collection.name
+        
+        self._lock = threading.Lock()
+        # ({'pais': id -> pai, 'niveis': id -> nivel, 'filhos': pai -> {nivel: [ids ordenados]}},
+        #  id -> posição entre os irmãos)
+        self._estado = ({'pais': {}, 'niveis': {}, 'filhos': {}}, {})
+        self._assinatura = None
+    
+    # ═══════════════════════════════════════════════════════════════════════
+    # Consulta
+    # ═══════════════════════════════════════════════════════════════════════
+    
+    def pai(self, chunk_id: str) -> Optional[str]:
+        """Id do pai do chunk (None para documentos de nível 1 e ids desconhecidos)"""
+        self.sincronizar()
+        return self._estado[0]['pais'].get(chunk_id)
+    
+    def filhos(self, chunk_id: str, nivel: Optional[int] = None) -> List[str]:
+        """Filhos do chunk em ordem de leitura (de um nível, ou de todos por nível)"""
+        self.sincronizar()
+        por_nivel = self._estado[0]['filhos'].get(chunk_id, {})
+        if nivel is not None:
+            return list(por_nivel.get(str(nivel), []))
+        return [filho for chave in sorted(por_nivel, key=int) for filho in por_nivel[chave]]
+    
+    def vizinhos(self, chunk_id: str, distancia: int = 1) -> List[Tuple[str, int]]:
+        """
+        Irmãos até `distancia` posições antes e depois do chunk
+        
+        Returns:
+            Lista de (id, deslocamento) em ordem de leitura (deslocamento < 0: anterior)
+        """
+        return self.relacoes([chunk_id], distancia)[chunk_id]['vizinhos']
+    
+    def relacoes(self, ids: List[str], distancia: int = 1) -> Dict[str, Dict]:
+        """
+        Pai e irmãos vizinhos de vários chunks (uma única verificação de atualização)
+        
+        Returns:
+            Dict id -> {'pai': id ou None, 'vizinhos': [(id, deslocamento)]}
+        """
+        self.sincronizar()
+        indice, posicoes = self._estado
+        
+        resultado = {}
+        for chunk_id in ids:
+            pai = indice['pais'].get(chunk_id)
+            vizinhos = []
+            if pai is not None and distancia > 0:
+                irmaos = indice['filhos'].get(pai, {}).get(str(indice['niveis'][chunk_id]), [])
+                posicao = posicoes[chunk_id]
+                vizinhos = [
+                    (irmaos[i], i - posicao)
+                    for i in range(max(0, posicao - distancia), min(len(irmaos), posicao + distancia + 1))
+                    if i != posicao
+                ]
+            resultado[chunk_id] = {'pai': pai, 'vizinhos': vizinhos}
+        return resultado
+    
+    # ═══════════════════════════════════════════════════════════════════════
+    # Atualização
+    # ═══════════════════════════════════════════════════════════════════════
+    
+    def carregado(self) -> bool:
+        """Índice já carregado (na conexão ou na primeira expansão)"""
+        return self._assinatura is not None
+    
+    def sincronizar(self):
+        """Carrega o índice e o reconstrói se a collection mudou"""
+        assinatura = assinatura_vector_store(self.vector_store_dir, self.collection.name)
+        total = self.collection.count()
+        if self._assinatura == (assinatura, total):
+            return
+        if self._assinatura is not None and (
+            self._lock.locked() or em_gravacao(self.vector_store_dir, self.collection.name)
+        ):
+            return  # Gravação ou atualização em andamento: segue com a hierarquia atual
+        
+        with self._lock:
+            if self._assinatura == (assinatura, total):
+                return
+            
+            if self._assinatura is None and self._ler_disco(assinatura, total):
+                self._assinatura = (assinatura, total)
+                return
+            
+            self._construir()
+            self._assinatura = (assinatura, total)
+            self._salvar(assinatura)
+    
+    def _construir(self):
+        """Monta pais e filhos ordenados a partir dos metadados (só metadados, sem documentos)"""
+        todos = self.collection.get(include=['metadatas'])
+        metadatas = dict(zip(todos['ids'], (meta or {} for meta in todos['metadatas'])))
+        
+        # Documento (nível 1) de cada document_id: pai dos chunks sem parent_id
+        raizes = {
+            meta.get('document_id'): chunk_id
+            for chunk_id, meta in metadatas.items()
+            if meta.get('nivel') == 1 and meta.get('document_id')
+        }
+        
+        pais, niveis, ordem = {}, {}, {}
+        for chunk_id, meta in metadatas.items():
+            niveis[chunk_id] = meta.get('nivel')
+            pai = meta.get('parent_id') or None
+            if pai not in metadatas:
+                pai = raizes.get(meta.get('document_id')) if meta.get('nivel') != 1 else None
+            if pai is None or pai == chunk_id:
+                continue
+            pais[chunk_id] = pai
+            chave = (meta.get('posicao') or 0, meta.get('tipo_secao') or '', chunk_id)
+            ordem.setdefault(pai, {}).setdefault(str(meta.get('nivel')), []).append((chave, chunk_id))
+        
+        filhos = {
+            pai: {nivel: [chunk_id for _, chunk_id in sorted(itens)] for nivel, itens in por_nivel.items()}
+            for pai, por_nivel in ordem.items()
+        }
+        self._publicar({'pais': pais, 'niveis': niveis, 'filhos': filhos})
+        print(f"🌳 Índice de hierarquia: {len(pais)} chunks ligados a {len(filhos)} pais")
+    
+    def _publicar(self, indice: Dict):
+        """Troca o índice em uso (consultas concorrentes veem o antigo ou o novo)"""
+        posicoes = {
+            chunk_id: i
+            for por_nivel in indice['filhos'].values()
+            for irmaos in por_nivel.values()
+            for i, chunk_id in enumerate(irmaos)
+        }
+        self._estado = (indice, posicoes)
+    
+    # ═══════════════════════════════════════════════════════════════════════
+    # Persistência
+    # ═══════════════════════════════════════════════════════════════════════
+    
+    def _ler_disco(self, assinatura: str, total: int) -> bool:
+        """Carrega o índice persistido se for da versão atual da collection"""
+        indice = self.diretorio / ARQUIVO_INDICE
+        manifesto = self.diretorio / ARQUIVO_MANIFESTO
+        if not (indice.exists() and manifesto.exists()):
+            return False
+        
+        manifesto = json.loads(manifesto.read_text(encoding='utf-8'))
+        if (manifesto.get('versao') != VERSAO_HIERARQUIA
+                or manifesto.get('assinatura') != assinatura
+                or manifesto.get('total_chunks') != total):
+            return False
+        
+        self._publicar(json.loads(indice.read_text(encoding='utf-8')))
+        return True
+    
+    def _salvar(self, assinatura: str):
+        """Persiste índice e manifesto (manifesto por último)"""
+        self.diretorio.mkdir(parents=True, exist_ok=True)
+        (self.diretorio / ARQUIVO_INDICE).write_text(
+            json.dumps(self._estado[0], ensure_ascii=False),
+            encoding='utf-8'
+        )
+        manifesto = {
+            'assinatura': assinatura,
+            'versao': VERSAO_HIERARQUIA,
+            'total_chunks': len(self._estado[0]['niveis']),
+            'pais': len(self._estado[0]['filhos'])
+        }
+        (self.diretorio / ARQUIVO_MANIFESTO).write_text(
+            json.dumps(manifesto, ensure_ascii=False, indent=2),
+            encoding='utf-8'
+        )
@@ -0,0 +1,690 @@
+"""
+═══════════════════════════════════════════════════════════════════════════
+INGESTÃO EM LOTE - MONTAGEM DO VECTOR STORE
+═══════════════════════════════════════════════════════════════════════════
+Monta (ou amplia) a collection a partir de arquivos de contestações e
+petições (PDF, DOCX, TXT). Cada arquivo passa pela extração do
+ProcessadorPeticao e é dividido nos três níveis consultados pelo retriever:
+
+    Nível 1: resumo estruturado do documento (partes, citações, início do texto)
+    Nível 2: seções processuais (preliminares, fatos, fundamentos, pedidos,
+             conclusão), em partes de até INGESTAO_TAMANHO_SECAO caracteres
+    Nível 3: trechos atômicos com precedentes citados
+
+Extração e divisão rodam num pool de processos; os chunks são codificados
+em lotes grandes no processo principal e gravados por upsert em lote. Os
+ids são determinísticos (documento + nível + hash do texto): reingerir um
+arquivo substitui os seus chunks.
+
+Com o manifesto (INGESTAO_MANIFESTO_ENABLED), a ingestão é incremental:
+arquivos inalterados são pulados, só chunks novos ou alterados são gravados
+(texto já codificado reutiliza o vetor guardado), chunks órfãos e arquivos
+removidos do disco saem da collection.
+
+Por padrão grava na versão ativa da collection (modules.versoes_collection).
+Com --nova-versao, monta uma versão nova, em vector store próprio, sem tocar
+na que está em uso, e a ativa depois de validada; os vetores de textos já
+codificados vêm do manifesto, então a reindexação completa não recodifica
+o corpus.
+
+Uso:
+    python -m modules.ingestao contestacoes/ peticoes/ --workers 8
+    python -m modules.ingestao contestacoes/ peticoes/  # de novo: só o que mudou
+    python -m modules.ingestao novas/*.docx --tipo-doc contestacao --tipo-lit HOME_CARE
+    python -m modules.ingestao contestacoes/ peticoes/ --nova-versao  # reindexação blue/green
+"""
+
+import argparse
+import hashlib
+import re
+import sys
+import time
+import uuid
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, wait
+from pathlib import Path
+from typing import Dict, Iterable, List, Optional
+
+import chromadb
+from chromadb.config import Settings
+
+from config.settings import Config
+from modules.citacoes import extrair_citacoes, normalizar_texto
+from modules.manifesto_ingestao import ManifestoIngestao, hash_arquivo, hash_chunk, hash_texto
+from modules.versoes_collection import ativar_versao, proxima_versao, versao_ativa
+
+try:
+    import resource  # Indisponível no Windows
+except ImportError:
+    resource = None
+
+# Namespace dos ids determinísticos dos chunks
+NAMESPACE_CHUNKS = uuid.UUID('6f0c8a52-3d4b-4f7e-9a61-2b8e5c1d7f30')
+
+# Incrementar quando a divisão em chunks mudar (força o reprocessamento no manifesto)
+VERSAO_DIVISAO = 1
+
+# Chunks do manifesto conferidos na collection antes de confiar nele
+AMOSTRA_VERIFICACAO = 1000
+
+# Títulos de seção -> tipo_secao (primeira regra que casa, no título normalizado)
+REGRAS_SECAO = [
+    ('preliminares', re.compile(r"\bpreliminar")),
+    ('pedidos', re.compile(r"\b(?:dos?\s+pedidos?|requerimentos?|requer)\b")),
+    ('conclusao', re.compile(r"\b(?:conclusao|ante o exposto|diante do exposto|isto posto)\b")),
+    ('fatos', re.compile(r"\b(?:dos?\s+fatos?|sintese|historico|narrativa|resumo da (?:inicial|demanda))\b")),
+    ('fundamentos', re.compile(r"\b(?:d[oa]s?\s+direitos?|merito|fundament)")),
+]
+
+# Prefixos das chaves de precedente em extrair_citacoes (o restante são dispositivos)
+PREFIXOS_PRECEDENTE = {'sumula', 'sumula_vinculante', 'aresp', 'resp', 'are', 're', 'rms', 'hc', 'tema', 'processo'}
+
+
+def _eh_titulo(linha: str) -> bool:
+    """Linha curta, majoritariamente em maiúsculas (título de seção)"""
+    letras = [c for c in linha if c.isalpha()]
+    return 4 <= len(letras) and len(linha) <= 200 and sum(c.isupper() for c in letras) >= 0.8 * len(letras)
+
+
+def classificar_titulo(titulo: str) -> Optional[str]:
+    """tipo_secao de um título de seção ou None se não for uma seção processual"""
+    normalizado = normalizar_texto(titulo)
+    for tipo, padrao in REGRAS_SECAO:
+        if padrao.search(normalizado):
+            return tipo
+    return None
+
+
+def detectar_tipo_lit(texto: str) -> str:
+    """Tipo de caso pelas keywords de Config.TIPOS_CASO ('GERAL' se nenhuma aparece)"""
+    normalizado = normalizar_texto(texto)
+    pontuacao = {
+        tipo: sum(normalizado.count(normalizar_texto(keyword)) for keyword in info['keywords'])
+        for tipo, info in Config.TIPOS_CASO.items()
+    }
+    melhor = max(pontuacao, key=pontuacao.get)
+    return melhor if pontuacao[melhor] else 'GERAL'
+
+
+def detectar_tipo_doc(texto: str) -> str:
+    """'contestacao' se o início do documento se apresenta como contestação, senão 'inicial'"""
+    return 'contestacao' if 'contestacao' in normalizar_texto(texto[:3000]) else 'inicial'
+
+
+def dividir_secoes(texto: str) -> List[Dict]:
+    """
+    Separa o texto nas seções processuais, na ordem da primeira ocorrência
+    
+    Títulos não reconhecidos (subtítulos) continuam a seção corrente; o texto
+    antes do primeiro título reconhecido entra em 'fatos'. Seções do mesmo
+    tipo espalhadas pelo documento são unidas.
+    
+    Returns:
+        Lista de {'tipo', 'titulo', 'texto'}
+    """
+    secoes = {}  # tipo -> {'tipo', 'titulo', 'linhas'} (ordem de inserção = posição)
+    atual = secoes.setdefault('fatos', {'tipo': 'fatos', 'titulo': '', 'linhas': []})
+    
+    for linha in texto.splitlines():
+        limpa = linha.strip()
+        tipo = classificar_titulo(limpa) if _eh_titulo(limpa) else None
+        if tipo:
+            atual = secoes.setdefault(tipo, {'tipo': tipo, 'titulo': limpa, 'linhas': []})
+            atual['titulo'] = atual['titulo'] or limpa
+        atual['linhas'].append(linha)
+    
+    resultado = []
+    for secao in secoes.values():
+        conteudo = "\n".join(secao['linhas']).strip()
+        if conteudo:
+            resultado.append({'tipo': secao['tipo'], 'titulo': secao['titulo'], 'texto': conteudo})
+    return resultado
+
+
+def dividir_partes(texto: str, tamanho: int) -> List[str]:
+    """Agrupa parágrafos em partes de até `tamanho` caracteres (parágrafo maior é cortado em espaços)"""
+    partes, atual = [], ""
+    for paragrafo in re.split(r'\n\s*\n', texto):
+        paragrafo = paragrafo.strip()
+        while len(paragrafo) > tamanho:
+            corte = paragrafo.rfind(' ', tamanho // 2, tamanho)
+            corte = corte if corte > 0 else tamanho
+            if atual:
+                partes.append(atual)
+                atual = ""
+            partes.append(paragrafo[:corte].strip())
+            paragrafo = paragrafo[corte:].strip()
+        if not paragrafo:
+            continue
+        if atual and len(atual) + 2 + len(paragrafo) > tamanho:
+            partes.append(atual)
+            atual = ""
+        atual = f"{atual}\n\n{paragrafo}" if atual else paragrafo
+    if atual:
+        partes.append(atual)
+    return partes
+
+
+def _listar(chaves: List[str]) -> str:
+    return "\n".join(f"{i}. {chave}" for i, chave in enumerate(chaves, 1)) or "Nenhum"
+
+
+def montar_resumo(dados: Dict, tipo_doc: str, tipo_lit: str, tamanho: int) -> str:
+    """Documento de nível 1: cabeçalho estruturado + início do texto, até `tamanho` caracteres"""
+    chaves = extrair_citacoes(dados['texto_completo'])['chaves']
+    precedentes = [c for c in chaves if c.split(':')[0] in PREFIXOS_PRECEDENTE]
+    dispositivos = [c for c in chaves if c.split(':')[0] not in PREFIXOS_PRECEDENTE]
+    resumo = (
+        f"\n# DOCUMENTO: {tipo_doc.upper()}\n"
+        f"## Tipo de Litígio: {tipo_lit}\n"
+        f"## Autor: {dados.get('autor')}\n"
+        f"## Réu: {dados.get('reu')}\n"
+        f"## Valor: R$ {dados.get('valor_causa') or '0.00'}\n\n"
+        f"### Dispositivos Legais\n{_listar(dispositivos[:15])}\n\n"
+        f"### Precedentes\n{_listar(precedentes[:15])}\n\n"
+        f"### Resumo Executivo\n{dados['texto_completo'].strip()}"
+    )
+    return resumo[:tamanho]
+
+
+def dividir_documento(
+    dados: Dict,
+    arquivo: str,
+    tipo_doc: str,
+    tipo_lit: str,
+    tamanho_resumo: Optional[int] = None,
+    tamanho_secao: Optional[int] = None,
+    tamanho_atomico: Optional[int] = None
+) -> List[Dict]:
+    """
+    Chunks dos três níveis de um documento extraído
+    
+    Args:
+        dados: Retorno de ProcessadorPeticao.processar_arquivo
+        arquivo: Caminho de origem (base do document_id e metadado 'arquivo')
+        tipo_doc: 'contestacao' ou 'inicial'
+        tipo_lit: Tipo de caso (chave de Config.TIPOS_CASO ou 'GERAL')
+        tamanho_resumo, tamanho_secao, tamanho_atomico: Limites em caracteres (usa Config se None)
+        
+    Returns:
+        Lista de {'id', 'documento', 'metadata', 'hash_texto', 'hash_chunk'}
+    """
+    tamanho_resumo = tamanho_resumo or Config.INGESTAO_TAMANHO_RESUMO
+    tamanho_secao = tamanho_secao or Config.INGESTAO_TAMANHO_SECAO
+    tamanho_atomico = tamanho_atomico or Config.INGESTAO_TAMANHO_ATOMICO
+    
+    digest = hashlib.sha1(arquivo.encode('utf-8')).hexdigest()[:12]
+    document_id = f"{tipo_doc}_{tipo_lit}_{digest}"
+    chunks = []
+    ocorrencias = {}
+    
+    def adicionar(nivel: int, documento: str, tipo_secao: str = '', secao: str = '',
+                  posicao: int = 0, parent_id: str = '', tipo_atomic: str = '',
+                  citacoes: Optional[Dict] = None) -> str:
+        # Id pelo texto (não pela ordem): inserir um parágrafo não muda o id dos
+        # chunks seguintes. O nível 1 é único por documento e tem id fixo
+        texto_hash = hash_texto(documento)
+        chave = f"{document_id}|1" if nivel == 1 else f"{document_id}|{nivel}|{texto_hash}"
+        ocorrencias[chave] = ocorrencias.get(chave, 0) + 1
+        chunk_id = str(uuid.uuid5(NAMESPACE_CHUNKS, f"{chave}|{ocorrencias[chave]}"))
+        citacoes = citacoes or extrair_citacoes(documento)
+        metadata = {
+            'document_id': document_id,
+            'arquivo': arquivo,
+            'nivel': nivel,
+            'tipo_lit': tipo_lit,
+            'tipo_doc': tipo_doc,
+            'tipo_secao': tipo_secao,
+            'secao': secao,
+            'posicao': posicao,
+            'parent_id': parent_id,
+            'tipo_atomic': tipo_atomic,
+            'tokens': len(documento) // 4,
+            'tem_dispositivos': bool(citacoes['dispositivos']),
+            'tem_precedentes': bool(citacoes['precedentes'])
+        }
+        chunks.append({
+            'id': chunk_id,
+            'documento': documento,
+            'metadata': metadata,
+            'hash_texto': texto_hash,
+            'hash_chunk': hash_chunk(documento, metadata)
+        })
+        return chunk_id
+    
+    # Nível 1: documento inteiro resumido
+    raiz = adicionar(1, montar_resumo(dados, tipo_doc, tipo_lit, tamanho_resumo))
+    
+    # Nível 2: seções, partes de uma seção dividida compartilham a posição
+    texto = dados['texto_completo']
+    for posicao, secao in enumerate(dividir_secoes(texto)):
+        partes = dividir_partes(secao['texto'], tamanho_secao)
+        for i, parte in enumerate(partes, 1):
+            tipo_secao = f"{secao['tipo']}_{i}" if len(partes) > 1 else secao['tipo']
+            adicionar(2, parte, tipo_secao, secao['titulo'], posicao, raiz)
+    
+    # Nível 3: trechos com precedentes (sem parent_id, como no store original)
+    for parte in dividir_partes(texto, tamanho_atomico):
+        citacoes = extrair_citacoes(parte)
+        if citacoes['precedentes']:
+            adicionar(3, parte, tipo_atomic='precedente', citacoes=citacoes)
+    
+    return chunks
+
+
+def parametros_divisao(tipo_doc: str, tipo_lit: Optional[str]) -> str:
+    """Parâmetros que mudam os chunks de um arquivo (entram no hash do arquivo no manifesto)"""
+    return (
+        f"v{VERSAO_DIVISAO}|{tipo_doc}|{tipo_lit or 'auto'}|{Config.INGESTAO_TAMANHO_RESUMO}|"
+        f"{Config.INGESTAO_TAMANHO_SECAO}|{Config.INGESTAO_TAMANHO_ATOMICO}"
+    )
+
+
+def processar_documento(
+    caminho: str,
+    tipo_doc: str = 'auto',
+    tipo_lit: Optional[str] = None,
+    hash_anterior: Optional[str] = None
+) -> Dict:
+    """
+    Extrai e divide um arquivo (executado nos processos do pool)
+    
+    Args:
+        caminho: Arquivo a processar
+        tipo_doc, tipo_lit: Ver IngestorVectorStore.ingerir
+        hash_anterior: Hash registrado no manifesto; se o arquivo ainda tem
+            esse hash, retorna sem extrair (só 'inalterado')
+    
+    Returns:
+        {'arquivo', 'tamanho', 'mtime_ns', 'hash'} com 'chunks' e 'segundos',
+        'inalterado' ou 'erro'
+    """
+    # Import tardio: PyPDF2/docx só são carregados nos processos de extração
+    from modules.document_processor import ProcessadorPeticao
+    
+    inicio = time.perf_counter()
+    try:
+        stat = Path(caminho).stat()
+        resultado = {
+            'arquivo': caminho,
+            'tamanho': stat.st_size,
+            'mtime_ns': stat.st_mtime_ns,
+            'hash': hash_arquivo(caminho, parametros_divisao(tipo_doc, tipo_lit))
+        }
+        if resultado['hash'] == hash_anterior:
+            resultado['inalterado'] = True
+            return resultado
+        
+        dados = ProcessadorPeticao().processar_arquivo(Path(caminho))
+        texto = dados['texto_completo']
+        if not texto.strip():
+            raise ValueError("documento sem texto extraível")
+        tipo_doc = detectar_tipo_doc(texto) if tipo_doc == 'auto' else tipo_doc
+        tipo_lit = tipo_lit or detectar_tipo_lit(texto)
+        resultado['chunks'] = dividir_documento(dados, caminho, tipo_doc, tipo_lit)
+    except Exception as e:
+        return {'arquivo': caminho, 'erro': f"{type(e).__name__}: {e}"}
+    resultado['segundos'] = time.perf_counter() - inicio
+    return resultado
+
+
+def listar_arquivos(caminhos: Iterable[str]) -> List[str]:
+    """Arquivos aceitos (Config.ALLOWED_FILE_TYPES) nos caminhos, diretórios percorridos recursivamente"""
+    extensoes = {f".{extensao}" for extensao in Config.ALLOWED_FILE_TYPES}
+    arquivos = set()
+    for caminho in map(Path, caminhos):
+        candidatos = caminho.rglob('*') if caminho.is_dir() else [caminho]
+        arquivos.update(
+            str(arquivo.resolve()) for arquivo in candidatos
+            if arquivo.is_file() and arquivo.suffix.lower() in extensoes
+        )
+    return sorted(arquivos)
+
+
+def pico_memoria_mb() -> Dict[str, Optional[float]]:
+    """Pico de memória residente (MB) do processo principal e dos processos filhos"""
+    if resource is None:
+        return {'principal': None, 'workers': None}
+    # ru_maxrss: KB no Linux, bytes no macOS
+    escala = 2**20 if sys.platform == 'darwin' else 2**10
+    return {
+        'principal': resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / escala,
+        'workers': resource.getrusage(resource.RUSAGE_CHILDREN).ru_maxrss / escala
+    }
+
+
+class IngestorVectorStore:
+    """Pipeline extração (pool de processos) -> encode em lote -> upsert em lote"""
+    
+    def __init__(
+        self,
+        vector_store_dir: Optional[Path] = None,
+        collection_name: Optional[str] = None,
+        motor=None,
+        lote_encode: Optional[int] = None,
+        lote_upsert: Optional[int] = None,
+        manifesto: Optional[bool] = None
+    ):
+        """
+        Args:
+            vector_store_dir: Diretório do vector store (usa o da versão ativa se None; criado se não existir)
+            collection_name: Collection de destino (usa a versão ativa se None; criada se não existir)
+            motor: Motor de embeddings (criar_motor_embedding() se None)
+            lote_encode: Textos por lote do motor (usa Config se None)
+            lote_upsert: Chunks por upsert (usa Config se None; limitado ao máximo do ChromaDB)
+            manifesto: Ingestão incremental pelo manifesto (usa Config se None)
+        """
+        ativa, diretorio_ativo = versao_ativa()
+        self.vector_store_dir = Path(vector_store_dir or diretorio_ativo)
+        self.collection_name = collection_name or ativa
+        self.lote_encode = lote_encode or Config.INGESTAO_LOTE_ENCODE
+        
+        if motor is None:
+            from modules.embedding_engines import criar_motor_embedding
+            print(f"📥 Carregando modelo de embeddings: {Config.EMBEDDING_MODEL} (motor: {Config.EMBEDDING_ENGINE})")
+            motor = criar_motor_embedding()
+        self.motor = motor
+        # Vetores guardados só valem para o mesmo modelo e motor (torch/onnx int8)
+        self.modelo = f"{getattr(motor, 'modelo', Config.EMBEDDING_MODEL)}@{getattr(motor, 'nome', Config.EMBEDDING_ENGINE)}"
+        
+        self.client = chromadb.PersistentClient(
+            path=str(self.vector_store_dir),
+            settings=Settings(anonymized_telemetry=False)
+        )
+        self.collection = self.client.get_or_create_collection(
+            name=self.collection_name,
+            metadata={'hnsw:space': Config.DISTANCE_METRIC}
+        )
+        self.lote_upsert = min(lote_upsert or Config.INGESTAO_LOTE_UPSERT, self.client.get_max_batch_size())
+        
+        manifesto = manifesto if manifesto is not None else Config.INGESTAO_MANIFESTO_ENABLED
+        self.manifesto = ManifestoIngestao(self.collection_name) if manifesto else None
+    
+    def verificar_manifesto(self) -> bool:
+        """
+        Confere uma amostra dos chunks do manifesto na collection
+        
+        Se a collection foi apagada ou reconstruída por fora, o manifesto é
+        descartado (todos os arquivos serão reprocessados, reaproveitando os
+        vetores guardados).
+        
+        Returns:
+            True se o manifesto é coerente com a collection
+        """
+        amostra = self.manifesto.amostra_chunks(AMOSTRA_VERIFICACAO)
+        if not amostra or len(self.collection.get(ids=amostra, include=[])['ids']) == len(amostra):
+            return True
+        print("⚠️  Manifesto não corresponde à collection: todos os arquivos serão reprocessados")
+        self.manifesto.esquecer_collection()
+        return False
+    
+    def remover_ausentes(self) -> int:
+        """Apaga da collection os chunks de arquivos registrados que não existem mais no disco"""
+        removidos = 0
+        for arquivo in self.manifesto.arquivos():
+            if Path(arquivo).exists():
+                continue
+            ids = self.manifesto.remover_arquivo(arquivo)
+            for i in range(0, len(ids), self.lote_upsert):
+                self.collection.delete(ids=ids[i:i + self.lote_upsert])
+            removidos += 1
+        return removidos
+    
+    def gravar(self, documentos: List[Dict]) -> Dict[str, float]:
+        """
+        Codifica e grava os chunks de documentos completos
+        
+        Com o manifesto, só chunks novos ou alterados (hash de texto +
+        metadados) são gravados, os vetores de textos já codificados são
+        reaproveitados e os chunks que o arquivo deixou de ter são apagados.
+        Arquivos sem registro no manifesto têm os chunks anteriores apagados
+        pelo metadado 'arquivo' (uma reingestão com menos partes não deixa
+        chunks órfãos).
+        
+        Returns:
+            Segundos em 'encode' e 'upsert' e contagens de chunks 'codificados',
+            'reaproveitados' (vetor guardado), 'inalterados' (sem upsert) e 'orfaos'
+        """
+        alterados, orfaos, sem_registro = [], [], []
+        for documento in documentos:
+            anteriores = self.manifesto.chunks_arquivo(documento['arquivo']) if self.manifesto else {}
+            if not anteriores:
+                sem_registro.append(documento['arquivo'])
+            novos = {chunk['id'] for chunk in documento['chunks']}
+            orfaos.extend(chunk_id for chunk_id in anteriores if chunk_id not in novos)
+            alterados.extend(
+                chunk for chunk in documento['chunks'] if anteriores.get(chunk['id']) != chunk['hash_chunk']
+            )
+        total = sum(len(documento['chunks']) for documento in documentos)
+        
+        # Vetores: guardados no manifesto pelo hash do texto; o restante é codificado
+        inicio = time.perf_counter()
+        guardados = self.manifesto.vetores(self.modelo, list({c['hash_texto'] for c in alterados})) if self.manifesto else {}
+        pendentes = {}
+        for chunk in alterados:
+            if chunk['hash_texto'] not in guardados:
+                pendentes.setdefault(chunk['hash_texto'], chunk['documento'])
+        novos_vetores = {}
+        if pendentes:
+            matriz = self.motor.encode(list(pendentes.values()), batch_size=self.lote_encode)
+            novos_vetores = dict(zip(pendentes, matriz))
+        vetores = {**guardados, **novos_vetores}
+        encode = time.perf_counter() - inicio
+        
+        inicio = time.perf_counter()
+        if sem_registro:
+            self.collection.delete(where={'arquivo': {'$in': sem_registro}})
+        for i in range(0, len(orfaos), self.lote_upsert):
+            self.collection.delete(ids=orfaos[i:i + self.lote_upsert])
+        for i in range(0, len(alterados), self.lote_upsert):
+            lote = alterados[i:i + self.lote_upsert]
+            self.collection.upsert(
+                ids=[chunk['id'] for chunk in lote],
+                embeddings=[vetores[chunk['hash_texto']] for chunk in lote],
+                documents=[chunk['documento'] for chunk in lote],
+                metadatas=[chunk['metadata'] for chunk in lote]
+            )
+        if self.manifesto:
+            self.manifesto.registrar(self.modelo, documentos, novos_vetores)
+        
+        codificados = sum(chunk['hash_texto'] in novos_vetores for chunk in alterados)
+        return {
+            'encode': encode,
+            'upsert': time.perf_counter() - inicio,
+            'codificados': codificados,
+            'reaproveitados': len(alterados) - codificados,
+            'inalterados': total - len(alterados),
+            'orfaos': len(orfaos)
+        }
+    
+    def ingerir(
+        self,
+        arquivos: List[str],
+        tipo_doc: str = 'auto',
+        tipo_lit: Optional[str] = None,
+        workers: Optional[int] = None,
+        reprocessar: bool = False
+    ) -> Dict:
+        """
+        Ingere os arquivos, gravando a cada ~lote_upsert chunks
+        
+        Args:
+            arquivos: Caminhos dos arquivos (ver listar_arquivos)
+            tipo_doc: 'contestacao', 'inicial' ou 'auto' (detectado pelo texto)
+            tipo_lit: Tipo de caso de todos os arquivos (None = detectado por keywords)
+            workers: Processos de extração (usa Config se None; <= 1 extrai no próprio processo)
+            reprocessar: Extrai e divide todos os arquivos, mesmo os inalterados no manifesto
+                (os chunks continuam sendo comparados e os vetores reaproveitados)
+            
+        Returns:
+            Relatório com contagens, tempos por etapa, vazão e pico de memória
+        """
+        workers = workers if workers is not None else Config.INGESTAO_WORKERS
+        tempos = {'extracao': 0.0, 'encode': 0.0, 'upsert': 0.0}
+        relatorio = {
+            'documentos': 0, 'chunks': 0, 'por_nivel': {1: 0, 2: 0, 3: 0}, 'erros': [],
+            'arquivos_inalterados': 0, 'arquivos_removidos': 0,
+            'codificados': 0, 'reaproveitados': 0, 'inalterados': 0, 'orfaos': 0
+        }
+        pendentes = []
+        inicio = time.perf_counter()
+        
+        # Manifesto: arquivos com tamanho e mtime registrados nem são abertos;
+        # os demais levam o hash anterior para o worker comparar
+        tarefas = [(arquivo, None) for arquivo in arquivos]
+        if self.manifesto:
+            if self.verificar_manifesto():
+                relatorio['arquivos_removidos'] = self.remover_ausentes()
+            tarefas = []
+            for arquivo in arquivos:
+                registro = None if reprocessar else self.manifesto.arquivo(arquivo)
+                if registro:
+                    stat = Path(arquivo).stat()
+                    if (stat.st_size, stat.st_mtime_ns) == tuple(registro[:2]):
+                        relatorio['arquivos_inalterados'] += 1
+                        continue
+                tarefas.append((arquivo, registro[2] if registro else None))
+        
+        def receber(resultado: Dict):
+            if 'erro' in resultado:
+                relatorio['erros'].append(resultado)
+                print(f"   ⚠️  {resultado['arquivo']}: {resultado['erro']}")
+                return
+            if resultado.get('inalterado'):
+                # Tocado (mtime novo) com o mesmo conteúdo
+                self.manifesto.atualizar_stat(resultado['arquivo'], resultado['tamanho'], resultado['mtime_ns'])
+                relatorio['arquivos_inalterados'] += 1
+                return
+            tempos['extracao'] += resultado['segundos']
+            pendentes.append(resultado)
+            if sum(len(documento['chunks']) for documento in pendentes) >= self.lote_upsert:
+                descarregar()
+        
+        def descarregar():
+            if not pendentes:
+                return
+            gravacao = self.gravar(pendentes)
+            for etapa in ('encode', 'upsert'):
+                tempos[etapa] += gravacao[etapa]
+            for contagem in ('codificados', 'reaproveitados', 'inalterados', 'orfaos'):
+                relatorio[contagem] += gravacao[contagem]
+            for documento in pendentes:
+                relatorio['documentos'] += 1
+                relatorio['chunks'] += len(documento['chunks'])
+                for chunk in documento['chunks']:
+                    relatorio['por_nivel'][chunk['metadata']['nivel']] += 1
+            pendentes.clear()
+            decorrido = time.perf_counter() - inicio
+            print(f"   📦 {relatorio['documentos']}/{len(tarefas)} documentos, "
+                  f"{relatorio['chunks']} chunks ({relatorio['documentos'] / decorrido:.1f} docs/s)")
+        
+        print(f"🚚 Ingerindo {len(tarefas)} de {len(arquivos)} arquivos em {self.collection_name} "
+              f"({max(workers, 1)} processos)")
+        if workers <= 1:
+            for arquivo, hash_anterior in tarefas:
+                receber(processar_documento(arquivo, tipo_doc, tipo_lit, hash_anterior))
+        else:
+            with ProcessPoolExecutor(max_workers=workers) as executor:
+                # Janela limitada de tarefas em voo (a memória não cresce com o
+                # corpus), com folga para a extração seguir durante encode e upsert
+                limite = max(4 * workers, self.lote_upsert // 8)
+                fila = iter(tarefas)
+                em_voo = set()
+                while True:
+                    for arquivo, hash_anterior in fila:
+                        em_voo.add(executor.submit(processar_documento, arquivo, tipo_doc, tipo_lit, hash_anterior))
+                        if len(em_voo) >= limite:
+                            break
+                    if not em_voo:
+                        break
+                    prontos, em_voo = wait(em_voo, return_when=FIRST_COMPLETED)
+                    for futuro in prontos:
+                        receber(futuro.result())
+        descarregar()
+        if self.manifesto:
+            self.manifesto.podar_vetores()
+        
+        total = time.perf_counter() - inicio
+        relatorio.update({
+            'segundos': total,
+            'docs_por_segundo': relatorio['documentos'] / total if total else 0.0,
+            'chunks_por_segundo': relatorio['chunks'] / total if total else 0.0,
+            'tempos': tempos,
+            'memoria_mb': pico_memoria_mb(),
+            'total_collection': self.collection.count()
+        })
+        return relatorio
+
+
+def imprimir_relatorio(relatorio: Dict):
+    """Resumo da ingestão no terminal"""
+    memoria = relatorio['memoria_mb']
+    formatar_mb = lambda valor: f"{valor:.0f} MB" if valor is not None else "n/d"
+    por_nivel = relatorio['por_nivel']
+    tempos = relatorio['tempos']
+    
+    print(f"\n✅ Ingestão concluída em {relatorio['segundos']:.1f} s")
+    print(f"📄 Documentos: {relatorio['documentos']} ({relatorio['docs_por_segundo']:.1f} docs/s), "
+          f"{relatorio['arquivos_inalterados']} inalterados, {relatorio['arquivos_removidos']} removidos do disco")
+    print(f"🧩 Chunks: {relatorio['chunks']} ({relatorio['chunks_por_segundo']:.1f} chunks/s) - "
+          f"nível 1: {por_nivel[1]}, nível 2: {por_nivel[2]}, nível 3: {por_nivel[3]}")
+    print(f"♻️  Chunks codificados: {relatorio['codificados']} | vetor reaproveitado: {relatorio['reaproveitados']} | "
+          f"sem alteração: {relatorio['inalterados']} | órfãos apagados: {relatorio['orfaos']}")
+    print(f"⏱️  Extração (soma dos processos): {tempos['extracao']:.1f} s | "
+          f"encode: {tempos['encode']:.1f} s | upsert: {tempos['upsert']:.1f} s")
+    print(f"💾 Pico de memória: principal {formatar_mb(memoria['principal'])}, "
+          f"maior processo de extração {formatar_mb(memoria['workers'])}")
+    print(f"📊 Total de chunks na collection: {relatorio['total_collection']}")
+    if relatorio['erros']:
+        print(f"⚠️  {len(relatorio['erros'])} arquivos com erro (ver mensagens acima)")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('caminhos', nargs='+', help='Arquivos ou diretórios (percorridos recursivamente)')
+    parser.add_argument('--tipo-doc', choices=['auto', 'contestacao', 'inicial'], default='auto',
+                        help='Tipo dos documentos (auto = detectado pelo texto)')
+    parser.add_argument('--tipo-lit', choices=sorted(Config.TIPOS_CASO) + ['GERAL'],
+                        help='Tipo de caso de todos os arquivos (padrão: detectado por keywords)')
+    parser.add_argument('--workers', type=int, default=Config.INGESTAO_WORKERS, help='Processos de extração')
+    parser.add_argument('--lote-encode', type=int, default=Config.INGESTAO_LOTE_ENCODE, help='Textos por encode')
+    parser.add_argument('--lote-upsert', type=int, default=Config.INGESTAO_LOTE_UPSERT, help='Chunks por upsert')
+    parser.add_argument('--vector-store', type=Path, help='Diretório do vector store (padrão: o da versão ativa)')
+    parser.add_argument('--collection', help='Collection de destino (padrão: a versão ativa)')
+    parser.add_argument('--nova-versao', action='store_true',
+                        help='Monta uma nova versão da collection (<base>_vN) e a ativa se validada')
+    parser.add_argument('--sem-ativar', action='store_true',
+                        help='Com --nova-versao, só monta a versão (ativar depois com modules.versoes_collection)')
+    parser.add_argument('--reprocessar', action='store_true',
+                        help='Extrai todos os arquivos, mesmo os inalterados no manifesto')
+    parser.add_argument('--sem-manifesto', action='store_true',
+                        help='Ignora o manifesto: regrava e recodifica todos os chunks')
+    args = parser.parse_args()
+    
+    arquivos = listar_arquivos(args.caminhos)
+    if not arquivos:
+        parser.error(f"nenhum arquivo {', '.join(Config.ALLOWED_FILE_TYPES)} encontrado")
+    
+    if args.nova_versao:
+        if args.vector_store or args.collection:
+            parser.error("--nova-versao define a collection e o vector store (não use com --collection/--vector-store)")
+        args.collection, args.vector_store = proxima_versao()
+        print(f"🆕 Nova versão: {args.collection} em {args.vector_store}")
+    
+    ingestor = IngestorVectorStore(
+        args.vector_store, args.collection,
+        lote_encode=args.lote_encode, lote_upsert=args.lote_upsert,
+        manifesto=False if args.sem_manifesto else None
+    )
+    imprimir_relatorio(ingestor.ingerir(arquivos, args.tipo_doc, args.tipo_lit, args.workers, args.reprocessar))
+    
+    if args.nova_versao and not args.sem_ativar:
+        try:
+            ativar_versao(ingestor.collection_name, ingestor.vector_store_dir)
+        except ValueError as e:
+            print(f"❌ {e}")
+            print(f"   A versão ativa continua a mesma; {ingestor.collection_name} ficou em {ingestor.vector_store_dir}")
+            raise SystemExit(1)
+
+
+if __name__ == "__main__":
+    main()
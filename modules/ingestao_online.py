@@ -0,0 +1,380 @@
+"""
+═══════════════════════════════════════════════════════════════════════════
+INGESTÃO ONLINE - CONTESTAÇÕES APROVADAS ENTRAM NA COLLECTION EM USO
+═══════════════════════════════════════════════════════════════════════════
+A contestação revisada e aprovada pelo advogado é o conhecimento novo mais
+valioso do sistema. Ao aprovar, o texto final é gravado em
+INGESTAO_ONLINE_APROVADAS_DIR e enfileirado numa fila SQLite, que sobrevive
+a reinícios (itens interrompidos voltam para a fila).
+
+Uma thread do processo consome a fila: divide o texto nos três níveis
+(mesma divisão de modules.ingestao), codifica e acrescenta os chunks à
+versão ativa da collection em transações pequenas, com pausas entre os
+lotes para não disputar CPU com as buscas. Os chunks novos entram na busca
+vetorial a cada transação; os índices auxiliares já carregados pelo
+retriever (BM25, citações, trechos, hierarquia, centroides) são atualizados
+na própria thread quando a fila esvazia. Até lá, as buscas seguem com os
+índices atuais em vez de reler a collection a cada transação.
+
+Os arquivos aprovados ficam registrados no manifesto da ingestão: uma
+reindexação que inclua INGESTAO_ONLINE_APROVADAS_DIR não os recodifica.
+Com VECTOR_BACKEND = 'numpy', os chunks novos só aparecem no próximo export
+(reinício ou troca de versão).
+"""
+
+import json
+import os
+import sqlite3
+import threading
+import time
+from collections import deque
+from pathlib import Path
+from typing import Dict, List, Optional
+
+import numpy as np
+
+from config.settings import Config
+from modules.ingestao import IngestorVectorStore, processar_documento
+from modules.manifesto_ingestao import hash_texto
+from modules.vector_backend import gravacao_em_andamento
+
+STATUS = ('pendente', 'processando', 'concluido', 'erro')
+
+# Tempos de indexação mantidos para a média (janela deslizante)
+MAX_AMOSTRAS_TEMPO = 1000
+
+
+class FilaIngestao:
+    """Fila durável (SQLite) de contestações aprovadas a indexar"""
+    
+    def __init__(self, diretorio: Optional[Path] = None, aprovadas_dir: Optional[Path] = None):
+        """
+        Args:
+            diretorio: Diretório da fila (usa Config.INGESTAO_ONLINE_DIR se None)
+            aprovadas_dir: Onde os textos aprovados são gravados (usa Config se None)
+        """
+        self.diretorio = Path(diretorio or Config.INGESTAO_ONLINE_DIR)
+        self.aprovadas_dir = Path(aprovadas_dir or Config.INGESTAO_ONLINE_APROVADAS_DIR)
+        self._lock = threading.Lock()
+        
+        self.diretorio.mkdir(parents=True, exist_ok=True)
+        self.aprovadas_dir.mkdir(parents=True, exist_ok=True)
+        self._conexao = sqlite3.connect(
+            str(self.diretorio / "fila.sqlite3"),
+            check_same_thread=False
+        )
+        self._conexao.executescript(
+            """
+            CREATE TABLE IF NOT EXISTS fila (
+                id INTEGER PRIMARY KEY AUTOINCREMENT,
+                arquivo TEXT NOT NULL,
+                tipo_lit TEXT,
+                metadados TEXT NOT NULL,
+                status TEXT NOT NULL,
+                tentativas INTEGER NOT NULL DEFAULT 0,
+                chunks INTEGER,
+                erro TEXT,
+                criado REAL NOT NULL,
+                atualizado REAL NOT NULL
+            );
+            CREATE INDEX IF NOT EXISTS idx_fila_status ON fila (status, id);
+            """
+        )
+        # Itens interrompidos por um reinício voltam para a fila (a indexação
+        # é idempotente: ids determinísticos + manifesto)
+        with self._conexao:
+            self._conexao.execute(
+                "UPDATE fila SET status = 'pendente', atualizado = ? WHERE status = 'processando'",
+                (time.time(),)
+            )
+    
+    def enfileirar(self, texto: str, tipo_lit: Optional[str] = None, metadados: Optional[Dict] = None) -> int:
+        """
+        Grava o texto aprovado e o coloca na fila
+        
+        Args:
+            texto: Texto final da contestação
+            tipo_lit: Tipo de caso (None = detectado por keywords na indexação)
+            metadados: Informações da aprovação guardadas com o item
+            
+        Returns:
+            Id do item na fila
+        """
+        if not texto.strip():
+            raise ValueError("Contestação sem texto")
+        
+        # Arquivo completo antes do registro na fila (temporário + os.replace)
+        agora = time.time()
+        nome = f"contestacao_{time.strftime('%Y%m%d_%H%M%S')}_{hash_texto(texto)[:8]}.txt"
+        arquivo = self.aprovadas_dir / nome
+        temporario = arquivo.with_name(f".{nome}.tmp")
+        with open(temporario, 'w', encoding='utf-8') as saida:
+            saida.write(texto)
+            saida.flush()
+            os.fsync(saida.fileno())
+        os.replace(temporario, arquivo)
+        
+        with self._lock, self._conexao:
+            cursor = self._conexao.execute(
+                "INSERT INTO fila (arquivo, tipo_lit, metadados, status, criado, atualizado) "
+                "VALUES (?, ?, ?, 'pendente', ?, ?)",
+                (str(arquivo.resolve()), tipo_lit, json.dumps(metadados or {}, ensure_ascii=False, default=str),
+                 agora, agora)
+            )
+        return cursor.lastrowid
+    
+    def proximo(self) -> Optional[Dict]:
+        """Reserva o item pendente mais antigo ('processando') ou retorna None"""
+        with self._lock, self._conexao:
+            linha = self._conexao.execute(
+                "SELECT id, arquivo, tipo_lit, metadados, tentativas FROM fila "
+                "WHERE status = 'pendente' ORDER BY id LIMIT 1"
+            ).fetchone()
+            if linha is None:
+                return None
+            # Condição no status: outro processo pode ter reservado o item antes
+            reservado = self._conexao.execute(
+                "UPDATE fila SET status = 'processando', tentativas = tentativas + 1, atualizado = ? "
+                "WHERE id = ? AND status = 'pendente'",
+                (time.time(), linha[0])
+            ).rowcount
+        if not reservado:
+            return None
+        return {
+            'id': linha[0],
+            'arquivo': linha[1],
+            'tipo_lit': linha[2],
+            'metadados': json.loads(linha[3]),
+            'tentativas': linha[4] + 1
+        }
+    
+    def concluir(self, item_id: int, chunks: int):
+        """Marca o item como indexado"""
+        with self._lock, self._conexao:
+            self._conexao.execute(
+                "UPDATE fila SET status = 'concluido', chunks = ?, erro = NULL, atualizado = ? WHERE id = ?",
+                (chunks, time.time(), item_id)
+            )
+    
+    def falhar(self, item_id: int, erro: str, tentativas_max: Optional[int] = None) -> bool:
+        """
+        Registra uma falha: o item volta para a fila até esgotar as tentativas
+        
+        Returns:
+            True se o item foi marcado como 'erro' (não será mais tentado)
+        """
+        tentativas_max = tentativas_max or Config.INGESTAO_ONLINE_TENTATIVAS
+        with self._lock, self._conexao:
+            self._conexao.execute(
+                "UPDATE fila SET status = CASE WHEN tentativas >= ? THEN 'erro' ELSE 'pendente' END, "
+                "erro = ?, atualizado = ? WHERE id = ?",
+                (tentativas_max, erro, time.time(), item_id)
+            )
+            status = self._conexao.execute("SELECT status FROM fila WHERE id = ?", (item_id,)).fetchone()
+        return status is not None and status[0] == 'erro'
+    
+    def item(self, item_id: int) -> Optional[Dict]:
+        """Situação de um item ({'status', 'chunks', 'erro', 'tentativas'}) ou None"""
+        with self._lock:
+            linha = self._conexao.execute(
+                "SELECT status, chunks, erro, tentativas FROM fila WHERE id = ?", (item_id,)
+            ).fetchone()
+        if linha is None:
+            return None
+        return {'status': linha[0], 'chunks': linha[1], 'erro': linha[2], 'tentativas': linha[3]}
+    
+    def contagens(self) -> Dict[str, int]:
+        """Itens por status"""
+        with self._lock:
+            contagens = dict(self._conexao.execute("SELECT status, COUNT(*) FROM fila GROUP BY status"))
+        return {status: contagens.get(status, 0) for status in STATUS}
+    
+    def erros(self, limite: int = 5) -> List[Dict]:
+        """Itens marcados como erro, os mais recentes primeiro"""
+        with self._lock:
+            linhas = self._conexao.execute(
+                "SELECT id, arquivo, erro FROM fila WHERE status = 'erro' ORDER BY id DESC LIMIT ?", (limite,)
+            ).fetchall()
+        return [{'id': item_id, 'arquivo': arquivo, 'erro': erro} for item_id, arquivo, erro in linhas]
+
+
+class _MotorEspacado:
+    """Motor que codifica em lotes pequenos, com pausa entre eles (cede CPU às buscas)"""
+    
+    def __init__(self, motor, lote: int, pausa: float):
+        self.motor = motor
+        self.lote = lote
+        self.pausa = pausa
+        # Mesma chave de modelo dos vetores guardados no manifesto
+        self.modelo = getattr(motor, 'modelo', Config.EMBEDDING_MODEL)
+        self.nome = getattr(motor, 'nome', Config.EMBEDDING_ENGINE)
+    
+    def encode(self, textos: List[str], batch_size: int = 32) -> np.ndarray:
+        vetores = []
+        for inicio in range(0, len(textos), self.lote):
+            if inicio:
+                time.sleep(self.pausa)
+            vetores.append(np.atleast_2d(self.motor.encode(textos[inicio:inicio + self.lote], batch_size=self.lote)))
+        return np.vstack(vetores)
+
+
+class IndexadorOnline:
+    """Thread que consome a fila de aprovadas e acrescenta os chunks à collection ativa"""
+    
+    def __init__(
+        self,
+        retriever,
+        fila: Optional[FilaIngestao] = None,
+        lote: Optional[int] = None,
+        pausa: Optional[float] = None,
+        intervalo: Optional[float] = None
+    ):
+        """
+        Args:
+            retriever: RAGRetriever em uso (motor de embeddings, versão ativa e índices auxiliares)
+            fila: Fila de aprovadas (FilaIngestao() se None)
+            lote: Chunks por encode e por transação de upsert (usa Config se None)
+            pausa: Segundos entre lotes (usa Config se None)
+            intervalo: Espera entre consultas à fila vazia (usa Config se None)
+        """
+        self.retriever = retriever
+        self.fila = fila or FilaIngestao()
+        self.lote = lote or Config.INGESTAO_ONLINE_LOTE
+        self.pausa = pausa if pausa is not None else Config.INGESTAO_ONLINE_PAUSA
+        self.intervalo = intervalo if intervalo is not None else Config.INGESTAO_ONLINE_INTERVALO
+        
+        self._motor = _MotorEspacado(retriever.embedding_model, self.lote, self.pausa)
+        self._ingestores = {}  # (collection, diretório) -> IngestorVectorStore
+        self._acordar = threading.Event()
+        self._ocioso = threading.Event()
+        self._lock = threading.Lock()
+        self._ativo = True
+        
+        # Métricas
+        self.documentos = 0
+        self.chunks = 0
+        self.falhas = 0
+        self._tempos = deque(maxlen=MAX_AMOSTRAS_TEMPO)
+        
+        self._worker = threading.Thread(
+            target=self._processar,
+            name='indexador-online',
+            daemon=True
+        )
+        self._worker.start()
+    
+    def aprovar(self, texto: str, tipo_lit: Optional[str] = None, metadados: Optional[Dict] = None) -> int:
+        """Enfileira uma contestação aprovada e acorda a thread; retorna o id do item"""
+        if tipo_lit not in Config.TIPOS_CASO:
+            tipo_lit = None  # 'GERAL' ou não classificado: detectado por keywords
+        item_id = self.fila.enfileirar(texto, tipo_lit, metadados)
+        with self._lock:
+            self._ocioso.clear()
+            self._acordar.set()
+        return item_id
+    
+    def aguardar(self, timeout: Optional[float] = None) -> bool:
+        """Espera a fila esvaziar e os índices auxiliares serem atualizados"""
+        return self._ocioso.wait(timeout)
+    
+    def _processar(self):
+        """Loop da thread: esvazia a fila, atualiza os índices auxiliares e espera novos itens"""
+        while self._ativo:
+            item = self.fila.proximo()
+            if item is None:
+                with self._lock:
+                    if not self._acordar.is_set():
+                        self._ocioso.set()
+                self._acordar.wait(self.intervalo)
+                self._acordar.clear()
+                continue
+            
+            # Durante a gravação as buscas não releem a collection para os
+            # índices auxiliares (seguem com os atuais); eles são atualizados
+            # uma vez, nesta thread, quando a fila esvazia
+            self._ocioso.clear()
+            with gravacao_em_andamento(self.retriever.vector_store_dir, self.retriever.collection_name):
+                while item is not None:
+                    self._processar_item(item)
+                    item = self.fila.proximo() if self._ativo else None
+                self._atualizar_indices()
+    
+    def _processar_item(self, item: Dict):
+        """Indexa um item da fila, registrando conclusão ou falha"""
+        inicio = time.perf_counter()
+        try:
+            chunks = self._indexar(item)
+        except Exception as e:
+            desistiu = self.fila.falhar(item['id'], f"{type(e).__name__}: {e}")
+            with self._lock:
+                self.falhas += 1
+            print(f"⚠️  Ingestão online de {Path(item['arquivo']).name} falhou "
+                  f"(tentativa {item['tentativas']}{', desistindo' if desistiu else ''}): {e}")
+            self._acordar.wait(self.intervalo)  # Nova tentativa sem girar em falso
+            self._acordar.clear()
+            return
+        
+        self.fila.concluir(item['id'], chunks)
+        with self._lock:
+            self.documentos += 1
+            self.chunks += chunks
+            self._tempos.append(time.perf_counter() - inicio)
+        print(f"📥 Contestação aprovada indexada: {Path(item['arquivo']).name} ({chunks} chunks)")
+    
+    def _indexar(self, item: Dict) -> int:
+        """Divide, codifica e grava um item na versão ativa; retorna o número de chunks"""
+        resultado = processar_documento(item['arquivo'], 'contestacao', item['tipo_lit'])
+        if 'erro' in resultado:
+            raise ValueError(resultado['erro'])
+        self._ingestor().gravar([resultado])
+        return len(resultado['chunks'])
+    
+    def _ingestor(self) -> IngestorVectorStore:
+        """Ingestor da versão em uso pelo retriever (um por versão)"""
+        chave = (self.retriever.collection_name, str(self.retriever.vector_store_dir))
+        if chave not in self._ingestores:
+            self._ingestores[chave] = IngestorVectorStore(
+                self.retriever.vector_store_dir,
+                self.retriever.collection_name,
+                motor=self._motor,
+                lote_encode=self.lote,
+                lote_upsert=self.lote
+            )
+        return self._ingestores[chave]
+    
+    def _atualizar_indices(self):
+        """Atualiza, nesta thread, os índices auxiliares que o retriever já carregou"""
+        retriever = self.retriever
+        indices = [
+            retriever.indice_lexical, retriever.indice_citacoes,
+            retriever.indice_trechos, retriever.indice_hierarquia, retriever.particoes
+        ]
+        try:
+            for indice in indices:
+                if indice is not None and indice.carregado():
+                    indice.sincronizar()
+            if retriever.classificador.carregado():
+                retriever.classificador.carregar()
+        except Exception as e:
+            print(f"⚠️  Erro ao atualizar índices auxiliares (atualizados na próxima busca): {e}")
+    
+    def estatisticas(self) -> Dict:
+        """Itens da fila por status, documentos/chunks indexados e tempo médio por documento"""
+        with self._lock:
+            tempos = list(self._tempos)
+            return {
+                'fila': self.fila.contagens(),
+                'documentos': self.documentos,
+                'chunks': self.chunks,
+                'falhas': self.falhas,
+                'tempo_medio_s': sum(tempos) / len(tempos) if tempos else 0.0,
+                'erros': self.fila.erros()
+            }
+    
+    def encerrar(self, timeout: Optional[float] = None):
+        """Termina o item em andamento e encerra a thread (pendentes ficam na fila)"""
+        if not self._ativo:
+            return
+        self._ativo = False
+        self._acordar.set()
+        self._worker.join(timeout)
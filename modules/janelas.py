@@ -0,0 +1,47 @@
+"""
+═══════════════════════════════════════════════════════════════════════════
+JANELAS DE PASSAGEM - SEGMENTAÇÃO DA PETIÇÃO PARA CONSULTA MULTI-VETOR
+═══════════════════════════════════════════════════════════════════════════
+Divide textos longos em janelas sobrepostas (cada uma dentro do limite de
+entrada do modelo de embeddings) e limita quantas entram na consulta.
+"""
+
+import re
+from typing import List
+
+
+def segmentar_janelas(texto: str, tamanho: int, sobreposicao: int = 0) -> List[str]:
+    """
+    Divide o texto em janelas de até `tamanho` caracteres, cortadas em espaços,
+    com `sobreposicao` caracteres repetidos entre janelas vizinhas
+    """
+    texto = re.sub(r'\s+', ' ', texto or '').strip()
+    passo = max(1, tamanho - sobreposicao)
+    
+    janelas = []
+    inicio = 0
+    while inicio < len(texto):
+        fim = min(len(texto), inicio + tamanho)
+        if fim < len(texto):
+            # Recuar até o último espaço para não cortar palavras
+            espaco = texto.rfind(' ', inicio + passo // 2, fim)
+            if espaco > inicio:
+                fim = espaco
+        janelas.append(texto[inicio:fim].strip())
+        if fim >= len(texto):
+            break
+        proximo = max(fim - sobreposicao, inicio + 1)
+        espaco = texto.find(' ', proximo, fim)
+        inicio = espaco + 1 if espaco != -1 else proximo
+    
+    return [janela for janela in janelas if janela]
+
+
+def selecionar_janelas(janelas: List[str], maximo: int) -> List[str]:
+    """Até `maximo` janelas igualmente espaçadas (cobre início, meio e fim do documento)"""
+    if len(janelas) <= maximo:
+        return list(janelas)
+    if maximo == 1:
+        return [janelas[0]]
+    indices = sorted({round(i * (len(janelas) - 1) / (maximo - 1)) for i in range(maximo)})
+    return [janelas[i] for i in indices]
@@ -0,0 +1,352 @@
+"""
+═══════════════════════════════════════════════════════════════════════════
+ÍNDICE LEXICAL - BM25 SOBRE OS CHUNKS DA COLLECTION
+═══════════════════════════════════════════════════════════════════════════
+Complementa a busca vetorial em consultas que dependem de tokens exatos
+("Lei 9.656/98", "art. 13", "Súmula 302", "home care").
+
+Tokenização para português jurídico: minúsculas, sem acentos, números
+de lei normalizados (9.656/98 -> 9656/98), stopwords removidas e plurais
+reduzidos ao singular. O índice é persistido em disco e atualizado
+incrementalmente (só chunks novos/alterados são re-tokenizados).
+"""
+
+import hashlib
+import json
+import re
+import threading
+import unicodedata
+from collections import Counter
+from pathlib import Path
+from typing import Dict, List, Optional
+
+import numpy as np
+
+from config.settings import Config
+from modules.vector_backend import assinatura_vector_store, em_gravacao
+
+ARQUIVO_INDICE = "indice.json"
+ARQUIVO_MANIFESTO = "manifesto.json"
+
+# Alterar quando a tokenização mudar (força re-tokenizar todo o índice)
+VERSAO_TOKENIZADOR = 1
+
+# Campos de metadados usados nos filtros de nível
+CAMPOS_FILTRO = ('nivel', 'tipo_lit', 'tipo_doc')
+
+STOPWORDS = {
+    'de', 'da', 'do', 'das', 'dos', 'a', 'o', 'as', 'os', 'e', 'em', 'no', 'na',
+    'nos', 'nas', 'um', 'uma', 'uns', 'umas', 'por', 'pelo', 'pela', 'pelos',
+    'pelas', 'para', 'pra', 'com', 'sem', 'que', 'se', 'ao', 'aos', 'ou', 'como',
+    'mais', 'mas', 'foi', 'ser', 'sao', 'esta', 'este', 'isso', 'isto', 'esse',
+    'essa', 'sua', 'seu', 'suas', 'seus', 'ja', 'nao', 'tem', 'ha', 'entre',
+    'sobre', 'ate', 'apos', 'quando', 'qual', 'quais', 'onde', 'nem', 'lhe',
+    'sendo', 'pois', 'assim', 'tambem', 'bem', 'ainda', 'cujo', 'cuja'
+}
+
+# Números (com separadores de milhar e barras: 9.656/98, 13, 1.000,00) ou palavras
+_PADRAO_TOKEN = re.compile(r"\d+(?:[.,/-]\d+)*|[a-z]+")
+_PONTO_MILHAR = re.compile(r"(?<=\d)\.(?=\d{3}(?!\d))")
+
+# Plurais -> singular (aplicados a palavras com mais de 4 letras)
+_PLURAIS = (
+    ('oes', 'ao'), ('aes', 'ao'), ('ais', 'al'), ('eis', 'el'),
+    ('ois', 'ol'), ('res', 'r'), ('zes', 'z'), ('ns', 'm'), ('s', '')
+)
+
+
+def _singular(palavra: str) -> str:
+    """Reduz plurais regulares ao singular (normalização leve, sem stemmer)"""
+    if len(palavra) <= 4 or palavra.endswith(('ss', 'us', 'is')):
+        return palavra
+    for sufixo, troca in _PLURAIS:
+        if palavra.endswith(sufixo):
+            return palavra[:-len(sufixo)] + troca
+    return palavra
+
+
+def tokenizar(texto: str) -> List[str]:
+    """Tokeniza texto jurídico em português para o BM25"""
+    texto = unicodedata.normalize('NFKD', texto.lower())
+    texto = ''.join(c for c in texto if not unicodedata.combining(c))
+    
+    tokens = []
+    for token in _PADRAO_TOKEN.findall(texto):
+        if token[0].isdigit():
+            # 9.656/98 -> 9656/98 (citações com e sem ponto de milhar)
+            numero = _PONTO_MILHAR.sub('', token).rstrip('.,/-')
+            tokens.append(numero)
+            if '/' in numero:
+                # Número da lei sozinho: casa 9.656/98 com 9.656/1998
+                tokens.append(numero.split('/', 1)[0])
+        elif len(token) > 1 and token not in STOPWORDS:
+            tokens.append(_singular(token))
+    return tokens
+
+
+def _hash(texto: str) -> str:
+    """Hash do conteúdo do chunk (detecta documentos alterados com o mesmo id)"""
+    return hashlib.sha1(texto.encode('utf-8')).hexdigest()
+
+
+class IndiceBM25:
+    """Índice BM25 persistido dos chunks da collection"""
+    
+    def __init__(
+        self,
+        collection,
+        vector_store_dir: Optional[Path] = None,
+        diretorio: Optional[Path] = None
+    ):
+        """
+        Args:
+            collection: Collection (ChromaDB ou NumpyVectorStore) com os documentos
+            vector_store_dir: Diretório do vector store (usa Config se None)
+            diretorio: Diretório do índice (usa Config.BM25_DIR se None)
+        """
+        self.collection = collection
+        self.vector_store_dir = Path(vector_store_dir or Config.VECTOR_STORE_DIR)
+        self.diretorio = Path(diretorio or Config.BM25_DIR) / self.collection.name
+        self.k1 = Config.BM25_K1
+        self.b = Config.BM25_B
+        
+        self._lock = threading.Lock()
+        self._documentos = {}  # id -> {'hash', 'termos': {termo: tf}, 'tamanho', campos de filtro}
+        self._manifesto = {}
+        self._assinatura = None
+        self._compilado = None
+    
+    # ═══════════════════════════════════════════════════════════════════════
+    # Busca
+    # ═══════════════════════════════════════════════════════════════════════
+    
+    def buscar(
+        self,
+        query_text: str,
+        n_results: int = 10,
+        where: Optional[Dict] = None
+    ) -> List[Dict]:
+        """
+        Busca BM25
+        
+        Args:
+            query_text: Texto da query
+            n_results: Número de resultados
+            where: Filtro de igualdade no formato do ChromaDB ({'campo': v} ou {'$and': [...]})
+            
+        Returns:
+            Lista de {'id', 'score'} ordenada por score (só chunks com score > 0)
+        """
+        self.sincronizar()
+        compilado = self._compilado
+        if compilado is None or not compilado['ids']:
+            return []
+        
+        scores = np.zeros(len(compilado['ids']), dtype=np.float32)
+        for termo in set(tokenizar(query_text)):
+            postings = compilado['postings'].get(termo)
+            if postings is None:
+                continue
+            indices, tfs = postings
+            idf = compilado['idf'][termo]
+            normalizacao = self.k1 * (1 - self.b + self.b * compilado['tamanhos'][indices] / compilado['tamanho_medio'])
+            scores[indices] += idf * tfs * (self.k1 + 1) / (tfs + normalizacao)
+        
+        mascara = self._mascara(compilado, where)
+        if mascara is not None:
+            scores[~mascara] = 0.0
+        
+        positivos = np.flatnonzero(scores > 0)
+        if len(positivos) > n_results:
+            positivos = positivos[np.argpartition(-scores[positivos], n_results - 1)[:n_results]]
+        ordem = positivos[np.argsort(-scores[positivos], kind='stable')]
+        
+        return [{'id': compilado['ids'][i], 'score': float(scores[i])} for i in ordem]
+    
+    @staticmethod
+    def _mascara(compilado: Dict, where: Optional[Dict]) -> Optional[np.ndarray]:
+        """Máscara booleana de um filtro de igualdade sobre os campos de filtro"""
+        if not where:
+            return None
+        
+        condicoes = where['$and'] if '$and' in where else [where]
+        mascara = np.ones(len(compilado['ids']), dtype=bool)
+        for condicao in condicoes:
+            for campo, valor in condicao.items():
+                if isinstance(valor, dict):
+                    valor = valor.get('$eq')
+                if campo not in compilado['campos']:
+                    raise ValueError(f"Campo de filtro não indexado no BM25: {campo}")
+                mascara &= compilado['campos'][campo] == valor
+        return mascara
+    
+    # ═══════════════════════════════════════════════════════════════════════
+    # Atualização
+    # ═══════════════════════════════════════════════════════════════════════
+    
+    def carregado(self) -> bool:
+        """Índice já carregado (por uma busca ou por sincronizar)"""
+        return self._assinatura is not None
+    
+    def sincronizar(self):
+        """Carrega o índice e o atualiza se a collection mudou"""
+        assinatura = assinatura_vector_store(self.vector_store_dir, self.collection.name)
+        total = self.collection.count()
+        if self._assinatura == (assinatura, total):
+            return
+        if self._assinatura is not None and (
+            self._lock.locked() or em_gravacao(self.vector_store_dir, self.collection.name)
+        ):
+            return  # Gravação ou atualização em andamento: as buscas seguem com o índice atual
+        
+        with self._lock:
+            if self._assinatura == (assinatura, total):
+                return
+            
+            if self._assinatura is None:
+                self._ler_disco()
+                if self._manifesto.get('assinatura') == assinatura and len(self._documentos) == total:
+                    self._assinatura = (assinatura, total)
+                    self._compilar()
+                    return
+            
+            self._sincronizar_collection()
+            self._assinatura = (assinatura, total)
+            self._salvar(assinatura)
+    
+    def _sincronizar_collection(self):
+        """Re-tokeniza só os chunks novos ou alterados e remove os excluídos"""
+        todos = self.collection.get(include=['documents', 'metadatas'])
+        
+        novos, alterados = 0, 0
+        presentes = set()
+        for chunk_id, documento, meta in zip(todos['ids'], todos['documents'], todos['metadatas']):
+            presentes.add(chunk_id)
+            documento = documento or ""
+            atual = self._documentos.get(chunk_id)
+            if atual is not None and atual['hash'] == _hash(documento):
+                continue
+            novos += atual is None
+            alterados += atual is not None
+            self._indexar(chunk_id, documento, meta)
+        
+        removidos = [chunk_id for chunk_id in self._documentos if chunk_id not in presentes]
+        for chunk_id in removidos:
+            del self._documentos[chunk_id]
+        
+        if novos or alterados or removidos:
+            print(f"🔤 Índice BM25 atualizado: {novos} novos, {alterados} alterados, {len(removidos)} removidos")
+        self._compilar()
+    
+    def atualizar(self, ids: List[str], documentos: List[str], metadatas: List[Dict]):
+        """Indexa (ou re-indexa) chunks explicitamente, sem reler a collection"""
+        with self._lock:
+            for chunk_id, documento, meta in zip(ids, documentos, metadatas):
+                self._indexar(chunk_id, documento or "", meta)
+            self._compilar()
+    
+    def remover(self, ids: List[str]):
+        """Remove chunks do índice"""
+        with self._lock:
+            for chunk_id in ids:
+                self._documentos.pop(chunk_id, None)
+            self._compilar()
+    
+    def _indexar(self, chunk_id: str, documento: str, meta: Dict):
+        """Tokeniza e registra um chunk"""
+        tokens = tokenizar(documento)
+        entrada = {
+            'hash': _hash(documento),
+            'termos': dict(Counter(tokens)),
+            'tamanho': len(tokens)
+        }
+        for campo in CAMPOS_FILTRO:
+            entrada[campo] = (meta or {}).get(campo)
+        self._documentos[chunk_id] = entrada
+    
+    def _compilar(self):
+        """Monta postings (arrays NumPy por termo), IDF e colunas de filtro"""
+        ids = list(self._documentos)
+        entradas = [self._documentos[chunk_id] for chunk_id in ids]
+        
+        postings = {}
+        for indice, entrada in enumerate(entradas):
+            for termo, tf in entrada['termos'].items():
+                postings.setdefault(termo, ([], []))
+                postings[termo][0].append(indice)
+                postings[termo][1].append(tf)
+        
+        total = len(ids)
+        tamanhos = np.array([entrada['tamanho'] for entrada in entradas], dtype=np.float32)
+        
+        self._compilado = {
+            'ids': ids,
+            'postings': {
+                termo: (np.array(indices, dtype=np.int64), np.array(tfs, dtype=np.float32))
+                for termo, (indices, tfs) in postings.items()
+            },
+            # IDF do BM25 (variante sempre positiva)
+            'idf': {
+                termo: float(np.log(1 + (total - len(indices) + 0.5) / (len(indices) + 0.5)))
+                for termo, (indices, _) in postings.items()
+            },
+            'tamanhos': tamanhos,
+            'tamanho_medio': float(tamanhos.mean()) if total and tamanhos.mean() > 0 else 1.0,
+            'campos': {
+                campo: np.array([entrada[campo] for entrada in entradas], dtype=object)
+                for campo in CAMPOS_FILTRO
+            }
+        }
+    
+    # ═══════════════════════════════════════════════════════════════════════
+    # Persistência
+    # ═══════════════════════════════════════════════════════════════════════
+    
+    def _ler_disco(self):
+        """Lê índice e manifesto persistidos (se existirem)"""
+        self._manifesto = {}
+        indice = self.diretorio / ARQUIVO_INDICE
+        manifesto = self.diretorio / ARQUIVO_MANIFESTO
+        if indice.exists() and manifesto.exists():
+            self._manifesto = json.loads(manifesto.read_text(encoding='utf-8'))
+            if self._manifesto.get('versao_tokenizador') == VERSAO_TOKENIZADOR:
+                self._documentos = json.loads(indice.read_text(encoding='utf-8'))
+            else:
+                self._manifesto = {}
+    
+    def _salvar(self, assinatura: str):
+        """Persiste índice e manifesto (manifesto por último)"""
+        self.diretorio.mkdir(parents=True, exist_ok=True)
+        (self.diretorio / ARQUIVO_INDICE).write_text(
+            json.dumps(self._documentos, ensure_ascii=False),
+            encoding='utf-8'
+        )
+        self._manifesto = {
+            'assinatura': assinatura,
+            'versao_tokenizador': VERSAO_TOKENIZADOR,
+            'total_chunks': len(self._documentos),
+            'termos': len(self._compilado['postings']) if self._compilado else 0
+        }
+        (self.diretorio / ARQUIVO_MANIFESTO).write_text(
+            json.dumps(self._manifesto, ensure_ascii=False, indent=2),
+            encoding='utf-8'
+        )
+
+
+def fundir_rrf(rankings: List[List[str]], k: Optional[int] = None) -> List[tuple]:
+    """
+    Reciprocal Rank Fusion de várias listas ordenadas de ids
+    
+    Args:
+        rankings: Listas de ids (melhor primeiro)
+        k: Constante do RRF (usa Config.RRF_K se None)
+        
+    Returns:
+        Lista de (id, score) ordenada por score
+    """
+    k = k if k is not None else Config.RRF_K
+    scores = {}
+    for ranking in rankings:
+        for posicao, chunk_id in enumerate(ranking, start=1):
+            scores[chunk_id] = scores.get(chunk_id, 0.0) + 1.0 / (k + posicao)
+    return sorted(scores.items(), key=lambda item: item[1], reverse=True)
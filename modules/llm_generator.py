@@ -2,7 +2,8 @@
 ═══════════════════════════════════════════════════════════════════════════
 CONTEXT BUILDER + LLM GENERATOR
 ═══════════════════════════════════════════════════════════════════════════
-Constrói contexto RAG otimizado e gera contestação via Claude API
+Constrói contexto RAG otimizado, formata o prompt (templates em
+config/prompts.py) e gera contestação via Claude API
 """
 
 import os
@@ -10,7 +11,13 @@ from typing import Dict, List, Optional
 import anthropic
 
 from config.settings import Config
-from config.prompts import SYSTEM_PROMPT, construir_prompt_usuario
+from config.prompts import (
+    SYSTEM_PROMPT,
+    USER_PROMPT_TEMPLATE,
+    SECAO_POR_PEDIDO,
+    INSTRUCAO_POR_PEDIDO
+)
+from modules.trechos import trecho
 
 class ContextBuilder:
     """Constrói contexto RAG otimizado para o prompt"""
@@ -46,7 +53,9 @@ class ContextBuilder:
             'especificos': self._extrair_chunks_especificos(
                 resultado_rag['nivel_2'],
                 dados_peticao['tipo_caso']
-            )
+            ),
+            # Contexto de cada pedido/fato (retrieval_por_pedido), se recuperado
+            'por_pedido': resultado_rag.get('por_pedido')
         }
         
         return contexto
@@ -70,6 +79,198 @@ class ContextBuilder:
         return especificos[:5]  # Top 5
 
 
+def formatar_contestacoes_similares(chunks_nivel_1, chunks_nivel_2):
+    """Formata chunks recuperados para inclusão no prompt"""
+    
+    resultado = []
+    
+    # Nível 1 - Contexto global
+    if chunks_nivel_1:
+        resultado.append("### Documentos Similares (Contexto Global)\n")
+        for i, chunk in enumerate(chunks_nivel_1[:5], 1):  # Top 5
+            resultado.append(f"**Documento {i}** (Similaridade: {chunk['similaridade']:.2%})")
+            resultado.append(f"Tipo: {chunk['metadata'].get('tipo_lit', 'N/A')}")
+            resultado.append(f"```\n{trecho(chunk, 500)}...\n```\n")
+    
+    # Nível 2 - Seções específicas
+    if chunks_nivel_2:
+        resultado.append("\n### Seções Processuais Relevantes\n")
+        for i, chunk in enumerate(chunks_nivel_2[:8], 1):  # Top 8
+            # Seções trazidas pela expansão hierárquica continuam o trecho anterior
+            relacao = (chunk.get('expansao') or {}).get('relacao')
+            adjacente = f" — seção {relacao} do mesmo documento" if relacao in ('anterior', 'seguinte') else ""
+            resultado.append(f"**Trecho {i}** (Similaridade: {chunk['similaridade']:.2%}){adjacente}")
+            resultado.append(f"Seção: {chunk['metadata'].get('secao', 'N/A')}")
+            resultado.append(f"```\n{trecho(chunk, 400)}...\n```\n")
+    
+    return "\n".join(resultado) if resultado else "Nenhum documento similar encontrado."
+
+
+def formatar_fundamentacao_juridica(chunks_nivel_3):
+    """Formata chunks de fundamentação jurídica"""
+    
+    if not chunks_nivel_3:
+        return "Nenhuma fundamentação jurídica específica recuperada."
+    
+    resultado = []
+    
+    # Agrupar por tipo
+    artigos = []
+    precedentes = []
+    outros = []
+    
+    grupos = {'dispositivo': artigos, 'precedente': precedentes, 'argumento': outros}
+    
+    for chunk in chunks_nivel_3:
+        # Categoria calculada uma vez na indexação de citações
+        categoria = chunk.get('categoria')
+        if categoria in grupos:
+            grupos[categoria].append(chunk)
+            continue
+        
+        conteudo = (chunk.get('conteudo') or trecho(chunk, 500)).lower()
+        if 'art.' in conteudo or 'artigo' in conteudo:
+            artigos.append(chunk)
+        elif 'jurisprudência' in conteudo or 'acórdão' in conteudo:
+            precedentes.append(chunk)
+        else:
+            outros.append(chunk)
+    
+    # Formatação
+    if artigos:
+        resultado.append("### Dispositivos Legais Aplicáveis\n")
+        for chunk in artigos[:5]:
+            resultado.append(f"```\n{trecho(chunk, 300)}...\n```\n")
+    
+    if precedentes:
+        resultado.append("\n### Precedentes Jurisprudenciais\n")
+        for chunk in precedentes[:4]:
+            resultado.append(f"```\n{trecho(chunk, 300)}...\n```\n")
+    
+    if outros:
+        resultado.append("\n### Argumentação Jurídica\n")
+        for chunk in outros[:3]:
+            resultado.append(f"```\n{trecho(chunk, 300)}...\n```\n")
+    
+    return "\n".join(resultado)
+
+
+def formatar_argumentos_tipo_caso(tipo_caso, chunks_especificos):
+    """Formata argumentos específicos do tipo de caso"""
+    
+    from config.settings import Config
+    
+    info_tipo = Config.get_tipo_caso_info(tipo_caso)
+    
+    resultado = [
+        f"### Tipo de Caso: {info_tipo['nome']}",
+        f"{info_tipo['descricao']}\n",
+        "**Argumentos de Defesa Típicos:**\n"
+    ]
+    
+    if chunks_especificos:
+        for i, chunk in enumerate(chunks_especificos[:5], 1):
+            resultado.append(f"{i}. {trecho(chunk, 250)}...")
+    else:
+        resultado.append("Use os argumentos gerais presentes nas contestações similares recuperadas.")
+    
+    return "\n".join(resultado)
+
+
+def formatar_contexto_por_pedido(por_pedido):
+    """Formata o contexto recuperado para cada pedido e fato da petição"""
+    
+    if not por_pedido or not (por_pedido.get('pedidos') or por_pedido.get('fatos')):
+        return "Nenhum contexto específico por pedido recuperado."
+    
+    rotulos_categoria = {'dispositivo': 'Dispositivo', 'precedente': 'Precedente', 'argumento': 'Argumento'}
+    resultado = []
+    # Trecho já exibido -> rótulo do item em que apareceu (o corpus tem
+    # chunks de mesmo conteúdo em documentos diferentes)
+    exibidos = {}
+    
+    for titulo, rotulo, itens in [
+        ("### Pedidos do Autor\n", "Pedido", por_pedido.get('pedidos', [])),
+        ("\n### Fatos Alegados\n", "Fato", por_pedido.get('fatos', []))
+    ]:
+        if not itens:
+            continue
+        resultado.append(titulo)
+        
+        for i, item in enumerate(itens, 1):
+            item_rotulo = f"{rotulo} {i}"
+            resultado.append(f"**{item_rotulo}:** {item['texto'][:300]}")
+            
+            # Precedentes primeiro: são o que a refutação do pedido cita
+            nivel_3 = sorted(item.get('nivel_3', []), key=lambda c: c.get('categoria') != 'precedente')
+            for chunk in item.get('nivel_2', []) + nivel_3:
+                if chunk['nivel'] == 3:
+                    tipo = rotulos_categoria.get(chunk.get('categoria'), 'Fundamentação')
+                else:
+                    tipo = "Contestação similar"
+                texto = trecho(chunk, 300)
+                if texto in exibidos:
+                    if exibidos[texto] != item_rotulo:
+                        resultado.append(f"- {tipo} (similaridade {chunk['similaridade']:.2%}): ver {exibidos[texto]}")
+                    continue
+                exibidos[texto] = item_rotulo
+                resultado.append(f"- {tipo} (similaridade {chunk['similaridade']:.2%}):")
+                resultado.append(f"```\n{texto}...\n```")
+            
+            if not item.get('nivel_2') and not item.get('nivel_3'):
+                resultado.append("- Nenhum trecho específico recuperado.")
+            resultado.append("")
+    
+    return "\n".join(resultado)
+
+
+def construir_prompt_usuario(dados_peticao, contexto_rag):
+    """Constrói o prompt do usuário com todos os dados"""
+    
+    # Formatar elementos factuais
+    elementos = "\n".join([f"- {elem}" for elem in dados_peticao.get('elementos_facticos', [])])
+    
+    # Formatar pedidos
+    pedidos = "\n".join([f"- {ped}" for ped in dados_peticao.get('pedidos', [])])
+    
+    # Valor da causa
+    valor = dados_peticao.get('valor_causa')
+    valor_info = f"\n## Valor da Causa\n{valor}\n" if valor else ""
+    
+    # Contexto por pedido (só quando o retrieval por pedido rodou)
+    por_pedido = contexto_rag.get('por_pedido')
+    tem_por_pedido = bool(por_pedido and (por_pedido.get('pedidos') or por_pedido.get('fatos')))
+    
+    # Construir prompt
+    prompt = USER_PROMPT_TEMPLATE.format(
+        peticao_inicial_completa=dados_peticao.get('texto_completo', ''),
+        tipo_caso=dados_peticao.get('tipo_caso', 'Não identificado'),
+        confianca_classificacao=dados_peticao.get('confianca', 0) * 100,
+        autor=dados_peticao.get('autor', 'Não identificado'),
+        reu=dados_peticao.get('reu', 'UNIMED FERJ'),
+        elementos_facticos=elementos if elementos else '- Não identificados',
+        pedidos_autor=pedidos if pedidos else '- Não identificados',
+        valor_causa_info=valor_info,
+        contestacoes_similares=formatar_contestacoes_similares(
+            contexto_rag.get('nivel_1', []),
+            contexto_rag.get('nivel_2', [])
+        ),
+        fundamentacao_juridica=formatar_fundamentacao_juridica(
+            contexto_rag.get('nivel_3', [])
+        ),
+        argumentos_tipo_caso=formatar_argumentos_tipo_caso(
+            dados_peticao.get('tipo_caso', ''),
+            contexto_rag.get('especificos', [])
+        ),
+        secao_por_pedido=SECAO_POR_PEDIDO.format(
+            contexto_por_pedido=formatar_contexto_por_pedido(por_pedido)
+        ) if tem_por_pedido else "",
+        instrucao_por_pedido=INSTRUCAO_POR_PEDIDO if tem_por_pedido else ""
+    )
+    
+    return prompt
+
+
 class LLMGenerator:
     """Gera contestação usando Claude API"""
     
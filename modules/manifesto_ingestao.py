@@ -0,0 +1,219 @@
+"""
+═══════════════════════════════════════════════════════════════════════════
+MANIFESTO DA INGESTÃO - REINDEXAÇÃO INCREMENTAL POR HASH DE CONTEÚDO
+═══════════════════════════════════════════════════════════════════════════
+Registra, por collection, o que a ingestão já gravou:
+
+    arquivos:    arquivo -> tamanho, mtime, hash do conteúdo + parâmetros da divisão
+    chunks:      chunk_id -> arquivo, hash do texto, hash do texto + metadados
+    embeddings:  (modelo, hash do texto) -> vetor
+
+Com ele, uma nova execução pula arquivos inalterados sem abri-los (tamanho
+e mtime iguais) ou sem dividi-los (hash igual), regrava só os chunks novos
+ou alterados, apaga os órfãos e reutiliza o vetor de qualquer texto já
+codificado, mesmo que o chunk tenha mudado de id ou de posição.
+"""
+
+import hashlib
+import json
+import sqlite3
+import threading
+import time
+from pathlib import Path
+from typing import Dict, List, Optional, Tuple
+
+import numpy as np
+
+from config.settings import Config
+
+
+def hash_texto(texto: str) -> str:
+    """Hash do texto de um chunk (chave dos vetores reaproveitados)"""
+    return hashlib.sha1(texto.encode('utf-8')).hexdigest()
+
+
+def hash_chunk(texto: str, metadata: Dict) -> str:
+    """Hash do texto + metadados: igual ao gravado = chunk não precisa de upsert"""
+    conteudo = texto + "\x00" + json.dumps(metadata, sort_keys=True, ensure_ascii=False)
+    return hashlib.sha1(conteudo.encode('utf-8')).hexdigest()
+
+
+def hash_arquivo(caminho: str, parametros: str) -> str:
+    """Hash do conteúdo do arquivo + parâmetros da divisão (mudá-los reprocessa o arquivo)"""
+    digest = hashlib.sha256(parametros.encode('utf-8'))
+    with open(caminho, 'rb') as arquivo:
+        for bloco in iter(lambda: arquivo.read(1 << 20), b""):
+            digest.update(bloco)
+    return digest.hexdigest()
+
+
+class ManifestoIngestao:
+    """Estado da ingestão em SQLite: arquivos, chunks gravados e vetores por hash de texto"""
+    
+    def __init__(self, collection_name: str, diretorio: Optional[Path] = None):
+        """
+        Args:
+            collection_name: Collection cujos arquivos e chunks são registrados
+            diretorio: Diretório do manifesto (usa Config.INGESTAO_MANIFESTO_DIR se None)
+        """
+        self.collection_name = collection_name
+        self.diretorio = Path(diretorio or Config.INGESTAO_MANIFESTO_DIR)
+        self._lock = threading.Lock()
+        
+        self.diretorio.mkdir(parents=True, exist_ok=True)
+        self._conexao = sqlite3.connect(
+            str(self.diretorio / "manifesto.sqlite3"),
+            check_same_thread=False
+        )
+        self._conexao.executescript(
+            """
+            CREATE TABLE IF NOT EXISTS arquivos (
+                collection TEXT NOT NULL,
+                arquivo TEXT NOT NULL,
+                tamanho INTEGER NOT NULL,
+                mtime_ns INTEGER NOT NULL,
+                hash TEXT NOT NULL,
+                atualizado REAL NOT NULL,
+                PRIMARY KEY (collection, arquivo)
+            );
+            CREATE TABLE IF NOT EXISTS chunks (
+                collection TEXT NOT NULL,
+                chunk_id TEXT NOT NULL,
+                arquivo TEXT NOT NULL,
+                hash_texto TEXT NOT NULL,
+                hash_chunk TEXT NOT NULL,
+                PRIMARY KEY (collection, chunk_id)
+            );
+            CREATE INDEX IF NOT EXISTS idx_chunks_arquivo ON chunks (collection, arquivo);
+            CREATE TABLE IF NOT EXISTS embeddings (
+                modelo TEXT NOT NULL,
+                hash_texto TEXT NOT NULL,
+                vetor BLOB NOT NULL,
+                PRIMARY KEY (modelo, hash_texto)
+            );
+            """
+        )
+        self._conexao.commit()
+    
+    def arquivo(self, caminho: str) -> Optional[Tuple[int, int, str]]:
+        """(tamanho, mtime_ns, hash) registrados para o arquivo ou None"""
+        with self._lock:
+            return self._conexao.execute(
+                "SELECT tamanho, mtime_ns, hash FROM arquivos WHERE collection = ? AND arquivo = ?",
+                (self.collection_name, caminho)
+            ).fetchone()
+    
+    def arquivos(self) -> List[str]:
+        """Arquivos registrados na collection"""
+        with self._lock:
+            return [linha[0] for linha in self._conexao.execute(
+                "SELECT arquivo FROM arquivos WHERE collection = ?", (self.collection_name,)
+            )]
+    
+    def atualizar_stat(self, caminho: str, tamanho: int, mtime_ns: int):
+        """Arquivo tocado mas com o mesmo conteúdo: só renova tamanho/mtime"""
+        with self._lock:
+            self._conexao.execute(
+                "UPDATE arquivos SET tamanho = ?, mtime_ns = ? WHERE collection = ? AND arquivo = ?",
+                (tamanho, mtime_ns, self.collection_name, caminho)
+            )
+            self._conexao.commit()
+    
+    def chunks_arquivo(self, caminho: str) -> Dict[str, str]:
+        """chunk_id -> hash_chunk dos chunks gravados do arquivo"""
+        with self._lock:
+            return dict(self._conexao.execute(
+                "SELECT chunk_id, hash_chunk FROM chunks WHERE collection = ? AND arquivo = ?",
+                (self.collection_name, caminho)
+            ))
+    
+    def amostra_chunks(self, tamanho: int) -> List[str]:
+        """Ids de até `tamanho` chunks registrados, sorteados (verificação contra a collection)"""
+        with self._lock:
+            return [linha[0] for linha in self._conexao.execute(
+                "SELECT chunk_id FROM chunks WHERE collection = ? ORDER BY RANDOM() LIMIT ?",
+                (self.collection_name, tamanho)
+            )]
+    
+    def vetores(self, modelo: str, hashes: List[str]) -> Dict[str, np.ndarray]:
+        """Vetores já codificados por hash de texto (ausentes ficam fora do dict)"""
+        encontrados = {}
+        with self._lock:
+            for i in range(0, len(hashes), 500):
+                lote = hashes[i:i + 500]
+                linhas = self._conexao.execute(
+                    f"SELECT hash_texto, vetor FROM embeddings WHERE modelo = ? "
+                    f"AND hash_texto IN ({','.join('?' * len(lote))})",
+                    [modelo, *lote]
+                )
+                for chave, vetor in linhas:
+                    encontrados[chave] = np.frombuffer(vetor, dtype=np.float32)
+        return encontrados
+    
+    def registrar(self, modelo: str, documentos: List[Dict], vetores_novos: Dict[str, np.ndarray]):
+        """
+        Registra arquivos gravados e os seus chunks, numa transação
+        
+        Args:
+            modelo: Modelo de embeddings dos vetores novos
+            documentos: {'arquivo', 'tamanho', 'mtime_ns', 'hash', 'chunks'}, chunks com
+                'id', 'hash_texto' e 'hash_chunk'
+            vetores_novos: hash_texto -> vetor codificado nesta gravação
+        """
+        agora = time.time()
+        with self._lock, self._conexao:
+            for documento in documentos:
+                self._conexao.execute(
+                    "DELETE FROM chunks WHERE collection = ? AND arquivo = ?",
+                    (self.collection_name, documento['arquivo'])
+                )
+                self._conexao.executemany(
+                    "INSERT OR REPLACE INTO chunks (collection, chunk_id, arquivo, hash_texto, hash_chunk) "
+                    "VALUES (?, ?, ?, ?, ?)",
+                    [
+                        (self.collection_name, chunk['id'], documento['arquivo'], chunk['hash_texto'], chunk['hash_chunk'])
+                        for chunk in documento['chunks']
+                    ]
+                )
+                self._conexao.execute(
+                    "INSERT OR REPLACE INTO arquivos (collection, arquivo, tamanho, mtime_ns, hash, atualizado) "
+                    "VALUES (?, ?, ?, ?, ?, ?)",
+                    (self.collection_name, documento['arquivo'], documento['tamanho'],
+                     documento['mtime_ns'], documento['hash'], agora)
+                )
+            self._conexao.executemany(
+                "INSERT OR REPLACE INTO embeddings (modelo, hash_texto, vetor) VALUES (?, ?, ?)",
+                [
+                    (modelo, chave, np.asarray(vetor, dtype=np.float32).tobytes())
+                    for chave, vetor in vetores_novos.items()
+                ]
+            )
+    
+    def remover_arquivo(self, caminho: str) -> List[str]:
+        """Esquece um arquivo; retorna os ids dos seus chunks (a apagar da collection)"""
+        with self._lock, self._conexao:
+            ids = [linha[0] for linha in self._conexao.execute(
+                "SELECT chunk_id FROM chunks WHERE collection = ? AND arquivo = ?",
+                (self.collection_name, caminho)
+            )]
+            self._conexao.execute(
+                "DELETE FROM chunks WHERE collection = ? AND arquivo = ?", (self.collection_name, caminho)
+            )
+            self._conexao.execute(
+                "DELETE FROM arquivos WHERE collection = ? AND arquivo = ?", (self.collection_name, caminho)
+            )
+        return ids
+    
+    def esquecer_collection(self):
+        """Descarta arquivos e chunks da collection (os vetores por texto continuam válidos)"""
+        with self._lock, self._conexao:
+            self._conexao.execute("DELETE FROM chunks WHERE collection = ?", (self.collection_name,))
+            self._conexao.execute("DELETE FROM arquivos WHERE collection = ?", (self.collection_name,))
+    
+    def podar_vetores(self) -> int:
+        """Remove vetores de textos que nenhum chunk registrado (em nenhuma collection) usa mais"""
+        with self._lock, self._conexao:
+            cursor = self._conexao.execute(
+                "DELETE FROM embeddings WHERE hash_texto NOT IN (SELECT hash_texto FROM chunks)"
+            )
+        return cursor.rowcount
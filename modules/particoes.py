@@ -0,0 +1,418 @@
+"""
+═══════════════════════════════════════════════════════════════════════════
+PARTIÇÕES - SUB-ÍNDICES POR (NIVEL, TIPO_LIT, TIPO_DOC)
+═══════════════════════════════════════════════════════════════════════════
+Particiona fisicamente a collection em um índice por combinação dos
+campos usados nos filtros do retriever. Uma busca filtrada é roteada
+direto para a(s) partição(ões) do filtro, sem filtro de metadados dentro
+do HNSW: o custo passa a depender do tamanho da partição, não do corpus.
+
+Filtros que não fixam o tipo de caso (tipo_caso None) consultam todas as
+partições do nível e fundem os top-k por distância. Filtros que não podem
+ser roteados (sem campos de partição, $or, operadores de intervalo)
+seguem para a collection global.
+
+As partições são reconstruídas quando a collection muda (mesma assinatura
+usada pelo export NumPy), no mesmo backend da collection: collections
+ChromaDB em um PersistentClient próprio ou exports NumPy.
+"""
+
+import hashlib
+import json
+import re
+import shutil
+import threading
+from pathlib import Path
+from typing import Dict, List, Optional
+
+import numpy as np
+
+from config.settings import Config
+from modules.vector_backend import NumpyVectorStore, assinatura_vector_store, em_gravacao
+
+ARQUIVO_MANIFESTO = "manifesto.json"
+
+# Campos que definem a partição (os mesmos de _montar_filtro)
+CAMPOS_PARTICAO = ('nivel', 'tipo_lit', 'tipo_doc')
+
+
+def nome_particao(chave: tuple, geracao: int) -> str:
+    """Nome válido de collection ChromaDB / diretório para uma partição"""
+    legivel = "_".join(
+        re.sub(r"[^a-z0-9]+", "-", str(valor).lower()).strip('-') or 'x'
+        for valor in chave
+    )
+    sufixo = hashlib.sha1(repr(chave).encode('utf-8')).hexdigest()[:8]
+    return f"g{geracao}.{legivel}.{sufixo}"
+
+
+class _DadosParticao:
+    """Fonte em memória no formato de collection.get (para NumpyVectorStore.exportar)"""
+    
+    def __init__(self):
+        self.ids, self.embeddings, self.documents, self.metadatas = [], [], [], []
+    
+    def get(self, include=None) -> Dict:
+        return {
+            'ids': self.ids,
+            'embeddings': self.embeddings,
+            'documents': self.documents,
+            'metadatas': self.metadatas
+        }
+
+
+class VectorStoreParticionado:
+    """Roteia buscas filtradas para sub-índices por (nivel, tipo_lit, tipo_doc)"""
+    
+    def __init__(
+        self,
+        collection,
+        vector_store_dir: Optional[Path] = None,
+        diretorio: Optional[Path] = None,
+        backend: Optional[str] = None
+    ):
+        """
+        Args:
+            collection: Collection global (ChromaDB ou NumpyVectorStore), origem e fallback
+            vector_store_dir: Diretório do vector store (usa Config se None)
+            diretorio: Diretório das partições (usa Config.PARTICOES_DIR se None)
+            backend: 'chroma' ou 'numpy' (usa Config.VECTOR_BACKEND se None)
+        """
+        self.collection = collection
+        self.vector_store_dir = Path(vector_store_dir or Config.VECTOR_STORE_DIR)
+        self.diretorio = Path(diretorio or Config.PARTICOES_DIR) / self.collection.name
+        self.backend = backend or Config.VECTOR_BACKEND
+        
+        self._lock = threading.Lock()
+        self._assinatura = None
+        self._manifesto = {}
+        self._particoes = {}  # (nivel, tipo_lit, tipo_doc) -> (collection da partição, total)
+        self._client = None
+        
+        # Métricas (buscas roteadas x enviadas à collection global)
+        self.buscas_roteadas = 0
+        self.buscas_globais = 0
+        self.particoes_consultadas = 0
+    
+    # ═══════════════════════════════════════════════════════════════════════
+    # API compatível com collection do ChromaDB (query)
+    # ═══════════════════════════════════════════════════════════════════════
+    
+    def query(
+        self,
+        query_embeddings: List[List[float]],
+        n_results: int = 10,
+        where: Optional[Dict] = None,
+        include: Optional[List[str]] = None
+    ) -> Dict:
+        """
+        Busca top-k roteada para as partições do filtro (mesmo formato de collection.query)
+        
+        Args:
+            query_embeddings: Lista de embeddings de query
+            n_results: Número de resultados por query
+            where: Filtro de metadados no formato do ChromaDB
+            include: Campos a incluir ('documents', 'metadatas', 'distances', 'embeddings')
+        """
+        include = include if include is not None else ['documents', 'metadatas', 'distances']
+        self.sincronizar()
+        
+        rota = self.rotear(where)
+        if rota is None:
+            with self._lock:
+                self.buscas_globais += 1
+            return self.collection.query(
+                query_embeddings=query_embeddings,
+                n_results=n_results,
+                where=where,
+                include=include
+            )
+        
+        particoes, residual = rota
+        with self._lock:
+            self.buscas_roteadas += 1
+            self.particoes_consultadas += len(particoes)
+        
+        # 'distances' é sempre pedido: é a chave da fusão entre partições
+        campos = list(dict.fromkeys(list(include) + ['distances']))
+        resultados = []
+        for particao, total in particoes:
+            if total == 0:
+                continue
+            resultados.append(particao.query(
+                query_embeddings=query_embeddings,
+                n_results=min(n_results, total),
+                where=residual,
+                include=campos
+            ))
+        
+        return self._fundir(resultados, len(query_embeddings), n_results, include)
+    
+    def count(self) -> int:
+        """Número de chunks na collection global"""
+        return self.collection.count()
+    
+    def rotear(self, where: Optional[Dict]) -> Optional[tuple]:
+        """
+        Partições que atendem o filtro
+        
+        Returns:
+            (lista de (partição, total), filtro residual sobre campos fora da partição)
+            ou None quando o filtro deve ir para a collection global
+        """
+        if not where:
+            return None
+        
+        condicoes = where['$and'] if set(where) == {'$and'} else [where]
+        fixos = {}
+        residuais = []
+        for condicao in condicoes:
+            if len(condicao) != 1:
+                return None
+            campo, valor = next(iter(condicao.items()))
+            if campo.startswith('$'):
+                return None  # $or / $and aninhado
+            if campo not in CAMPOS_PARTICAO:
+                residuais.append(condicao)
+                continue
+            if isinstance(valor, dict):
+                if set(valor) == {'$eq'}:
+                    valor = valor['$eq']
+                elif set(valor) == {'$in'}:
+                    fixos[campo] = set(valor['$in'])
+                    continue
+                else:
+                    return None
+            fixos[campo] = {valor}
+        
+        if not fixos:
+            return None
+        
+        particoes = [
+            particao for chave, particao in self._particoes.items()
+            if all(chave[CAMPOS_PARTICAO.index(campo)] in valores for campo, valores in fixos.items())
+        ]
+        
+        if not residuais:
+            residual = None
+        elif len(residuais) == 1:
+            residual = residuais[0]
+        else:
+            residual = {'$and': residuais}
+        return particoes, residual
+    
+    @staticmethod
+    def _fundir(resultados: List[Dict], n_queries: int, n_results: int, include: List[str]) -> Dict:
+        """Funde os top-k de várias partições por distância (menor primeiro)"""
+        campos = [campo for campo in ('documents', 'metadatas', 'distances', 'embeddings') if campo in include]
+        fundido = {'ids': [], 'included': list(include)}
+        for campo in ('documents', 'metadatas', 'distances', 'embeddings'):
+            fundido[campo] = [] if campo in include else None
+        
+        for i in range(n_queries):
+            candidatos = []
+            for resultado in resultados:
+                for j, chunk_id in enumerate(resultado['ids'][i]):
+                    candidatos.append((resultado['distances'][i][j], chunk_id, resultado, j))
+            candidatos.sort(key=lambda candidato: (candidato[0], candidato[1]))
+            candidatos = candidatos[:n_results]
+            
+            fundido['ids'].append([chunk_id for _, chunk_id, _, _ in candidatos])
+            for campo in campos:
+                fundido[campo].append([resultado[campo][i][j] for _, _, resultado, j in candidatos])
+        
+        return fundido
+    
+    # ═══════════════════════════════════════════════════════════════════════
+    # Construção
+    # ═══════════════════════════════════════════════════════════════════════
+    
+    def carregado(self) -> bool:
+        """Partições já abertas (pela primeira busca roteada ou por sincronizar)"""
+        return self._assinatura is not None
+    
+    def sincronizar(self):
+        """Abre as partições e as reconstrói se a collection mudou"""
+        assinatura = assinatura_vector_store(self.vector_store_dir, self.collection.name)
+        total = self.collection.count()
+        if self._assinatura == (assinatura, total):
+            return
+        if self._assinatura is not None and (
+            self._lock.locked() or em_gravacao(self.vector_store_dir, self.collection.name)
+        ):
+            return  # Gravação ou atualização em andamento: as partições atuais seguem atendendo
+        
+        with self._lock:
+            if self._assinatura == (assinatura, total):
+                return
+            
+            manifesto = self._ler_manifesto()
+            if (manifesto.get('assinatura') == assinatura
+                    and manifesto.get('total') == total
+                    and manifesto.get('backend') == self.backend
+                    and self._abrir(manifesto)):
+                pass
+            else:
+                self._reconstruir(assinatura, manifesto.get('geracao', 0) + 1)
+            self._assinatura = (assinatura, total)
+    
+    def _reconstruir(self, assinatura: str, geracao: int, lote: int = 5000):
+        """Copia a collection global para uma partição por combinação de campos"""
+        print(f"🧩 Particionando collection {self.collection.name} por {', '.join(CAMPOS_PARTICAO)}...")
+        self.diretorio.mkdir(parents=True, exist_ok=True)
+        
+        # Partições da geração anterior continuam atendendo buscas até a troca
+        destinos = {}
+        total = self.collection.count()
+        for inicio in range(0, total, lote):
+            dados = self.collection.get(
+                include=['embeddings', 'documents', 'metadatas'],
+                limit=lote,
+                offset=inicio
+            )
+            grupos = {}
+            for posicao, meta in enumerate(dados['metadatas']):
+                chave = tuple((meta or {}).get(campo) for campo in CAMPOS_PARTICAO)
+                grupos.setdefault(chave, []).append(posicao)
+            
+            for chave, posicoes in grupos.items():
+                if chave not in destinos:
+                    destinos[chave] = self._criar_particao(nome_particao(chave, geracao))
+                self._adicionar(
+                    destinos[chave],
+                    [dados['ids'][p] for p in posicoes],
+                    [dados['embeddings'][p] for p in posicoes],
+                    [dados['documents'][p] for p in posicoes],
+                    [dados['metadatas'][p] for p in posicoes]
+                )
+        
+        particoes = {}
+        manifesto_particoes = []
+        for chave, destino in destinos.items():
+            nome = nome_particao(chave, geracao)
+            particao = self._finalizar_particao(nome, destino)
+            particoes[chave] = (particao, particao.count())
+            manifesto_particoes.append({
+                'nome': nome,
+                **dict(zip(CAMPOS_PARTICAO, chave)),
+                'total': particoes[chave][1]
+            })
+        
+        # Troca da referência é atômica: buscas concorrentes veem as partições antigas ou as novas
+        self._particoes = particoes
+        self._manifesto = {
+            'assinatura': assinatura,
+            'total': total,
+            'backend': self.backend,
+            'geracao': geracao,
+            'particoes': sorted(manifesto_particoes, key=lambda p: p['nome'])
+        }
+        (self.diretorio / ARQUIVO_MANIFESTO).write_text(
+            json.dumps(self._manifesto, ensure_ascii=False, indent=2),
+            encoding='utf-8'
+        )
+        self._remover_geracoes_antigas(geracao)
+        print(f"✅ {len(particoes)} partições (geração {geracao}), maior com "
+              f"{max((p['total'] for p in manifesto_particoes), default=0)} chunks")
+    
+    def _abrir(self, manifesto: Dict) -> bool:
+        """Abre as partições listadas no manifesto (False se alguma não existir mais)"""
+        particoes = {}
+        try:
+            for entrada in manifesto['particoes']:
+                chave = tuple(entrada[campo] for campo in CAMPOS_PARTICAO)
+                if self.backend == 'numpy':
+                    particao = NumpyVectorStore(self.diretorio / entrada['nome'])
+                else:
+                    particao = self._cliente().get_collection(name=entrada['nome'])
+                particoes[chave] = (particao, entrada['total'])
+        except Exception as e:
+            print(f"⚠️  Partições persistidas inválidas ({e}): reconstruindo")
+            return False
+        self._particoes = particoes
+        self._manifesto = manifesto
+        return True
+    
+    def _cliente(self):
+        """PersistentClient das partições ChromaDB (separado do vector store global)"""
+        if self._client is None:
+            import chromadb
+            from chromadb.config import Settings
+            self._client = chromadb.PersistentClient(
+                path=str(self.diretorio / "chroma"),
+                settings=Settings(anonymized_telemetry=False)
+            )
+        return self._client
+    
+    def _criar_particao(self, nome: str):
+        """Destino de escrita de uma partição (collection ChromaDB ou buffer NumPy)"""
+        if self.backend == 'numpy':
+            return _DadosParticao()
+        return self._cliente().create_collection(
+            name=nome,
+            metadata={'hnsw:space': Config.DISTANCE_METRIC}
+        )
+    
+    @staticmethod
+    def _adicionar(destino, ids: List[str], embeddings: List, documentos: List[str], metadatas: List[Dict]):
+        """Acrescenta um lote de chunks à partição"""
+        if isinstance(destino, _DadosParticao):
+            destino.ids.extend(ids)
+            destino.embeddings.extend(np.asarray(e, dtype=np.float32) for e in embeddings)
+            destino.documents.extend(documentos)
+            destino.metadatas.extend(metadatas)
+        else:
+            destino.add(
+                ids=ids,
+                embeddings=[np.asarray(e, dtype=np.float32).tolist() for e in embeddings],
+                documents=documentos,
+                metadatas=metadatas
+            )
+    
+    def _finalizar_particao(self, nome: str, destino):
+        """Partição pronta para busca"""
+        if isinstance(destino, _DadosParticao):
+            return NumpyVectorStore.exportar(destino, self.diretorio / nome)
+        return destino
+    
+    def _remover_geracoes_antigas(self, geracao: int):
+        """
+        Apaga partições anteriores à geração passada (ChromaDB e exports NumPy)
+        
+        A geração imediatamente anterior é mantida: buscas que começaram
+        antes da troca ainda podem estar lendo dela.
+        """
+        mantidas = (f"g{geracao}.", f"g{geracao - 1}.")
+        for caminho in self.diretorio.iterdir():
+            if caminho.is_dir() and caminho.name.startswith('g') and not caminho.name.startswith(mantidas):
+                shutil.rmtree(caminho, ignore_errors=True)
+        if self.backend != 'numpy':
+            for collection in self._cliente().list_collections():
+                nome = getattr(collection, 'name', collection)
+                if not nome.startswith(mantidas):
+                    self._cliente().delete_collection(nome)
+    
+    def _ler_manifesto(self) -> Dict:
+        """Manifesto das partições persistidas (vazio se ausente)"""
+        manifesto = self.diretorio / ARQUIVO_MANIFESTO
+        if manifesto.exists():
+            return json.loads(manifesto.read_text(encoding='utf-8'))
+        return {}
+    
+    # ═══════════════════════════════════════════════════════════════════════
+    # Estatísticas
+    # ═══════════════════════════════════════════════════════════════════════
+    
+    def estatisticas(self) -> Dict:
+        """Partições (campos e tamanho) e contagem de buscas roteadas/globais"""
+        self.sincronizar()
+        with self._lock:
+            return {
+                'geracao': self._manifesto.get('geracao'),
+                'particoes': list(self._manifesto.get('particoes', [])),
+                'buscas_roteadas': self.buscas_roteadas,
+                'buscas_globais': self.buscas_globais,
+                'particoes_por_busca': (
+                    self.particoes_consultadas / self.buscas_roteadas if self.buscas_roteadas else 0.0
+                )
+            }
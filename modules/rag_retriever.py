@@ -5,17 +5,96 @@ RAG RETRIEVER - RECUPERAÇÃO HIERÁRQUICA MULTI-NÍVEL
 Implementa busca vetorial hierárquica em 3 níveis
 """
 
+import json
+import re
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, wait
+
 import chromadb
 from chromadb.config import Settings
-from sentence_transformers import SentenceTransformer
 from typing import List, Dict, Optional
 from pathlib import Path
 import numpy as np
 
 from config.settings import Config
+from modules.vector_backend import assinatura_vector_store, carregar_store_numpy
+from modules.embedding_cache import CacheEmbeddings
+from modules.cache_resultados import CacheResultados
+from modules.embedding_engines import criar_motor_embedding
+from modules.embedding_service import ServicoEmbeddings
+from modules.classificador import ClassificadorCentroides
+from modules.lexical_index import IndiceBM25, fundir_rrf
+from modules.citacoes import IndiceCitacoes, extrair_citacoes
+from modules.particoes import VectorStoreParticionado
+from modules.janelas import selecionar_janelas
+from modules.trechos import IndiceTrechos
+from modules.hierarquia import IndiceHierarquia
+from modules.versoes_collection import versao_ativa
+
+class EstadoVersao:
+    """
+    Collection, cliente e índices auxiliares de uma versão da collection
+    
+    O retriever guarda um único EstadoVersao e, na troca de versão, substitui
+    essa referência: cada operação lê a referência uma vez e vê a collection
+    e os índices da mesma versão, nunca uma mistura da antiga com a nova.
+    """
+    
+    def __init__(
+        self,
+        vector_store_dir: Path,
+        collection_name: str,
+        client,
+        collection,
+        particoes: Optional[VectorStoreParticionado],
+        classificador: ClassificadorCentroides,
+        indice_lexical: IndiceBM25,
+        indice_citacoes: IndiceCitacoes,
+        indice_trechos: IndiceTrechos,
+        cache_resultados: Optional[CacheResultados],
+        indice_hierarquia: IndiceHierarquia
+    ):
+        self.vector_store_dir = vector_store_dir
+        self.collection_name = collection_name
+        self.client = client
+        self.collection = collection
+        self.particoes = particoes
+        self.classificador = classificador
+        self.indice_lexical = indice_lexical
+        self.indice_citacoes = indice_citacoes
+        self.indice_trechos = indice_trechos
+        self.cache_resultados = cache_resultados
+        self.indice_hierarquia = indice_hierarquia
+        # Mapa id -> nivel/tipo_lit/tipo_doc (modo fundido, carregado sob demanda)
+        self.mapa_filtros = None
+        # Índice de estatísticas: (assinatura da collection, contagens)
+        self.estatisticas = None
+
+
+def _da_versao(atributo: str) -> property:
+    """Atributo do retriever lido (e atribuído) no EstadoVersao atual"""
+    return property(
+        lambda self: getattr(self._versao, atributo),
+        lambda self, valor: setattr(self._versao, atributo, valor)
+    )
+
 
 class RAGRetriever:
-    """Recuperação RAG hierárquica com ChromaDB"""
+    """Recuperação RAG hierárquica com ChromaDB (ou busca exata NumPy)"""
+    
+    # Estado da versão ativa (EstadoVersao), exposto como atributos do retriever
+    vector_store_dir = _da_versao('vector_store_dir')
+    collection_name = _da_versao('collection_name')
+    client = _da_versao('client')
+    collection = _da_versao('collection')
+    particoes = _da_versao('particoes')
+    classificador = _da_versao('classificador')
+    indice_lexical = _da_versao('indice_lexical')
+    indice_citacoes = _da_versao('indice_citacoes')
+    indice_trechos = _da_versao('indice_trechos')
+    cache_resultados = _da_versao('cache_resultados')
+    indice_hierarquia = _da_versao('indice_hierarquia')
     
     def __init__(self, vector_store_dir: Optional[Path] = None):
         """
@@ -24,93 +103,373 @@ class RAGRetriever:
         Args:
             vector_store_dir: Diretório do vector store (usa Config se None)
         """
-        self.vector_store_dir = vector_store_dir or Config.VECTOR_STORE_DIR
+        # Versão ativa da collection (ponteiro de modules.versoes_collection);
+        # com vector_store_dir explícito, usa Config.COLLECTION_NAME sem troca de versão
+        self._versionado = vector_store_dir is None
+        if self._versionado:
+            collection_name, vector_store_dir = versao_ativa()
+        else:
+            collection_name = Config.COLLECTION_NAME
+        self._lock_versao = threading.Lock()
+        self._versao_conferida = time.monotonic()
         
         # Carregar modelo de embeddings
-        print(f"📥 Carregando modelo de embeddings: {Config.EMBEDDING_MODEL}")
-        self.embedding_model = SentenceTransformer(Config.EMBEDDING_MODEL)
+        print(f"📥 Carregando modelo de embeddings: {Config.EMBEDDING_MODEL} (motor: {Config.EMBEDDING_ENGINE})")
+        self.embedding_model = criar_motor_embedding()
         print("✅ Modelo carregado")
         
-        # Conectar ao ChromaDB
-        print(f"🔌 Conectando ao vector store: {self.vector_store_dir}")
-        self.client = chromadb.PersistentClient(
-            path=str(self.vector_store_dir),
-            settings=Settings(anonymized_telemetry=False)
+        # Micro-lotes para pedidos concorrentes (instância compartilhada entre sessões)
+        self.servico_embeddings = (
+            ServicoEmbeddings(self.embedding_model) if Config.EMBEDDING_MICROLOTE_ENABLED else None
         )
         
-        self.collection = self.client.get_collection(name=Config.COLLECTION_NAME)
-        print(f"✅ Conectado à collection: {Config.COLLECTION_NAME}")
-        print(f"📊 Total de chunks: {self.collection.count()}\n")
-    
-    def gerar_embedding(self, texto: str) -> List[float]:
-        """Gera embedding para um texto"""
-        embedding = self.embedding_model.encode(
-            texto,
-            convert_to_numpy=True,
-            normalize_embeddings=True  # Normalizar para cosine similarity
-        )
-        return embedding.tolist()
+        # Cache de embeddings (memória + disco)
+        self.cache_embeddings = CacheEmbeddings() if Config.EMBEDDING_CACHE_ENABLED else None
+        
+        # Contador de buscas vetoriais (usado nos benchmarks). A instância é
+        # compartilhada entre sessões do app: total protegido por lock e
+        # contagem por thread para o resultado de cada retrieval
+        self.total_queries = 0
+        self._lock = threading.Lock()
+        self._local = threading.local()
+        
+        # Collection, cliente e índices auxiliares da versão
+        self._versao = self._conectar(vector_store_dir, collection_name)
+        
+        self._lock_estatisticas = threading.Lock()
+        
+        # Pool de threads do modo paralelo (criado sob demanda, compartilhado entre sessões)
+        self._executor = None
+        
+        # Busca adaptativa: k atual por (nível, filtro) e contadores candidatos/documentos/usados
+        self._k_adaptativo = {}
+        self._media_sobreviventes = {}
+        self._contadores_nivel = {}
     
-    def buscar_nivel_1(
-        self,
-        query_embedding: List[float],
-        tipo_caso: Optional[str] = None,
-        top_k: Optional[int] = None
-    ) -> List[Dict]:
+    def _conectar(self, vector_store_dir: Path, collection_name: str) -> EstadoVersao:
         """
-        Busca no nível 1 (contexto global)
+        Abre uma versão da collection e os seus índices auxiliares
         
         Args:
-            query_embedding: Embedding da query
-            tipo_caso: Filtrar por tipo de caso (opcional)
-            top_k: Número de resultados (usa Config se None)
+            vector_store_dir: Diretório do vector store da versão
+            collection_name: Nome da collection
             
         Returns:
-            Lista de chunks recuperados com metadados
+            Estado da versão (collection, cliente e índices, com cache de resultados vazio)
         """
-        config = Config.RETRIEVAL_CONFIG['nivel_1']
-        top_k = top_k or config['top_k']
+        # Conectar ao vector store (backend definido em Config.VECTOR_BACKEND)
+        print(f"🔌 Conectando ao vector store: {vector_store_dir}")
+        if Config.VECTOR_BACKEND == 'numpy':
+            # Busca exata em memória, sem abrir o ChromaDB (exceto para exportar)
+            client = None
+            collection = carregar_store_numpy(vector_store_dir, collection_name)
+        else:
+            client = chromadb.PersistentClient(
+                path=str(vector_store_dir),
+                settings=Settings(anonymized_telemetry=False)
+            )
+            collection = client.get_collection(name=collection_name)
+        print(f"✅ Conectado à collection: {collection_name} (backend: {Config.VECTOR_BACKEND})")
+        print(f"📊 Total de chunks: {collection.count()}\n")
         
-        # Preparar filtro (ChromaDB requer $and para múltiplos campos)
-        if tipo_caso:
-            where_filter = {
-                '$and': [
-                    {'nivel': 1},
-                    {'tipo_lit': tipo_caso}
-                ]
-            }
+        # Hierarquia pai/filhos dos chunks (expansão por id, carregada na conexão)
+        indice_hierarquia = IndiceHierarquia(collection, vector_store_dir)
+        if Config.HIERARQUIA_EXPANSAO:
+            indice_hierarquia.sincronizar()
+        
+        return EstadoVersao(
+            vector_store_dir=vector_store_dir,
+            collection_name=collection_name,
+            client=client,
+            collection=collection,
+            # Sub-índices por (nivel, tipo_lit, tipo_doc) para as buscas filtradas por nível
+            particoes=(
+                VectorStoreParticionado(collection, vector_store_dir)
+                if Config.VECTOR_PARTICOES else None
+            ),
+            # Classificador por centroides (calculados/carregados na primeira classificação)
+            classificador=ClassificadorCentroides(collection, vector_store_dir),
+            # Índice BM25 do modo híbrido (carregado/atualizado na primeira busca)
+            indice_lexical=IndiceBM25(collection, vector_store_dir),
+            # Índice invertido de citações jurídicas (carregado/atualizado no primeiro uso)
+            indice_citacoes=IndiceCitacoes(collection, vector_store_dir),
+            # Trechos pré-calculados (retrieval sem o texto completo dos chunks)
+            indice_trechos=IndiceTrechos(collection, vector_store_dir),
+            # Cache semântico de resultados (petições quase idênticas não acessam o vector store)
+            cache_resultados=(
+                CacheResultados(collection, vector_store_dir)
+                if Config.RESULTADOS_CACHE_ENABLED else None
+            ),
+            indice_hierarquia=indice_hierarquia
+        )
+    
+    def _verificar_versao(self):
+        """
+        Passa para a versão ativa da collection se o ponteiro mudou
+        
+        O ponteiro é relido no máximo a cada Config.VERSOES_INTERVALO
+        segundos. Só uma thread abre a nova versão; as demais seguem na
+        atual sem esperar. Quando a nova versão e os seus índices estão
+        prontos, o EstadoVersao é trocado numa única atribuição (com cache de
+        resultados novo) e as estatísticas da busca adaptativa, calibradas na
+        versão anterior, são zeradas.
+        """
+        if not self._versionado or time.monotonic() - self._versao_conferida < Config.VERSOES_INTERVALO:
+            return
+        if not self._lock_versao.acquire(blocking=False):
+            return
+        try:
+            self._versao_conferida = time.monotonic()
+            nome, diretorio = versao_ativa()
+            if (nome, Path(diretorio)) == (self.collection_name, Path(self.vector_store_dir)):
+                return
+            print(f"🔄 Nova versão da collection: {nome} (anterior: {self.collection_name})")
+            estado = self._conectar(diretorio, nome)
+            with self._lock:
+                self._versao = estado
+                self._k_adaptativo.clear()
+                self._media_sobreviventes.clear()
+                self._contadores_nivel.clear()
+        except Exception as e:
+            print(f"⚠️  Não foi possível trocar de versão, mantendo {self.collection_name}: {e}")
+        finally:
+            self._lock_versao.release()
+    
+    def _contar_query(self):
+        """Contabiliza uma busca vetorial (total do processo e da thread atual)"""
+        with self._lock:
+            self.total_queries += 1
+        self._local.queries = self._queries_thread() + 1
+    
+    def _queries_thread(self) -> int:
+        """Buscas vetoriais feitas pela thread atual"""
+        return getattr(self._local, 'queries', 0)
+    
+    def gerar_embedding(self, texto: str) -> List[float]:
+        """Gera embedding para um texto (consultando o cache, se habilitado)"""
+        if self.cache_embeddings is not None:
+            embedding = self.cache_embeddings.obter(texto)
+            if embedding is not None:
+                return embedding
+        
+        # Motores retornam vetores normalizados (cosine similarity)
+        if self.servico_embeddings is not None:
+            embedding = self.servico_embeddings.encode(texto).tolist()
         else:
-            where_filter = {'nivel': 1}
+            embedding = self.embedding_model.encode(texto).tolist()
         
-        # Buscar
-        results = self.collection.query(
+        if self.cache_embeddings is not None:
+            self.cache_embeddings.armazenar(texto, embedding)
+        
+        return embedding
+    
+    def gerar_embeddings(self, textos: List[str], batch_size: Optional[int] = None) -> List[List[float]]:
+        """
+        Gera embeddings de vários textos com encode em lote (consultando o cache)
+        
+        Args:
+            textos: Textos (petições)
+            batch_size: Textos por lote do motor (usa Config.RETRIEVAL_LOTE_ENCODE se None)
+        """
+        embeddings = [None] * len(textos)
+        pendentes = {}  # texto -> posições (textos repetidos são codificados uma vez)
+        
+        for i, texto in enumerate(textos):
+            if self.cache_embeddings is not None:
+                embeddings[i] = self.cache_embeddings.obter(texto)
+            if embeddings[i] is None:
+                pendentes.setdefault(texto, []).append(i)
+        
+        if pendentes:
+            unicos = list(pendentes)
+            matriz = self.embedding_model.encode(
+                unicos,
+                batch_size=batch_size or Config.RETRIEVAL_LOTE_ENCODE
+            )
+            for texto, vetor in zip(unicos, matriz):
+                embedding = vetor.tolist()
+                if self.cache_embeddings is not None:
+                    self.cache_embeddings.armazenar(texto, embedding)
+                for i in pendentes[texto]:
+                    embeddings[i] = embedding
+        
+        return embeddings
+    
+    def _montar_filtro(
+        self,
+        nivel: int,
+        tipo_caso: Optional[str] = None,
+        tipo_doc: Optional[str] = None
+    ) -> Dict:
+        """Monta filtro where (ChromaDB requer $and para múltiplos campos)"""
+        filters = [{'nivel': nivel}]
+        
+        if tipo_caso:
+            filters.append({'tipo_lit': tipo_caso})
+        
+        if tipo_doc:
+            filters.append({'tipo_doc': tipo_doc})
+        
+        # Usar $and apenas se houver múltiplos filtros
+        if len(filters) > 1:
+            return {'$and': filters}
+        return filters[0]
+    
+    def _consultar(
+        self,
+        query_embedding: List[float],
+        n_results: int,
+        where_filter: Optional[Dict] = None,
+        include: Optional[List[str]] = None
+    ) -> Dict:
+        """Executa uma busca vetorial (roteada às partições, se habilitadas), contabilizando a chamada"""
+        self._contar_query()
+        versao = self._versao
+        indice = versao.particoes if versao.particoes is not None else versao.collection
+        return indice.query(
             query_embeddings=[query_embedding],
-            n_results=top_k,
+            n_results=n_results,
+            where=where_filter,
+            include=include if include is not None else self._campos_busca()
+        )
+    
+    def _consultar_lote(
+        self,
+        query_embeddings: List[List[float]],
+        n_results: int,
+        where_filter: Optional[Dict] = None
+    ) -> Dict:
+        """Executa uma busca vetorial com várias queries (um resultado por query)"""
+        self._contar_query()
+        versao = self._versao
+        indice = versao.particoes if versao.particoes is not None else versao.collection
+        return indice.query(
+            query_embeddings=query_embeddings,
+            n_results=n_results,
             where=where_filter,
-            include=['documents', 'metadatas', 'distances']
+            include=self._campos_busca()
         )
+    
+    @staticmethod
+    def _campos_busca() -> List[str]:
+        """Campos das buscas vetoriais (sem documentos no retrieval com trechos)"""
+        if Config.RETRIEVAL_TRECHOS:
+            return ['metadatas', 'distances']
+        return ['documents', 'metadatas', 'distances']
+    
+    def _converter_resultados(
+        self,
+        results: Dict,
+        nivel: Optional[int] = None,
+        min_similarity: Optional[float] = None,
+        indice: int = 0
+    ) -> List[Dict]:
+        """
+        Converte o retorno de collection.query em lista de chunks
+        
+        Args:
+            results: Retorno de collection.query
+            nivel: Nível atribuído aos chunks (usa metadata['nivel'] se None)
+            min_similarity: Similaridade mínima para manter o chunk (opcional)
+            indice: Posição da query no lote (buscas com várias queries)
+            
+        Returns:
+            Lista de chunks ordenada por similaridade
+        """
+        ids = results['ids'][indice]
+        # Retrieval com trechos: a busca não traz documentos
+        documentos = results['documents'][indice] if results.get('documents') else [None] * len(ids)
         
-        # Processar resultados
         chunks = []
-        for doc, meta, dist in zip(
-            results['documents'][0],
-            results['metadatas'][0],
-            results['distances'][0]
+        for chunk_id, doc, meta, dist in zip(
+            ids,
+            documentos,
+            results['metadatas'][indice],
+            results['distances'][indice]
         ):
             # Converter distância para similaridade (se usando cosine)
             similaridade = 1 - dist if Config.DISTANCE_METRIC == 'cosine' else dist
             
             # Filtrar por similaridade mínima
-            if similaridade >= config['min_similarity']:
+            if min_similarity is None or similaridade >= min_similarity:
                 chunks.append({
+                    'id': chunk_id,
                     'conteudo': doc,
                     'metadata': meta,
                     'similaridade': similaridade,
-                    'nivel': 1
+                    'nivel': nivel if nivel is not None else meta.get('nivel')
                 })
         
+        if documentos and documentos[0] is None:
+            chunks = self._anexar_trechos(chunks)
         return chunks
     
+    def _anexar_trechos(self, chunks: List[Dict]) -> List[Dict]:
+        """
+        Troca o 'conteudo' ausente pelos trechos pré-calculados do chunk
+        
+        Chunks ainda fora do índice de trechos têm o texto completo carregado.
+        """
+        trechos = self.indice_trechos.trechos([chunk['id'] for chunk in chunks])
+        sem_trechos = [chunk for chunk in chunks if trechos[chunk['id']] is None]
+        completos = {chunk['id']: chunk for chunk in self.carregar_conteudo(sem_trechos)}
+        
+        resultado = []
+        for chunk in chunks:
+            if chunk['id'] in completos:
+                resultado.append(completos[chunk['id']])
+                continue
+            chunk = {campo: valor for campo, valor in chunk.items() if campo != 'conteudo'}
+            chunk['trechos'] = trechos[chunk['id']]
+            resultado.append(chunk)
+        return resultado
+    
+    def carregar_conteudo(self, chunks: List[Dict]) -> List[Dict]:
+        """
+        Texto completo dos chunks recuperados só com trechos (um único get)
+        
+        Args:
+            chunks: Chunks do retrieval (os que já têm 'conteudo' são mantidos)
+            
+        Returns:
+            Cópias dos chunks com 'conteudo'
+        """
+        pendentes = [chunk['id'] for chunk in chunks if chunk.get('conteudo') is None]
+        if not pendentes:
+            return list(chunks)
+        
+        dados = self.collection.get(ids=pendentes, include=['documents'])
+        documentos = dict(zip(dados['ids'], dados['documents']))
+        return [
+            chunk if chunk.get('conteudo') is not None
+            else {**chunk, 'conteudo': documentos.get(chunk['id']) or ""}
+            for chunk in chunks
+        ]
+    
+    def buscar_nivel_1(
+        self,
+        query_embedding: List[float],
+        tipo_caso: Optional[str] = None,
+        top_k: Optional[int] = None
+    ) -> List[Dict]:
+        """
+        Busca no nível 1 (contexto global)
+        
+        Args:
+            query_embedding: Embedding da query
+            tipo_caso: Filtrar por tipo de caso (opcional)
+            top_k: Número de resultados (usa Config se None)
+            
+        Returns:
+            Lista de chunks recuperados com metadados
+        """
+        config = Config.RETRIEVAL_CONFIG['nivel_1']
+        top_k = top_k or config['top_k']
+        
+        # Buscar (filtrando por similaridade mínima)
+        where_filter = self._montar_filtro(1, tipo_caso=tipo_caso)
+        return self._buscar_nivel(1, query_embedding, top_k, where_filter)
+    
     def buscar_nivel_2(
         self,
         query_embedding: List[float],
@@ -133,119 +492,456 @@ class RAGRetriever:
         config = Config.RETRIEVAL_CONFIG['nivel_2']
         top_k = top_k or config['top_k']
         
-        # Preparar filtro (ChromaDB requer $and para múltiplos campos)
-        filters = [{'nivel': 2}]
+        # Buscar (filtrando por similaridade mínima)
+        where_filter = self._montar_filtro(2, tipo_caso=tipo_caso, tipo_doc=tipo_doc)
+        return self._buscar_nivel(2, query_embedding, top_k, where_filter)
+    
+    def buscar_nivel_3(
+        self,
+        query_embedding: List[float],
+        tipo_caso: Optional[str] = None,
+        top_k: Optional[int] = None
+    ) -> List[Dict]:
+        """
+        Busca no nível 3 (chunks atômicos - precedentes, artigos de lei)
         
-        if tipo_caso:
-            filters.append({'tipo_lit': tipo_caso})
+        Args:
+            query_embedding: Embedding da query
+            tipo_caso: Filtrar por tipo de caso (opcional)
+            top_k: Número de resultados
+            
+        Returns:
+            Lista de chunks recuperados
+        """
+        config = Config.RETRIEVAL_CONFIG['nivel_3']
+        top_k = top_k or config['top_k']
         
-        if tipo_doc:
-            filters.append({'tipo_doc': tipo_doc})
+        # Buscar (filtrando por similaridade mínima)
+        where_filter = self._montar_filtro(3, tipo_caso=tipo_caso)
+        return self._buscar_nivel(3, query_embedding, top_k, where_filter)
+    
+    def _buscar_nivel(
+        self,
+        nivel: int,
+        query_embedding: List[float],
+        top_k: int,
+        where_filter: Dict
+    ) -> List[Dict]:
+        """Busca de um nível com corte em min_similarity (adaptativa se Config.RETRIEVAL_ADAPTATIVO)"""
+        min_similarity = Config.RETRIEVAL_CONFIG[f'nivel_{nivel}']['min_similarity']
         
-        # Usar $and apenas se houver múltiplos filtros
-        if len(filters) > 1:
-            where_filter = {'$and': filters}
-        else:
-            where_filter = filters[0]
+        if Config.RETRIEVAL_ADAPTATIVO:
+            return self.buscar_adaptativo(nivel, query_embedding, top_k, where_filter, min_similarity)
         
-        # Buscar
-        results = self.collection.query(
-            query_embeddings=[query_embedding],
-            n_results=top_k,
-            where=where_filter,
-            include=['documents', 'metadatas', 'distances']
-        )
+        results = self._consultar(query_embedding, top_k, where_filter)
+        chunks = self._converter_resultados(results, nivel, min_similarity)
+        candidatos = len(results['ids'][0])
+        self._registrar_adaptativo(nivel, candidatos=candidatos, documentos=candidatos, usados=len(chunks))
+        return chunks
+    
+    def buscar_adaptativo(
+        self,
+        nivel: int,
+        query_embedding: List[float],
+        top_k: int,
+        where_filter: Dict,
+        min_similarity: float
+    ) -> List[Dict]:
+        """
+        Busca com k adaptativo: ids e distâncias primeiro, documentos só dos sobreviventes
         
-        # Processar resultados
-        chunks = []
-        for doc, meta, dist in zip(
-            results['documents'][0],
-            results['metadatas'][0],
-            results['distances'][0]
-        ):
-            similaridade = 1 - dist if Config.DISTANCE_METRIC == 'cosine' else dist
+        Começa com o k aprendido para o nível. Se todos os candidatos
+        passam do limiar (pode haver mais acima dele), amplia k até top_k;
+        se algum fica abaixo, o corte foi alcançado e os demais também
+        ficariam. O próximo k do nível acompanha quantos passaram
+        (média móvel, com ADAPTATIVO_MARGEM de folga), encolhendo quando a
+        maioria é descartada e crescendo quando quase todos passam. O estado
+        é separado por filtro: uma busca seletiva (tipo_lit) não encolhe o k
+        das buscas sem filtro.
+        
+        Args:
+            nivel: Nível dos chunks
+            query_embedding: Embedding da query
+            top_k: Máximo de resultados
+            where_filter: Filtro where da busca
+            min_similarity: Similaridade mínima
             
-            if similaridade >= config['min_similarity']:
-                chunks.append({
-                    'conteudo': doc,
-                    'metadata': meta,
-                    'similaridade': similaridade,
-                    'nivel': 2
-                })
+        Returns:
+            Mesmos chunks de uma busca com top_k cortada em min_similarity
+        """
+        chave = (nivel, json.dumps(where_filter, sort_keys=True, default=str))
+        with self._lock:
+            k = min(top_k, self._k_adaptativo.get(chave, top_k))
+        candidatos = 0
         
+        while True:
+            results = self._consultar(query_embedding, k, where_filter, include=['distances'])
+            ids = results['ids'][0]
+            candidatos += len(ids)
+            sobreviventes = [
+                {
+                    'id': chunk_id,
+                    'similaridade': 1 - dist if Config.DISTANCE_METRIC == 'cosine' else dist,
+                    'nivel': nivel
+                }
+                for chunk_id, dist in zip(ids, results['distances'][0])
+            ]
+            sobreviventes = [c for c in sobreviventes if c['similaridade'] >= min_similarity]
+            
+            # Todos passaram e a busca veio cheia: o corte pode estar além de k
+            if len(sobreviventes) == len(ids) == k < top_k:
+                k = min(top_k, k * Config.ADAPTATIVO_FATOR_AMPLIACAO)
+                self._registrar_adaptativo(nivel, ampliacoes=1)
+                continue
+            break
+        
+        # Média móvel dos sobreviventes: uma query atípica não derruba o k do nível
+        # (sob o lock: o retriever é compartilhado entre sessões e pelo modo paralelo)
+        alfa = Config.ADAPTATIVO_SUAVIZACAO
+        with self._lock:
+            media = self._media_sobreviventes.get(chave, len(sobreviventes))
+            media = (1 - alfa) * media + alfa * len(sobreviventes)
+            self._media_sobreviventes[chave] = media
+            proximo_k = int(np.ceil(media * (1 + Config.ADAPTATIVO_MARGEM))) + 1
+            self._k_adaptativo[chave] = max(Config.ADAPTATIVO_K_MIN, min(top_k, proximo_k))
+        
+        chunks = self._materializar(sobreviventes)
+        self._registrar_adaptativo(
+            nivel, candidatos=candidatos, documentos=len(chunks), usados=len(chunks)
+        )
         return chunks
     
-    def buscar_nivel_3(
+    def _registrar_adaptativo(self, nivel: int, **contagens):
+        """Soma contagens de candidatos/documentos/usados/buscas por nível"""
+        contagens.setdefault('buscas', 1 if 'candidatos' in contagens else 0)
+        with self._lock:
+            contadores = self._contadores_nivel.setdefault(
+                nivel, {'buscas': 0, 'candidatos': 0, 'documentos': 0, 'usados': 0, 'ampliacoes': 0}
+            )
+            for campo, valor in contagens.items():
+                contadores[campo] += valor
+    
+    def estatisticas_busca(self) -> Dict[int, Dict]:
+        """
+        Contadores por nível das buscas buscar_nivel_*
+        
+        Returns:
+            Dict nivel -> {'buscas', 'candidatos' (ids/distâncias buscados),
+            'documentos' (chunks com documento carregado), 'usados' (acima de
+            min_similarity), 'ampliacoes' (rebuscas com k maior), 'k' (maior
+            k adaptativo atual do nível), 'k_por_filtro' (filtro -> k)}
+        """
+        with self._lock:
+            estatisticas = {}
+            for nivel, contadores in sorted(self._contadores_nivel.items()):
+                por_filtro = {
+                    filtro: k for (nivel_k, filtro), k in self._k_adaptativo.items() if nivel_k == nivel
+                }
+                estatisticas[nivel] = {
+                    **contadores,
+                    'k': max(por_filtro.values()) if por_filtro else None,
+                    'k_por_filtro': por_filtro
+                }
+            return estatisticas
+    
+    def buscar_nivel_hibrido(
         self,
+        nivel: int,
+        query_text: str,
         query_embedding: List[float],
         tipo_caso: Optional[str] = None,
+        tipo_doc: Optional[str] = None,
         top_k: Optional[int] = None
     ) -> List[Dict]:
         """
-        Busca no nível 3 (chunks atômicos - precedentes, artigos de lei)
+        Busca em um nível fundindo rankings vetorial e BM25 (Reciprocal Rank Fusion)
+        
+        O limiar min_similarity do nível vale para os hits vetoriais; chunks
+        trazidos só pelo BM25 (citações exatas) entram com a similaridade
+        calculada a partir do seu embedding.
         
         Args:
+            nivel: Nível hierárquico (1, 2 ou 3)
+            query_text: Texto da query (para o BM25)
             query_embedding: Embedding da query
             tipo_caso: Filtrar por tipo de caso (opcional)
-            top_k: Número de resultados
+            tipo_doc: Filtrar por tipo de documento (opcional)
+            top_k: Número de resultados (usa Config se None)
             
         Returns:
-            Lista de chunks recuperados
+            Lista de chunks ordenada pelo score RRF
         """
-        config = Config.RETRIEVAL_CONFIG['nivel_3']
+        config = Config.RETRIEVAL_CONFIG[f'nivel_{nivel}']
         top_k = top_k or config['top_k']
+        n_candidatos = top_k * Config.HIBRIDO_FATOR_CANDIDATOS
+        where_filter = self._montar_filtro(nivel, tipo_caso=tipo_caso, tipo_doc=tipo_doc)
         
-        # Preparar filtro (ChromaDB requer $and para múltiplos campos)
-        if tipo_caso:
-            where_filter = {
-                '$and': [
-                    {'nivel': 3},
-                    {'tipo_lit': tipo_caso}
-                ]
-            }
-        else:
-            where_filter = {'nivel': 3}
+        results = self._consultar(query_embedding, n_candidatos, where_filter)
+        vetoriais = self._converter_resultados(results, nivel, config['min_similarity'])
+        lexicais = self.indice_lexical.buscar(query_text, n_candidatos, where_filter)
         
-        # Buscar
-        results = self.collection.query(
-            query_embeddings=[query_embedding],
-            n_results=top_k,
-            where=where_filter,
-            include=['documents', 'metadatas', 'distances']
-        )
+        fundidos = fundir_rrf([
+            [chunk['id'] for chunk in vetoriais],
+            [hit['id'] for hit in lexicais]
+        ])[:top_k]
+        
+        por_id = {chunk['id']: chunk for chunk in vetoriais}
+        faltantes = [chunk_id for chunk_id, _ in fundidos if chunk_id not in por_id]
+        if faltantes:
+            # Chunks só lexicais: carregar documento e calcular similaridade real
+            for chunk in self._carregar_com_similaridade(faltantes, query_embedding, nivel):
+                por_id[chunk['id']] = chunk
+        
+        scores_bm25 = {hit['id']: hit['score'] for hit in lexicais}
+        return [
+            {**por_id[chunk_id], 'score_rrf': score, 'score_bm25': scores_bm25.get(chunk_id, 0.0)}
+            for chunk_id, score in fundidos
+        ]
+    
+    def buscar_nivel_multijanela(
+        self,
+        nivel: int,
+        embeddings_janelas: List[List[float]],
+        tipo_caso: Optional[str] = None,
+        tipo_doc: Optional[str] = None,
+        top_k: Optional[int] = None,
+        agregacao: Optional[str] = None
+    ) -> List[Dict]:
+        """
+        Busca em um nível com várias janelas da petição (uma busca multi-query)
+        
+        Cada janela traz seus top_k; os hits são agregados por chunk. O
+        limiar min_similarity do nível vale para a maior similaridade do
+        chunk entre as janelas.
+        
+        Args:
+            nivel: Nível hierárquico (1, 2 ou 3)
+            embeddings_janelas: Embeddings das janelas da petição
+            tipo_caso: Filtrar por tipo de caso (opcional)
+            tipo_doc: Filtrar por tipo de documento (opcional)
+            top_k: Número de resultados (usa Config se None)
+            agregacao: 'max' ou 'soma' (usa Config.MULTIJANELA_AGREGACAO se None)
+            
+        Returns:
+            Lista de chunks ordenada pelo score agregado ('score_janelas'),
+            com 'janelas' = número de janelas que recuperaram o chunk
+        """
+        config = Config.RETRIEVAL_CONFIG[f'nivel_{nivel}']
+        top_k = top_k or config['top_k']
+        agregacao = agregacao or Config.MULTIJANELA_AGREGACAO
+        if agregacao not in ('max', 'soma'):
+            raise ValueError(f"Agregação multijanela desconhecida: {agregacao}")
+        
+        where_filter = self._montar_filtro(nivel, tipo_caso=tipo_caso, tipo_doc=tipo_doc)
+        results = self._consultar_lote(embeddings_janelas, top_k, where_filter)
+        
+        por_id = {}
+        for indice in range(len(embeddings_janelas)):
+            for chunk in self._converter_resultados(results, nivel, indice=indice):
+                atual = por_id.get(chunk['id'])
+                if atual is None:
+                    por_id[chunk['id']] = {**chunk, 'score_janelas': chunk['similaridade'], 'janelas': 1}
+                    continue
+                atual['janelas'] += 1
+                atual['similaridade'] = max(atual['similaridade'], chunk['similaridade'])
+                if agregacao == 'soma':
+                    atual['score_janelas'] += chunk['similaridade']
+                else:
+                    atual['score_janelas'] = atual['similaridade']
+        
+        chunks = [
+            chunk for chunk in por_id.values()
+            if chunk['similaridade'] >= config['min_similarity']
+        ]
+        chunks.sort(key=lambda chunk: (-chunk['score_janelas'], -chunk['similaridade']))
+        return chunks[:top_k]
+    
+    def _carregar_com_similaridade(
+        self,
+        ids: List[str],
+        query_embedding: List[float],
+        nivel: Optional[int] = None
+    ) -> List[Dict]:
+        """Carrega chunks por id (fora de uma busca vetorial) com a similaridade calculada do embedding"""
+        campos = ['metadatas', 'embeddings'] + ([] if Config.RETRIEVAL_TRECHOS else ['documents'])
+        dados = self.collection.get(ids=ids, include=campos)
+        query = np.asarray(query_embedding, dtype=np.float32)
+        query = query / max(float(np.linalg.norm(query)), 1e-12)
+        documentos = dados['documents'] if dados.get('documents') is not None else [None] * len(dados['ids'])
         
-        # Processar resultados
         chunks = []
-        for doc, meta, dist in zip(
-            results['documents'][0],
-            results['metadatas'][0],
-            results['distances'][0]
+        for chunk_id, doc, meta, embedding in zip(
+            dados['ids'], documentos, dados['metadatas'], dados['embeddings']
         ):
-            similaridade = 1 - dist if Config.DISTANCE_METRIC == 'cosine' else dist
+            embedding = np.asarray(embedding, dtype=np.float32)
+            chunks.append({
+                'id': chunk_id,
+                'conteudo': doc,
+                'metadata': meta,
+                'similaridade': float(embedding @ query / max(float(np.linalg.norm(embedding)), 1e-12)),
+                'nivel': nivel if nivel is not None else meta.get('nivel')
+            })
+        return self._anexar_trechos(chunks) if Config.RETRIEVAL_TRECHOS else chunks
+    
+    def expandir_hierarquia(
+        self,
+        query_embedding: List[float],
+        chunks_por_nivel: Dict[int, List[Dict]],
+        sementes: Optional[int] = None,
+        vizinhos: Optional[int] = None
+    ) -> Dict[int, List[Dict]]:
+        """
+        Acrescenta o pai e os irmãos vizinhos dos melhores hits de cada nível
+        
+        Os vizinhos vêm do índice de hierarquia e são carregados num único
+        get por id (sem busca vetorial), com a similaridade calculada do
+        embedding. Irmãos entram logo depois do hit que os trouxe; pais
+        (documentos de nível 1) entram no fim do seu nível. Chunks já
+        recuperados não se repetem.
+        
+        Args:
+            query_embedding: Embedding da query (para a similaridade)
+            chunks_por_nivel: Dict nivel -> chunks recuperados
+            sementes: Hits expandidos por nível (usa Config.HIERARQUIA_SEMENTES se None)
+            vizinhos: Irmãos de cada lado (usa Config.HIERARQUIA_VIZINHOS se None)
             
-            if similaridade >= config['min_similarity']:
-                chunks.append({
-                    'conteudo': doc,
-                    'metadata': meta,
-                    'similaridade': similaridade,
-                    'nivel': 3
-                })
+        Returns:
+            Dict nivel -> chunks, com 'expansao' ({'origem', 'relacao'}) nos acrescentados
+        """
+        sementes = sementes if sementes is not None else Config.HIERARQUIA_SEMENTES
+        vizinhos = vizinhos if vizinhos is not None else Config.HIERARQUIA_VIZINHOS
+        
+        vistos = {chunk['id'] for chunks in chunks_por_nivel.values() for chunk in chunks}
+        origens = [chunk['id'] for nivel in (2, 3) for chunk in chunks_por_nivel.get(nivel, [])[:sementes]]
+        relacoes = self.indice_hierarquia.relacoes(origens, vizinhos)
         
+        irmaos = {}  # id da semente -> [(id, relacao)] em ordem de leitura
+        pais = []    # (id, id da semente)
+        for origem in origens:
+            pai = relacoes[origem]['pai']
+            if pai is not None and pai not in vistos:
+                vistos.add(pai)
+                pais.append((pai, origem))
+            for vizinho, deslocamento in relacoes[origem]['vizinhos']:
+                if vizinho not in vistos:
+                    vistos.add(vizinho)
+                    relacao = 'anterior' if deslocamento < 0 else 'seguinte'
+                    irmaos.setdefault(origem, []).append((vizinho, relacao))
+        
+        ids = [pai for pai, _ in pais] + [i for lista in irmaos.values() for i, _ in lista]
+        if not ids:
+            return chunks_por_nivel
+        carregados = {chunk['id']: chunk for chunk in self._carregar_com_similaridade(ids, query_embedding)}
+        
+        expandidos = {}
+        for nivel, chunks in chunks_por_nivel.items():
+            expandidos[nivel] = []
+            for chunk in chunks:
+                expandidos[nivel].append(chunk)
+                for vizinho, relacao in irmaos.get(chunk['id'], []):
+                    if vizinho in carregados:
+                        expandidos[nivel].append(
+                            {**carregados[vizinho], 'expansao': {'origem': chunk['id'], 'relacao': relacao}}
+                        )
+        for pai, origem in pais:
+            if pai in carregados:
+                chunk = carregados[pai]
+                expandidos.setdefault(chunk['nivel'], []).append(
+                    {**chunk, 'expansao': {'origem': origem, 'relacao': 'pai'}}
+                )
+        return expandidos
+    
+    def buscar_por_citacoes(
+        self,
+        query_text: str,
+        query_embedding: List[float],
+        nivel: int = 3,
+        tipo_caso: Optional[str] = None,
+        top_k: Optional[int] = None
+    ) -> List[Dict]:
+        """
+        Chunks que citam as leis, artigos e precedentes mencionados no texto
+        
+        Lookup exato no índice de citações (sem busca vetorial); a
+        similaridade de cada chunk é calculada do seu embedding.
+        
+        Args:
+            query_text: Texto da petição
+            query_embedding: Embedding da petição (para a similaridade)
+            nivel: Nível dos chunks
+            tipo_caso: Filtrar por tipo de caso (opcional)
+            top_k: Número de resultados (usa Config.CITACOES_MAX_CHUNKS se None)
+            
+        Returns:
+            Lista de chunks com 'citacoes' (chaves casadas), ordenada por
+            especificidade do casamento e similaridade
+        """
+        chaves = extrair_citacoes(query_text)['chaves']
+        if not chaves:
+            return []
+        
+        hits = self.indice_citacoes.buscar(chaves, nivel=nivel, tipo_caso=tipo_caso)
+        hits = hits[:top_k or Config.CITACOES_MAX_CHUNKS]
+        if not hits:
+            return []
+        
+        por_id = {
+            chunk['id']: chunk
+            for chunk in self._carregar_com_similaridade([hit['id'] for hit in hits], query_embedding, nivel)
+        }
+        chunks = [
+            {**por_id[hit['id']], 'score_citacao': hit['score'], 'citacoes': hit['chaves']}
+            for hit in hits
+        ]
+        chunks.sort(key=lambda chunk: (-chunk['score_citacao'], -chunk['similaridade']))
         return chunks
     
-    def classificar_tipo_caso(self, query_embedding: List[float]) -> Dict:
+    def _complementar_nivel_3(
+        self,
+        query_text: str,
+        query_embedding: List[float],
+        tipo_caso: Optional[str],
+        chunks_nivel_3: List[Dict]
+    ) -> List[Dict]:
+        """
+        Põe à frente do nível 3 os chunks que citam os diplomas da petição
+        e anota a categoria (dispositivo/precedente/argumento) de cada chunk
         """
-        Classifica o tipo de caso baseado em similaridade com nível 1
+        citados = self.buscar_por_citacoes(query_text, query_embedding, tipo_caso=tipo_caso)
+        ids_citados = {chunk['id'] for chunk in citados}
+        
+        chunks = citados + [chunk for chunk in chunks_nivel_3 if chunk['id'] not in ids_citados]
+        categorias = self.indice_citacoes.categorias([chunk['id'] for chunk in chunks])
+        return [{**chunk, 'categoria': categorias[chunk['id']]} for chunk in chunks]
+    
+    def classificar_tipo_caso(
+        self,
+        query_embedding: List[float],
+        metodo: Optional[str] = None
+    ) -> Dict:
+        """
+        Classifica o tipo de caso da petição
         
         Args:
             query_embedding: Embedding da petição inicial
+            metodo: 'centroides' ou 'vizinhos' (usa Config.CLASSIFICADOR_METODO se None)
             
         Returns:
             Dict com tipo_caso e confiança
         """
+        metodo = metodo or Config.CLASSIFICADOR_METODO
+        
+        if metodo == 'centroides':
+            # Produto com protótipos pré-computados (sem busca vetorial)
+            return self.classificador.classificar(query_embedding)
+        
         # Buscar top-k documentos nível 1
         chunks_nivel_1 = self.buscar_nivel_1(query_embedding, top_k=10)
         
+        return self._classificar_por_chunks(chunks_nivel_1)
+    
+    def _classificar_por_chunks(self, chunks_nivel_1: List[Dict]) -> Dict:
+        """Classifica o tipo de caso a partir de chunks de nível 1 já recuperados"""
         if not chunks_nivel_1:
             return {
                 'tipo_caso': None,
@@ -281,11 +977,216 @@ class RAGRetriever:
             'distribuicao': scores
         }
     
+    def classificar_tipo_caso_lote(
+        self,
+        query_embeddings: List[List[float]],
+        metodo: Optional[str] = None,
+        tamanho_lote: Optional[int] = None
+    ) -> List[Dict]:
+        """
+        Classifica o tipo de caso de várias petições
+        
+        Args:
+            query_embeddings: Embeddings das petições
+            metodo: 'centroides' ou 'vizinhos' (usa Config.CLASSIFICADOR_METODO se None)
+            tamanho_lote: Máximo de queries por busca no método 'vizinhos'
+        """
+        metodo = metodo or Config.CLASSIFICADOR_METODO
+        
+        if metodo == 'centroides':
+            return self.classificador.classificar_lote(query_embeddings)
+        
+        # Vizinhos: top-10 do nível 1 para várias queries por busca
+        tamanho_lote = tamanho_lote or Config.RETRIEVAL_LOTE_QUERIES
+        min_similarity = Config.RETRIEVAL_CONFIG['nivel_1']['min_similarity']
+        classificacoes = []
+        for pos in range(0, len(query_embeddings), tamanho_lote):
+            bloco = query_embeddings[pos:pos + tamanho_lote]
+            results = self._consultar_lote(bloco, 10, self._montar_filtro(1))
+            classificacoes.extend(
+                self._classificar_por_chunks(
+                    self._converter_resultados(results, 1, min_similarity, indice=j)
+                )
+                for j in range(len(bloco))
+            )
+        
+        return classificacoes
+    
+    def buscar_sobreamostrado(
+        self,
+        query_embedding: List[float],
+        tipo_caso: Optional[str] = None
+    ) -> '_HitsSobreamostrados':
+        """
+        Executa uma única busca sobre-amostrada cobrindo os 3 níveis
+        
+        A busca traz apenas ids e distâncias; nivel/tipo_lit/tipo_doc vêm de
+        um mapa em memória e os documentos só são carregados (via
+        _materializar) para os chunks efetivamente selecionados.
+        
+        Args:
+            query_embedding: Embedding da query
+            tipo_caso: Filtrar por tipo de caso (opcional)
+            
+        Returns:
+            Hits ordenados por similaridade, separáveis por nível em memória
+        """
+        soma_top_k = sum(
+            Config.RETRIEVAL_CONFIG[f'nivel_{nivel}']['top_k'] for nivel in (1, 2, 3)
+        )
+        total = self.collection.count()
+        n_results = min(Config.RETRIEVAL_FUNDIDO_FATOR * soma_top_k, total)
+        
+        self._contar_query()
+        results = self.collection.query(
+            query_embeddings=[query_embedding],
+            n_results=n_results,
+            where={'tipo_lit': tipo_caso} if tipo_caso else None,
+            include=['distances']
+        )
+        
+        ids = results['ids'][0]
+        mapa = self._metadados_filtro(ids)
+        
+        hits = []
+        for chunk_id, dist in zip(ids, results['distances'][0]):
+            similaridade = 1 - dist if Config.DISTANCE_METRIC == 'cosine' else dist
+            hits.append({
+                'id': chunk_id,
+                'metadata': mapa[chunk_id],
+                'similaridade': similaridade
+            })
+        
+        return _HitsSobreamostrados(hits, truncado=n_results < total and len(hits) >= n_results)
+    
+    def _metadados_filtro(self, ids: List[str]) -> Dict[str, Dict]:
+        """
+        Retorna nivel/tipo_lit/tipo_doc dos ids, a partir de um mapa em memória
+        
+        O mapa é carregado uma vez (só metadados) e recarregado quando
+        aparece um id desconhecido (chunks adicionados à collection).
+        """
+        versao = self._versao
+        mapa = versao.mapa_filtros
+        if mapa is None or any(i not in mapa for i in ids):
+            todos = versao.collection.get(include=['metadatas'])
+            mapa = {
+                chunk_id: {
+                    campo: meta.get(campo)
+                    for campo in ('nivel', 'tipo_lit', 'tipo_doc')
+                }
+                for chunk_id, meta in zip(todos['ids'], todos['metadatas'])
+            }
+            # Troca da referência é atômica: buscas concorrentes veem o mapa antigo ou o novo
+            versao.mapa_filtros = mapa
+        
+        return mapa
+    
+    def _materializar(self, chunks: List[Dict]) -> List[Dict]:
+        """Carrega conteúdo (ou trechos) e metadados completos de chunks selecionados por id"""
+        if not chunks:
+            return []
+        
+        campos = ['metadatas'] if Config.RETRIEVAL_TRECHOS else ['documents', 'metadatas']
+        results = self.collection.get(ids=[chunk['id'] for chunk in chunks], include=campos)
+        documentos = results['documents'] if results.get('documents') is not None else [None] * len(results['ids'])
+        por_id = {
+            chunk_id: (doc, meta)
+            for chunk_id, doc, meta in zip(results['ids'], documentos, results['metadatas'])
+        }
+        
+        materializados = []
+        for chunk in chunks:
+            doc, meta = por_id[chunk['id']]
+            materializados.append({
+                'id': chunk['id'],
+                'conteudo': doc,
+                'metadata': meta,
+                'similaridade': chunk['similaridade'],
+                'nivel': chunk['nivel']
+            })
+        
+        return self._anexar_trechos(materializados) if Config.RETRIEVAL_TRECHOS else materializados
+    
+    def _obter_executor(self) -> ThreadPoolExecutor:
+        """Pool de threads para buscas de nível concorrentes"""
+        with self._lock:
+            if self._executor is None:
+                self._executor = ThreadPoolExecutor(
+                    max_workers=Config.RETRIEVAL_PARALELO_WORKERS,
+                    thread_name_prefix='retrieval'
+                )
+            return self._executor
+    
+    def _executar_nivel(self, busca, query_embedding: List[float], parametros: Dict) -> tuple:
+        """Executa a busca de um nível na thread do pool (chunks, tempo, buscas vetoriais)"""
+        inicio = time.perf_counter()
+        queries_inicio = self._queries_thread()
+        chunks = busca(query_embedding, **parametros)
+        return chunks, time.perf_counter() - inicio, self._queries_thread() - queries_inicio
+    
+    def buscar_niveis_paralelo(
+        self,
+        query_embedding: List[float],
+        tipo_caso: Optional[str] = None,
+        timeout: Optional[float] = None,
+        tempos: Optional[Dict] = None
+    ) -> Dict[int, List[Dict]]:
+        """
+        Executa as buscas dos 3 níveis concorrentemente
+        
+        Args:
+            query_embedding: Embedding da query
+            tipo_caso: Filtrar por tipo de caso (opcional)
+            timeout: Tempo máximo (s) para os 3 níveis (usa Config se None)
+            tempos: Dict que recebe o tempo de cada nível (None se expirado)
+            
+        Returns:
+            Dict nivel -> chunks (lista vazia para nível que excedeu o timeout)
+        """
+        timeout = timeout if timeout is not None else Config.RETRIEVAL_PARALELO_TIMEOUT
+        tempos = tempos if tempos is not None else {}
+        
+        buscas = {
+            1: (self.buscar_nivel_1, {'tipo_caso': tipo_caso}),
+            2: (self.buscar_nivel_2, {'tipo_caso': tipo_caso, 'tipo_doc': 'contestacao'}),
+            3: (self.buscar_nivel_3, {'tipo_caso': tipo_caso})
+        }
+        
+        executor = self._obter_executor()
+        futuros = {
+            nivel: executor.submit(self._executar_nivel, busca, query_embedding, parametros)
+            for nivel, (busca, parametros) in buscas.items()
+        }
+        _, pendentes = wait(futuros.values(), timeout=timeout)
+        
+        resultados = {}
+        for nivel, futuro in futuros.items():
+            if futuro in pendentes:
+                # Não interrompe uma busca já iniciada, apenas deixa de aguardá-la
+                futuro.cancel()
+                print(f"⚠️  Nível {nivel} excedeu o timeout ({timeout:.1f}s): seguindo sem seus chunks")
+                resultados[nivel] = []
+                tempos[f'nivel_{nivel}'] = None
+                continue
+            
+            chunks, tempo, queries = futuro.result()
+            resultados[nivel] = chunks
+            tempos[f'nivel_{nivel}'] = tempo
+            # Buscas feitas nas threads do pool contam para o retrieval desta thread
+            self._local.queries = self._queries_thread() + queries
+        
+        return resultados
+    
     def retrieval_hierarquico(
         self,
         query_text: str,
         tipo_caso: Optional[str] = None,
-        auto_classificar: bool = True
+        auto_classificar: bool = True,
+        modo: Optional[str] = None,
+        janelas: Optional[List[str]] = None,
+        pedidos: Optional[List[str]] = None,
+        fatos: Optional[List[str]] = None
     ) -> Dict:
         """
         Executa retrieval hierárquico completo em 3 níveis
@@ -294,23 +1195,83 @@ class RAGRetriever:
             query_text: Texto da query (petição inicial)
             tipo_caso: Tipo de caso (se conhecido). Se None e auto_classificar=True, classifica automaticamente
             auto_classificar: Se True, classifica automaticamente o tipo de caso
+            modo: 'sequencial', 'fundido', 'paralelo', 'hibrido' ou 'multijanela' (usa Config.RETRIEVAL_MODO se None)
+            janelas: Janelas da petição para o modo multijanela
+                (ProcessadorPeticao.get_janelas_para_embedding); sem janelas, usa só query_text
+            pedidos: Pedidos do autor; com Config.PEDIDOS_RETRIEVAL_ENABLED, adiciona
+                'por_pedido' (retrieval_por_pedido) ao resultado
+            fatos: Elementos factuais consultados junto com os pedidos
             
         Returns:
             Dict com chunks de todos os níveis e metadados
         """
+        self._verificar_versao()
+        # Cache da versão em uso no início (uma troca de versão no meio não mistura caches)
+        cache_resultados = self.cache_resultados
+        modo = modo or Config.RETRIEVAL_MODO
+        queries_inicio = self._queries_thread()
+        tempos = {}
+        
         print("\n" + "="*80)
-        print("🔍 INICIANDO RETRIEVAL HIERÁRQUICO")
+        print(f"🔍 INICIANDO RETRIEVAL HIERÁRQUICO (modo: {modo})")
         print("="*80 + "\n")
         
         # 1. Gerar embedding da query
-        print("📊 Gerando embedding da query...")
-        query_embedding = self.gerar_embedding(query_text)
+        inicio = time.perf_counter()
+        if modo == 'multijanela':
+            # Resumo (query_text) como janela 0 + trechos da petição, num encode em lote
+            janelas = [query_text] + [janela for janela in (janelas or []) if janela != query_text]
+            janelas = selecionar_janelas(janelas, Config.MULTIJANELA_MAX_JANELAS)
+            print(f"📊 Gerando embeddings de {len(janelas)} janelas da petição...")
+            embeddings_janelas = self.gerar_embeddings(janelas)
+            query_embedding = embeddings_janelas[0]
+        else:
+            print("📊 Gerando embedding da query...")
+            query_embedding = self.gerar_embedding(query_text)
+        tempos['embedding'] = time.perf_counter() - inicio
         print("✅ Embedding gerado\n")
         
+        # Cache semântico: petição quase idêntica a uma recente reutiliza o resultado
+        if cache_resultados is not None:
+            inicio = time.perf_counter()
+            # No modo multijanela, a petição inteira (média das janelas) define a query
+            vetor_cache = np.mean(embeddings_janelas, axis=0) if modo == 'multijanela' else query_embedding
+            parametros_cache = (
+                modo, tipo_caso, auto_classificar,
+                Config.CITACOES_ENABLED, Config.HIERARQUIA_EXPANSAO, Config.RETRIEVAL_TRECHOS
+            )
+            achado = cache_resultados.obter(vetor_cache, parametros_cache)
+            tempos['cache'] = time.perf_counter() - inicio
+            if achado is not None:
+                resultado, similaridade = achado
+                resultado = self._resultado_do_cache(
+                    resultado, similaridade, query_embedding, pedidos, fatos, tempos, queries_inicio
+                )
+                print("="*80)
+                print(f"⚡ RESULTADO DO CACHE SEMÂNTICO (cosseno {similaridade:.4f}) - "
+                      f"Total: {resultado['total_chunks']} chunks ({resultado['queries']} buscas vetoriais)")
+                print("="*80 + "\n")
+                return resultado
+        
+        # Modo fundido: uma única busca, separada por nível em memória
+        hits = None
+        if modo == 'fundido':
+            inicio = time.perf_counter()
+            hits = self.buscar_sobreamostrado(query_embedding, tipo_caso=tipo_caso)
+            tempos['busca_fundida'] = time.perf_counter() - inicio
+        
         # 2. Classificar tipo de caso (se necessário)
+        inicio = time.perf_counter()
         if tipo_caso is None and auto_classificar:
             print("🏷️  Classificando tipo de caso...")
-            classificacao = self.classificar_tipo_caso(query_embedding)
+            if hits is not None and Config.CLASSIFICADOR_METODO == 'vizinhos':
+                # Reaproveita os hits de nível 1 da busca fundida
+                chunks_classificacao = hits.selecionar(1, top_k=10)
+                if chunks_classificacao is None:
+                    chunks_classificacao = self.buscar_nivel_1(query_embedding, top_k=10)
+                classificacao = self._classificar_por_chunks(chunks_classificacao)
+            else:
+                classificacao = self.classificar_tipo_caso(query_embedding)
             tipo_caso = classificacao['tipo_caso']
             confianca = classificacao['confianca']
             
@@ -322,23 +1283,131 @@ class RAGRetriever:
                 tipo_caso = None
         else:
             classificacao = {'tipo_caso': tipo_caso, 'confianca': 1.0}
+        tempos['classificacao'] = time.perf_counter() - inicio
         
         # 3. Buscar em cada nível
-        print("📚 Buscando no Nível 1 (Contexto Global)...")
-        chunks_nivel_1 = self.buscar_nivel_1(query_embedding, tipo_caso=tipo_caso)
-        print(f"   ✅ {len(chunks_nivel_1)} chunks recuperados\n")
-        
-        print("📄 Buscando no Nível 2 (Seções Processuais)...")
-        chunks_nivel_2 = self.buscar_nivel_2(
-            query_embedding,
-            tipo_caso=tipo_caso,
-            tipo_doc='contestacao'  # Focar em contestações
-        )
-        print(f"   ✅ {len(chunks_nivel_2)} chunks recuperados\n")
+        if modo == 'paralelo':
+            # Buscas dos 3 níveis concorrentes (latência ~ do nível mais lento)
+            print("📚 Buscando nos Níveis 1, 2 e 3 em paralelo...")
+            chunks_por_nivel = self.buscar_niveis_paralelo(
+                query_embedding,
+                tipo_caso=tipo_caso,
+                tempos=tempos
+            )
+            chunks_nivel_1, chunks_nivel_2, chunks_nivel_3 = (
+                chunks_por_nivel[nivel] for nivel in (1, 2, 3)
+            )
+        elif modo == 'multijanela':
+            # Uma busca multi-query por nível (todas as janelas), hits agregados por chunk
+            chunks_por_nivel = {}
+            for nivel, rotulo, filtros in [
+                (1, "📚 Buscando no Nível 1 (Contexto Global)...", {}),
+                (2, "📄 Buscando no Nível 2 (Seções Processuais)...", {'tipo_doc': 'contestacao'}),
+                (3, "⚖️  Buscando no Nível 3 (Chunks Atômicos)...", {})
+            ]:
+                print(f"{rotulo} [{len(embeddings_janelas)} janelas]")
+                inicio = time.perf_counter()
+                chunks_por_nivel[nivel] = self.buscar_nivel_multijanela(
+                    nivel, embeddings_janelas, tipo_caso=tipo_caso, **filtros
+                )
+                tempos[f'nivel_{nivel}'] = time.perf_counter() - inicio
+            chunks_nivel_1, chunks_nivel_2, chunks_nivel_3 = (
+                chunks_por_nivel[nivel] for nivel in (1, 2, 3)
+            )
+        elif modo == 'hibrido':
+            # Rankings vetorial e BM25 fundidos por RRF em cada nível
+            chunks_por_nivel = {}
+            for nivel, rotulo, filtros in [
+                (1, "📚 Buscando no Nível 1 (Contexto Global)...", {}),
+                (2, "📄 Buscando no Nível 2 (Seções Processuais)...", {'tipo_doc': 'contestacao'}),
+                (3, "⚖️  Buscando no Nível 3 (Chunks Atômicos)...", {})
+            ]:
+                print(f"{rotulo} [híbrido]")
+                inicio = time.perf_counter()
+                chunks_por_nivel[nivel] = self.buscar_nivel_hibrido(
+                    nivel, query_text, query_embedding, tipo_caso=tipo_caso, **filtros
+                )
+                tempos[f'nivel_{nivel}'] = time.perf_counter() - inicio
+            chunks_nivel_1, chunks_nivel_2, chunks_nivel_3 = (
+                chunks_por_nivel[nivel] for nivel in (1, 2, 3)
+            )
+        else:
+            # No modo fundido, só rebusca o nível cujos hits
+            # sobre-amostrados não garantem o resultado exato
+            print("📚 Buscando no Nível 1 (Contexto Global)...")
+            inicio = time.perf_counter()
+            chunks_nivel_1 = hits.selecionar(1, tipo_caso=tipo_caso) if hits else None
+            if chunks_nivel_1 is None:
+                chunks_nivel_1 = self.buscar_nivel_1(query_embedding, tipo_caso=tipo_caso)
+            tempos['nivel_1'] = time.perf_counter() - inicio
+            
+            print("📄 Buscando no Nível 2 (Seções Processuais)...")
+            inicio = time.perf_counter()
+            chunks_nivel_2 = (
+                hits.selecionar(2, tipo_caso=tipo_caso, tipo_doc='contestacao') if hits else None
+            )
+            if chunks_nivel_2 is None:
+                chunks_nivel_2 = self.buscar_nivel_2(
+                    query_embedding,
+                    tipo_caso=tipo_caso,
+                    tipo_doc='contestacao'  # Focar em contestações
+                )
+            tempos['nivel_2'] = time.perf_counter() - inicio
+            
+            print("⚖️  Buscando no Nível 3 (Chunks Atômicos)...")
+            inicio = time.perf_counter()
+            chunks_nivel_3 = hits.selecionar(3, tipo_caso=tipo_caso) if hits else None
+            if chunks_nivel_3 is None:
+                chunks_nivel_3 = self.buscar_nivel_3(query_embedding, tipo_caso=tipo_caso)
+            tempos['nivel_3'] = time.perf_counter() - inicio
+        
+        if hits is not None:
+            # Carregar documentos dos chunks selecionados em memória (um único get)
+            inicio = time.perf_counter()
+            niveis = [chunks_nivel_1, chunks_nivel_2, chunks_nivel_3]
+            pendentes = [chunk for chunks in niveis for chunk in chunks if 'conteudo' not in chunk]
+            carregados = iter(self._materializar(pendentes))
+            chunks_nivel_1, chunks_nivel_2, chunks_nivel_3 = [
+                [next(carregados) if 'conteudo' not in chunk else chunk for chunk in chunks]
+                for chunks in niveis
+            ]
+            tempos['materializacao'] = time.perf_counter() - inicio
+        
+        if Config.CITACOES_ENABLED:
+            # Lookup exato das citações da petição (sem busca vetorial)
+            inicio = time.perf_counter()
+            total_nivel_3 = len(chunks_nivel_3)
+            # No modo multijanela, citações de todas as janelas (petição inteira)
+            texto_citacoes = " ".join(janelas) if modo == 'multijanela' else query_text
+            chunks_nivel_3 = self._complementar_nivel_3(texto_citacoes, query_embedding, tipo_caso, chunks_nivel_3)
+            tempos['citacoes'] = time.perf_counter() - inicio
+            if len(chunks_nivel_3) > total_nivel_3:
+                print(f"⚖️  Citações da petição: +{len(chunks_nivel_3) - total_nivel_3} chunks de nível 3")
         
-        print("⚖️  Buscando no Nível 3 (Chunks Atômicos)...")
-        chunks_nivel_3 = self.buscar_nivel_3(query_embedding, tipo_caso=tipo_caso)
-        print(f"   ✅ {len(chunks_nivel_3)} chunks recuperados\n")
+        if Config.HIERARQUIA_EXPANSAO:
+            # Documento e seções/chunks vizinhos dos melhores hits, por id (sem busca vetorial)
+            inicio = time.perf_counter()
+            total_antes = len(chunks_nivel_1) + len(chunks_nivel_2) + len(chunks_nivel_3)
+            expandidos = self.expandir_hierarquia(
+                query_embedding,
+                {1: chunks_nivel_1, 2: chunks_nivel_2, 3: chunks_nivel_3}
+            )
+            chunks_nivel_1, chunks_nivel_2, chunks_nivel_3 = (expandidos[nivel] for nivel in (1, 2, 3))
+            tempos['hierarquia'] = time.perf_counter() - inicio
+            acrescentados = len(chunks_nivel_1) + len(chunks_nivel_2) + len(chunks_nivel_3) - total_antes
+            if acrescentados:
+                print(f"🌳 Expansão hierárquica: +{acrescentados} chunks (pais e vizinhos)")
+        
+        por_pedido = None
+        if Config.PEDIDOS_RETRIEVAL_ENABLED and (pedidos or fatos):
+            # Contexto de cada pedido/fato: 2 buscas em lote, com o tipo já classificado
+            inicio = time.perf_counter()
+            por_pedido = self.retrieval_por_pedido(pedidos or [], fatos, tipo_caso=tipo_caso)
+            tempos['por_pedido'] = time.perf_counter() - inicio
+        
+        print(f"   ✅ Nível 1: {len(chunks_nivel_1)} chunks recuperados")
+        print(f"   ✅ Nível 2: {len(chunks_nivel_2)} chunks recuperados")
+        print(f"   ✅ Nível 3: {len(chunks_nivel_3)} chunks recuperados\n")
         
         # 4. Consolidar resultados
         resultado = {
@@ -347,31 +1416,409 @@ class RAGRetriever:
             'nivel_2': chunks_nivel_2,
             'nivel_3': chunks_nivel_3,
             'total_chunks': len(chunks_nivel_1) + len(chunks_nivel_2) + len(chunks_nivel_3),
-            'query_embedding': query_embedding
+            'query_embedding': query_embedding,
+            'queries': self._queries_thread() - queries_inicio,
+            'tempos': tempos  # segundos por etapa (None = nível expirado no modo paralelo)
         }
+        if modo == 'multijanela':
+            resultado['janelas'] = len(janelas)
+        if por_pedido is not None:
+            resultado['por_pedido'] = por_pedido
+        if cache_resultados is not None:
+            # Sem o embedding: um hit usa o da própria query (e a cópia fica menor)
+            cache_resultados.armazenar(
+                vetor_cache, parametros_cache,
+                {chave: valor for chave, valor in resultado.items() if chave != 'query_embedding'}
+            )
         
         print("="*80)
-        print(f"✅ RETRIEVAL CONCLUÍDO - Total: {resultado['total_chunks']} chunks")
+        print(f"✅ RETRIEVAL CONCLUÍDO - Total: {resultado['total_chunks']} chunks "
+              f"({resultado['queries']} buscas vetoriais)")
         print("="*80 + "\n")
         
         return resultado
     
-    def get_estatisticas(self) -> Dict:
-        """Retorna estatísticas do vector store"""
-        stats = {
-            'total_chunks': self.collection.count(),
-            'por_nivel': {},
-            'por_tipo': {}
+    def retrieval_hierarquico_lote(
+        self,
+        query_texts: List[str],
+        tipos_caso: Optional[List[Optional[str]]] = None,
+        auto_classificar: bool = True,
+        tamanho_lote: Optional[int] = None
+    ) -> List[Dict]:
+        """
+        Executa o retrieval hierárquico de várias petições de uma vez
+        
+        Embeddings são gerados em lote e cada nível é consultado com uma
+        busca por grupo de petições do mesmo tipo de caso (várias
+        query_embeddings por chamada), em vez de um encode e até quatro
+        buscas por petição.
+        
+        Args:
+            query_texts: Textos das petições
+            tipos_caso: Tipo de caso de cada petição (None = classificar)
+            auto_classificar: Se True, classifica as petições sem tipo informado
+            tamanho_lote: Máximo de queries por busca (usa Config.RETRIEVAL_LOTE_QUERIES se None)
+            
+        Returns:
+            Lista de resultados na mesma estrutura de retrieval_hierarquico
+        """
+        self._verificar_versao()
+        tamanho_lote = tamanho_lote or Config.RETRIEVAL_LOTE_QUERIES
+        tipos_caso = list(tipos_caso) if tipos_caso is not None else [None] * len(query_texts)
+        queries_inicio = self._queries_thread()
+        tempos = {}
+        
+        print(f"\n🔍 RETRIEVAL HIERÁRQUICO EM LOTE: {len(query_texts)} petições")
+        
+        # 1. Embeddings em lote
+        inicio = time.perf_counter()
+        embeddings = self.gerar_embeddings(query_texts)
+        tempos['embedding'] = time.perf_counter() - inicio
+        
+        # 2. Classificação das petições sem tipo informado
+        inicio = time.perf_counter()
+        classificacoes = [
+            {'tipo_caso': tipo, 'confianca': 1.0} if tipo is not None else None
+            for tipo in tipos_caso
+        ]
+        a_classificar = [i for i, tipo in enumerate(tipos_caso) if tipo is None and auto_classificar]
+        if a_classificar:
+            resultado_classificacao = self.classificar_tipo_caso_lote(
+                [embeddings[i] for i in a_classificar],
+                tamanho_lote=tamanho_lote
+            )
+            for i, classificacao in zip(a_classificar, resultado_classificacao):
+                classificacoes[i] = classificacao
+                confiante = classificacao['confianca'] >= Config.MIN_CONFIDENCE_CLASSIFICATION
+                tipos_caso[i] = classificacao['tipo_caso'] if confiante else None
+        classificacoes = [
+            c if c is not None else {'tipo_caso': None, 'confianca': 1.0} for c in classificacoes
+        ]
+        tempos['classificacao'] = time.perf_counter() - inicio
+        
+        # 3. Uma busca por nível para cada grupo de petições do mesmo tipo
+        grupos = {}
+        for i, tipo in enumerate(tipos_caso):
+            grupos.setdefault(tipo, []).append(i)
+        
+        especificacoes = {
+            1: {},
+            2: {'tipo_doc': 'contestacao'},  # Focar em contestações
+            3: {}
+        }
+        
+        chunks = {nivel: [None] * len(query_texts) for nivel in especificacoes}
+        queries_por_grupo = {}
+        for nivel, filtros in especificacoes.items():
+            inicio = time.perf_counter()
+            config = Config.RETRIEVAL_CONFIG[f'nivel_{nivel}']
+            
+            for tipo, indices in grupos.items():
+                where_filter = self._montar_filtro(nivel, tipo_caso=tipo, **filtros)
+                
+                for pos in range(0, len(indices), tamanho_lote):
+                    bloco = indices[pos:pos + tamanho_lote]
+                    results = self._consultar_lote(
+                        [embeddings[i] for i in bloco],
+                        config['top_k'],
+                        where_filter
+                    )
+                    queries_por_grupo[tipo] = queries_por_grupo.get(tipo, 0) + 1
+                    for j, i in enumerate(bloco):
+                        chunks[nivel][i] = self._converter_resultados(
+                            results, nivel, config['min_similarity'], indice=j
+                        )
+            
+            tempos[f'nivel_{nivel}'] = time.perf_counter() - inicio
+        
+        if Config.CITACOES_ENABLED:
+            inicio = time.perf_counter()
+            chunks[3] = [
+                self._complementar_nivel_3(texto, embedding, tipo, chunks_nivel_3)
+                for texto, embedding, tipo, chunks_nivel_3 in zip(query_texts, embeddings, tipos_caso, chunks[3])
+            ]
+            tempos['citacoes'] = time.perf_counter() - inicio
+        
+        if Config.HIERARQUIA_EXPANSAO:
+            inicio = time.perf_counter()
+            for i, query_embedding in enumerate(embeddings):
+                expandidos = self.expandir_hierarquia(
+                    query_embedding,
+                    {nivel: chunks[nivel][i] for nivel in (1, 2, 3)}
+                )
+                for nivel in (1, 2, 3):
+                    chunks[nivel][i] = expandidos[nivel]
+            tempos['hierarquia'] = time.perf_counter() - inicio
+        
+        resultados = []
+        for i, query_embedding in enumerate(embeddings):
+            chunks_nivel_1, chunks_nivel_2, chunks_nivel_3 = (chunks[nivel][i] for nivel in (1, 2, 3))
+            resultados.append({
+                'classificacao': classificacoes[i],
+                'nivel_1': chunks_nivel_1,
+                'nivel_2': chunks_nivel_2,
+                'nivel_3': chunks_nivel_3,
+                'total_chunks': len(chunks_nivel_1) + len(chunks_nivel_2) + len(chunks_nivel_3),
+                'query_embedding': query_embedding,
+                # Buscas (em lote) das quais a petição participou; tempos são do lote
+                'queries': queries_por_grupo[tipos_caso[i]],
+                'tempos': tempos
+            })
+        
+        total_queries = self._queries_thread() - queries_inicio
+        print(f"✅ RETRIEVAL EM LOTE CONCLUÍDO - {len(resultados)} petições, "
+              f"{len(grupos)} grupo(s) de tipo, {total_queries} buscas vetoriais\n")
+        
+        return resultados
+    
+    def retrieval_por_pedido(
+        self,
+        pedidos: List[str],
+        fatos: Optional[List[str]] = None,
+        tipo_caso: Optional[str] = None,
+        top_k_nivel_2: Optional[int] = None,
+        top_k_nivel_3: Optional[int] = None
+    ) -> Dict:
+        """
+        Contexto direcionado a cada pedido e fato da petição
+        
+        Pedidos e fatos são codificados num único encode em lote e cada
+        nível (2 e 3) é consultado com uma busca multi-query para todos os
+        itens, em vez de um encode e duas buscas por item.
+        
+        Args:
+            pedidos: Pedidos do autor (ProcessadorPeticao._extrair_pedidos)
+            fatos: Elementos factuais da petição (opcional)
+            tipo_caso: Filtrar por tipo de caso (opcional)
+            top_k_nivel_2: Trechos de contestação por item (usa Config.PEDIDOS_TOP_K_NIVEL_2 se None)
+            top_k_nivel_3: Chunks atômicos por item (usa Config.PEDIDOS_TOP_K_NIVEL_3 se None)
+            
+        Returns:
+            Dict com 'pedidos' e 'fatos' (listas de {'texto', 'nivel_2',
+            'nivel_3'} na ordem recebida), 'queries' e 'tempos'
+        """
+        self._verificar_versao()
+        pedidos, fatos = self._itens_por_pedido(pedidos, fatos)
+        textos = pedidos + fatos
+        queries_inicio = self._queries_thread()
+        tempos = {}
+        
+        if not textos:
+            return {'pedidos': [], 'fatos': [], 'queries': 0, 'tempos': tempos}
+        
+        print(f"🎯 Retrieval por pedido: {len(pedidos)} pedidos, {len(fatos)} fatos")
+        
+        # 1. Embeddings de todos os itens em lote
+        inicio = time.perf_counter()
+        embeddings = self.gerar_embeddings(textos)
+        tempos['embedding'] = time.perf_counter() - inicio
+        
+        # 2. Uma busca multi-query por nível
+        chunks = {}
+        for nivel, top_k, filtros in [
+            (2, top_k_nivel_2 or Config.PEDIDOS_TOP_K_NIVEL_2, {'tipo_doc': 'contestacao'}),
+            (3, top_k_nivel_3 or Config.PEDIDOS_TOP_K_NIVEL_3, {})
+        ]:
+            inicio = time.perf_counter()
+            where_filter = self._montar_filtro(nivel, tipo_caso=tipo_caso, **filtros)
+            min_similarity = Config.RETRIEVAL_CONFIG[f'nivel_{nivel}']['min_similarity']
+            
+            chunks[nivel] = []
+            for pos in range(0, len(embeddings), Config.RETRIEVAL_LOTE_QUERIES):
+                bloco = embeddings[pos:pos + Config.RETRIEVAL_LOTE_QUERIES]
+                results = self._consultar_lote(bloco, top_k, where_filter)
+                chunks[nivel].extend(
+                    self._converter_resultados(results, nivel, min_similarity, indice=j)
+                    for j in range(len(bloco))
+                )
+            tempos[f'nivel_{nivel}'] = time.perf_counter() - inicio
+        
+        if Config.CITACOES_ENABLED:
+            # Categoria (dispositivo/precedente/argumento) dos chunks atômicos
+            inicio = time.perf_counter()
+            categorias = self.indice_citacoes.categorias(
+                list({chunk['id'] for lista in chunks[3] for chunk in lista})
+            )
+            chunks[3] = [
+                [{**chunk, 'categoria': categorias[chunk['id']]} for chunk in lista]
+                for lista in chunks[3]
+            ]
+            tempos['citacoes'] = time.perf_counter() - inicio
+        
+        itens = [
+            {'texto': texto, 'nivel_2': chunks_nivel_2, 'nivel_3': chunks_nivel_3}
+            for texto, chunks_nivel_2, chunks_nivel_3 in zip(textos, chunks[2], chunks[3])
+        ]
+        resultado = {
+            'pedidos': itens[:len(pedidos)],
+            'fatos': itens[len(pedidos):],
+            'queries': self._queries_thread() - queries_inicio,
+            'tempos': tempos
         }
+        print(f"   ✅ {len(itens)} itens com contexto próprio ({resultado['queries']} buscas vetoriais)")
+        
+        return resultado
+    
+    @staticmethod
+    def _itens_por_pedido(pedidos: Optional[List[str]], fatos: Optional[List[str]]) -> tuple:
+        """Pedidos e fatos não vazios, até Config.PEDIDOS_MAX_ITENS / PEDIDOS_MAX_FATOS"""
+        pedidos = [p.strip() for p in (pedidos or []) if p and p.strip()][:Config.PEDIDOS_MAX_ITENS]
+        fatos = [f.strip() for f in (fatos or []) if f and f.strip()][:Config.PEDIDOS_MAX_FATOS]
+        return pedidos, fatos
+    
+    def _resultado_do_cache(
+        self,
+        resultado: Dict,
+        similaridade: float,
+        query_embedding: List[float],
+        pedidos: Optional[List[str]],
+        fatos: Optional[List[str]],
+        tempos: Dict,
+        queries_inicio: int
+    ) -> Dict:
+        """
+        Adapta um resultado do cache semântico à petição atual
+        
+        O contexto por pedido só é reaproveitado se os pedidos e fatos forem
+        os mesmos; senão é recuperado de novo (2 buscas em lote).
+        """
+        if not (Config.PEDIDOS_RETRIEVAL_ENABLED and (pedidos or fatos)):
+            resultado.pop('por_pedido', None)
+        else:
+            itens = self._itens_por_pedido(pedidos, fatos)
+            guardado = resultado.get('por_pedido')
+            if guardado is None or (
+                [item['texto'] for item in guardado['pedidos']],
+                [item['texto'] for item in guardado['fatos']]
+            ) != itens:
+                # Mesmo filtro de tipo do retrieval guardado (sem filtro se a confiança foi baixa)
+                classificacao = resultado['classificacao']
+                tipo_caso = (
+                    classificacao['tipo_caso']
+                    if classificacao['confianca'] >= Config.MIN_CONFIDENCE_CLASSIFICATION else None
+                )
+                inicio = time.perf_counter()
+                resultado['por_pedido'] = self.retrieval_por_pedido(*itens, tipo_caso=tipo_caso)
+                tempos['por_pedido'] = time.perf_counter() - inicio
+        
+        resultado['query_embedding'] = query_embedding
+        resultado['queries'] = self._queries_thread() - queries_inicio
+        resultado['tempos'] = tempos
+        resultado['cache'] = {'similaridade': similaridade}
+        return resultado
+    
+    def get_estatisticas(self, forcar: bool = False) -> Dict:
+        """
+        Retorna estatísticas do vector store
+        
+        As contagens são calculadas em uma única passada pelos metadados e
+        reaproveitadas até a collection mudar (assinatura dos arquivos ou
+        total de chunks).
         
-        # Por nível
-        for nivel in [1, 2, 3]:
-            results = self.collection.get(where={'nivel': nivel})
-            stats['por_nivel'][f'nivel_{nivel}'] = len(results['ids'])
+        Args:
+            forcar: Recalcula mesmo com o índice atualizado
+        """
+        self._verificar_versao()
+        estado = self._versao
+        versao = (
+            assinatura_vector_store(estado.vector_store_dir, estado.collection_name),
+            estado.collection.count()
+        )
         
-        # Por tipo de litígio
-        for tipo in Config.TIPOS_CASO.keys():
-            results = self.collection.get(where={'tipo_lit': tipo})
-            stats['por_tipo'][tipo] = len(results['ids'])
+        indice = estado.estatisticas
+        if not forcar and indice is not None and indice[0] == versao:
+            return indice[1]
+        
+        with self._lock_estatisticas:
+            indice = estado.estatisticas
+            if forcar or indice is None or indice[0] != versao:
+                indice = (versao, self._indexar_metadados(estado.collection))
+                estado.estatisticas = indice
+        
+        return indice[1]
+    
+    def _indexar_metadados(self, collection, lote: int = 5000) -> Dict:
+        """Conta chunks por nivel, tipo_lit, tipo_doc e seção (só metadados, em lotes)"""
+        stats = {
+            'total_chunks': 0,
+            'por_nivel': {f'nivel_{nivel}': 0 for nivel in [1, 2, 3]},
+            'por_tipo': {tipo: 0 for tipo in Config.TIPOS_CASO.keys()},
+            'por_tipo_doc': {},
+            'por_secao': {}
+        }
+        
+        offset = 0
+        while True:
+            results = collection.get(include=['metadatas'], limit=lote, offset=offset)
+            metadatas = results['metadatas'] or []
+            
+            for meta in metadatas:
+                nivel = f"nivel_{meta.get('nivel')}"
+                tipo = meta.get('tipo_lit') or 'DESCONHECIDO'
+                tipo_doc = meta.get('tipo_doc') or 'DESCONHECIDO'
+                # Chunks antigos usam 'secao'; os atuais, 'tipo_secao' (ex.: fatos_2 -> fatos)
+                secao = meta.get('secao') or meta.get('tipo_secao') or 'DESCONHECIDO'
+                secao = re.sub(r'_\d+$', '', secao)
+                
+                stats['por_nivel'][nivel] = stats['por_nivel'].get(nivel, 0) + 1
+                stats['por_tipo'][tipo] = stats['por_tipo'].get(tipo, 0) + 1
+                stats['por_tipo_doc'][tipo_doc] = stats['por_tipo_doc'].get(tipo_doc, 0) + 1
+                stats['por_secao'][secao] = stats['por_secao'].get(secao, 0) + 1
+            
+            stats['total_chunks'] += len(metadatas)
+            if len(metadatas) < lote:
+                break
+            offset += lote
         
         return stats
+
+class _HitsSobreamostrados:
+    """Hits de uma busca sobre-amostrada, separados por nível em memória"""
+    
+    def __init__(self, chunks: List[Dict], truncado: bool):
+        """
+        Args:
+            chunks: Hits (id, metadata de filtro, similaridade) ordenados
+            truncado: Se a busca pode ter deixado hits de fora (atingiu n_results)
+        """
+        self.chunks = chunks
+        self.truncado = truncado
+        self.menor_similaridade = chunks[-1]['similaridade'] if chunks else 0.0
+    
+    def selecionar(
+        self,
+        nivel: int,
+        tipo_caso: Optional[str] = None,
+        tipo_doc: Optional[str] = None,
+        top_k: Optional[int] = None
+    ) -> Optional[List[Dict]]:
+        """
+        Seleciona os chunks de um nível, como buscar_nivel_X faria
+        
+        Returns:
+            Lista de hits (ainda sem conteúdo), ou None se a sobre-amostragem
+            não garante o mesmo resultado de uma busca dedicada
+        """
+        config = Config.RETRIEVAL_CONFIG[f'nivel_{nivel}']
+        top_k = top_k or config['top_k']
+        min_similarity = config['min_similarity']
+        
+        selecionados = []
+        for chunk in self.chunks:
+            meta = chunk['metadata']
+            if meta.get('nivel') != nivel or chunk['similaridade'] < min_similarity:
+                continue
+            if tipo_caso and meta.get('tipo_lit') != tipo_caso:
+                continue
+            if tipo_doc and meta.get('tipo_doc') != tipo_doc:
+                continue
+            
+            selecionados.append({**chunk, 'nivel': nivel})
+            if len(selecionados) >= top_k:
+                return selecionados
+        
+        # Menos de top_k: só é exato se nenhum hit acima do limiar ficou de fora
+        if self.truncado and self.menor_similaridade >= min_similarity:
+            return None
+        
+        return selecionados
@@ -0,0 +1,242 @@
+"""
+═══════════════════════════════════════════════════════════════════════════
+TRECHOS PRÉ-CALCULADOS DOS CHUNKS
+═══════════════════════════════════════════════════════════════════════════
+O prompt e a interface exibem só o início de cada chunk (200 a 500
+caracteres). Este índice guarda, para cada chunk, os trechos nesses
+tamanhos já cortados em fim de frase, para que o retrieval possa buscar
+apenas ids, metadados e distâncias e anexar os trechos em memória, sem
+ler o documento inteiro do vector store. O texto completo é carregado
+sob demanda (RAGRetriever.carregar_conteudo).
+
+Cada chunk guarda o prefixo do documento até o maior tamanho e a posição
+de corte de cada tamanho (Config.TRECHOS_TAMANHOS).
+"""
+
+import hashlib
+import json
+import re
+import threading
+from pathlib import Path
+from typing import Dict, List, Optional
+
+from config.settings import Config
+from modules.vector_backend import assinatura_vector_store, em_gravacao
+
+ARQUIVO_INDICE = "indice.json"
+ARQUIVO_MANIFESTO = "manifesto.json"
+
+# Incrementar quando o corte dos trechos mudar (força reindexação)
+VERSAO_TRECHOS = 1
+
+# Fim de frase (ou de item: ';' e ':') seguido de espaço, ou quebra de linha
+_FIM_FRASE = re.compile(r'[.;:!?](?=\s)|\n')
+
+
+def cortar_trecho(texto: str, tamanho: int, minimo: float = 0.6) -> str:
+    """
+    Início do texto com até `tamanho` caracteres, cortado em fim de frase
+    
+    Usa o último fim de frase a partir de `minimo` * tamanho; sem nenhum,
+    corta no último espaço (ou no próprio limite, em textos sem espaços).
+    """
+    texto = texto or ""
+    if len(texto) <= tamanho:
+        return texto
+    
+    inicio_busca = int(minimo * tamanho)
+    # Um caractere a mais: o fim de frase no limite precisa ver o espaço seguinte
+    janela = texto[:tamanho + 1]
+    fins = [m.end() for m in _FIM_FRASE.finditer(janela, inicio_busca) if m.end() <= tamanho]
+    if fins:
+        return texto[:fins[-1]].rstrip()
+    
+    espaco = texto.rfind(' ', inicio_busca, tamanho + 1)
+    if espaco > 0:
+        return texto[:espaco].rstrip()
+    return texto[:tamanho]
+
+
+def trecho(chunk: Dict, tamanho: int) -> str:
+    """
+    Trecho de um chunk recuperado, com ou sem o texto completo carregado
+    
+    Usa o trecho pré-calculado quando o chunk veio do retrieval com
+    trechos (Config.RETRIEVAL_TRECHOS); senão corta o 'conteudo'.
+    """
+    trechos = chunk.get('trechos')
+    if trechos and tamanho in trechos:
+        return trechos[tamanho]
+    if chunk.get('conteudo') is not None:
+        return cortar_trecho(chunk['conteudo'], tamanho)
+    if trechos:
+        # Tamanho não pré-calculado: corta do maior disponível
+        return cortar_trecho(trechos[max(trechos)], tamanho)
+    return ""
+
+
+def _hash(texto: str) -> str:
+    """Hash do conteúdo do chunk (detecta documentos alterados com o mesmo id)"""
+    return hashlib.sha1(texto.encode('utf-8')).hexdigest()
+
+
+class IndiceTrechos:
+    """Trechos persistidos por chunk: id -> prefixo do documento e posições de corte"""
+    
+    def __init__(
+        self,
+        collection,
+        vector_store_dir: Optional[Path] = None,
+        diretorio: Optional[Path] = None,
+        tamanhos: Optional[List[int]] = None
+    ):
+        """
+        Args:
+            collection: Collection (ChromaDB ou NumpyVectorStore) com os documentos
+            vector_store_dir: Diretório do vector store (usa Config se None)
+            diretorio: Diretório do índice (usa Config.TRECHOS_DIR se None)
+            tamanhos: Tamanhos dos trechos (usa Config.TRECHOS_TAMANHOS se None)
+        """
+        self.collection = collection
+        self.vector_store_dir = Path(vector_store_dir or Config.VECTOR_STORE_DIR)
+        self.diretorio = Path(diretorio or Config.TRECHOS_DIR) / self.collection.name
+        self.tamanhos = sorted(tamanhos or Config.TRECHOS_TAMANHOS)
+        
+        self._lock = threading.Lock()
+        self._documentos = {}  # id -> {'hash', 'prefixo', 'cortes'}
+        self._manifesto = {}
+        self._assinatura = None
+    
+    # ═══════════════════════════════════════════════════════════════════════
+    # Consulta
+    # ═══════════════════════════════════════════════════════════════════════
+    
+    def trechos(self, ids: List[str]) -> Dict[str, Optional[Dict[int, str]]]:
+        """Trechos de cada chunk por tamanho (None se o chunk não está indexado)"""
+        self.sincronizar()
+        documentos = self._documentos
+        resultado = {}
+        for chunk_id in ids:
+            documento = documentos.get(chunk_id)
+            resultado[chunk_id] = None if documento is None else {
+                tamanho: documento['prefixo'][:corte]
+                for tamanho, corte in zip(self.tamanhos, documento['cortes'])
+            }
+        return resultado
+    
+    # ═══════════════════════════════════════════════════════════════════════
+    # Atualização
+    # ═══════════════════════════════════════════════════════════════════════
+    
+    def carregado(self) -> bool:
+        """Trechos já carregados (pela primeira busca ou por sincronizar)"""
+        return self._assinatura is not None
+    
+    def sincronizar(self):
+        """Carrega o índice e o atualiza se a collection mudou"""
+        assinatura = assinatura_vector_store(self.vector_store_dir, self.collection.name)
+        total = self.collection.count()
+        if self._assinatura == (assinatura, total):
+            return
+        if self._assinatura is not None and (
+            self._lock.locked() or em_gravacao(self.vector_store_dir, self.collection.name)
+        ):
+            return  # Gravação ou atualização em andamento: segue com os trechos atuais
+        
+        with self._lock:
+            if self._assinatura == (assinatura, total):
+                return
+            
+            if self._assinatura is None:
+                self._ler_disco()
+                if self._manifesto.get('assinatura') == assinatura and len(self._documentos) == total:
+                    self._assinatura = (assinatura, total)
+                    return
+            
+            self._sincronizar_collection()
+            self._assinatura = (assinatura, total)
+            self._salvar(assinatura)
+    
+    def _sincronizar_collection(self):
+        """Recorta só os chunks novos ou alterados e remove os excluídos"""
+        todos = self.collection.get(include=['documents'])
+        
+        documentos = dict(self._documentos)
+        novos, alterados = 0, 0
+        presentes = set()
+        for chunk_id, documento in zip(todos['ids'], todos['documents']):
+            presentes.add(chunk_id)
+            documento = documento or ""
+            atual = documentos.get(chunk_id)
+            if atual is not None and atual['hash'] == _hash(documento):
+                continue
+            novos += atual is None
+            alterados += atual is not None
+            documentos[chunk_id] = self._recortar(documento)
+        
+        removidos = [chunk_id for chunk_id in documentos if chunk_id not in presentes]
+        for chunk_id in removidos:
+            del documentos[chunk_id]
+        
+        if novos or alterados or removidos:
+            print(f"✂️  Índice de trechos atualizado: {novos} novos, {alterados} alterados, {len(removidos)} removidos")
+        # Troca da referência é atômica: consultas concorrentes veem o índice antigo ou o novo
+        self._documentos = documentos
+    
+    def atualizar(self, ids: List[str], documentos: List[str]):
+        """Recorta (ou recorta de novo) chunks explicitamente, sem reler a collection"""
+        with self._lock:
+            atualizados = dict(self._documentos)
+            for chunk_id, documento in zip(ids, documentos):
+                atualizados[chunk_id] = self._recortar(documento or "")
+            self._documentos = atualizados
+    
+    def remover(self, ids: List[str]):
+        """Remove chunks do índice"""
+        with self._lock:
+            restantes = dict(self._documentos)
+            for chunk_id in ids:
+                restantes.pop(chunk_id, None)
+            self._documentos = restantes
+    
+    def _recortar(self, documento: str) -> Dict:
+        """Prefixo do documento e posição de corte de cada tamanho"""
+        # +1: cortar_trecho olha um caractere além do limite
+        prefixo = documento[:self.tamanhos[-1] + 1]
+        cortes = [len(cortar_trecho(prefixo, tamanho)) for tamanho in self.tamanhos]
+        return {'hash': _hash(documento), 'prefixo': prefixo[:max(cortes)], 'cortes': cortes}
+    
+    # ═══════════════════════════════════════════════════════════════════════
+    # Persistência
+    # ═══════════════════════════════════════════════════════════════════════
+    
+    def _ler_disco(self):
+        """Lê índice e manifesto persistidos (se existirem e forem dos mesmos tamanhos)"""
+        self._manifesto = {}
+        indice = self.diretorio / ARQUIVO_INDICE
+        manifesto = self.diretorio / ARQUIVO_MANIFESTO
+        if indice.exists() and manifesto.exists():
+            self._manifesto = json.loads(manifesto.read_text(encoding='utf-8'))
+            if (self._manifesto.get('versao') == VERSAO_TRECHOS
+                    and self._manifesto.get('tamanhos') == self.tamanhos):
+                self._documentos = json.loads(indice.read_text(encoding='utf-8'))
+            else:
+                self._manifesto = {}
+    
+    def _salvar(self, assinatura: str):
+        """Persiste índice e manifesto (manifesto por último)"""
+        self.diretorio.mkdir(parents=True, exist_ok=True)
+        (self.diretorio / ARQUIVO_INDICE).write_text(
+            json.dumps(self._documentos, ensure_ascii=False),
+            encoding='utf-8'
+        )
+        self._manifesto = {
+            'assinatura': assinatura,
+            'versao': VERSAO_TRECHOS,
+            'tamanhos': self.tamanhos,
+            'total_chunks': len(self._documentos)
+        }
+        (self.diretorio / ARQUIVO_MANIFESTO).write_text(
+            json.dumps(self._manifesto, ensure_ascii=False, indent=2),
+            encoding='utf-8'
+        )
@@ -0,0 +1,521 @@
+"""
+═══════════════════════════════════════════════════════════════════════════
+VECTOR BACKEND - BUSCA EXATA EM MEMÓRIA (NUMPY)
+═══════════════════════════════════════════════════════════════════════════
+Alternativa ao ChromaDB para corpora pequenos: exporta a collection uma vez
+para uma matriz float32 memory-mapped + colunas de metadados e responde
+buscas filtradas com um único produto matricial e argpartition.
+
+Com NUMPY_QUANTIZACAO = 'float16' ou 'int8' (escala por vetor), a varredura
+usa uma cópia compacta da matriz (2x ou 4x menor), convertida para float32
+em blocos, e os NUMPY_REESCORE_FATOR x k melhores candidatos são
+reordenados com o produto exato sobre a matriz float32, que fica no disco
+(memory-mapped) e só tem lidas as linhas dos candidatos.
+
+O NumpyVectorStore expõe o mesmo subconjunto da API de collection usado
+pelo RAGRetriever (query, get, count), com retornos no formato do ChromaDB.
+"""
+
+import json
+import os
+import threading
+from contextlib import contextmanager
+from pathlib import Path
+from typing import Dict, List, Optional
+
+import numpy as np
+
+from config.settings import Config
+
+ARQUIVO_VETORES = "vetores.npy"
+ARQUIVO_COLUNAS = "colunas.npz"
+ARQUIVO_REGISTROS = "registros.json"
+ARQUIVO_MANIFESTO = "manifesto.json"
+ARQUIVO_QUANTIZADOS = "vetores_{modo}.npy"
+ARQUIVO_ESCALAS = "escalas_int8.npy"
+
+QUANTIZACOES = ('float32', 'float16', 'int8')
+# Linhas convertidas para float32 por vez (quantização e varredura)
+BLOCO_VARREDURA = 256
+
+# Arquivos do ChromaDB cuja alteração indica mudança na collection
+ARQUIVOS_CHROMA = ("chroma.sqlite3", "chroma.sqlite3-wal")
+
+
+def assinatura_vector_store(vector_store_dir: Path, collection_name: str) -> str:
+    """
+    Gera assinatura barata (sem abrir o ChromaDB) do estado da collection
+    
+    Usa tamanho e mtime dos arquivos SQLite do ChromaDB: qualquer escrita na
+    collection altera a assinatura.
+    """
+    partes = [collection_name]
+    for nome in ARQUIVOS_CHROMA:
+        arquivo = Path(vector_store_dir) / nome
+        if arquivo.exists():
+            stat = arquivo.stat()
+            partes.append(f"{nome}:{stat.st_size}:{stat.st_mtime_ns}")
+    return "|".join(partes)
+
+
+# Collections com gravação em andamento neste processo: (diretório, nome) -> threads que gravam
+_GRAVACOES = {}
+_LOCK_GRAVACOES = threading.Lock()
+
+
+def _chave_gravacao(vector_store_dir: Path, collection_name: str) -> tuple:
+    return str(Path(vector_store_dir).resolve()), collection_name
+
+
+@contextmanager
+def gravacao_em_andamento(vector_store_dir: Path, collection_name: str):
+    """
+    Marca a collection como em gravação pela thread atual enquanto o bloco executa
+    
+    Nas demais threads, índices auxiliares já carregados não se atualizam
+    enquanto a marca existe (cada transação da gravação mudaria a assinatura
+    e faria a busca reler a collection). A thread que grava os atualiza
+    dentro do bloco, ao terminar.
+    """
+    chave = _chave_gravacao(vector_store_dir, collection_name)
+    thread = threading.get_ident()
+    with _LOCK_GRAVACOES:
+        threads = _GRAVACOES.setdefault(chave, {})
+        threads[thread] = threads.get(thread, 0) + 1
+    try:
+        yield
+    finally:
+        with _LOCK_GRAVACOES:
+            threads[thread] -= 1
+            if not threads[thread]:
+                del threads[thread]
+            if not threads:
+                del _GRAVACOES[chave]
+
+
+def em_gravacao(vector_store_dir: Path, collection_name: str) -> bool:
+    """Outra thread está gravando na collection (ver gravacao_em_andamento)"""
+    if not _GRAVACOES:
+        return False
+    with _LOCK_GRAVACOES:
+        threads = _GRAVACOES.get(_chave_gravacao(vector_store_dir, collection_name), {})
+        return any(thread != threading.get_ident() for thread in threads)
+
+
+def _gravar_atomico(destino: Path, gravar):
+    """Grava via gravar(arquivo binário aberto) num temporário e o troca por os.replace"""
+    temporario = destino.with_name(f".{destino.name}.{os.getpid()}.tmp")
+    with open(temporario, 'wb') as arquivo:
+        gravar(arquivo)
+    os.replace(temporario, destino)
+
+
+class NumpyVectorStore:
+    """Busca vetorial exata em memória sobre um export da collection"""
+    
+    def __init__(
+        self,
+        diretorio: Path,
+        quantizacao: Optional[str] = None,
+        reescore_fator: Optional[int] = None
+    ):
+        """
+        Carrega um export existente
+        
+        Args:
+            diretorio: Diretório gerado por NumpyVectorStore.exportar
+            quantizacao: 'float32', 'float16' ou 'int8' (usa Config.NUMPY_QUANTIZACAO se None)
+            reescore_fator: Candidatos reordenados em precisão total, em múltiplos de k (usa Config se None)
+        """
+        self.diretorio = Path(diretorio)
+        self.quantizacao = quantizacao or Config.NUMPY_QUANTIZACAO
+        if self.quantizacao not in QUANTIZACOES:
+            raise ValueError(f"Quantização não suportada: {self.quantizacao} (use {', '.join(QUANTIZACOES)})")
+        self.reescore_fator = reescore_fator or Config.NUMPY_REESCORE_FATOR
+        
+        # Matriz de vetores normalizados (memory-mapped, não copia para RAM)
+        self.vetores = np.load(self.diretorio / ARQUIVO_VETORES, mmap_mode='r')
+        
+        registros = json.loads((self.diretorio / ARQUIVO_REGISTROS).read_text(encoding='utf-8'))
+        self.ids = registros['ids']
+        self.documentos = registros['documentos']
+        self.metadatas = registros['metadatas']
+        self._posicao = {chunk_id: i for i, chunk_id in enumerate(self.ids)}
+        
+        # Colunas de metadados para filtros vetorizados
+        self.colunas = {}
+        with np.load(self.diretorio / ARQUIVO_COLUNAS) as arquivo:
+            for nome in arquivo.files:
+                if nome.startswith('valores__'):
+                    campo = nome[len('valores__'):]
+                    self.colunas[campo] = (arquivo[nome], arquivo[f'presente__{campo}'])
+        
+        self.manifesto = json.loads((self.diretorio / ARQUIVO_MANIFESTO).read_text(encoding='utf-8'))
+        # Nome da collection de origem (mesmo atributo da collection ChromaDB)
+        self.name = self.manifesto.get('collection', self.diretorio.name)
+        
+        # Cópia compacta varrida nas buscas (None = varredura sobre a float32)
+        self._quantizados, self._escalas = None, None
+        if self.quantizacao != 'float32' and len(self.ids):
+            self._quantizados, self._escalas = self._carregar_quantizados()
+    
+    @classmethod
+    def exportar(cls, collection, diretorio: Path, assinatura: str = "") -> 'NumpyVectorStore':
+        """
+        Exporta uma collection ChromaDB para o formato em memória
+        
+        Args:
+            collection: Collection ChromaDB de origem
+            diretorio: Diretório de destino
+            assinatura: Assinatura da collection no momento do export
+            
+        Returns:
+            Store carregado a partir do export
+        """
+        diretorio = Path(diretorio)
+        diretorio.mkdir(parents=True, exist_ok=True)
+        # Sem manifesto até o fim: export em andamento nunca é considerado válido
+        (diretorio / ARQUIVO_MANIFESTO).unlink(missing_ok=True)
+        # Cópias quantizadas do export anterior: refeitas a partir dos vetores novos
+        for modo in QUANTIZACOES[1:]:
+            (diretorio / ARQUIVO_QUANTIZADOS.format(modo=modo)).unlink(missing_ok=True)
+        (diretorio / ARQUIVO_ESCALAS).unlink(missing_ok=True)
+        
+        dados = collection.get(include=['embeddings', 'documents', 'metadatas'])
+        
+        vetores = np.asarray(dados['embeddings'], dtype=np.float32).reshape(len(dados['ids']), -1)
+        if Config.DISTANCE_METRIC == 'cosine':
+            normas = np.linalg.norm(vetores, axis=1, keepdims=True)
+            vetores = vetores / np.where(normas == 0, 1, normas)
+        # Arquivos trocados por os.replace: quem está com o export anterior
+        # memory-mapped (outros retrievers, partições) segue lendo o antigo inteiro
+        _gravar_atomico(diretorio / ARQUIVO_VETORES, lambda arquivo: np.save(arquivo, vetores))
+        
+        metadatas = [meta or {} for meta in dados['metadatas']]
+        colunas = cls._montar_colunas(metadatas)
+        _gravar_atomico(diretorio / ARQUIVO_COLUNAS, lambda arquivo: np.savez(arquivo, **colunas))
+        
+        registros = {
+            'ids': dados['ids'],
+            'documentos': dados['documents'],
+            'metadatas': metadatas
+        }
+        _gravar_atomico(
+            diretorio / ARQUIVO_REGISTROS,
+            lambda arquivo: arquivo.write(json.dumps(registros, ensure_ascii=False).encode('utf-8'))
+        )
+        
+        # Manifesto por último: export incompleto nunca é considerado válido
+        manifesto = {
+            'assinatura': assinatura,
+            'total': len(dados['ids']),
+            'dimensao': int(vetores.shape[1]) if len(vetores) else 0,
+            'metrica': Config.DISTANCE_METRIC,
+            'collection': getattr(collection, 'name', diretorio.name)
+        }
+        _gravar_atomico(diretorio / ARQUIVO_MANIFESTO, lambda arquivo: arquivo.write(json.dumps(manifesto).encode('utf-8')))
+        
+        return cls(diretorio)
+    
+    @staticmethod
+    def _montar_colunas(metadatas: List[Dict]) -> Dict[str, np.ndarray]:
+        """Converte metadados por linha em colunas (valores + máscara de presença)"""
+        campos = sorted({campo for meta in metadatas for campo in meta})
+        colunas = {}
+        
+        for campo in campos:
+            valores = [meta.get(campo) for meta in metadatas]
+            presentes = np.array([v is not None for v in valores])
+            
+            if all(isinstance(v, (int, float, bool)) for v in valores if v is not None):
+                coluna = np.array([np.nan if v is None else float(v) for v in valores])
+            else:
+                coluna = np.array(['' if v is None else str(v) for v in valores])
+            
+            colunas[f'valores__{campo}'] = coluna
+            colunas[f'presente__{campo}'] = presentes
+        
+        return colunas
+    
+    def _carregar_quantizados(self) -> tuple:
+        """Matriz quantizada (e escalas, no int8) memory-mapped, gerada na primeira carga"""
+        arquivo = self.diretorio / ARQUIVO_QUANTIZADOS.format(modo=self.quantizacao)
+        escalas = self.diretorio / ARQUIVO_ESCALAS
+        
+        if not arquivo.exists() or (self.quantizacao == 'int8' and not escalas.exists()):
+            self._quantizar(arquivo, escalas)
+        quantizados = np.load(arquivo, mmap_mode='r')
+        if quantizados.shape != self.vetores.shape:
+            # Sobra de um export anterior: refaz
+            self._quantizar(arquivo, escalas)
+            quantizados = np.load(arquivo, mmap_mode='r')
+        if self.quantizacao == 'int8':
+            return quantizados, np.load(escalas)
+        return quantizados, None
+    
+    def _quantizar(self, arquivo: Path, escalas: Path):
+        """Grava a cópia quantizada, em blocos (temporário + os.replace: leitores nunca veem parcial)"""
+        temporario = arquivo.with_name(f".{arquivo.name}.{os.getpid()}.tmp")
+        destino = np.lib.format.open_memmap(
+            temporario, mode='w+', dtype=np.dtype(self.quantizacao), shape=self.vetores.shape
+        )
+        fatores = np.ones(len(self.vetores), dtype=np.float32)
+        
+        for inicio in range(0, len(self.vetores), BLOCO_VARREDURA):
+            bloco = np.asarray(self.vetores[inicio:inicio + BLOCO_VARREDURA], dtype=np.float32)
+            if self.quantizacao == 'int8':
+                # Escala por vetor: o maior componente em módulo vira ±127
+                maximos = np.abs(bloco).max(axis=1) if bloco.shape[1] else np.zeros(len(bloco))
+                escala = np.where(maximos > 0, maximos / 127, 1).astype(np.float32)
+                fatores[inicio:inicio + len(bloco)] = escala
+                bloco = np.clip(np.rint(bloco / escala[:, None]), -127, 127)
+            destino[inicio:inicio + len(bloco)] = bloco
+        destino.flush()
+        del destino
+        
+        if self.quantizacao == 'int8':
+            temporario_escalas = escalas.with_name(f".{escalas.name}.{os.getpid()}.tmp.npy")
+            np.save(temporario_escalas, fatores)
+            os.replace(temporario_escalas, escalas)
+        os.replace(temporario, arquivo)
+    
+    def memoria_varredura(self) -> int:
+        """Bytes da matriz lida inteira a cada busca (a quantizada, se houver)"""
+        if self._quantizados is None:
+            return int(self.vetores.nbytes)
+        return int(self._quantizados.nbytes + (self._escalas.nbytes if self._escalas is not None else 0))
+    
+    # ═══════════════════════════════════════════════════════════════════════
+    # API compatível com collection do ChromaDB
+    # ═══════════════════════════════════════════════════════════════════════
+    
+    def count(self) -> int:
+        """Número de chunks no store"""
+        return len(self.ids)
+    
+    def query(
+        self,
+        query_embeddings: List[List[float]],
+        n_results: int = 10,
+        where: Optional[Dict] = None,
+        include: Optional[List[str]] = None
+    ) -> Dict:
+        """
+        Busca exata top-k (mesmo formato de retorno de collection.query)
+        
+        Args:
+            query_embeddings: Lista de embeddings de query
+            n_results: Número de resultados por query
+            where: Filtro de metadados no formato do ChromaDB
+            include: Campos a incluir ('documents', 'metadatas', 'distances', 'embeddings')
+        """
+        include = include if include is not None else ['documents', 'metadatas', 'distances']
+        
+        candidatos = self._filtrar(where)
+        consultas = np.asarray(query_embeddings, dtype=np.float32).reshape(-1, self.vetores.shape[1])
+        
+        if self._quantizados is None:
+            matriz = self.vetores if candidatos is None else self.vetores[candidatos]
+            similaridades = consultas @ matriz.T
+        else:
+            similaridades = self._varrer_quantizados(consultas, candidatos)
+        k = min(n_results, similaridades.shape[1])
+        # Quantizado: mais candidatos, reordenados abaixo em precisão total
+        k_varredura = k if self._quantizados is None else min(k * self.reescore_fator, similaridades.shape[1])
+        
+        resultado = {campo: [] for campo in ('ids', 'documents', 'metadatas', 'distances', 'embeddings')}
+        
+        for consulta, linha in zip(consultas, similaridades):
+            topo = self._topo(linha, k_varredura)
+            posicoes = topo if candidatos is None else candidatos[topo]
+            escores = linha[topo]
+            
+            if self._quantizados is not None:
+                # Reescore exato: lê do disco só as linhas dos candidatos
+                escores = np.asarray(self.vetores[posicoes], dtype=np.float32) @ consulta
+                melhores = self._topo(escores, k)
+                posicoes, escores = posicoes[melhores], escores[melhores]
+            
+            resultado['ids'].append([self.ids[p] for p in posicoes])
+            resultado['documents'].append([self.documentos[p] for p in posicoes])
+            resultado['metadatas'].append([self.metadatas[p] for p in posicoes])
+            resultado['distances'].append(self._distancias(escores).tolist())
+            resultado['embeddings'].append(self.vetores[posicoes])
+        
+        return self._aplicar_include(resultado, include)
+    
+    def get(
+        self,
+        ids: Optional[List[str]] = None,
+        where: Optional[Dict] = None,
+        limit: Optional[int] = None,
+        offset: Optional[int] = None,
+        include: Optional[List[str]] = None
+    ) -> Dict:
+        """Busca por ids e/ou filtro (mesmo formato de retorno de collection.get)"""
+        include = include if include is not None else ['documents', 'metadatas']
+        
+        if ids is not None:
+            posicoes = np.array(
+                [self._posicao[i] for i in ids if i in self._posicao], dtype=np.int64
+            )
+        else:
+            posicoes = np.arange(len(self.ids))
+        
+        mascara = self._filtrar(where)
+        if mascara is not None:
+            posicoes = posicoes[np.isin(posicoes, mascara)]
+        
+        inicio = offset or 0
+        posicoes = posicoes[inicio:inicio + limit if limit is not None else None]
+        
+        resultado = {
+            'ids': [self.ids[p] for p in posicoes],
+            'documents': [self.documentos[p] for p in posicoes],
+            'metadatas': [self.metadatas[p] for p in posicoes],
+            'embeddings': self.vetores[posicoes]
+        }
+        return self._aplicar_include(resultado, include)
+    
+    # ═══════════════════════════════════════════════════════════════════════
+    # Auxiliares
+    # ═══════════════════════════════════════════════════════════════════════
+    
+    @staticmethod
+    def _aplicar_include(resultado: Dict, include: List[str]) -> Dict:
+        """Zera campos não solicitados (como o ChromaDB faz)"""
+        for campo in ('documents', 'metadatas', 'distances', 'embeddings'):
+            if campo in resultado and campo not in include:
+                resultado[campo] = None
+        resultado['included'] = list(include)
+        return resultado
+    
+    @staticmethod
+    def _topo(escores: np.ndarray, k: int) -> np.ndarray:
+        """Índices dos k maiores escores, em ordem decrescente"""
+        if k == 0:
+            return np.empty(0, dtype=np.int64)
+        parcial = np.argpartition(-escores, k - 1)[:k]
+        return parcial[np.argsort(-escores[parcial], kind='stable')]
+    
+    def _varrer_quantizados(self, consultas: np.ndarray, candidatos: Optional[np.ndarray]) -> np.ndarray:
+        """Similaridades aproximadas sobre a matriz quantizada, convertida em blocos"""
+        total = len(self.ids) if candidatos is None else len(candidatos)
+        similaridades = np.empty((len(consultas), total), dtype=np.float32)
+        
+        for inicio in range(0, total, BLOCO_VARREDURA):
+            fim = min(inicio + BLOCO_VARREDURA, total)
+            linhas = slice(inicio, fim) if candidatos is None else candidatos[inicio:fim]
+            bloco = self._quantizados[linhas].astype(np.float32)
+            similaridades[:, inicio:fim] = consultas @ bloco.T
+            if self._escalas is not None:
+                similaridades[:, inicio:fim] *= self._escalas[linhas]
+        
+        return similaridades
+    
+    def _distancias(self, similaridades: np.ndarray) -> np.ndarray:
+        """Converte similaridade (produto interno) na distância do ChromaDB"""
+        if self.manifesto.get('metrica') == 'l2':
+            return 2 - 2 * similaridades
+        return 1 - similaridades
+    
+    def _filtrar(self, where: Optional[Dict]) -> Optional[np.ndarray]:
+        """Retorna posições que satisfazem o filtro (None = todas)"""
+        if not where:
+            return None
+        return np.flatnonzero(self._avaliar(where))
+    
+    def _avaliar(self, where: Dict) -> np.ndarray:
+        """Avalia um filtro where do ChromaDB como máscara booleana vetorizada"""
+        mascara = np.ones(len(self.ids), dtype=bool)
+        
+        for chave, condicao in where.items():
+            if chave == '$and':
+                for sub in condicao:
+                    mascara &= self._avaliar(sub)
+            elif chave == '$or':
+                alguma = np.zeros(len(self.ids), dtype=bool)
+                for sub in condicao:
+                    alguma |= self._avaliar(sub)
+                mascara &= alguma
+            elif isinstance(condicao, dict):
+                for operador, valor in condicao.items():
+                    mascara &= self._comparar(chave, operador, valor)
+            else:
+                mascara &= self._comparar(chave, '$eq', condicao)
+        
+        return mascara
+    
+    def _comparar(self, campo: str, operador: str, valor) -> np.ndarray:
+        """Compara uma coluna de metadados com um valor"""
+        if campo not in self.colunas:
+            return np.full(len(self.ids), operador in ('$ne', '$nin'))
+        
+        coluna, presentes = self.colunas[campo]
+        numerica = coluna.dtype.kind == 'f'
+        
+        def converter(v):
+            return float(v) if numerica else str(v)
+        
+        if operador == '$eq':
+            return presentes & (coluna == converter(valor))
+        if operador == '$ne':
+            return ~(presentes & (coluna == converter(valor)))
+        if operador == '$in':
+            return presentes & np.isin(coluna, [converter(v) for v in valor])
+        if operador == '$nin':
+            return ~(presentes & np.isin(coluna, [converter(v) for v in valor]))
+        if operador in ('$gt', '$gte', '$lt', '$lte') and numerica:
+            comparacoes = {
+                '$gt': np.greater, '$gte': np.greater_equal,
+                '$lt': np.less, '$lte': np.less_equal
+            }
+            with np.errstate(invalid='ignore'):
+                return presentes & comparacoes[operador](coluna, float(valor))
+        
+        raise ValueError(f"Operador de filtro não suportado: {operador} ({campo})")
+
+
+def carregar_store_numpy(
+    vector_store_dir: Path,
+    collection_name: str,
+    diretorio: Optional[Path] = None
+) -> NumpyVectorStore:
+    """
+    Carrega o store NumPy, exportando do ChromaDB se ausente ou desatualizado
+    
+    Args:
+        vector_store_dir: Diretório do vector store ChromaDB (origem)
+        collection_name: Nome da collection
+        diretorio: Diretório do export (usa Config.NUMPY_STORE_DIR se None)
+        
+    Returns:
+        NumpyVectorStore pronto para busca
+    """
+    diretorio = Path(diretorio or Config.NUMPY_STORE_DIR) / collection_name
+    assinatura = assinatura_vector_store(vector_store_dir, collection_name)
+    
+    manifesto = diretorio / ARQUIVO_MANIFESTO
+    if manifesto.exists():
+        if json.loads(manifesto.read_text(encoding='utf-8')).get('assinatura') == assinatura:
+            return NumpyVectorStore(diretorio)
+    
+    # Export ausente ou desatualizado: único ponto que abre o ChromaDB
+    print(f"📦 Exportando collection {collection_name} para {diretorio}...")
+    import chromadb
+    from chromadb.config import Settings
+    
+    client = chromadb.PersistentClient(
+        path=str(vector_store_dir),
+        settings=Settings(anonymized_telemetry=False)
+    )
+    collection = client.get_collection(name=collection_name)
+    
+    # Assinatura recalculada após abrir o client (a inicialização pode tocar o SQLite)
+    store = NumpyVectorStore.exportar(
+        collection,
+        diretorio,
+        assinatura_vector_store(vector_store_dir, collection_name)
+    )
+    print(f"✅ Export concluído: {store.count()} chunks")
+    return store
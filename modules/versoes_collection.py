@@ -0,0 +1,264 @@
+"""
+═══════════════════════════════════════════════════════════════════════════
+VERSÕES DA COLLECTION (BLUE/GREEN) COM TROCA ATÔMICA
+═══════════════════════════════════════════════════════════════════════════
+Reindexar a collection em uso faria os retrievers em execução verem uma
+collection pela metade (e disputarem o SQLite com a escrita). Cada build
+vai para uma versão nova, <base>_vN, com vector store próprio em
+VERSOES_DIR/<nome>: a escrita pesada não toca os arquivos da versão ativa.
+
+Um ponteiro (JSON em VERSOES_PONTEIRO) nomeia a versão ativa. Ele só é
+trocado depois da validação da nova versão, por os.replace (atômico): um
+leitor vê o ponteiro antigo ou o novo, nunca um parcial. Os RAGRetriever em
+execução conferem o ponteiro periodicamente e passam para a nova versão sem
+reiniciar. Sem ponteiro, a versão ativa é Config.COLLECTION_NAME em
+Config.VECTOR_STORE_DIR.
+
+Uso:
+    python -m modules.versoes_collection status
+    python -m modules.versoes_collection ativar contestacoes_juridicas_v2
+    python -m modules.versoes_collection reverter
+    python -m modules.versoes_collection limpar --manter 2
+"""
+
+import argparse
+import json
+import os
+import re
+import shutil
+import time
+from pathlib import Path
+from typing import Dict, List, Optional, Tuple
+
+import chromadb
+from chromadb.config import Settings
+
+from config.settings import Config
+
+PADRAO_VERSAO = re.compile(r"^(?P<base>.+)_v(?P<numero>\d+)$")
+
+
+def ler_ponteiro(ponteiro: Optional[Path] = None) -> Optional[Dict]:
+    """Registro da versão ativa ({'collection', 'diretorio', 'anterior', ...}) ou None"""
+    ponteiro = Path(ponteiro or Config.VERSOES_PONTEIRO)
+    if not ponteiro.exists():
+        return None
+    return json.loads(ponteiro.read_text(encoding='utf-8'))
+
+
+def versao_ativa(ponteiro: Optional[Path] = None) -> Tuple[str, Path]:
+    """(nome da collection, diretório do vector store) da versão ativa"""
+    registro = ler_ponteiro(ponteiro)
+    if registro is None:
+        return Config.COLLECTION_NAME, Path(Config.VECTOR_STORE_DIR)
+    return registro['collection'], Path(registro['diretorio'])
+
+
+def proxima_versao() -> Tuple[str, Path]:
+    """Nome e diretório da próxima versão: <base>_v(maior número existente + 1)"""
+    ativa, _ = versao_ativa()
+    match = PADRAO_VERSAO.match(ativa)
+    base = match.group('base') if match else ativa
+    
+    numeros = [int(match.group('numero'))] if match else [0]
+    diretorio = Path(Config.VERSOES_DIR)
+    if diretorio.exists():
+        for entrada in diretorio.iterdir():
+            existente = PADRAO_VERSAO.match(entrada.name)
+            if existente and existente.group('base') == base:
+                numeros.append(int(existente.group('numero')))
+    
+    nome = f"{base}_v{max(numeros) + 1}"
+    return nome, diretorio / nome
+
+
+def abrir_collection(nome: str, diretorio: Path):
+    """Collection ChromaDB de uma versão"""
+    client = chromadb.PersistentClient(
+        path=str(diretorio),
+        settings=Settings(anonymized_telemetry=False)
+    )
+    return client.get_collection(name=nome)
+
+
+def validar_versao(nome: str, diretorio: Path, min_fracao: Optional[float] = None) -> List[str]:
+    """
+    Verifica se uma versão pode ser ativada
+    
+    Checa: collection não vazia, com os três níveis, vetores na dimensão do
+    modelo, busca que encontra o próprio chunk e total de chunks de pelo
+    menos min_fracao do total da versão ativa (build interrompido).
+    
+    Args:
+        nome: Collection da nova versão
+        diretorio: Vector store da nova versão
+        min_fracao: Fração mínima de chunks em relação à ativa (usa Config se None)
+        
+    Returns:
+        Lista de erros (vazia se a versão é válida)
+    """
+    min_fracao = min_fracao if min_fracao is not None else Config.VERSOES_MIN_FRACAO
+    erros = []
+    
+    if not Path(diretorio).exists():
+        return [f"Vector store {diretorio} não existe"]
+    try:
+        collection = abrir_collection(nome, diretorio)
+    except Exception as e:
+        return [f"Collection {nome} não encontrada em {diretorio}: {e}"]
+    
+    total = collection.count()
+    if not total:
+        return [f"Collection {nome} está vazia"]
+    
+    for nivel in (1, 2, 3):
+        if not collection.get(where={'nivel': nivel}, limit=1, include=[])['ids']:
+            erros.append(f"Nenhum chunk de nível {nivel}")
+    
+    amostra = collection.get(limit=1, include=['embeddings'])
+    vetor = amostra['embeddings'][0]
+    if len(vetor) != Config.EMBEDDING_DIM:
+        erros.append(f"Dimensão {len(vetor)} diferente de EMBEDDING_DIM ({Config.EMBEDDING_DIM})")
+    else:
+        encontrados = collection.query(query_embeddings=[vetor], n_results=1, include=[])['ids'][0]
+        if encontrados != amostra['ids']:
+            erros.append("Busca pelo vetor de um chunk não retorna o próprio chunk (índice inconsistente)")
+    
+    nome_ativo, diretorio_ativo = versao_ativa()
+    if (nome_ativo, Path(diretorio_ativo)) != (nome, Path(diretorio)):
+        try:
+            total_ativo = abrir_collection(nome_ativo, diretorio_ativo).count()
+        except Exception:
+            total_ativo = 0  # Versão ativa inacessível: não há com o que comparar
+        if total < min_fracao * total_ativo:
+            erros.append(f"{total} chunks, menos de {min_fracao:.0%} dos {total_ativo} da versão ativa")
+    
+    return erros
+
+
+def _gravar_ponteiro(registro: Dict, ponteiro: Optional[Path] = None):
+    """Grava o ponteiro num temporário e o troca por os.replace (atômico)"""
+    ponteiro = Path(ponteiro or Config.VERSOES_PONTEIRO)
+    ponteiro.parent.mkdir(parents=True, exist_ok=True)
+    temporario = ponteiro.with_name(f".{ponteiro.name}.{os.getpid()}.tmp")
+    with open(temporario, 'w', encoding='utf-8') as arquivo:
+        json.dump(registro, arquivo, ensure_ascii=False, indent=2)
+        arquivo.flush()
+        os.fsync(arquivo.fileno())
+    os.replace(temporario, ponteiro)
+
+
+def ativar_versao(nome: str, diretorio: Path, validar: bool = True, min_fracao: Optional[float] = None) -> Dict:
+    """
+    Torna uma versão a ativa (troca atômica do ponteiro)
+    
+    Args:
+        nome: Collection da versão
+        diretorio: Vector store da versão
+        validar: Roda validar_versao antes (ValueError se reprovada)
+        min_fracao: Repassado a validar_versao
+        
+    Returns:
+        Novo registro do ponteiro
+    """
+    if validar:
+        erros = validar_versao(nome, diretorio, min_fracao)
+        if erros:
+            raise ValueError(f"Versão {nome} reprovada: " + "; ".join(erros))
+    
+    nome_ativo, diretorio_ativo = versao_ativa()
+    registro = {
+        'collection': nome,
+        'diretorio': str(Path(diretorio).resolve()),
+        'total_chunks': abrir_collection(nome, diretorio).count(),
+        'ativado_em': time.strftime('%Y-%m-%dT%H:%M:%S'),
+        'anterior': {'collection': nome_ativo, 'diretorio': str(Path(diretorio_ativo).resolve())}
+    }
+    _gravar_ponteiro(registro)
+    print(f"🔀 Versão ativa: {nome} ({registro['total_chunks']} chunks; anterior: {nome_ativo})")
+    return registro
+
+
+def reverter() -> Dict:
+    """Reativa a versão anterior registrada no ponteiro (sem exigir a fração mínima)"""
+    registro = ler_ponteiro()
+    if not registro or not registro.get('anterior'):
+        raise ValueError("Não há versão anterior registrada")
+    anterior = registro['anterior']
+    return ativar_versao(anterior['collection'], Path(anterior['diretorio']), min_fracao=0.0)
+
+
+def limpar_versoes(manter: Optional[int] = None) -> List[str]:
+    """
+    Remove do disco as versões inativas mais antigas
+    
+    A versão ativa e a anterior (alvo de reverter) nunca são removidas.
+    
+    Args:
+        manter: Versões inativas mantidas, as mais recentes (usa Config se None)
+        
+    Returns:
+        Nomes das versões removidas
+    """
+    manter = manter if manter is not None else Config.VERSOES_MANTER
+    diretorio = Path(Config.VERSOES_DIR)
+    if not diretorio.exists():
+        return []
+    
+    registro = ler_ponteiro() or {}
+    protegidos = {
+        Path(entrada['diretorio']).resolve()
+        for entrada in (registro, registro.get('anterior'))
+        if entrada and entrada.get('diretorio')
+    }
+    inativas = sorted(
+        (
+            entrada for entrada in diretorio.iterdir()
+            if entrada.is_dir() and PADRAO_VERSAO.match(entrada.name) and entrada.resolve() not in protegidos
+        ),
+        key=lambda entrada: int(PADRAO_VERSAO.match(entrada.name).group('numero'))
+    )
+    
+    removidas = inativas[:max(0, len(inativas) - manter)]
+    for entrada in removidas:
+        shutil.rmtree(entrada)
+        print(f"🗑️  Versão removida: {entrada.name}")
+    return [entrada.name for entrada in removidas]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    comandos = parser.add_subparsers(dest='comando', required=True)
+    comandos.add_parser('status', help='Versão ativa e versões em disco')
+    ativar = comandos.add_parser('ativar', help='Valida e ativa uma versão')
+    ativar.add_argument('nome', help='Collection da versão (ex.: contestacoes_juridicas_v2)')
+    ativar.add_argument('--diretorio', type=Path, help='Vector store da versão (padrão: VERSOES_DIR/<nome>)')
+    ativar.add_argument('--forcar', action='store_true', help='Ativa sem validar')
+    comandos.add_parser('reverter', help='Reativa a versão anterior')
+    limpar = comandos.add_parser('limpar', help='Remove versões inativas antigas')
+    limpar.add_argument('--manter', type=int, default=Config.VERSOES_MANTER, help='Versões inativas mantidas')
+    args = parser.parse_args()
+    
+    try:
+        if args.comando == 'status':
+            nome, diretorio = versao_ativa()
+            registro = ler_ponteiro() or {}
+            print(f"✅ Versão ativa: {nome} em {diretorio} ({registro.get('ativado_em', 'sem ponteiro')})")
+            if registro.get('anterior'):
+                print(f"↩️  Anterior: {registro['anterior']['collection']}")
+            if Path(Config.VERSOES_DIR).exists():
+                for entrada in sorted(Path(Config.VERSOES_DIR).iterdir()):
+                    print(f"   📁 {entrada.name}")
+        elif args.comando == 'ativar':
+            ativar_versao(args.nome, args.diretorio or Path(Config.VERSOES_DIR) / args.nome, validar=not args.forcar)
+        elif args.comando == 'reverter':
+            reverter()
+        else:
+            limpar_versoes(args.manter)
+    except ValueError as e:
+        print(f"❌ {e}")
+        raise SystemExit(1)
+
+
+if __name__ == "__main__":
+    main()
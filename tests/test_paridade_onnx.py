@@ -0,0 +1,88 @@
+"""
+═══════════════════════════════════════════════════════════════════════════
+TESTES - PARIDADE DE EMBEDDINGS ONNX (INT8) x TORCH
+═══════════════════════════════════════════════════════════════════════════
+O motor ONNX só pode substituir o torch se os vetores não derivarem: um
+export ou uma quantização com problema muda as buscas sem nenhum erro.
+Os testes com os modelos são pulados quando sentence-transformers,
+onnxruntime ou o próprio modelo (cache ou download) não estão disponíveis.
+"""
+
+import importlib.util
+from pathlib import Path
+
+import numpy as np
+import pytest
+
+from config.settings import Config
+from modules.embedding_engines import (
+    ARQUIVO_ONNX_INT8,
+    MotorEmbeddingONNX,
+    MotorEmbeddingTorch,
+    comparar_vetores,
+    verificar_paridade
+)
+
+TEXTOS = [
+    "Negativa de cobertura de home care pela operadora, com pedido de tutela de urgência.",
+    "Cancelamento unilateral do plano de saúde sem notificação prévia de 60 dias, art. 13 da Lei 9.656/98.",
+    "Demora na autorização de procedimento cirúrgico solicitado em caráter de urgência.",
+    "Pedido de reembolso integral de despesas médicas realizadas fora da rede credenciada.",
+    "Súmula 302 do STJ: é abusiva a cláusula contratual que limita no tempo a internação hospitalar.",
+    "Ausência de cobertura contratual e observância do rol de procedimentos da ANS (RN 465/2021).",
+    "DOS PEDIDOS. Ante o exposto, requer a total improcedência dos pedidos formulados na inicial."
+]
+
+
+def _disponivel(*modulos: str) -> bool:
+    """Todos os módulos instalados (sem importá-los)"""
+    return all(importlib.util.find_spec(modulo) is not None for modulo in modulos)
+
+
+@pytest.fixture(scope='module')
+def motores():
+    """Motores torch e ONNX carregados uma vez para o módulo"""
+    if not _disponivel('sentence_transformers', 'onnxruntime', 'tokenizers'):
+        pytest.skip("sentence-transformers, onnxruntime ou tokenizers não instalados")
+    if not (Path(Config.ONNX_MODEL_DIR) / ARQUIVO_ONNX_INT8).exists() and not _disponivel('torch', 'transformers'):
+        pytest.skip("Modelo ONNX não exportado e sem torch + transformers para exportá-lo")
+    try:
+        return MotorEmbeddingTorch(), MotorEmbeddingONNX()
+    except OSError as e:
+        pytest.skip(f"Modelo {Config.EMBEDDING_MODEL} indisponível (sem cache e sem rede): {e}")
+
+
+def test_paridade_onnx_torch(motores):
+    resultado = verificar_paridade(*motores, TEXTOS)
+    
+    assert resultado['normas_ok'], "Vetores ONNX não normalizados"
+    assert resultado['cosseno_min'] >= Config.ONNX_PARIDADE_MIN_COSSENO, (
+        f"ONNX derivou do torch: cosseno mínimo {resultado['cosseno_min']:.4f} "
+        f"< ONNX_PARIDADE_MIN_COSSENO ({Config.ONNX_PARIDADE_MIN_COSSENO})"
+    )
+
+
+def test_paridade_texto_unico(motores):
+    motor_torch, motor_onnx = motores
+    referencia = motor_torch.encode(TEXTOS[0])
+    avaliado = motor_onnx.encode(TEXTOS[0])
+    
+    assert avaliado.shape == referencia.shape == (Config.EMBEDDING_DIM,)
+    assert comparar_vetores(referencia[None, :], avaliado[None, :])['aprovado']
+
+
+def test_comparar_vetores_reprova_deriva():
+    rng = np.random.default_rng(0)
+    referencia = rng.normal(size=(len(TEXTOS), 64)).astype(np.float32)
+    referencia /= np.linalg.norm(referencia, axis=1, keepdims=True)
+    
+    assert comparar_vetores(referencia, referencia.copy())['aprovado']
+    
+    # Um único vetor derivado reprova o conjunto
+    derivado = referencia.copy()
+    derivado[3] = rng.normal(size=64)
+    derivado[3] /= np.linalg.norm(derivado[3])
+    resultado = comparar_vetores(referencia, derivado)
+    assert not resultado['aprovado']
+    assert resultado['cosseno_min'] < Config.ONNX_PARIDADE_MIN_COSSENO
+    assert resultado['normas_ok']